@@ -661,46 +661,32 @@ class ReportGenerateView(OrganizationRequiredMixin, TemplateView):
 
     def _generate_supplier_performance(self, organization, period_start, period_end):
         """Generate supplier performance report data"""
-        from apps.procurement.models import Supplier, PurchaseOrder, Quote
+        from apps.procurement.scorecards import supplier_scorecards
 
-        suppliers = Supplier.objects.filter(organization=organization)
-        supplier_data = []
-
-        for supplier in suppliers[:20]:
-            pos = PurchaseOrder.objects.filter(
-                organization=organization,
-                supplier=supplier,
-                created_at__date__gte=period_start,
-                created_at__date__lte=period_end
-            )
-            quotes = Quote.objects.filter(
-                supplier=supplier,
-                rfq__organization=organization,
-                created_at__date__gte=period_start,
-                created_at__date__lte=period_end
-            )
-
-            total_spend = pos.aggregate(total=Sum('total_amount'))['total'] or 0
-            completed_pos = pos.filter(status='completed').count()
-            total_pos = pos.count()
-
-            supplier_data.append({
-                'name': supplier.name,
-                'status': supplier.status,
-                'total_spend': float(total_spend),
-                'order_count': total_pos,
-                'quote_count': quotes.count(),
-                'completion_rate': round((completed_pos / total_pos * 100) if total_pos > 0 else 0, 1),
-            })
+        scorecards = supplier_scorecards(
+            organization, status=None, period_start=period_start, period_end=period_end
+        )
+        supplier_data = [
+            {
+                'name': card['name'],
+                'status': card['status'],
+                'total_spend': float(card['total_spend']),
+                'order_count': card['order_count'],
+                'quote_count': card['total_quotes'],
+                'completion_rate': card['completion_rate'],
+            }
+            for card in scorecards
+        ]
 
-        # Sort by total spend
+        # Top suppliers by total spend
         supplier_data.sort(key=lambda x: x['total_spend'], reverse=True)
+        supplier_data = supplier_data[:20]
 
         return {
             'report_title': 'Supplier Performance Report',
             'period': f'{period_start} to {period_end}',
-            'total_suppliers': suppliers.count(),
-            'active_suppliers': suppliers.filter(status='active').count(),
+            'total_suppliers': len(scorecards),
+            'active_suppliers': sum(1 for card in scorecards if card['status'] == 'active'),
             'supplier_details': supplier_data,
             'total_records': len(supplier_data),
         }
@@ -1397,7 +1383,7 @@ class PricingDataExportView(OrganizationRequiredMixin, TemplateView):
         
         from apps.pricing.models import Price
         prices = Price.objects.filter(
-            organization=request.user.profile.organization
+            organization=self.get_user_organization()
         ).select_related('material').order_by('-time')[:1000]
         
         for price in prices:
@@ -1424,7 +1410,7 @@ class ProcurementDataExportView(OrganizationRequiredMixin, TemplateView):
         
         from apps.procurement.models import Quote
         quotes = Quote.objects.filter(
-            organization=request.user.profile.organization
+            organization=self.get_user_organization()
         ).select_related('rfq', 'supplier').order_by('-created_at')[:1000]
         
         for quote in quotes:
@@ -1451,7 +1437,7 @@ class SupplierDataExportView(OrganizationRequiredMixin, TemplateView):
         
         from apps.procurement.models import Supplier
         suppliers = Supplier.objects.filter(
-            organization=request.user.profile.organization
+            organization=self.get_user_organization()
         ).order_by('name')
         
         for supplier in suppliers:
@@ -1596,20 +1582,18 @@ class SupplierMetricsView(OrganizationRequiredMixin, TemplateView):
     
     def _get_supplier_performance(self, organization):
         """Get supplier performance metrics"""
-        from apps.procurement.models import Supplier
+        from apps.procurement.scorecards import supplier_scorecards
         
-        return list(
-            Supplier.objects.filter(
-                organization=organization,
-                quote__isnull=False
-            ).annotate(
-                total_quotes=Count('quote'),
-                approved_quotes=Count('quote', filter=Q(quote__status='approved')),
-                avg_quote_value=Avg('quote__total_value')
-            ).values(
-                'name', 'total_quotes', 'approved_quotes', 'avg_quote_value'
-            )[:20]
-        )
+        return [
+            {
+                'name': card['name'],
+                'total_quotes': card['total_quotes'],
+                'approved_quotes': card['accepted_quotes'],
+                'avg_quote_value': card['avg_quote_value'],
+            }
+            for card in supplier_scorecards(organization, status=None)
+            if card['total_quotes'] > 0
+        ][:20]
 
 
 # Chart Views
@@ -0,0 +1,248 @@
+"""
+Batched, asynchronous audit log writer
+
+Audit middleware hands records to :class:`AuditLogWriter` instead of
+inserting them on the request thread. Records go onto an in-process queue
+and a background thread writes them with ``bulk_create`` once
+``AUDIT_LOG_BATCH_SIZE`` records are waiting or ``AUDIT_LOG_FLUSH_INTERVAL``
+seconds after the first one arrived, whichever comes first.
+
+Work that is not needed to answer the request, such as parsing the request
+body, redacting sensitive fields and detecting PII, runs in the writer
+thread through each record's ``prepare`` callback.
+
+Delivery is at least once. Record ids and ``created_at`` timestamps are
+assigned when a record is submitted, so rows carry the time of the action
+rather than of the flush, and batches are inserted with ``ignore_conflicts``
+so a retried batch cannot create duplicates. Batches are retried with backoff while the
+database is unavailable; a record that cannot be stored at all is logged
+instead.
+Records still queued at interpreter exit are flushed by an ``atexit`` hook.
+When the queue is full, or ``AUDIT_LOG_ASYNC`` is off, records are written
+synchronously.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_QUEUE_SIZE = 10000
+SHUTDOWN_ATTEMPTS = 3
+
+
+@dataclass
+class AuditRecord:
+    """AuditLog field values plus deferred preparation work"""
+    fields: Dict[str, Any]
+    request_data: Optional[Dict[str, Any]] = None
+    prepare: Optional[Callable[['AuditRecord'], None]] = None
+
+
+def capture_request_data(request) -> Optional[Dict[str, Any]]:
+    """
+    Grab the raw request payload of a mutating request without parsing it.
+
+    The body has already been read by the time the response exists, so this
+    only keeps references; use :func:`load_request_data` in ``prepare``.
+    """
+    if request.method not in ('POST', 'PUT', 'PATCH'):
+        return None
+    try:
+        if hasattr(request, 'data'):
+            # DRF request
+            return {'data': dict(request.data)}
+        if 'application/json' in request.META.get('CONTENT_TYPE', ''):
+            return {'json': request.body}
+        return {'data': dict(request.POST)}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def load_request_data(captured: Optional[Dict[str, Any]]) -> Any:
+    """Request data captured by :func:`capture_request_data`"""
+    if not captured:
+        return {}
+    if 'error' in captured:
+        raise ValueError(captured['error'])
+    if 'json' in captured:
+        return json.loads(captured['json'])
+    return captured['data']
+
+
+class AuditLogWriter:
+    """Queues audit records and writes them in batches from a background thread"""
+
+    def __init__(self,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 queue_size: Optional[int] = None,
+                 asynchronous: Optional[bool] = None):
+        self.batch_size = batch_size or getattr(settings, 'AUDIT_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = flush_interval or getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self.queue_size = queue_size or getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        self.asynchronous = (
+            asynchronous if asynchronous is not None else getattr(settings, 'AUDIT_LOG_ASYNC', True)
+        )
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def _ensure_thread(self) -> queue.Queue:
+        # A thread started before a fork (e.g. gunicorn --preload) does not survive in the child
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._closing.clear()
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def submit(self,
+               fields: Dict[str, Any],
+               request_data: Optional[Dict[str, Any]] = None,
+               prepare: Optional[Callable[[AuditRecord], None]] = None) -> None:
+        """Queue one AuditLog row; returns without touching the database"""
+        fields.setdefault('id', uuid.uuid4())
+        fields.setdefault('created_at', timezone.now())
+        record = AuditRecord(fields=fields, request_data=request_data, prepare=prepare)
+        if not self.asynchronous:
+            self._write([record])
+            return
+        try:
+            self._ensure_thread().put_nowait(record)
+        except queue.Full:
+            logger.warning("Audit log queue full; writing record synchronously")
+            self._write([record])
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect_batch()
+            if batch:
+                self._write_with_retry(batch)
+
+        # Records submitted by other threads while shutting down
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            self._write_with_retry(remaining[start:start + self.batch_size])
+
+    def _collect_batch(self):
+        """Block for the first record, then gather more until the batch is full or the interval ends"""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write_with_retry(self, batch: List[AuditRecord]) -> None:
+        """
+        Write a batch, retrying with backoff while the database is unreachable.
+
+        Other errors come from the records themselves, so the batch is split
+        up and only the rows that fail on their own are dropped.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                close_old_connections()
+                self._write(batch)
+                return
+            except (OperationalError, InterfaceError) as e:
+                connection.close()
+                if self._closing.is_set() and attempt >= SHUTDOWN_ATTEMPTS:
+                    self._drop(batch, e)
+                    return
+                delay = min(30.0, 0.5 * 2 ** (attempt - 1))
+                logger.warning(f"Audit log batch of {len(batch)} failed ({e}); retrying in {delay}s")
+                self._closing.wait(delay)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._drop(batch, e)
+                    return
+                for record in batch:
+                    self._write_with_retry([record])
+                return
+
+    def _drop(self, batch: List[AuditRecord], error: Exception) -> None:
+        # Last resort so the records are not silently lost
+        for record in batch:
+            logger.error(f"Unwritten audit log record: {json.dumps(record.fields, default=str)}")
+        logger.error(f"Dropped {len(batch)} audit log records: {error}")
+
+    def _write(self, batch: List[AuditRecord]) -> None:
+        from .models import AuditLog
+
+        entries = []
+        for record in batch:
+            if record.prepare is not None:
+                try:
+                    record.prepare(record)
+                except Exception as e:
+                    logger.error(f"Failed to prepare audit log record: {e}")
+                record.prepare = None
+            entries.append(AuditLog(**record.fields))
+        AuditLog.objects.bulk_create(entries, ignore_conflicts=True)
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer thread"""
+        with self._lock:
+            thread, pid = self._thread, self._pid
+            self._thread = None
+        if thread is not None and pid == os.getpid() and thread.is_alive():
+            self._closing.set()
+            self._queue.put(_STOP)
+            thread.join()
+
+
+_audit_writer: Optional[AuditLogWriter] = None
+_audit_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    """Process-wide audit writer, flushed at interpreter exit"""
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_writer_lock:
+            if _audit_writer is None:
+                _audit_writer = AuditLogWriter()
+                atexit.register(_audit_writer.close)
+    return _audit_writer
@@ -21,6 +21,9 @@ from .security_models import (
     DataRetentionPolicy, UserSecuritySettings
 )
 from .data_encryption import encryption_service, DataMasking
+from .data_subject_export import (
+    EXPORT_FORMAT, SCOPE_ACCESS, SCOPE_PORTABILITY, start_data_subject_export,
+)
 from .vault_integration import secret_manager
 
 User = get_user_model()
@@ -105,31 +108,19 @@ class GDPRCompliance:
     def _handle_access_request(self, user: User) -> Dict[str, Any]:
         """Handle right to access request (Article 15)"""
         try:
-            user_data = self._collect_user_data(user)
-            
-            # Create data export
-            export_data = {
-                'user_info': {
-                    'id': str(user.id),
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'date_joined': user.date_joined.isoformat(),
-                    'last_login': user.last_login.isoformat() if user.last_login else None,
-                },
-                'personal_data': user_data,
+            # The full export is built in the background
+            export = start_data_subject_export(user, SCOPE_ACCESS, metadata={
+                'regulation': 'GDPR',
                 'processing_purposes': self._get_processing_purposes(),
                 'data_categories': self._get_data_categories(),
                 'recipients': self._get_data_recipients(),
                 'retention_periods': self._get_retention_periods(),
-                'export_date': datetime.now().isoformat(),
-                'export_id': f"gdpr_access_{user.id}_{int(datetime.now().timestamp())}",
-            }
+            })
             
             return {
-                'status': 'success',
-                'data': export_data,
-                'format': self.config.user_data_export_format,
+                'status': 'processing',
+                'export_id': export['export_id'],
+                'format': EXPORT_FORMAT,
             }
             
         except Exception as e:
@@ -203,13 +194,12 @@ class GDPRCompliance:
     def _handle_portability_request(self, user: User) -> Dict[str, Any]:
         """Handle right to data portability request (Article 20)"""
         try:
-            portable_data = self._collect_portable_data(user)
+            export = start_data_subject_export(user, SCOPE_PORTABILITY, metadata={'regulation': 'GDPR'})
             
             return {
-                'status': 'success',
-                'data': portable_data,
-                'format': 'json',
-                'export_date': datetime.now().isoformat(),
+                'status': 'processing',
+                'export_id': export['export_id'],
+                'format': EXPORT_FORMAT,
             }
             
         except Exception as e:
@@ -269,91 +259,6 @@ class GDPRCompliance:
             logger.error(f"Objection request failed for user {user.id}: {e}")
             return {'status': 'error', 'message': 'Failed to process objection request'}
     
-    def _collect_user_data(self, user: User) -> Dict[str, Any]:
-        """Collect all user data across the system"""
-        user_data = {}
-        
-        # Profile data
-        if hasattr(user, 'profile'):
-            profile = user.profile
-            user_data['profile'] = {
-                'job_title': profile.job_title,
-                'department': profile.department,
-                'preferences': profile.preferences,
-                'notification_settings': profile.notification_settings,
-            }
-        
-        # Organization memberships
-        memberships = user.organization_memberships.all()
-        user_data['organizations'] = [
-            {
-                'name': mem.organization.name,
-                'role': mem.role,
-                'joined_at': mem.joined_at.isoformat(),
-            }
-            for mem in memberships
-        ]
-        
-        # API keys
-        api_keys = user.api_keys.all()
-        user_data['api_keys'] = [
-            {
-                'name': key.name,
-                'created_at': key.created_at.isoformat(),
-                'last_used': key.last_used.isoformat() if key.last_used else None,
-            }
-            for key in api_keys
-        ]
-        
-        # Login history (last 100)
-        login_history = user.login_history.all()[:100]
-        user_data['login_history'] = [
-            {
-                'login_at': login.login_at.isoformat(),
-                'ip_address': login.ip_address,
-                'success': login.success,
-            }
-            for login in login_history
-        ]
-        
-        # Security events (last 100)
-        security_events = SecurityEvent.objects.filter(user=user)[:100]
-        user_data['security_events'] = [
-            {
-                'event_type': event.event_type,
-                'description': event.description,
-                'created_at': event.created_at.isoformat(),
-                'severity': event.severity,
-            }
-            for event in security_events
-        ]
-        
-        return user_data
-    
-    def _collect_portable_data(self, user: User) -> Dict[str, Any]:
-        """Collect data that can be ported (user-provided data only)"""
-        portable_data = {
-            'personal_info': {
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'phone': getattr(user, 'phone', ''),
-            },
-            'preferences': {},
-        }
-        
-        if hasattr(user, 'profile'):
-            profile = user.profile
-            portable_data['preferences'] = {
-                'job_title': profile.job_title,
-                'department': profile.department,
-                'preferences': profile.preferences,
-                'notification_settings': profile.notification_settings,
-                'theme': profile.theme,
-            }
-        
-        return portable_data
-    
     def _perform_data_erasure(self, user: User) -> Dict[str, Any]:
         """Perform data erasure while maintaining referential integrity"""
         deleted_data = {}
@@ -610,9 +515,13 @@ class CCPACompliance:
         ]
     
     def _get_user_specific_data(self, user: User) -> Dict[str, Any]:
-        """Get user's specific personal information"""
-        gdpr = GDPRCompliance(self.config)
-        return gdpr._collect_user_data(user)
+        """Start an export of the user's specific personal information"""
+        export = start_data_subject_export(user, SCOPE_ACCESS, metadata={'regulation': 'CCPA'})
+        return {
+            'status': export['status'],
+            'export_id': export['export_id'],
+            'format': EXPORT_FORMAT,
+        }
 
 
 class SOC2Compliance:
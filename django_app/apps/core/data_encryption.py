@@ -1,15 +1,28 @@
 """
 Data Encryption and Key Management for AI Pricing Agent
 Implements field-level encryption, database encryption, and key rotation
+
+Fields are encrypted with envelope encryption: each context has a data key
+that is wrapped by Vault (transit) or, without Vault, by the context's local
+key. The plaintext data key is cached in process, so encrypting a field is a
+local AES-GCM operation and Vault is only called when a data key is created
+or first unwrapped. Data keys are replaced when they expire, reach their
+usage limit, or when the context's rotation epoch changes after
+``rotate_key``. Envelope ciphertexts carry their wrapped data key, so values
+encrypted under earlier data keys remain readable.
 """
 import os
 import base64
 import logging
-from typing import Dict, List, Optional, Any, Union, Tuple
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Union, Tuple, Iterable
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes, serialization, padding
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.asymmetric import rsa, padding as asym_padding
@@ -39,6 +52,24 @@ class EncryptionConfig:
     kdf_iterations: int = 100000
     key_rotation_days: int = 90
     backup_key_versions: int = 3
+    data_key_ttl: int = 3600  # seconds a cached data key is used for encryption
+    data_key_max_uses: int = 2 ** 24  # well below the AES-GCM random nonce limit
+    rotation_epoch_check_interval: int = 30  # seconds between rotation epoch lookups
+    unwrapped_key_cache_size: int = 1024
+
+
+ENVELOPE_PREFIX = 'env:'
+LOCAL_WRAP_PREFIX = 'local:'
+
+
+@dataclass
+class DataKey:
+    """Plaintext data key cached for encryption"""
+    key: bytes
+    wrapped: str
+    epoch: int
+    expires_at: float  # time.monotonic()
+    uses: int = 0
 
 
 class EncryptionService:
@@ -48,6 +79,10 @@ class EncryptionService:
         self.config = config or EncryptionConfig()
         self._master_key_cache = {}
         self._key_cache_timeout = 3600  # 1 hour
+        self._lock = threading.Lock()
+        self._data_keys: Dict[Tuple[str, str], DataKey] = {}
+        self._unwrapped_keys: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._epochs: Dict[str, Tuple[int, float]] = {}
     
     def encrypt_field(self, plaintext: str, context: str, key_name: str = None) -> str:
         """Encrypt a field value with context"""
@@ -55,11 +90,8 @@ class EncryptionService:
             return plaintext
         
         try:
-            # Use Vault if available, fallback to local encryption
-            if vault_client.authenticate():
-                return self._encrypt_with_vault(plaintext, key_name or context)
-            else:
-                return self._encrypt_locally(plaintext, context)
+            data_key = self._get_data_key(context, key_name or context)
+            return self._seal(plaintext, context, data_key)
                 
         except Exception as e:
             logger.error(f"Encryption failed for context {context}: {e}")
@@ -71,8 +103,10 @@ class EncryptionService:
             return ciphertext
         
         try:
+            if ciphertext.startswith(ENVELOPE_PREFIX):
+                return self._open(ciphertext, context, key_name or context)
             # Check if it's Vault encrypted (starts with vault:)
-            if ciphertext.startswith('vault:'):
+            elif ciphertext.startswith('vault:'):
                 if vault_client.authenticate():
                     return self._decrypt_with_vault(ciphertext, key_name or context)
                 else:
@@ -84,41 +118,164 @@ class EncryptionService:
             logger.error(f"Decryption failed for context {context}: {e}")
             raise SecurityException(f"Decryption failed: {e}")
     
-    def _encrypt_with_vault(self, plaintext: str, key_name: str) -> str:
-        """Encrypt using Vault transit engine"""
-        try:
-            ciphertext = vault_client.encrypt_data(plaintext, key_name)
-            return ciphertext
-        except Exception as e:
-            logger.warning(f"Vault encryption failed, falling back to local: {e}")
-            return self._encrypt_locally(plaintext, key_name)
+    def encrypt_values(self, values: Iterable[str], context: str, key_name: str = None) -> List[str]:
+        """Encrypt many values of one context"""
+        return [self.encrypt_field(value, context, key_name) for value in values]
     
-    def _decrypt_with_vault(self, ciphertext: str, key_name: str) -> str:
-        """Decrypt using Vault transit engine"""
-        return vault_client.decrypt_data(ciphertext, key_name)
+    def decrypt_values(self, values: Iterable[str], context: str, key_name: str = None) -> List[str]:
+        """Decrypt many values of one context"""
+        return [self.decrypt_field(value, context, key_name) for value in values]
     
-    def _encrypt_locally(self, plaintext: str, context: str) -> str:
-        """Encrypt locally using AES-GCM"""
-        # Get or derive key
-        key = self._get_or_derive_key(context)
-        
-        # Generate random IV
-        iv = secrets.token_bytes(self.config.iv_size)
-        
-        # Encrypt
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.GCM(iv),
-            backend=default_backend()
+    def bulk_encrypt(self, objects, field_names: List[str], batch_size: int = 500) -> int:
+        """
+        Encrypt fields of many model instances.
+        
+        Values that are already encrypted are left alone. When ``objects``
+        is a QuerySet, the changed rows are written back with
+        ``bulk_update``, bypassing ``save()``.
+        
+        Returns:
+            Number of instances that had at least one field encrypted
+        """
+        changed = []
+        for obj in objects:
+            updated = False
+            for field_name in field_names:
+                value = getattr(obj, field_name)
+                if value and not is_encrypted_value(value):
+                    setattr(obj, field_name, self.encrypt_field(value, field_context(obj, field_name)))
+                    updated = True
+            if updated:
+                changed.append(obj)
+        
+        if changed and isinstance(objects, models.QuerySet):
+            objects.model.objects.bulk_update(changed, field_names, batch_size=batch_size)
+        return len(changed)
+    
+    def bulk_decrypt(self, objects, field_names: List[str]) -> List[Dict[str, Any]]:
+        """
+        Decrypt fields of many model instances without modifying them.
+        
+        Returns:
+            One dict per instance with ``pk`` and the decrypted fields
+        """
+        results = []
+        for obj in objects:
+            row = {'pk': obj.pk}
+            for field_name in field_names:
+                value = getattr(obj, field_name)
+                if value and is_encrypted_value(value):
+                    value = self.decrypt_field(value, field_context(obj, field_name))
+                row[field_name] = value
+            results.append(row)
+        return results
+    
+    def _seal(self, plaintext: str, context: str, data_key: DataKey) -> str:
+        """Envelope ciphertext: prefix, wrapped data key, then nonce + ciphertext + tag"""
+        nonce = secrets.token_bytes(self.config.iv_size)
+        ciphertext_bytes = AESGCM(data_key.key).encrypt(nonce, plaintext.encode('utf-8'), context.encode('utf-8'))
+        payload = base64.b64encode(nonce + ciphertext_bytes).decode('ascii')
+        return f"{ENVELOPE_PREFIX}{data_key.wrapped}.{payload}"
+    
+    def _open(self, ciphertext: str, context: str, key_name: str) -> str:
+        wrapped, _, payload = ciphertext[len(ENVELOPE_PREFIX):].rpartition('.')
+        encrypted_data = base64.b64decode(payload)
+        key = self._unwrap_data_key(wrapped, context, key_name)
+        plaintext_bytes = AESGCM(key).decrypt(
+            encrypted_data[:self.config.iv_size],
+            encrypted_data[self.config.iv_size:],
+            context.encode('utf-8')
         )
-        encryptor = cipher.encryptor()
-        ciphertext_bytes = encryptor.update(plaintext.encode('utf-8')) + encryptor.finalize()
-        
-        # Combine IV + tag + ciphertext
-        encrypted_data = iv + encryptor.tag + ciphertext_bytes
+        return plaintext_bytes.decode('utf-8')
+    
+    def _get_data_key(self, context: str, key_name: str) -> DataKey:
+        """Cached data key for encrypting in ``context``, replaced when stale"""
+        epoch = self._rotation_epoch(context)
+        with self._lock:
+            data_key = self._data_keys.get((context, key_name))
+            if (data_key is not None and data_key.epoch == epoch
+                    and data_key.uses < self.config.data_key_max_uses
+                    and time.monotonic() < data_key.expires_at):
+                data_key.uses += 1
+                return data_key
+        
+        # Created outside the lock; a concurrent creation just wins or loses
+        key, wrapped = self._create_data_key(context, key_name)
+        data_key = DataKey(
+            key=key,
+            wrapped=wrapped,
+            epoch=epoch,
+            expires_at=time.monotonic() + self.config.data_key_ttl,
+            uses=1,
+        )
+        with self._lock:
+            self._data_keys[(context, key_name)] = data_key
+            self._remember_unwrapped(wrapped, key)
+        return data_key
+    
+    def _create_data_key(self, context: str, key_name: str) -> Tuple[bytes, str]:
+        """New data key and its wrapped form"""
+        if vault_client.authenticate():
+            try:
+                response = vault_client.generate_data_key(key_name, bits=self.config.key_size * 8)
+                return base64.b64decode(response['plaintext']), response['ciphertext']
+            except Exception as e:
+                logger.warning(f"Vault data key generation failed, wrapping locally: {e}")
+        
+        key = secrets.token_bytes(self.config.key_size)
+        nonce = secrets.token_bytes(self.config.iv_size)
+        wrapping_key = self._get_or_derive_key(context)
+        wrapped_bytes = AESGCM(wrapping_key).encrypt(nonce, key, context.encode('utf-8'))
+        return key, LOCAL_WRAP_PREFIX + base64.b64encode(nonce + wrapped_bytes).decode('ascii')
+    
+    def _unwrap_data_key(self, wrapped: str, context: str, key_name: str) -> bytes:
+        with self._lock:
+            key = self._unwrapped_keys.get(wrapped)
+            if key is not None:
+                self._unwrapped_keys.move_to_end(wrapped)
+                return key
+        
+        if wrapped.startswith(LOCAL_WRAP_PREFIX):
+            wrapped_bytes = base64.b64decode(wrapped[len(LOCAL_WRAP_PREFIX):])
+            wrapping_key = self._get_or_derive_key(context)
+            key = AESGCM(wrapping_key).decrypt(
+                wrapped_bytes[:self.config.iv_size],
+                wrapped_bytes[self.config.iv_size:],
+                context.encode('utf-8')
+            )
+        elif vault_client.authenticate():
+            key = base64.b64decode(vault_client.decrypt_data(wrapped, key_name))
+        else:
+            raise SecurityException("Vault not available for decryption")
         
-        # Encode as base64
-        return base64.b64encode(encrypted_data).decode('utf-8')
+        with self._lock:
+            self._remember_unwrapped(wrapped, key)
+        return key
+    
+    def _remember_unwrapped(self, wrapped: str, key: bytes):
+        # Caller holds self._lock
+        self._unwrapped_keys[wrapped] = key
+        self._unwrapped_keys.move_to_end(wrapped)
+        while len(self._unwrapped_keys) > self.config.unwrapped_key_cache_size:
+            self._unwrapped_keys.popitem(last=False)
+    
+    def _rotation_epoch(self, context: str) -> int:
+        """
+        Rotation epoch of a context, shared between processes via the cache.
+        
+        Looked up at most every ``rotation_epoch_check_interval`` seconds.
+        """
+        now = time.monotonic()
+        cached = self._epochs.get(context)
+        if cached and now < cached[1]:
+            return cached[0]
+        epoch = cache.get(f"encryption_key_epoch:{context}", 0)
+        self._epochs[context] = (epoch, now + self.config.rotation_epoch_check_interval)
+        return epoch
+    
+    def _decrypt_with_vault(self, ciphertext: str, key_name: str) -> str:
+        """Decrypt using Vault transit engine"""
+        return vault_client.decrypt_data(ciphertext, key_name)
     
     def _decrypt_locally(self, ciphertext: str, context: str) -> str:
         """Decrypt locally using AES-GCM"""
@@ -220,9 +377,18 @@ class EncryptionService:
                 }
                 vault_client.write_secret(f"encryption/{context}", key_data)
             
-            # Clear cache
+            # Clear cache and start a new data key epoch in every process
             cache_key = f"encryption_key:{context}"
             self._master_key_cache.pop(cache_key, None)
+            epoch_key = f"encryption_key_epoch:{context}"
+            try:
+                cache.incr(epoch_key)
+            except ValueError:
+                cache.set(epoch_key, 1, None)
+            with self._lock:
+                for key in [key for key in self._data_keys if key[0] == context]:
+                    del self._data_keys[key]
+            self._epochs.pop(context, None)
             
             # Log rotation
             SecurityEvent.log_event(
@@ -365,6 +531,29 @@ class EncryptionService:
             raise SecurityException(f"File decryption failed: {e}")
 
 
+def field_context(obj, field_name: str) -> str:
+    """Encryption context of a model field"""
+    return f"{obj._meta.label_lower}_{field_name}"
+
+
+def is_encrypted_value(value: str) -> bool:
+    """Check if value is already encrypted"""
+    if not value:
+        return False
+    
+    # Check for envelope and Vault formats
+    if value.startswith((ENVELOPE_PREFIX, 'vault:')):
+        return True
+    
+    # Check for base64 format (local encryption)
+    try:
+        base64.b64decode(value)
+        # If it's valid base64 and long enough, assume it's encrypted
+        return len(value) > 20
+    except:
+        return False
+
+
 class EncryptedFieldMixin:
     """Mixin for models with encrypted fields"""
     
@@ -372,16 +561,10 @@ class EncryptedFieldMixin:
     
     def save(self, *args, **kwargs):
         """Override save to encrypt fields"""
-        encryption_service = EncryptionService()
-        
-        for field_name in self.ENCRYPTED_FIELDS:
-            if hasattr(self, field_name):
-                field_value = getattr(self, field_name)
-                if field_value and not self._is_encrypted(field_value):
-                    # Encrypt the field
-                    context = f"{self._meta.label_lower}_{field_name}"
-                    encrypted_value = encryption_service.encrypt_field(field_value, context)
-                    setattr(self, field_name, encrypted_value)
+        # The shared service keeps data keys cached between saves
+        encryption_service.bulk_encrypt([self], [
+            field_name for field_name in self.ENCRYPTED_FIELDS if hasattr(self, field_name)
+        ])
         
         super().save(*args, **kwargs)
     
@@ -394,9 +577,7 @@ class EncryptedFieldMixin:
         if not field_value or not self._is_encrypted(field_value):
             return field_value
         
-        encryption_service = EncryptionService()
-        context = f"{self._meta.label_lower}_{field_name}"
-        return encryption_service.decrypt_field(field_value, context)
+        return encryption_service.decrypt_field(field_value, field_context(self, field_name))
     
     def set_encrypted_field(self, field_name: str, value: str):
         """Set encrypted field value"""
@@ -404,29 +585,14 @@ class EncryptedFieldMixin:
             raise ValueError(f"Field {field_name} is not encrypted")
         
         if value:
-            encryption_service = EncryptionService()
-            context = f"{self._meta.label_lower}_{field_name}"
-            encrypted_value = encryption_service.encrypt_field(value, context)
+            encrypted_value = encryption_service.encrypt_field(value, field_context(self, field_name))
             setattr(self, field_name, encrypted_value)
         else:
             setattr(self, field_name, value)
     
     def _is_encrypted(self, value: str) -> bool:
         """Check if value is already encrypted"""
-        if not value:
-            return False
-        
-        # Check for Vault format
-        if value.startswith('vault:'):
-            return True
-        
-        # Check for base64 format (local encryption)
-        try:
-            base64.b64decode(value)
-            # If it's valid base64 and long enough, assume it's encrypted
-            return len(value) > 20
-        except:
-            return False
+        return is_encrypted_value(value)
 
 
 class DatabaseEncryption:
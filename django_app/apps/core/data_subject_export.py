@@ -0,0 +1,267 @@
+"""
+Data-subject exports for GDPR access/portability and CCPA right-to-know requests
+
+An export is a ZIP archive with one NDJSON file per data category and a
+``manifest.json`` describing the export. Every category is exported in full:
+rows are read with ``QuerySet.iterator()``, which uses server-side cursors
+on PostgreSQL, and written straight into a deflated archive entry, so memory
+use stays flat however much login, audit or security history a user has.
+The archive is assembled in a temporary file and then saved to the default
+storage under ``data_subject_exports/``.
+
+Exports run in the ``core.export_data_subject_data`` Celery task. Status and
+progress are kept in the cache under ``data_subject_export:{export_id}``;
+see :func:`get_export_status`.
+"""
+import json
+import logging
+import tempfile
+import uuid
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = 'ndjson+zip'
+EXPORT_STATUS_TIMEOUT = 7 * 24 * 3600  # 1 week
+CHUNK_SIZE = 2000  # rows fetched per cursor round trip and written per batch
+PROGRESS_INTERVAL = 10000  # rows between progress updates
+
+SCOPE_ACCESS = 'access'
+SCOPE_PORTABILITY = 'portability'
+
+
+@dataclass
+class ExportCategory:
+    """One NDJSON file of an export"""
+    name: str
+    queryset: Callable[[Any], Any]  # user -> QuerySet, or None if not applicable
+    fields: Tuple[str, ...]
+    order_by: str = 'pk'
+
+
+def _related(attribute: str) -> Callable[[Any], Any]:
+    """Rows of a reverse relation of the user, if the relation exists"""
+    def queryset(user):
+        manager = getattr(user, attribute, None)
+        return manager.all() if manager is not None else None
+    return queryset
+
+
+def _user_rows(user):
+    return User.objects.filter(pk=user.pk)
+
+
+def _profile_rows(user):
+    from apps.accounts.models import UserProfile
+    return UserProfile.objects.filter(user=user)
+
+
+def _security_event_rows(user):
+    from .security_models import SecurityEvent
+    return SecurityEvent.objects.filter(user=user)
+
+
+def _audit_log_rows(user):
+    from .models import AuditLog
+    return AuditLog.objects.filter(user=user)
+
+
+PERSONAL_INFO = ExportCategory(
+    'personal_info', _user_rows,
+    ('email', 'first_name', 'last_name', 'date_joined', 'last_login'),
+)
+
+EXPORT_CATEGORIES: Dict[str, List[ExportCategory]] = {
+    SCOPE_ACCESS: [
+        PERSONAL_INFO,
+        ExportCategory('profile', _profile_rows, (
+            'job_title', 'department', 'organization__name', 'role', 'phone', 'mobile',
+            'timezone', 'language', 'notifications_enabled', 'email_notifications',
+            'sms_notifications', 'bio', 'linkedin_url', 'date_of_birth', 'last_login_ip',
+            'created_at', 'updated_at',
+        )),
+        ExportCategory('organizations', _related('organization_memberships'),
+                       ('organization__name', 'role', 'joined_at')),
+        ExportCategory('api_keys', _related('api_keys'), ('name', 'created_at', 'last_used')),
+        ExportCategory('login_history', _related('login_history'),
+                       ('login_at', 'ip_address', 'success'), order_by='login_at'),
+        ExportCategory('security_events', _security_event_rows, (
+            'event_type', 'severity', 'description', 'ip_address', 'user_agent', 'created_at',
+        ), order_by='created_at'),
+        ExportCategory('audit_logs', _audit_log_rows, (
+            'action', 'object_type', 'object_id', 'object_repr', 'changes',
+            'ip_address', 'user_agent', 'created_at',
+        ), order_by='created_at'),
+    ],
+    # User-provided data only (GDPR Article 20)
+    SCOPE_PORTABILITY: [
+        PERSONAL_INFO,
+        ExportCategory('preferences', _profile_rows, (
+            'job_title', 'department', 'phone', 'mobile', 'timezone', 'language',
+            'notifications_enabled', 'email_notifications', 'sms_notifications',
+            'bio', 'linkedin_url',
+        )),
+    ],
+}
+
+
+def _status_key(export_id: str) -> str:
+    return f'data_subject_export:{export_id}'
+
+
+def get_export_status(export_id: str) -> Optional[Dict[str, Any]]:
+    """Status, progress and, once completed, the artifact path of an export"""
+    return cache.get(_status_key(export_id))
+
+
+def update_export_status(export_id: str, **status) -> Dict[str, Any]:
+    """Merge ``status`` into the cached status of an export"""
+    current = cache.get(_status_key(export_id)) or {'export_id': export_id}
+    current.update(status)
+    cache.set(_status_key(export_id), current, EXPORT_STATUS_TIMEOUT)
+    return current
+
+
+def start_data_subject_export(user, scope: str = SCOPE_ACCESS,
+                              metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Queue an export of a user's data.
+
+    Args:
+        user: Data subject
+        scope: ``access`` for everything held about the user, ``portability``
+            for user-provided data only
+        metadata: JSON-serializable values added to the manifest, such as
+            processing purposes and retention periods
+
+    Returns:
+        Initial status of the export, including its ``export_id``
+    """
+    from .tasks import export_data_subject_data
+
+    if scope not in EXPORT_CATEGORIES:
+        raise ValueError(f"Unknown export scope: {scope}")
+
+    export_id = f"{scope}_{user.pk}_{uuid.uuid4().hex}"
+    status = update_export_status(
+        export_id,
+        status='queued',
+        scope=scope,
+        user_id=user.pk,
+        format=EXPORT_FORMAT,
+        percentage=0,
+        requested_at=timezone.now().isoformat(),
+    )
+    export_data_subject_data.delay(user.pk, export_id, scope, metadata or {})
+    return status
+
+
+def _write_category(archive: zipfile.ZipFile, queryset, category: ExportCategory,
+                    on_rows: Callable[[int], None]) -> int:
+    """Stream one category into an archive entry; returns the row count"""
+    encoder = DjangoJSONEncoder()
+    rows = queryset.order_by(category.order_by).values(*category.fields).iterator(chunk_size=CHUNK_SIZE)
+    written = 0
+    batch = []
+    # force_zip64: the entry size is not known up front and may exceed 2 GiB
+    with archive.open(f'{category.name}.ndjson', 'w', force_zip64=True) as entry:
+        for row in rows:
+            batch.append(encoder.encode(row))
+            if len(batch) >= CHUNK_SIZE:
+                entry.write(('\n'.join(batch) + '\n').encode('utf-8'))
+                written += len(batch)
+                on_rows(len(batch))
+                batch = []
+        if batch:
+            entry.write(('\n'.join(batch) + '\n').encode('utf-8'))
+            written += len(batch)
+            on_rows(len(batch))
+    return written
+
+
+def export_data_subject_data(user, export_id: str, scope: str = SCOPE_ACCESS,
+                             metadata: Dict[str, Any] = None,
+                             progress_callback: Callable[[int, int], None] = None) -> Dict[str, Any]:
+    """
+    Build the export archive of a user and save it to the default storage.
+
+    Args:
+        progress_callback: Called with (rows written, total rows)
+
+    Returns:
+        Final status of the export
+    """
+    categories = []
+    for category in EXPORT_CATEGORIES[scope]:
+        queryset = category.queryset(user)
+        if queryset is not None:
+            categories.append((category, queryset))
+
+    # Counting first gives a meaningful percentage; new rows added while the
+    # export runs can push it slightly past the total
+    total_rows = sum(queryset.count() for _, queryset in categories)
+    progress = {'rows': 0, 'reported': 0}
+
+    def on_rows(count: int):
+        progress['rows'] += count
+        if progress['rows'] - progress['reported'] >= PROGRESS_INTERVAL:
+            progress['reported'] = progress['rows']
+            _report(export_id, progress['rows'], total_rows, progress_callback)
+
+    update_export_status(export_id, status='processing', started_at=timezone.now().isoformat(),
+                total_rows=total_rows, rows_written=0)
+
+    counts = {}
+    with tempfile.TemporaryFile() as artifact:
+        with zipfile.ZipFile(artifact, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for category, queryset in categories:
+                update_export_status(export_id, category=category.name)
+                counts[category.name] = _write_category(archive, queryset, category, on_rows)
+
+            manifest = {
+                'export_id': export_id,
+                'scope': scope,
+                'user_id': str(user.pk),
+                'format': EXPORT_FORMAT,
+                'generated_at': timezone.now().isoformat(),
+                'categories': {
+                    name: {'file': f'{name}.ndjson', 'rows': rows} for name, rows in counts.items()
+                },
+                **(metadata or {}),
+            }
+            archive.writestr('manifest.json', json.dumps(manifest, cls=DjangoJSONEncoder, indent=2))
+
+        size = artifact.tell()
+        artifact.seek(0)
+        path = default_storage.save(f'data_subject_exports/{user.pk}/{export_id}.zip', File(artifact))
+
+    _report(export_id, progress['rows'], total_rows, progress_callback)
+    logger.info(f"Data subject export {export_id} written to {path} ({progress['rows']} rows, {size} bytes)")
+    return update_export_status(
+        export_id,
+        status='completed',
+        category=None,
+        artifact=path,
+        size=size,
+        rows_written=progress['rows'],
+        counts=counts,
+        percentage=100,
+        completed_at=timezone.now().isoformat(),
+    )
+
+
+def _report(export_id: str, rows: int, total: int, callback: Optional[Callable[[int, int], None]]):
+    percentage = min(100, int(rows * 100 / total)) if total else 100
+    update_export_status(export_id, rows_written=rows, percentage=percentage)
+    if callback is not None:
+        callback(rows, total)
@@ -1,7 +1,6 @@
 """
 Custom middleware for the pricing agent
 """
-import json
 import logging
 import time
 from django.http import JsonResponse, HttpResponse
@@ -10,8 +9,10 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils import timezone
 from rest_framework import status
-from apps.core.models import AuditLog, Organization
+from apps.core.models import Organization
+from apps.core.audit_writer import capture_request_data, get_audit_writer, load_request_data
 from apps.core.exceptions import OrganizationAccessDenied
+from apps.core.organization_context import get_organization_context, get_user_context
 import traceback
 
 User = get_user_model()
@@ -79,25 +80,24 @@ class AuditMiddleware(MiddlewareMixin):
         # Get user agent
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         
-        # Get changes (for POST/PUT/PATCH requests)
+        # Get changes; request data is parsed and redacted by the audit writer
         changes = self.get_changes(request, response)
         
-        # Calculate response time
-        response_time = None
-        if hasattr(request, '_audit_start_time'):
-            response_time = time.time() - request._audit_start_time
-        
-        # Create audit log
-        AuditLog.objects.create(
-            user=user,
-            organization=organization,
-            action=action,
-            object_type=object_type,
-            object_id=object_id,
-            object_repr=object_repr,
-            changes=changes,
-            ip_address=ip_address,
-            user_agent=user_agent,
+        # Queue audit log; it is written in a background batch
+        get_audit_writer().submit(
+            {
+                'user_id': user.pk if user else None,
+                'organization_id': getattr(organization, 'pk', None),
+                'action': action,
+                'object_type': object_type or '',
+                'object_id': object_id,
+                'object_repr': object_repr or '',
+                'changes': changes,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+            },
+            request_data=capture_request_data(request),
+            prepare=self.prepare_changes,
         )
     
     def get_action(self, request, response):
@@ -169,28 +169,24 @@ class AuditMiddleware(MiddlewareMixin):
         if hasattr(request, '_audit_start_time'):
             changes['response_time_ms'] = round((time.time() - request._audit_start_time) * 1000, 2)
         
-        # Include request data for POST/PUT/PATCH
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            try:
-                if hasattr(request, 'data'):
-                    # DRF request
-                    changes['request_data'] = dict(request.data)
-                elif request.content_type == 'application/json':
-                    # JSON request
-                    changes['request_data'] = json.loads(request.body)
-                else:
-                    # Form data
-                    changes['request_data'] = dict(request.POST)
-                
-                # Remove sensitive fields
-                sensitive_fields = ['password', 'token', 'secret', 'key']
-                for field in sensitive_fields:
-                    if field in changes.get('request_data', {}):
-                        changes['request_data'][field] = '[REDACTED]'
-            except:
-                pass
-        
         return changes
+    
+    @staticmethod
+    def prepare_changes(record):
+        """Add the redacted request data to a queued record (runs in the audit writer)"""
+        if record.request_data is None:
+            return
+        try:
+            request_data = load_request_data(record.request_data)
+            
+            # Remove sensitive fields
+            sensitive_fields = ['password', 'token', 'secret', 'key']
+            for field in sensitive_fields:
+                if field in request_data:
+                    request_data[field] = '[REDACTED]'
+            record.fields['changes']['request_data'] = request_data
+        except:
+            pass
 
 
 class OrganizationMiddleware(MiddlewareMixin):
@@ -218,18 +214,21 @@ class OrganizationMiddleware(MiddlewareMixin):
     
     def get_organization_from_request(self, request):
         """Get organization from request"""
+        context = get_organization_context(request)
+        
         # Try from header first (API requests)
         org_id = request.META.get('HTTP_X_ORGANIZATION_ID')
         if org_id:
+            if context.organization and str(context.organization_id) == org_id and context.organization.is_active:
+                return context.organization
             try:
                 return Organization.objects.get(id=org_id, is_active=True)
             except Organization.DoesNotExist:
                 pass
         
-        # Try from user's default organization
-        user_profile = getattr(request.user, 'profile', None)
-        if user_profile and hasattr(user_profile, 'default_organization'):
-            return user_profile.default_organization
+        # Try from user's profile organization
+        if context.organization:
+            return context.organization
         
         # Try from user's organization memberships
         if hasattr(request.user, 'organization_memberships'):
@@ -247,6 +246,10 @@ class OrganizationMiddleware(MiddlewareMixin):
         if user.is_superuser:
             return True
         
+        # The user's own organization
+        if get_user_context(user).organization_id == organization.pk:
+            return True
+        
         # Check organization memberships
         if hasattr(user, 'organization_memberships'):
             return user.organization_memberships.filter(
@@ -6,6 +6,9 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from apps.accounts.models import UserProfile
 from apps.core.models import Organization
+from apps.core.organization_context import (
+    get_organization_context, get_user_context, reset_organization_context,
+)
 
 
 class OrganizationRequiredMixin(LoginRequiredMixin):
@@ -19,7 +22,7 @@ class OrganizationRequiredMixin(LoginRequiredMixin):
             return super().dispatch(request, *args, **kwargs)
         
         # Ensure user has a profile
-        if not hasattr(request.user, 'profile'):
+        if get_organization_context(request).profile is None:
             # Create profile on the fly if needed
             default_org, _ = Organization.objects.get_or_create(
                 name='Default Organization',
@@ -36,6 +39,7 @@ class OrganizationRequiredMixin(LoginRequiredMixin):
                 department='General'
             )
             
+            reset_organization_context(request)
             messages.info(request, "Your user profile has been created.")
         
         return super().dispatch(request, *args, **kwargs)
@@ -44,9 +48,7 @@ class OrganizationRequiredMixin(LoginRequiredMixin):
         """
         Safe method to get user's organization
         """
-        if hasattr(self.request.user, 'profile'):
-            return self.request.user.profile.organization
-        return None
+        return get_organization_context(self.request).organization
     
     def get_queryset(self):
         """
@@ -68,9 +70,8 @@ def get_user_organization(user):
     if not user.is_authenticated:
         return None
     
-    try:
-        return user.profile.organization
-    except (AttributeError, UserProfile.DoesNotExist):
+    organization = get_user_context(user).organization
+    if organization is None:
         # Create profile on the fly
         default_org, _ = Organization.objects.get_or_create(
             name='Default Organization',
@@ -87,4 +88,7 @@ def get_user_organization(user):
             department='General'
         )
         
-        return profile.organization
\ No newline at end of file
+        reset_organization_context(user)
+        organization = profile.organization
+    
+    return organization
\ No newline at end of file
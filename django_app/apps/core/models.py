@@ -90,7 +90,8 @@ class AuditLog(models.Model):
     changes = models.JSONField(default=dict, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the action happens, not when the batched writer stores the row
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'audit_logs'
@@ -0,0 +1,146 @@
+"""
+Per-request organization context
+
+Resolves user -> profile -> organization -> role once per request instead
+of on every ``get_user_organization`` or ``get_user_role`` call. The context
+is memoized on the request and on its user object, so helpers that only
+receive ``request.user`` share it, and the user's ``profile`` (with its
+organization) is attached to the user so ``request.user.profile.organization``
+costs no further queries.
+
+Resolved contexts are also cached per session for
+``ORGANIZATION_CONTEXT_CACHE_TIMEOUT`` seconds. Each user has a version stamp
+in the cache that is replaced when their profile is saved or deleted or
+their groups change (see signals), so those changes take effect on the next
+request; other changes, such as editing the organization itself, show up
+once the cached entry expires.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ORGANIZATION_CONTEXT_CACHE_TIMEOUT = 60  # 1 minute
+
+_ATTRIBUTE = '_organization_context'
+
+
+@dataclass
+class OrganizationContext:
+    """Profile, organization and role of one user"""
+    user_id: Optional[int] = None
+    profile: Optional[object] = None
+    organization: Optional[object] = None
+    role: Optional[str] = None
+    group_names: FrozenSet[str] = field(default_factory=frozenset)
+    version: int = 0
+
+    @property
+    def organization_id(self):
+        return self.organization.pk if self.organization is not None else None
+
+
+def _version_key(user_id) -> str:
+    return f'organization_context:version:{user_id}'
+
+
+def _context_key(user_id, session_key) -> str:
+    return f'organization_context:{user_id}:{session_key}'
+
+
+def invalidate_organization_context(user_id) -> None:
+    """Drop all cached contexts of a user"""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def _role(user, group_names: FrozenSet[str]) -> str:
+    from .rbac import Role
+
+    if user.is_superuser:
+        return Role.ADMIN
+    for role in (Role.ADMIN, Role.ANALYST, Role.USER):
+        if role in group_names:
+            return role
+    return Role.USER  # Default role
+
+
+def _load(user, version: int) -> OrganizationContext:
+    """Resolve the context with one query for the profile and one for groups"""
+    from apps.accounts.models import UserProfile
+
+    profile = UserProfile.objects.select_related('organization').filter(user_id=user.pk).first()
+    group_names = frozenset(user.groups.values_list('name', flat=True))
+    return OrganizationContext(
+        user_id=user.pk,
+        profile=profile,
+        organization=profile.organization if profile else None,
+        role=_role(user, group_names),
+        group_names=group_names,
+        version=version,
+    )
+
+
+def _attach(user, context: OrganizationContext) -> OrganizationContext:
+    setattr(user, _ATTRIBUTE, context)
+    if context.profile is not None:
+        # Fills the reverse one-to-one cache, so user.profile needs no query
+        user.profile = context.profile
+    return context
+
+
+def get_user_context(user) -> OrganizationContext:
+    """
+    Organization context of a user, resolved at most once per user object.
+
+    Prefer :func:`get_organization_context` when the request is available;
+    it can also use the per-session cache.
+    """
+    context = getattr(user, _ATTRIBUTE, None)
+    if context is not None:
+        return context
+    if not user.is_authenticated:
+        return OrganizationContext(role=_role(user, frozenset()))
+    return _attach(user, _load(user, cache.get(_version_key(user.pk), 0)))
+
+
+def get_organization_context(request) -> OrganizationContext:
+    """Organization context of ``request.user``, memoized on the request"""
+    context = getattr(request, 'organization_context', None)
+    if context is not None:
+        return context
+
+    user = request.user
+    context = getattr(user, _ATTRIBUTE, None)
+    if context is None:
+        session = getattr(request, 'session', None)
+        session_key = session.session_key if session is not None else None
+        if not user.is_authenticated or not session_key:
+            context = get_user_context(user)
+        else:
+            context_key = _context_key(user.pk, session_key)
+            version_key = _version_key(user.pk)
+            cached = cache.get_many([context_key, version_key])
+            version = cached.get(version_key, 0)
+            context = cached.get(context_key)
+            if context is None or context.version != version:
+                context = _load(user, version)
+                cache.set(context_key, context, ORGANIZATION_CONTEXT_CACHE_TIMEOUT)
+            _attach(user, context)
+
+    request.organization_context = context
+    return context
+
+
+def reset_organization_context(request_or_user) -> None:
+    """Forget the memoized context, e.g. after creating the user's profile"""
+    user = getattr(request_or_user, 'user', request_or_user)
+    if getattr(request_or_user, 'organization_context', None) is not None:
+        request_or_user.organization_context = None
+    if hasattr(user, _ATTRIBUTE):
+        delattr(user, _ATTRIBUTE)
+    if user.is_authenticated:
+        invalidate_organization_context(user.pk)
@@ -0,0 +1,138 @@
+"""
+Distributed Rate Limiting for AI Pricing Agent
+Token-bucket limiter evaluated atomically in Redis, same script as the ML service
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# Shared with the ML service (fastapi_ml/dependencies.py), which loads the
+# same file. Only the algorithm is shared: each service keys its buckets by
+# its own limit types, so their limits are counted separately.
+TOKEN_BUCKET_SCRIPT_PATH = Path(__file__).with_name('token_bucket.lua')
+TOKEN_BUCKET_SCRIPT = TOKEN_BUCKET_SCRIPT_PATH.read_text()
+
+
+# (requests, window seconds)
+RATE_LIMITS = {
+    'ip_limit': (1000, 3600),
+    'user_limit': (2000, 3600),
+    'api_limit': (5000, 3600),
+}
+
+
+def _redis_connection():
+    """Raw Redis connection behind the default cache, or None for non-Redis caches"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+class TokenBucketRateLimiter:
+    """
+    One Redis round trip per check, with optional per-process token leases.
+
+    With ``lease_size`` > 1 up to that many tokens are claimed at once and
+    handed out locally until they run out or ``lease_ttl`` seconds pass.
+    Lapsed leases are discarded, so leasing only ever tightens the limit.
+    Falls back to a cache counter when the cache is not Redis (local dev).
+    """
+
+    MAX_LEASES = 10000
+
+    def __init__(self, lease_size: int = 10, lease_ttl: float = 1.0):
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self._script = None
+        self._leases: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_script(self):
+        if self._script is None:
+            connection = _redis_connection()
+            if connection is not None:
+                self._script = connection.register_script(TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+    def _take_leased(self, key: str) -> Optional[int]:
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None:
+                return None
+            if lease[0] <= 0 or lease[1] < time.monotonic():
+                del self._leases[key]
+                return None
+            lease[0] -= 1
+            self._leases.move_to_end(key)
+            return lease[0]
+
+    def _store_lease(self, key: str, tokens: int):
+        if tokens <= 0:
+            return
+        with self._lock:
+            self._leases[key] = [tokens, time.monotonic() + self.lease_ttl]
+            self._leases.move_to_end(key)
+            while len(self._leases) > self.MAX_LEASES:
+                self._leases.popitem(last=False)
+
+    def is_allowed(self, key: str, limit: int, window: int, burst: int = 0) -> Tuple[bool, Dict]:
+        """Take one token from ``key``'s bucket; returns (allowed, metadata)"""
+        metadata = {'limit': limit, 'window': window}
+
+        leased_left = self._take_leased(key)
+        if leased_left is not None:
+            metadata.update({'remaining': leased_left, 'retry_after': 0})
+            return True, metadata
+
+        script = self._get_script()
+        if script is None:
+            return self._counter_is_allowed(key, limit, window, metadata)
+
+        capacity = limit + burst
+        lease_size = max(1, min(self.lease_size, capacity // 10))
+        try:
+            granted, tokens_left, retry_after_ms = script(
+                keys=[key],
+                args=[capacity, limit / (window * 1000), lease_size, 1, window * 2],
+            )
+        except Exception as e:
+            # Fail open: an unavailable Redis must not take the site down
+            logger.warning(f"Rate limit check failed for {key}: {e}")
+            return True, metadata
+
+        granted = int(granted)
+        self._store_lease(key, granted - 1)
+        metadata.update({
+            'remaining': int(tokens_left) + max(granted - 1, 0),
+            'retry_after': 0 if granted else max(1, -(-int(retry_after_ms) // 1000)),
+        })
+        return granted > 0, metadata
+
+    def _counter_is_allowed(self, key: str, limit: int, window: int, metadata: Dict) -> Tuple[bool, Dict]:
+        """Fixed-window cache counter for non-Redis caches"""
+        current_count = cache.get(key, 0)
+        metadata.update({'remaining': max(limit - current_count - 1, 0), 'retry_after': window})
+        if current_count >= limit:
+            return False, metadata
+        cache.set(key, current_count + 1, timeout=window)
+        return True, metadata
+
+
+rate_limiter = TokenBucketRateLimiter()
+
+
+def is_rate_limited(identifier: str, limit_type: str) -> bool:
+    """True when ``identifier`` has exhausted its ``limit_type`` bucket"""
+    limit, window = RATE_LIMITS.get(limit_type, RATE_LIMITS['ip_limit'])
+    allowed, _ = rate_limiter.is_allowed(f"rate_limit:bucket:{limit_type}:{identifier}", limit, window)
+    return not allowed
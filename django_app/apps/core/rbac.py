@@ -1,8 +1,23 @@
 """
 Role-Based Access Control (RBAC) System
+
+Permission and role checks use a compiled permission set per (user,
+organization): the user's permissions from the auth backends plus their
+group names, checked by set membership. Compiled sets are memoized on the
+user object, kept in process for LOCAL_PERMISSION_CACHE_TIMEOUT seconds and
+cached in the shared cache under ``user:perms:{user_id}:{org_id}``. Cached
+sets carry a global and a per-user version stamp; ``assign_role``,
+``create_roles_and_permissions`` (``setup_rbac``) and changes to group
+memberships or permissions (see signals) replace the stamps, so other
+processes pick up role changes within the local timeout.
 """
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Tuple
+
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db import models
 from functools import wraps
 from django.shortcuts import redirect
@@ -71,6 +86,100 @@ ROLE_PERMISSIONS = {
 }
 
 
+PERMISSION_CACHE_TIMEOUT = 300  # 5 minutes
+LOCAL_PERMISSION_CACHE_TIMEOUT = 5  # seconds
+LOCAL_PERMISSION_CACHE_SIZE = 10000
+
+_ATTRIBUTE = '_rbac_permission_set'
+_GLOBAL_VERSION_KEY = 'user:perms:version'
+
+
+@dataclass(frozen=True)
+class PermissionSet:
+    """Compiled permissions and group names of one user"""
+    permissions: FrozenSet[str] = frozenset()
+    groups: FrozenSet[str] = frozenset()
+    versions: Tuple[int, int] = (0, 0)
+
+
+EMPTY_PERMISSION_SET = PermissionSet()
+
+# (user_id, organization_id) -> (permission set, expiry in time.monotonic())
+_local_permission_sets: Dict[Tuple, Tuple[PermissionSet, float]] = {}
+
+
+def _user_version_key(user_id) -> str:
+    return f'user:perms:version:{user_id}'
+
+
+def _permission_key(user_id, organization_id) -> str:
+    return f'user:perms:{user_id}:{organization_id}'
+
+
+def invalidate_user_permissions(user) -> None:
+    """Drop compiled permission sets of a user (instance or id)"""
+    user_id = getattr(user, 'pk', user)
+    cache.set(_user_version_key(user_id), time.time_ns(), None)
+    for key in [key for key in list(_local_permission_sets) if key[0] == user_id]:
+        _local_permission_sets.pop(key, None)
+    # Including ModelBackend's caches, so a set compiled later in this request is current
+    for attribute in (_ATTRIBUTE, '_perm_cache', '_user_perm_cache', '_group_perm_cache'):
+        if hasattr(user, attribute):
+            delattr(user, attribute)
+
+
+def invalidate_all_permissions() -> None:
+    """Drop every compiled permission set, e.g. after role permissions change"""
+    cache.set(_GLOBAL_VERSION_KEY, time.time_ns(), None)
+    _local_permission_sets.clear()
+
+
+def _compile_permission_set(user, versions: Tuple[int, int]) -> PermissionSet:
+    # Superusers pass every permission check without consulting the set
+    permissions = frozenset() if user.is_superuser else frozenset(user.get_all_permissions())
+    return PermissionSet(
+        permissions=permissions,
+        groups=frozenset(user.groups.values_list('name', flat=True)),
+        versions=versions,
+    )
+
+
+def get_permission_set(user) -> PermissionSet:
+    """Compiled permission set of a user in their current organization"""
+    if not user.is_authenticated:
+        return EMPTY_PERMISSION_SET
+    permission_set = getattr(user, _ATTRIBUTE, None)
+    if permission_set is not None:
+        return permission_set
+    
+    from .organization_context import get_user_context
+    
+    organization_id = get_user_context(user).organization_id
+    local_key = (user.pk, organization_id)
+    entry = _local_permission_sets.get(local_key)
+    if entry is not None and time.monotonic() < entry[1]:
+        permission_set = entry[0]
+    else:
+        permission_key = _permission_key(user.pk, organization_id)
+        user_version_key = _user_version_key(user.pk)
+        cached = cache.get_many([permission_key, _GLOBAL_VERSION_KEY, user_version_key])
+        # Versions are read before compiling, so a concurrent change can only
+        # leave a set that is already outdated, never a stale set that looks current
+        versions = (cached.get(_GLOBAL_VERSION_KEY, 0), cached.get(user_version_key, 0))
+        permission_set = cached.get(permission_key)
+        if permission_set is None or permission_set.versions != versions:
+            permission_set = _compile_permission_set(user, versions)
+            cache.set(permission_key, permission_set, PERMISSION_CACHE_TIMEOUT)
+        if len(_local_permission_sets) >= LOCAL_PERMISSION_CACHE_SIZE:
+            _local_permission_sets.clear()
+        _local_permission_sets[local_key] = (
+            permission_set, time.monotonic() + LOCAL_PERMISSION_CACHE_TIMEOUT
+        )
+    
+    setattr(user, _ATTRIBUTE, permission_set)
+    return permission_set
+
+
 def create_roles_and_permissions():
     """Create roles (groups) and assign permissions"""
     from django.contrib.auth.models import User
@@ -139,6 +248,8 @@ def create_roles_and_permissions():
             except Permission.DoesNotExist:
                 print(f"Permission {perm_codename} not found")
         print(f"Assigned permissions to role: {role_name}")
+    
+    invalidate_all_permissions()
 
 
 def assign_role(user, role):
@@ -154,39 +265,29 @@ def assign_role(user, role):
     if hasattr(user, 'userprofile'):
         user.profile.role = role
         user.profile.save()
+    
+    invalidate_user_permissions(user)
 
 
 def get_user_role(user):
-    """Get the primary role of a user"""
-    if user.is_superuser:
-        return Role.ADMIN
-    
-    if hasattr(user, 'userprofile') and user.profile.role:
-        return user.profile.role
-    
-    # Check groups
-    if user.groups.filter(name=Role.ADMIN).exists():
-        return Role.ADMIN
-    elif user.groups.filter(name=Role.ANALYST).exists():
-        return Role.ANALYST
-    elif user.groups.filter(name=Role.USER).exists():
-        return Role.USER
+    """Get the primary role of a user, resolved once per request"""
+    from .organization_context import get_user_context
     
-    return Role.USER  # Default role
+    return get_user_context(user).role
 
 
 def has_role(user, role):
     """Check if user has a specific role"""
     if user.is_superuser and role == Role.ADMIN:
         return True
-    return user.groups.filter(name=role).exists()
+    return role in get_permission_set(user).groups
 
 
 def has_any_role(user, roles):
     """Check if user has any of the specified roles"""
     if user.is_superuser and Role.ADMIN in roles:
         return True
-    return user.groups.filter(name__in=roles).exists()
+    return not get_permission_set(user).groups.isdisjoint(roles)
 
 
 def has_permission(user, permission):
@@ -194,8 +295,8 @@ def has_permission(user, permission):
     if user.is_superuser:
         return True
     
-    # Check both user permissions and group permissions
-    return user.has_perm(f'auth.{permission}')
+    # Covers both user permissions and group permissions
+    return f'auth.{permission}' in get_permission_set(user).permissions
 
 
 # Decorators for view protection
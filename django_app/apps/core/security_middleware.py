@@ -8,6 +8,7 @@ import time
 import hashlib
 import re
 from datetime import datetime, timedelta
+from functools import partial
 from typing import Dict, List, Optional, Set
 from collections import defaultdict
 
@@ -21,6 +22,9 @@ from django.core.exceptions import SuspiciousOperation
 
 from .security_models import SecurityEvent, UserSecuritySettings
 from .security import SecurityConfig
+from .rate_limiting import is_rate_limited
+from .threat_scanner import get_threat_scanner
+from .audit_writer import capture_request_data, get_audit_writer, load_request_data
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -96,29 +100,8 @@ class ThreatDetectionMiddleware(MiddlewareMixin):
         super().__init__(get_response)
         self.config = SecurityConfig()
         
-        # Threat patterns
-        self.sql_injection_patterns = [
-            r"union\s+select", r"select\s+.*\s+from", r"insert\s+into",
-            r"update\s+.*\s+set", r"delete\s+from", r"drop\s+table",
-            r"--", r"/\*", r"\*/", r"xp_cmdshell", r"sp_executesql"
-        ]
-        
-        self.xss_patterns = [
-            r"<script", r"javascript:", r"on\w+\s*=", r"expression\s*\(",
-            r"vbscript:", r"data:text/html", r"<iframe", r"<object",
-            r"<embed", r"<link.*javascript"
-        ]
-        
-        self.path_traversal_patterns = [
-            r"\.\.\/", r"\.\.\\"", r"\.\.%2f", r"\.\.%5c",
-            r"%2e%2e%2f", r"%2e%2e%5c"
-        ]
-        
-        # Suspicious patterns
-        self.suspicious_patterns = [
-            r"curl", r"wget", r"python", r"perl", r"php",
-            r"bash", r"cmd", r"powershell", r"eval\("
-        ]
+        # Threat signatures compiled into one single-pass matcher
+        self.scanner = get_threat_scanner()
     
     def process_request(self, request):
         """Detect and block threats in incoming requests"""
@@ -175,77 +158,24 @@ class ThreatDetectionMiddleware(MiddlewareMixin):
     
     def _is_rate_limited(self, identifier: str, limit_type: str) -> bool:
         """Check rate limiting"""
-        cache_key = f"rate_limit:{limit_type}:{identifier}"
-        current_count = cache.get(cache_key, 0)
-        
-        # Different limits for different types
-        limits = {
-            'ip_limit': 1000,  # requests per hour
-            'user_limit': 2000,
-            'api_limit': 5000,
-        }
-        
-        limit = limits.get(limit_type, 1000)
-        
-        if current_count >= limit:
-            return True
-        
-        # Increment counter
-        cache.set(cache_key, current_count + 1, timeout=3600)  # 1 hour
-        return False
+        return is_rate_limited(identifier, limit_type)
     
     def _scan_for_threats(self, request) -> Optional[str]:
         """Scan request for threat patterns"""
-        
-        # Collect all input data
-        all_data = []
-        
-        # URL and query parameters
-        all_data.append(request.path)
-        all_data.append(request.META.get('QUERY_STRING', ''))
-        
-        # POST data
-        if hasattr(request, 'body') and request.body:
-            try:
-                body_str = request.body.decode('utf-8')
-                all_data.append(body_str)
-            except:
-                pass
-        
-        # Headers (selected ones)
-        suspicious_headers = ['HTTP_REFERER', 'HTTP_USER_AGENT', 'HTTP_X_FORWARDED_FOR']
-        for header in suspicious_headers:
-            if header in request.META:
-                all_data.append(request.META[header])
-        
-        # Check each data source
-        for data in all_data:
-            if not data:
-                continue
-                
-            data_lower = data.lower()
-            
-            # SQL Injection
-            for pattern in self.sql_injection_patterns:
-                if re.search(pattern, data_lower, re.IGNORECASE):
-                    return f"SQL Injection: {pattern}"
-            
-            # XSS
-            for pattern in self.xss_patterns:
-                if re.search(pattern, data_lower, re.IGNORECASE):
-                    return f"XSS: {pattern}"
-            
-            # Path Traversal
-            for pattern in self.path_traversal_patterns:
-                if re.search(pattern, data_lower, re.IGNORECASE):
-                    return f"Path Traversal: {pattern}"
-            
-            # Command Injection
-            for pattern in self.suspicious_patterns:
-                if re.search(r'\b' + pattern + r'\b', data_lower, re.IGNORECASE):
-                    return f"Command Injection: {pattern}"
-        
-        return None
+        result = self.scanner.scan_request(request)
+        request.threat_scan = result
+        return result.threat
+    
+    def process_response(self, request, response):
+        """Expose the threat scan cost of the request"""
+        result = getattr(request, 'threat_scan', None)
+        if result is not None:
+            response['Server-Timing'] = f'threat-scan;dur={result.duration_ms:.3f}'
+            logger.debug(
+                f"Threat scan of {request.path}: {result.duration_ms:.3f} ms, "
+                f"{result.bytes_scanned} body bytes{' (truncated)' if result.body_truncated else ''}"
+            )
+        return response
     
     def _handle_threat(self, request, threat_type: str):
         """Handle detected threat"""
@@ -312,7 +242,8 @@ class EnhancedAuditMiddleware(MiddlewareMixin):
     def process_request(self, request):
         """Store request start time for performance tracking"""
         request._audit_start_time = time.time()
-        request._audit_request_size = len(request.body) if hasattr(request, 'body') else 0
+        # Content-Length instead of len(request.body), which would read the whole body here
+        request._audit_request_size = int(request.META.get('CONTENT_LENGTH') or 0)
         return None
     
     def process_response(self, request, response):
@@ -351,9 +282,7 @@ class EnhancedAuditMiddleware(MiddlewareMixin):
         return False
     
     def _create_enhanced_audit_log(self, request, response):
-        """Create comprehensive audit log entry"""
-        from .models import AuditLog
-        
+        """Queue comprehensive audit log entry; sanitization and PII detection run in the audit writer"""
         user = getattr(request, 'user', None) if hasattr(request, 'user') else None
         if user and not user.is_authenticated:
             user = None
@@ -368,57 +297,75 @@ class EnhancedAuditMiddleware(MiddlewareMixin):
             response_time = time.time() - request._audit_start_time
         
         request_size = getattr(request, '_audit_request_size', 0)
-        response_size = len(response.content) if hasattr(response, 'content') else 0
+        response_size = self._get_response_size(response)
         
         # Determine action and risk level
         action = self._get_action_description(request, response)
         risk_level = self._calculate_risk_level(request, response, user)
+        classification = self._classify_operation(request)
         
-        # Extract and sanitize changes
         changes = self._extract_changes(request, response)
-        
-        # Detect PII in request/response
-        pii_detected = self._detect_pii(changes)
-        
-        # Create audit log
-        audit_data = {
-            'user': user,
-            'organization': organization,
-            'action': action,
-            'ip_address': ip_address,
-            'user_agent': user_agent,
-            'changes': changes,
+        changes['compliance'] = {
+            'pii_detected': [],
+            'risk_level': risk_level,
+            'response_time_ms': round(response_time * 1000, 2) if response_time else None,
+            'request_size_bytes': request_size,
+            'response_size_bytes': response_size,
+            'classification': classification,
         }
         
-        # Add compliance metadata
-        audit_data['changes'].update({
-            'compliance': {
-                'pii_detected': pii_detected,
-                'risk_level': risk_level,
-                'response_time_ms': round(response_time * 1000, 2) if response_time else None,
-                'request_size_bytes': request_size,
-                'response_size_bytes': response_size,
-                'classification': self._classify_operation(request),
-            }
-        })
+        get_audit_writer().submit(
+            {
+                'user_id': user.pk if user else None,
+                'organization_id': getattr(organization, 'pk', None),
+                'action': action,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'changes': changes,
+            },
+            request_data=capture_request_data(request),
+            prepare=partial(self._prepare_audit_record, user=user, organization=organization),
+        )
+    
+    def _prepare_audit_record(self, record, user=None, organization=None):
+        """Sanitize request data and detect PII for a queued record (runs in the audit writer)"""
+        changes = record.fields['changes']
         
-        AuditLog.objects.create(**audit_data)
+        if record.request_data is not None:
+            try:
+                request_data = load_request_data(record.request_data)
+                changes['request']['data'] = self._sanitize_sensitive_data(request_data)
+            except Exception as e:
+                changes['request']['data_error'] = str(e)
+        
+        changes['compliance']['pii_detected'] = self._detect_pii(
+            {key: value for key, value in changes.items() if key != 'compliance'}
+        )
         
         # Additional logging for high-risk operations
-        if risk_level == 'high':
+        if changes['compliance']['risk_level'] == 'high':
             SecurityEvent.log_event(
                 'policy_violation',
                 user=user,
                 organization=organization,
-                description=f'High-risk operation: {action}',
+                description=f"High-risk operation: {record.fields['action']}",
                 severity='high',
-                ip_address=ip_address,
+                ip_address=record.fields['ip_address'],
                 metadata={
-                    'audit_details': changes,
-                    'classification': self._classify_operation(request),
+                    'audit_details': {key: value for key, value in changes.items() if key != 'compliance'},
+                    'classification': changes['compliance']['classification'],
                 }
             )
     
+    @staticmethod
+    def _get_response_size(response) -> Optional[int]:
+        """Response size without rendering streaming responses into memory"""
+        if response.has_header('Content-Length'):
+            return int(response['Content-Length'])
+        if getattr(response, 'streaming', False):
+            return None
+        return len(response.content)
+    
     def _get_client_ip(self, request) -> str:
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -513,29 +460,6 @@ class EnhancedAuditMiddleware(MiddlewareMixin):
             }
         }
         
-        # Add request data (sanitized)
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            try:
-                if hasattr(request, 'data'):
-                    # DRF request
-                    request_data = dict(request.data)
-                elif hasattr(request, 'body') and request.body:
-                    # Raw request
-                    content_type = request.META.get('CONTENT_TYPE', '')
-                    if 'application/json' in content_type:
-                        request_data = json.loads(request.body.decode('utf-8'))
-                    else:
-                        request_data = dict(request.POST)
-                else:
-                    request_data = {}
-                
-                # Sanitize sensitive data
-                sanitized_data = self._sanitize_sensitive_data(request_data)
-                changes['request']['data'] = sanitized_data
-                
-            except Exception as e:
-                changes['request']['data_error'] = str(e)
-        
         return changes
     
     def _sanitize_sensitive_data(self, data) -> dict:
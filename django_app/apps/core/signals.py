@@ -0,0 +1,63 @@
+"""
+Django signals for the core module.
+
+Keeps cached organization contexts and compiled RBAC permission sets in
+step with profiles, group memberships and permissions.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import UserProfile
+
+from .organization_context import invalidate_organization_context, reset_organization_context
+from .rbac import invalidate_all_permissions, invalidate_user_permissions
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_context_on_profile_change(sender, instance, **kwargs):
+    """Invalidate the user's organization context when their profile changes"""
+    invalidate_organization_context(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_context_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate contexts and permission sets when users are added to or removed from groups"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            # Also drops what is memoized on this user object
+            reset_organization_context(instance)
+            invalidate_user_permissions(instance)
+        return
+
+    # Changed from the group side; a clear does not report the users
+    if action == 'pre_clear':
+        pk_set = set(instance.user_set.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    for user_id in pk_set or ():
+        invalidate_organization_context(user_id)
+        invalidate_user_permissions(user_id)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_permissions_on_user_permission_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate permission sets when permissions are granted to or revoked from users"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_permissions(instance)
+    else:
+        # Changed from the permission side
+        invalidate_all_permissions()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permissions_on_group_permission_change(sender, action, **kwargs):
+    """Invalidate all permission sets when a group's permissions change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_all_permissions()
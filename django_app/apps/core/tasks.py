@@ -0,0 +1,57 @@
+"""
+Asynchronous tasks for core compliance processing
+"""
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+import logging
+
+from .data_subject_export import update_export_status, export_data_subject_data as build_export
+from .security_models import SecurityEvent
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name='core.export_data_subject_data')
+def export_data_subject_data(self, user_id, export_id: str, scope: str, metadata: dict = None):
+    """
+    Build a data-subject export archive with progress tracking
+
+    Progress is kept in the cache for status polling and reported as the
+    Celery task state.
+    """
+    try:
+        user = User.objects.get(pk=user_id)
+        update_export_status(export_id, celery_task_id=self.request.id)
+
+        def update_progress(current, total):
+            self.update_state(
+                state='PROGRESS',
+                meta={
+                    'current': current,
+                    'total': total,
+                    'percentage': int((current / total) * 100) if total > 0 else 100,
+                }
+            )
+
+        result = build_export(user, export_id, scope, metadata, progress_callback=update_progress)
+
+        SecurityEvent.log_event(
+            'data_export',
+            user=user,
+            description=f'Data subject export completed: {scope}',
+            severity='medium',
+            metadata={
+                'export_id': export_id,
+                'scope': scope,
+                'rows': result['rows_written'],
+                'artifact': result['artifact'],
+            }
+        )
+        return result
+
+    except Exception as e:
+        logger.error(f"Data subject export {export_id} failed: {e}")
+        update_export_status(export_id, status='failed', error=str(e), failed_at=timezone.now().isoformat())
+        raise
@@ -0,0 +1 @@
+# Core Test Suite
@@ -0,0 +1,94 @@
+"""
+Tests for the batched, asynchronous audit log writer
+"""
+import time
+import uuid
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from apps.core.audit_writer import AuditLogWriter, AuditRecord
+from apps.core.models import AuditLog
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+class AuditLogWriterTests(TransactionTestCase):
+    """The writer thread uses its own connection, so rows must be committed"""
+
+    def make_writer(self, **kwargs):
+        writer = AuditLogWriter(asynchronous=True, **kwargs)
+        self.addCleanup(writer.close)
+        batches = []
+        real_write = writer._write
+
+        def write(batch):
+            batches.append(len(batch))
+            real_write(batch)
+
+        writer._write = write
+        return writer, batches
+
+    def test_flushes_when_batch_is_full(self):
+        writer, batches = self.make_writer(batch_size=3, flush_interval=60)
+        for i in range(3):
+            writer.submit({'action': f'action-{i}'})
+
+        self.assertTrue(wait_for(lambda: AuditLog.objects.count() == 3))
+        self.assertEqual(batches, [3])
+
+    def test_flushes_after_interval(self):
+        writer, batches = self.make_writer(batch_size=100, flush_interval=0.1)
+        writer.submit({'action': 'login'})
+        writer.submit({'action': 'logout'})
+
+        self.assertTrue(wait_for(lambda: AuditLog.objects.count() == 2))
+        self.assertEqual(batches, [2])
+
+    def test_created_at_is_the_submission_time(self):
+        writer, _ = self.make_writer(batch_size=100, flush_interval=60)
+        before = timezone.now()
+        writer.submit({'action': 'update'})
+        after = timezone.now()
+        time.sleep(0.05)
+        writer.close()
+
+        created_at = AuditLog.objects.get().created_at
+        self.assertTrue(before <= created_at <= after)
+
+    def test_close_drains_the_queue(self):
+        writer, _ = self.make_writer(batch_size=100, flush_interval=60)
+        for i in range(5):
+            writer.submit({'action': f'action-{i}'})
+        writer.close()
+
+        self.assertEqual(AuditLog.objects.count(), 5)
+        self.assertIsNone(writer._thread)
+
+    def test_retried_batch_does_not_duplicate_rows(self):
+        writer = AuditLogWriter(asynchronous=False)
+        batch = [AuditRecord(fields={'id': uuid.uuid4(), 'action': f'action-{i}'}) for i in range(3)]
+        real_write = writer._write
+        attempts = []
+
+        def write_then_lose_connection(records):
+            attempts.append(len(records))
+            real_write(records)
+            if len(attempts) == 1:
+                # The rows were stored but the acknowledgement never arrived
+                raise OperationalError('server closed the connection unexpectedly')
+
+        with patch.object(writer, '_write', side_effect=write_then_lose_connection):
+            writer._write_with_retry(batch)
+
+        self.assertEqual(attempts, [3, 3])
+        self.assertEqual(AuditLog.objects.count(), 3)
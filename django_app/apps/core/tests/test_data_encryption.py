@@ -0,0 +1,179 @@
+"""
+Tests for envelope field encryption
+"""
+import base64
+import secrets
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.core.data_encryption import (
+    ENVELOPE_PREFIX, LOCAL_WRAP_PREFIX, EncryptionConfig, EncryptionService,
+)
+from apps.core.exceptions import SecurityException
+from apps.core.models import AuditLog
+
+CONTEXT = 'supplier_tax_id'
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class EncryptionServiceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        vault_patcher = patch('apps.core.data_encryption.vault_client')
+        self.vault = vault_patcher.start()
+        self.addCleanup(vault_patcher.stop)
+        self.vault.authenticate.return_value = False
+
+        event_patcher = patch('apps.core.data_encryption.SecurityEvent')
+        event_patcher.start()
+        self.addCleanup(event_patcher.stop)
+
+        self.clock = FakeClock()
+        clock_patcher = patch('apps.core.data_encryption.time.monotonic', self.clock)
+        clock_patcher.start()
+        self.addCleanup(clock_patcher.stop)
+
+        self.service = self.make_service()
+
+    def make_service(self, **config):
+        # Few KDF iterations keep the tests fast
+        return EncryptionService(EncryptionConfig(kdf_iterations=1000, **config))
+
+    def wrapped_key(self, ciphertext):
+        return ciphertext[len(ENVELOPE_PREFIX):].rpartition('.')[0]
+
+    def test_local_wrap_round_trip(self):
+        ciphertext = self.service.encrypt_field('12-3456789', CONTEXT)
+
+        self.assertTrue(ciphertext.startswith(ENVELOPE_PREFIX + LOCAL_WRAP_PREFIX))
+        # A fresh service has no cached data key and unwraps it again
+        self.assertEqual(self.make_service().decrypt_field(ciphertext, CONTEXT), '12-3456789')
+        self.vault.generate_data_key.assert_not_called()
+
+    def test_ciphertext_is_bound_to_its_context(self):
+        ciphertext = self.service.encrypt_field('12-3456789', CONTEXT)
+
+        with self.assertRaises(SecurityException):
+            self.make_service().decrypt_field(ciphertext, 'supplier_bank_account')
+
+    def test_vault_wrapped_data_key(self):
+        key = secrets.token_bytes(32)
+        self.vault.authenticate.return_value = True
+        self.vault.generate_data_key.return_value = {
+            'plaintext': base64.b64encode(key).decode('ascii'),
+            'ciphertext': 'vault:v1:wrapped',
+        }
+        self.vault.decrypt_data.return_value = base64.b64encode(key).decode('ascii')
+
+        ciphertext = self.service.encrypt_field('12-3456789', CONTEXT)
+
+        self.assertEqual(self.wrapped_key(ciphertext), 'vault:v1:wrapped')
+        self.assertEqual(self.make_service().decrypt_field(ciphertext, CONTEXT), '12-3456789')
+        self.vault.decrypt_data.assert_called_once_with('vault:v1:wrapped', CONTEXT)
+
+    def test_decrypts_legacy_local_ciphertext(self):
+        # iv + tag + ciphertext, as written before envelope encryption
+        key = self.service._get_or_derive_key(CONTEXT)
+        iv = secrets.token_bytes(12)
+        sealed = AESGCM(key).encrypt(iv, b'12-3456789', None)
+        legacy = base64.b64encode(iv + sealed[-16:] + sealed[:-16]).decode('ascii')
+
+        self.assertEqual(self.make_service().decrypt_field(legacy, CONTEXT), '12-3456789')
+
+    def test_decrypts_legacy_vault_ciphertext(self):
+        self.vault.authenticate.return_value = True
+        self.vault.decrypt_data.return_value = '12-3456789'
+
+        self.assertEqual(self.service.decrypt_field('vault:v1:legacy', CONTEXT), '12-3456789')
+        self.vault.decrypt_data.assert_called_once_with('vault:v1:legacy', CONTEXT)
+
+    def test_legacy_vault_ciphertext_needs_vault(self):
+        with self.assertRaises(SecurityException):
+            self.service.decrypt_field('vault:v1:legacy', CONTEXT)
+
+    def test_data_key_is_reused_until_it_expires(self):
+        service = self.make_service(data_key_ttl=60)
+        first = self.wrapped_key(service.encrypt_field('a', CONTEXT))
+        self.clock.now += 59
+        self.assertEqual(self.wrapped_key(service.encrypt_field('b', CONTEXT)), first)
+
+        self.clock.now += 1
+        expired = service.encrypt_field('c', CONTEXT)
+
+        self.assertNotEqual(self.wrapped_key(expired), first)
+        self.assertEqual(service.decrypt_field(expired, CONTEXT), 'c')
+
+    def test_data_key_is_replaced_at_usage_limit(self):
+        service = self.make_service(data_key_max_uses=2)
+        wrapped = [self.wrapped_key(service.encrypt_field(str(i), CONTEXT)) for i in range(5)]
+
+        self.assertEqual(wrapped[0], wrapped[1])
+        self.assertEqual(wrapped[2], wrapped[3])
+        self.assertEqual(len(set(wrapped)), 3)
+
+    def test_rotate_key_starts_a_new_epoch_in_every_process(self):
+        other = self.make_service()
+        before = self.wrapped_key(self.service.encrypt_field('a', CONTEXT))
+        other_before = self.wrapped_key(other.encrypt_field('a', CONTEXT))
+
+        self.assertTrue(self.service.rotate_key(CONTEXT))
+        self.assertEqual(cache.get(f'encryption_key_epoch:{CONTEXT}'), 1)
+
+        # The rotating service drops its data key at once
+        self.assertNotEqual(self.wrapped_key(self.service.encrypt_field('d', CONTEXT)), before)
+        # Other processes notice the epoch change at their next lookup
+        self.clock.now += EncryptionConfig.rotation_epoch_check_interval
+        self.assertNotEqual(self.wrapped_key(other.encrypt_field('e', CONTEXT)), other_before)
+
+        self.assertTrue(self.service.rotate_key(CONTEXT))
+        self.assertEqual(cache.get(f'encryption_key_epoch:{CONTEXT}'), 2)
+
+    def test_values_encrypted_before_rotation_stay_readable(self):
+        old = self.service.encrypt_field('12-3456789', CONTEXT)
+        self.service.rotate_key(CONTEXT)
+
+        self.assertEqual(self.make_service().decrypt_field(old, CONTEXT), '12-3456789')
+
+    def test_bulk_encrypt_queryset_writes_back(self):
+        plain = AuditLog.objects.create(action='view', user_agent='Mozilla/5.0 (X11; Linux x86_64)')
+        empty = AuditLog.objects.create(action='view', user_agent='')
+        encrypted_value = self.service.encrypt_field('curl/8.0', 'core.auditlog_user_agent')
+        encrypted = AuditLog.objects.create(action='view', user_agent=encrypted_value)
+
+        with self.assertNumQueries(2):  # one select and one bulk update
+            changed = self.service.bulk_encrypt(AuditLog.objects.order_by('created_at'), ['user_agent'])
+
+        self.assertEqual(changed, 1)
+        plain.refresh_from_db()
+        empty.refresh_from_db()
+        encrypted.refresh_from_db()
+        self.assertTrue(plain.user_agent.startswith(ENVELOPE_PREFIX))
+        self.assertEqual(empty.user_agent, '')
+        self.assertEqual(encrypted.user_agent, encrypted_value)
+
+        rows = {row['pk']: row['user_agent']
+                for row in self.service.bulk_decrypt(AuditLog.objects.all(), ['user_agent'])}
+        self.assertEqual(rows[plain.pk], 'Mozilla/5.0 (X11; Linux x86_64)')
+        self.assertEqual(rows[encrypted.pk], 'curl/8.0')
+
+    def test_bulk_encrypt_list_is_not_saved(self):
+        log = AuditLog.objects.create(action='view', user_agent='Mozilla/5.0 (X11; Linux x86_64)')
+
+        with self.assertNumQueries(0):
+            changed = self.service.bulk_encrypt([log], ['user_agent'])
+
+        self.assertEqual(changed, 1)
+        self.assertTrue(log.user_agent.startswith(ENVELOPE_PREFIX))
+        log.refresh_from_db()
+        self.assertEqual(log.user_agent, 'Mozilla/5.0 (X11; Linux x86_64)')
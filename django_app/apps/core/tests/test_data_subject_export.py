@@ -0,0 +1,151 @@
+"""
+Tests for data-subject export archives and their status tracking
+"""
+import json
+import shutil
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from apps.accounts.models import UserProfile
+from apps.core import data_subject_export, tasks
+from apps.core.data_subject_export import SCOPE_ACCESS, SCOPE_PORTABILITY, get_export_status
+from apps.core.models import AuditLog, Organization
+from apps.core.security_models import SecurityEvent
+
+
+class DataSubjectExportTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # security_models has no migrations, so its table is created here
+        cls._created_security_events = 'security_events' not in connection.introspection.table_names()
+        if cls._created_security_events:
+            with connection.schema_editor() as editor:
+                editor.create_model(SecurityEvent)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls._created_security_events:
+            with connection.schema_editor() as editor:
+                editor.delete_model(SecurityEvent)
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        # Small batches so every category spans several writes and progress updates
+        for name, value in (('CHUNK_SIZE', 40), ('PROGRESS_INTERVAL', 100)):
+            patcher = patch.object(data_subject_export, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(tasks.export_data_subject_data, 'update_state')
+        self.update_state = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.organization = Organization.objects.create(name='Test Organization', code='EXPORT_ORG', type='buyer')
+        self.user = User.objects.create_user(username='subject', email='subject@example.com', password='testpass123')
+        UserProfile.objects.create(user=self.user, organization=self.organization, job_title='Buyer')
+        other = User.objects.create_user(username='other', password='testpass123')
+
+        AuditLog.objects.bulk_create(
+            [AuditLog(user=self.user, action='view', object_repr=f'Material {i}') for i in range(150)]
+            + [AuditLog(user=other, action='view') for _ in range(20)]
+        )
+        SecurityEvent.objects.bulk_create(
+            [SecurityEvent(user=self.user, event_type='login_success', description=f'Login {i}')
+             for i in range(120)]
+            + [SecurityEvent(user=other, event_type='login_success', description='Login') for _ in range(10)]
+        )
+
+    def run_export(self, export_id='access-export', scope=SCOPE_ACCESS):
+        data_subject_export.update_export_status(export_id, status='queued')
+        return tasks.export_data_subject_data(self.user.pk, export_id, scope, {'purpose': 'gdpr_access'})
+
+    def read_archive(self, path):
+        with default_storage.open(path) as artifact, zipfile.ZipFile(artifact) as archive:
+            manifest = json.loads(archive.read('manifest.json'))
+            lines = {
+                name: archive.read(name).decode('utf-8').splitlines()
+                for name in archive.namelist() if name.endswith('.ndjson')
+            }
+        return manifest, lines
+
+    def test_archive_matches_manifest_and_database(self):
+        expected = {
+            'personal_info': 1,
+            'profile': 1,
+            'audit_logs': AuditLog.objects.filter(user=self.user).count(),
+            'security_events': SecurityEvent.objects.filter(user=self.user).count(),
+        }
+
+        result = self.run_export()
+
+        manifest, lines = self.read_archive(result['artifact'])
+        self.assertEqual(manifest['purpose'], 'gdpr_access')
+        self.assertEqual(set(lines), {entry['file'] for entry in manifest['categories'].values()})
+        for name, entry in manifest['categories'].items():
+            self.assertEqual(len(lines[entry['file']]), entry['rows'], name)
+        for name, rows in expected.items():
+            self.assertEqual(manifest['categories'][name]['rows'], rows, name)
+        self.assertEqual(expected['audit_logs'], 150)
+        self.assertEqual(expected['security_events'], 120)
+
+        audit_rows = [json.loads(line) for line in lines['audit_logs.ndjson']]
+        self.assertEqual({row['object_repr'] for row in audit_rows}, {f'Material {i}' for i in range(150)})
+        self.assertEqual(json.loads(lines['profile.ndjson'][0])['organization__name'], 'Test Organization')
+
+    def test_status_reaches_completed(self):
+        result = self.run_export()
+
+        status = get_export_status('access-export')
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['percentage'], 100)
+        self.assertEqual(status['rows_written'], status['total_rows'])
+        self.assertEqual(status['artifact'], result['artifact'])
+        self.assertTrue(default_storage.exists(status['artifact']))
+        # Progress is reported to Celery during the export, not only at the end
+        self.assertGreater(self.update_state.call_count, 1)
+        self.assertEqual(self.update_state.call_args.kwargs['meta']['percentage'], 100)
+        self.assertTrue(SecurityEvent.objects.filter(user=self.user, event_type='data_export').exists())
+
+    def test_portability_scope_holds_user_provided_data_only(self):
+        result = self.run_export('portability-export', SCOPE_PORTABILITY)
+
+        manifest, lines = self.read_archive(result['artifact'])
+        self.assertEqual(set(manifest['categories']), {'personal_info', 'preferences'})
+        self.assertEqual(set(lines), {'personal_info.ndjson', 'preferences.ndjson'})
+
+    def test_status_is_failed_when_the_task_raises(self):
+        with patch.object(tasks, 'build_export', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.run_export()
+
+        status = get_export_status('access-export')
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['error'], 'disk full')
+        self.assertIn('failed_at', status)
+
+    def test_start_queues_the_task(self):
+        with patch.object(tasks.export_data_subject_data, 'delay') as delay:
+            status = data_subject_export.start_data_subject_export(self.user, SCOPE_ACCESS, {'purpose': 'ccpa'})
+
+        self.assertEqual(status['status'], 'queued')
+        self.assertEqual(get_export_status(status['export_id'])['status'], 'queued')
+        delay.assert_called_once_with(self.user.pk, status['export_id'], SCOPE_ACCESS, {'purpose': 'ccpa'})
+
+    def test_unknown_scope(self):
+        with self.assertRaises(ValueError):
+            data_subject_export.start_data_subject_export(self.user, 'everything')
@@ -0,0 +1,116 @@
+"""
+Tests for the request-scoped and session-cached organization context
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.views import View
+
+from apps.accounts.models import UserProfile
+from apps.core.mixins import OrganizationRequiredMixin, get_user_organization
+from apps.core.models import Organization
+from apps.core.organization_context import get_organization_context
+from apps.core.rbac import Role, get_user_role
+
+
+class OrganizationView(OrganizationRequiredMixin, View):
+
+    def get(self, request):
+        return HttpResponse(self.get_user_organization().name)
+
+
+class OrganizationContextTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        self.session.create()
+
+        self.organization = Organization.objects.create(name='Acme', code='ACME', type='buyer')
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.profile = UserProfile.objects.create(user=self.user, organization=self.organization)
+
+    def make_request(self, user=None):
+        """A request of the session, with the user loaded as AuthenticationMiddleware would"""
+        request = self.factory.get('/materials/')
+        request.user = User.objects.get(pk=(user or self.user).pk)
+        request.session = self.session
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_repeated_lookups_in_a_request_make_no_queries(self):
+        request = self.make_request()
+        view = OrganizationView()
+        view.setup(request)
+
+        self.assertEqual(view.get_user_organization(), self.organization)
+        with self.assertNumQueries(0):
+            self.assertEqual(view.get_user_organization(), self.organization)
+            self.assertEqual(get_user_organization(request.user), self.organization)
+            self.assertEqual(get_user_role(request.user), Role.USER)
+            self.assertEqual(request.user.profile.organization, self.organization)
+            self.assertIs(get_organization_context(request), request.organization_context)
+
+    def test_next_request_of_the_session_is_served_from_cache(self):
+        get_organization_context(self.make_request())
+
+        request = self.make_request()
+        with self.assertNumQueries(0):
+            context = get_organization_context(request)
+            self.assertEqual(get_user_role(request.user), Role.USER)
+        self.assertEqual(context.organization, self.organization)
+
+    def test_profile_save_invalidates_the_session_cache(self):
+        get_organization_context(self.make_request())
+        other = Organization.objects.create(name='Globex', code='GLOBEX', type='buyer')
+
+        self.profile.organization = other
+        self.profile.save()
+
+        self.assertEqual(get_organization_context(self.make_request()).organization, other)
+
+    def test_group_change_invalidates_the_session_cache(self):
+        get_organization_context(self.make_request())
+        analyst = Group.objects.create(name=Role.ANALYST)
+
+        self.user.groups.add(analyst)
+        request = self.make_request()
+        self.assertEqual(get_organization_context(request).role, Role.ANALYST)
+        self.assertEqual(get_user_role(request.user), Role.ANALYST)
+
+        analyst.user_set.clear()
+        self.assertEqual(get_organization_context(self.make_request()).role, Role.USER)
+
+    def test_dispatch_creates_missing_profile(self):
+        user = User.objects.create_user(username='newcomer', password='testpass123')
+        # The first request caches a context without a profile for the session
+        self.assertIsNone(get_organization_context(self.make_request(user)).profile)
+
+        request = self.make_request(user)
+        response = OrganizationView.as_view()(request)
+
+        self.assertEqual(response.content, b'Default Organization')
+        self.assertEqual(request.user.profile.organization.name, 'Default Organization')
+        self.assertEqual(UserProfile.objects.filter(user=user).count(), 1)
+        # Later requests of the session see the new profile too
+        context = get_organization_context(self.make_request(user))
+        self.assertEqual(context.profile.user_id, user.pk)
+        self.assertEqual(context.organization.name, 'Default Organization')
+
+    def test_get_user_organization_creates_missing_profile(self):
+        user = User.objects.create_user(username='newcomer', password='testpass123')
+
+        organization = get_user_organization(user)
+
+        self.assertEqual(organization.name, 'Default Organization')
+        # The context is resolved again once, now with the profile
+        self.assertEqual(get_user_organization(user), organization)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_organization(user), organization)
+        self.assertEqual(UserProfile.objects.filter(user=user).count(), 1)
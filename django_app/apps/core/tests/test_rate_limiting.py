@@ -0,0 +1,109 @@
+"""
+Tests for the Redis token bucket rate limiter
+"""
+from unittest.mock import Mock, patch
+
+import fakeredis
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from apps.core import rate_limiting
+from apps.core.rate_limiting import TokenBucketRateLimiter, is_rate_limited
+
+
+class TokenBucketRateLimiterTests(SimpleTestCase):
+    """Runs the shared Lua script against an in-memory Redis"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(rate_limiting, '_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bucket_tokens(self, key='bucket'):
+        return int(float(self.redis.hget(key, 'tokens')))
+
+    def test_requests_in_the_same_second_are_all_counted(self):
+        limiter = TokenBucketRateLimiter(lease_size=1)
+
+        results = [limiter.is_allowed('bucket', 5, 3600)[0] for _ in range(8)]
+
+        self.assertEqual(results, [True] * 5 + [False] * 3)
+        self.assertGreater(self.redis.ttl('bucket'), 7190)
+
+    def test_denied_requests_report_retry_after(self):
+        limiter = TokenBucketRateLimiter(lease_size=1)
+        for _ in range(3):
+            limiter.is_allowed('bucket', 3, 3600)
+
+        allowed, metadata = limiter.is_allowed('bucket', 3, 3600)
+
+        self.assertFalse(allowed)
+        self.assertEqual(metadata['remaining'], 0)
+        # One token refills every 1200 seconds
+        self.assertTrue(1 <= metadata['retry_after'] <= 1200)
+
+    def test_tokens_refill_with_elapsed_time(self):
+        seconds, microseconds = self.redis.time()
+        now_ms = seconds * 1000 + microseconds // 1000
+        self.redis.hset('bucket', mapping={'tokens': 0, 'ts': now_ms - 30000})
+
+        allowed, metadata = TokenBucketRateLimiter(lease_size=1).is_allowed('bucket', 60, 60)
+
+        self.assertTrue(allowed)
+        self.assertEqual(metadata['remaining'], 29)
+
+    def test_leased_tokens_are_served_locally(self):
+        limiter = TokenBucketRateLimiter(lease_size=10, lease_ttl=60)
+
+        for _ in range(10):
+            self.assertTrue(limiter.is_allowed('bucket', 100, 3600)[0])
+        self.assertEqual(self.bucket_tokens(), 90)
+
+        limiter.is_allowed('bucket', 100, 3600)
+        self.assertEqual(self.bucket_tokens(), 80)
+
+    def test_lapsed_leases_are_discarded(self):
+        limiter = TokenBucketRateLimiter(lease_size=10, lease_ttl=0)
+
+        limiter.is_allowed('bucket', 100, 3600)
+        limiter.is_allowed('bucket', 100, 3600)
+
+        self.assertEqual(self.bucket_tokens(), 80)
+
+    def test_limit_types_have_separate_buckets(self):
+        with patch.object(rate_limiting, 'rate_limiter', TokenBucketRateLimiter(lease_size=1)), \
+                patch.dict(rate_limiting.RATE_LIMITS, {'ip_limit': (1, 3600), 'user_limit': (1, 3600)}):
+            self.assertFalse(is_rate_limited('10.0.0.1', 'ip_limit'))
+            self.assertTrue(is_rate_limited('10.0.0.1', 'ip_limit'))
+            self.assertFalse(is_rate_limited('10.0.0.1', 'user_limit'))
+
+        self.assertEqual(
+            sorted(self.redis.keys('rate_limit:bucket:*')),
+            ['rate_limit:bucket:ip_limit:10.0.0.1', 'rate_limit:bucket:user_limit:10.0.0.1'],
+        )
+
+    def test_redis_errors_fail_open(self):
+        limiter = TokenBucketRateLimiter(lease_size=1)
+        limiter._script = Mock(side_effect=ConnectionError('Redis unavailable'))
+
+        for _ in range(3):
+            self.assertTrue(limiter.is_allowed('bucket', 1, 3600)[0])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CounterFallbackTests(SimpleTestCase):
+    """Non-Redis caches fall back to a fixed-window counter"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(rate_limiting, '_redis_connection', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_counter_limits_requests(self):
+        limiter = TokenBucketRateLimiter()
+
+        results = [limiter.is_allowed('bucket', 2, 60)[0] for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
@@ -0,0 +1,151 @@
+"""
+Tests for compiled RBAC permission sets and their invalidation
+"""
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.core import rbac
+from apps.core.rbac import Role, assign_role, has_any_role, has_permission, has_role
+
+
+class RBACTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        rbac._local_permission_sets.clear()
+        self.addCleanup(rbac._local_permission_sets.clear)
+
+        content_type = ContentType.objects.get_for_model(User)
+        self.permissions = {
+            codename: Permission.objects.get_or_create(
+                codename=codename, content_type=content_type, defaults={'name': codename}
+            )[0]
+            for codename in ('view_analytics', 'manage_users', 'view_dashboard')
+        }
+        self.admin = Group.objects.create(name=Role.ADMIN)
+        self.admin.permissions.add(self.permissions['view_analytics'], self.permissions['manage_users'])
+        self.analyst = Group.objects.create(name=Role.ANALYST)
+        self.analyst.permissions.add(self.permissions['view_analytics'])
+        self.user_group = Group.objects.create(name=Role.USER)
+
+        self.user = User.objects.create_user(username='analyst', password='testpass123')
+        self.user.groups.add(self.analyst)
+
+    def next_request(self, user=None):
+        """The user as loaded by the next request"""
+        return User.objects.get(pk=(user or self.user).pk)
+
+    def warm(self, user):
+        """Compile and cache the user's permission set"""
+        has_permission(user, 'view_analytics')
+        return user
+
+
+class PermissionSetTests(RBACTestCase):
+
+    def test_role_and_permission_checks(self):
+        self.assertTrue(has_role(self.user, Role.ANALYST))
+        self.assertFalse(has_role(self.user, Role.ADMIN))
+        self.assertTrue(has_any_role(self.user, [Role.ADMIN, Role.ANALYST]))
+        self.assertTrue(has_permission(self.user, 'view_analytics'))
+        self.assertFalse(has_permission(self.user, 'manage_users'))
+
+    def test_repeat_checks_make_no_queries(self):
+        self.warm(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(has_permission(self.user, 'view_analytics'))
+            self.assertFalse(has_permission(self.user, 'manage_users'))
+            self.assertTrue(has_role(self.user, Role.ANALYST))
+            self.assertFalse(has_any_role(self.user, [Role.ADMIN, Role.USER]))
+
+    def test_superuser(self):
+        superuser = User.objects.create_superuser(username='root', password='testpass123')
+
+        self.assertTrue(has_permission(superuser, 'manage_system_settings'))
+        self.assertTrue(has_role(superuser, Role.ADMIN))
+        self.assertTrue(has_any_role(superuser, [Role.ADMIN]))
+        self.assertFalse(has_role(superuser, Role.ANALYST))
+
+    def test_anonymous_user(self):
+        anonymous = AnonymousUser()
+
+        with self.assertNumQueries(0):
+            self.assertFalse(has_permission(anonymous, 'view_dashboard'))
+            self.assertFalse(has_role(anonymous, Role.USER))
+            self.assertFalse(has_any_role(anonymous, [Role.ADMIN, Role.ANALYST, Role.USER]))
+
+
+class PermissionInvalidationTests(RBACTestCase):
+    """Changes are visible at once, on the changed object and on the next request"""
+
+    def test_assign_role(self):
+        self.warm(self.user)
+        self.warm(self.next_request())
+
+        assign_role(self.user, Role.ADMIN)
+
+        for user in (self.user, self.next_request()):
+            self.assertTrue(has_role(user, Role.ADMIN))
+            self.assertFalse(has_role(user, Role.ANALYST))
+            self.assertTrue(has_permission(user, 'manage_users'))
+
+    def test_user_groups_add(self):
+        self.warm(self.user)
+        self.warm(self.next_request())
+
+        self.user.groups.add(self.admin)
+
+        for user in (self.user, self.next_request()):
+            self.assertTrue(has_role(user, Role.ADMIN))
+            self.assertTrue(has_permission(user, 'manage_users'))
+
+    def test_user_groups_remove(self):
+        self.warm(self.user)
+        self.warm(self.next_request())
+
+        self.user.groups.remove(self.analyst)
+
+        for user in (self.user, self.next_request()):
+            self.assertFalse(has_role(user, Role.ANALYST))
+            self.assertFalse(has_permission(user, 'view_analytics'))
+
+    def test_user_groups_clear(self):
+        self.warm(self.user)
+        self.warm(self.next_request())
+
+        self.user.groups.clear()
+
+        for user in (self.user, self.next_request()):
+            self.assertFalse(has_role(user, Role.ANALYST))
+            self.assertFalse(has_permission(user, 'view_analytics'))
+
+    def test_group_user_set_clear(self):
+        self.warm(self.next_request())
+
+        self.analyst.user_set.clear()
+
+        user = self.next_request()
+        self.assertFalse(has_role(user, Role.ANALYST))
+        self.assertFalse(has_permission(user, 'view_analytics'))
+
+    def test_group_permissions_add(self):
+        self.warm(self.next_request())
+
+        self.analyst.permissions.add(self.permissions['view_dashboard'])
+
+        self.assertTrue(has_permission(self.next_request(), 'view_dashboard'))
+
+    def test_user_permissions_remove(self):
+        self.user.user_permissions.add(self.permissions['view_dashboard'])
+        self.warm(self.user)
+        self.warm(self.next_request())
+        self.assertTrue(has_permission(self.next_request(), 'view_dashboard'))
+
+        self.user.user_permissions.remove(self.permissions['view_dashboard'])
+
+        for user in (self.user, self.next_request()):
+            self.assertFalse(has_permission(user, 'view_dashboard'))
+            self.assertTrue(has_permission(user, 'view_analytics'))
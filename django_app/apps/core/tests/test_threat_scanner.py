@@ -0,0 +1,144 @@
+"""
+Tests for the request threat scanner
+"""
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.core.threat_scanner import CHUNK_OVERLAP, THREAT_SIGNATURES, ThreatScanner
+
+# One input per signature that only that signature's category matches
+SIGNATURE_EXAMPLES = {
+    r"union\s+select": "1 UNION SELECT password",
+    r"select\s+.*\s+from": "SELECT name FROM users",
+    r"insert\s+into": "INSERT INTO users",
+    r"update\s+.*\s+set": "UPDATE users SET admin",
+    r"delete\s+from": "DELETE FROM users",
+    r"drop\s+table": "DROP TABLE users",
+    r"--": "admin'--",
+    r"/\*": "1/*",
+    r"\*/": "*/1",
+    r"xp_cmdshell": "exec xp_cmdshell",
+    r"sp_executesql": "exec sp_executesql",
+    r"<script": "<SCRIPT>alert(1)",
+    r"javascript:": "javascript:alert(1)",
+    r"on\w+\s*=": "<img onerror=alert(1)>",
+    r"expression\s*\(": "width: expression(alert(1))",
+    r"vbscript:": "vbscript:msgbox",
+    r"data:text/html": "data:text/html,hi",
+    r"<iframe": "<iframe src=x>",
+    r"<object": "<object data=x>",
+    r"<embed": "<embed src=x>",
+    r"<link.*javascript": "<link href=javascript>",
+    r"\.\.\/": "../etc/passwd",
+    r"\.\.\\": "..\\windows",
+    r"\.\.%2f": "..%2fetc",
+    r"\.\.%5c": "..%5cwindows",
+    r"%2e%2e%2f": "%2e%2e%2fetc",
+    r"%2e%2e%5c": "%2e%2e%5cwindows",
+    r"curl": "curl example.com",
+    r"wget": "wget example.com",
+    r"python": "python -c",
+    r"perl": "perl -e",
+    r"php": "php -r",
+    r"bash": "bash -i",
+    r"cmd": "cmd /c",
+    r"powershell": "powershell -enc",
+    r"eval\(": "eval(x)",
+}
+
+
+def category(label):
+    return label.split(':', 1)[0]
+
+
+class ThreatScannerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.scanner = ThreatScanner(max_body_bytes=64 * 1024)
+        self.factory = RequestFactory()
+
+    def assertEverySignatureFires(self, scan):
+        for expected, pattern in THREAT_SIGNATURES:
+            with self.subTest(pattern=pattern):
+                result = scan(SIGNATURE_EXAMPLES[pattern])
+                self.assertIsNotNone(result)
+                self.assertEqual(category(result), expected)
+
+    def test_examples_cover_every_signature(self):
+        self.assertEqual(set(SIGNATURE_EXAMPLES), {pattern for _, pattern in THREAT_SIGNATURES})
+
+    def test_every_signature_fires_in_path(self):
+        self.assertEverySignatureFires(
+            lambda payload: self.scanner.scan_request(self.factory.get('/search/' + payload)).threat
+        )
+
+    def test_every_signature_fires_in_text_body(self):
+        self.assertEverySignatureFires(
+            lambda payload: self.scanner.scan_request(
+                self.factory.post('/api/', data=json.dumps({'q': payload}), content_type='application/json')
+            ).threat
+        )
+
+    def test_every_signature_fires_in_multipart_field(self):
+        self.assertEverySignatureFires(
+            lambda payload: self.scanner.scan_request(self.factory.post('/upload/', data={'comment': payload})).threat
+        )
+
+    def test_every_signature_fires_across_chunk_boundary(self):
+        def scan(payload):
+            data = ('x ' * CHUNK_OVERLAP + payload).encode('utf-8')
+            split = 2 * CHUNK_OVERLAP + len(payload.encode('utf-8')) // 2
+            threat, _, _ = self.scanner.scan_chunks([data[:split], data[split:]], budget=len(data))
+            return threat
+
+        self.assertEverySignatureFires(scan)
+
+    def test_unicode_whitespace_in_text_body(self):
+        request = self.factory.post('/api/', data='q=1 union\xa0select password'.encode('utf-8'),
+                                    content_type='application/x-www-form-urlencoded')
+
+        self.assertEqual(self.scanner.scan_request(request).threat, r'SQL Injection: union\s+select')
+
+    def test_unicode_whitespace_in_multipart_field(self):
+        request = self.factory.post('/upload/', data={'comment': '1 union\u2003select password'})
+
+        self.assertEqual(self.scanner.scan_request(request).threat, r'SQL Injection: union\s+select')
+
+    def test_character_split_across_chunks(self):
+        data = 'union\xa0select'.encode('utf-8')
+        split = data.index(b'\xa0')  # between the two bytes of U+00A0
+
+        threat, scanned, truncated = self.scanner.scan_chunks([data[:split], data[split:]], budget=100)
+
+        self.assertEqual(threat, r'SQL Injection: union\s+select')
+        self.assertEqual((scanned, truncated), (len(data), False))
+
+    def test_textual_upload_is_scanned(self):
+        upload = SimpleUploadedFile('notes.txt', b'a' * 1000 + b' DROP TABLE users', content_type='text/plain')
+        request = self.factory.post('/upload/', data={'file': upload})
+
+        self.assertEqual(self.scanner.scan_request(request).threat, r'SQL Injection: drop\s+table')
+
+    def test_binary_upload_is_skipped(self):
+        upload = SimpleUploadedFile('image.png', b'DROP TABLE users', content_type='image/png')
+        request = self.factory.post('/upload/', data={'file': upload})
+
+        self.assertIsNone(self.scanner.scan_request(request).threat)
+
+    def test_body_beyond_budget_is_not_scanned(self):
+        scanner = ThreatScanner(max_body_bytes=100)
+        request = self.factory.post('/api/', data='a' * 200 + ' drop table users', content_type='text/plain')
+
+        result = scanner.scan_request(request)
+
+        self.assertIsNone(result.threat)
+        self.assertEqual(result.bytes_scanned, 100)
+        self.assertTrue(result.body_truncated)
+
+    def test_clean_request(self):
+        request = self.factory.post('/api/', data=json.dumps({'name': 'Steel bolts', 'quantity': 10}),
+                                    content_type='application/json')
+
+        self.assertIsNone(self.scanner.scan_request(request).threat)
@@ -0,0 +1,251 @@
+"""
+Request threat scanner for ThreatDetectionMiddleware
+
+All threat signatures are compiled once into a single alternation regex, so
+each input is scanned in one pass instead of once per signature. Only when
+that regex matches are the individual signatures tried at the match
+position to name the one that fired.
+
+Request bodies are scanned only up to ``THREAT_SCAN_MAX_BODY_BYTES`` per
+request. Body bytes are decoded as UTF-8 (dropping invalid sequences) and
+matched with the same text regex as paths and headers, so Unicode whitespace
+such as U+00A0 counts as whitespace there too:
+
+- textual content types (form, JSON, XML, text/*) are scanned directly
+- multipart bodies go through Django's streaming multipart parser; form
+  fields, file names and textual uploads are scanned chunk by chunk, and
+  binary uploads are skipped
+- other content types are not scanned
+
+Each scan records its duration and the number of bytes scanned on the
+request as ``request.threat_scan``.
+"""
+import logging
+import re
+import time
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http.multipartparser import MultiPartParserError
+
+logger = logging.getLogger(__name__)
+
+# (category, pattern) in priority order
+THREAT_SIGNATURES: Tuple[Tuple[str, str], ...] = tuple(
+    [('SQL Injection', pattern) for pattern in (
+        r"union\s+select", r"select\s+.*\s+from", r"insert\s+into",
+        r"update\s+.*\s+set", r"delete\s+from", r"drop\s+table",
+        r"--", r"/\*", r"\*/", r"xp_cmdshell", r"sp_executesql",
+    )]
+    + [('XSS', pattern) for pattern in (
+        r"<script", r"javascript:", r"on\w+\s*=", r"expression\s*\(",
+        r"vbscript:", r"data:text/html", r"<iframe", r"<object",
+        r"<embed", r"<link.*javascript",
+    )]
+    + [('Path Traversal', pattern) for pattern in (
+        r"\.\.\/", r"\.\.\\", r"\.\.%2f", r"\.\.%5c",
+        r"%2e%2e%2f", r"%2e%2e%5c",
+    )]
+    + [('Command Injection', pattern) for pattern in (
+        r"curl", r"wget", r"python", r"perl", r"php",
+        r"bash", r"cmd", r"powershell", r"eval\(",
+    )]
+)
+
+# Categories whose signatures only match whole words
+WORD_BOUNDARY_CATEGORIES = {'Command Injection'}
+
+DEFAULT_MAX_BODY_BYTES = 64 * 1024
+
+TEXT_CONTENT_TYPES = (
+    'application/x-www-form-urlencoded', 'application/json', 'application/xml',
+    'application/javascript', 'application/graphql',
+)
+
+SCANNED_HEADERS = ('HTTP_REFERER', 'HTTP_USER_AGENT', 'HTTP_X_FORWARDED_FOR')
+
+# Bytes carried over between streamed chunks so that signatures spanning a
+# chunk boundary still match
+CHUNK_OVERLAP = 256
+
+
+@dataclass
+class ThreatScanResult:
+    """Outcome and cost of scanning one request"""
+    threat: Optional[str] = None
+    duration_ms: float = 0.0
+    bytes_scanned: int = 0
+    body_scanned: bool = False
+    body_truncated: bool = False
+
+
+def is_text_content_type(content_type: str) -> bool:
+    content_type = (content_type or '').lower()
+    return (
+        content_type.startswith('text/')
+        or content_type in TEXT_CONTENT_TYPES
+        or content_type.endswith(('+json', '+xml'))
+    )
+
+
+class ThreatScanner:
+    """Single-pass scanner over a fixed set of threat signatures"""
+
+    def __init__(self,
+                 signatures: Iterable[Tuple[str, str]] = THREAT_SIGNATURES,
+                 max_body_bytes: Optional[int] = None):
+        self.max_body_bytes = (
+            max_body_bytes if max_body_bytes is not None
+            else getattr(settings, 'THREAT_SCAN_MAX_BODY_BYTES', DEFAULT_MAX_BODY_BYTES)
+        )
+
+        # One alternation per category, without capturing groups so that the
+        # regex engine can skip ahead on the possible first characters;
+        # word-boundary categories share a single pair of boundary checks
+        branches = []
+        labelled = []
+        for category, group in groupby(signatures, key=itemgetter(0)):
+            patterns = [pattern for _, pattern in group]
+            if category in WORD_BOUNDARY_CATEGORIES:
+                branches.append(rf'\b(?:{"|".join(patterns)})\b')
+                labelled.extend((f'{category}: {p}', rf'\b{p}\b') for p in patterns)
+            else:
+                branches.append('|'.join(patterns))
+                labelled.extend((f'{category}: {p}', p) for p in patterns)
+
+        self._pattern = re.compile('|'.join(branches))
+        # Individual signatures, only used to label a match
+        self._signatures = [(label, re.compile(p)) for label, p in labelled]
+
+    def scan(self, data: Union[str, bytes, memoryview]) -> Optional[str]:
+        """Label of the first signature found in ``data``, or None"""
+        if not data:
+            return None
+        if not isinstance(data, str):
+            data = bytes(data).decode('utf-8', 'ignore')
+        # Lowercasing once is cheaper than case-insensitive matching
+        data = data.lower()
+
+        match = self._pattern.search(data)
+        if match is None:
+            return None
+        # The alternation picks the first signature matching at this position
+        for label, signature in self._signatures:
+            if signature.match(data, match.start()):
+                return label
+        return None
+
+    def scan_chunks(self, chunks: Iterable[bytes], budget: int) -> Tuple[Optional[str], int, bool]:
+        """
+        Scan a byte stream chunk by chunk, stopping after ``budget`` bytes.
+
+        The last ``CHUNK_OVERLAP`` bytes of each chunk are scanned again with
+        the next one, which also reassembles characters split between chunks.
+
+        Returns:
+            (threat label or None, bytes scanned, whether the stream was cut off)
+        """
+        scanned = 0
+        tail = b''
+        for chunk in chunks:
+            if scanned >= budget:
+                return None, scanned, True
+            chunk = chunk[:budget - scanned]
+            scanned += len(chunk)
+            threat = self.scan(tail + chunk)
+            if threat:
+                return threat, scanned, False
+            tail = chunk[-CHUNK_OVERLAP:]
+        return None, scanned, False
+
+    def scan_request(self, request) -> ThreatScanResult:
+        """Scan path, query string, selected headers and the body of a request"""
+        start = time.perf_counter()
+        result = ThreatScanResult()
+
+        sources = [request.path, request.META.get('QUERY_STRING', '')]
+        sources.extend(request.META.get(header, '') for header in SCANNED_HEADERS)
+        for source in sources:
+            result.threat = self.scan(source)
+            if result.threat:
+                break
+        else:
+            result.threat = self._scan_body(request, result)
+
+        result.duration_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    def _scan_body(self, request, result: ThreatScanResult) -> Optional[str]:
+        content_type = (request.content_type or '').lower()
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if not content_length or self.max_body_bytes <= 0:
+            return None
+
+        try:
+            if content_type == 'multipart/form-data':
+                return self._scan_multipart(request, result)
+            # A body without a content type is scanned like text
+            if not content_type or is_text_content_type(content_type):
+                body = request.body
+                result.body_scanned = True
+                result.body_truncated = len(body) > self.max_body_bytes
+                result.bytes_scanned = min(len(body), self.max_body_bytes)
+                return self.scan(memoryview(body)[:self.max_body_bytes])
+        except (RequestDataTooBig, MultiPartParserError) as e:
+            # Django rejects the request with the same error when the view
+            # reads the body
+            logger.debug(f"Request body not scanned: {e}")
+        return None
+
+    def _scan_multipart(self, request, result: ThreatScanResult) -> Optional[str]:
+        """
+        Scan form fields, file names and textual uploads.
+
+        Reading ``request.POST`` runs Django's multipart parser, which
+        streams the body into upload handlers; the parsed data stays cached
+        on the request for the view.
+        """
+        result.body_scanned = True
+        budget = self.max_body_bytes
+
+        fields: List[str] = [value for _, values in request.POST.lists() for value in values]
+        uploads = [upload for _, files in request.FILES.lists() for upload in files]
+        fields.extend(upload.name for upload in uploads)
+
+        for value in fields:
+            data = value.encode('utf-8')[:budget - result.bytes_scanned]
+            result.bytes_scanned += len(data)
+            threat = self.scan(data)
+            if threat:
+                return threat
+            if result.bytes_scanned >= budget:
+                result.body_truncated = True
+                return None
+
+        for upload in uploads:
+            if not is_text_content_type(upload.content_type):
+                continue
+            threat, scanned, truncated = self.scan_chunks(upload.chunks(), budget - result.bytes_scanned)
+            upload.seek(0)
+            result.bytes_scanned += scanned
+            if threat:
+                return threat
+            if truncated or result.bytes_scanned >= budget:
+                result.body_truncated = True
+                return None
+        return None
+
+
+_threat_scanner: Optional[ThreatScanner] = None
+
+
+def get_threat_scanner() -> ThreatScanner:
+    """Process-wide scanner, compiled on first use"""
+    global _threat_scanner
+    if _threat_scanner is None:
+        _threat_scanner = ThreatScanner()
+    return _threat_scanner
@@ -0,0 +1,47 @@
+-- Token bucket rate limit, evaluated atomically in Redis.
+--
+-- Single source of the script for both services: Django loads it from
+-- apps/core/rate_limiting.py and the ML service through
+-- settings.RATE_LIMIT_SCRIPT_PATH (fastapi_ml/dependencies.py).
+--
+-- KEYS[1]  bucket hash (fields: tokens, ts in ms of the Redis clock)
+-- ARGV[1]  capacity
+-- ARGV[2]  refill rate in tokens per millisecond
+-- ARGV[3]  tokens requested
+-- ARGV[4]  minimum tokens to grant; fewer available grants none
+-- ARGV[5]  key TTL in seconds
+--
+-- Returns {granted, tokens left (floored), retry after in ms}.
+if redis.replicate_commands then redis.replicate_commands() end
+local capacity = tonumber(ARGV[1])
+local refill_per_ms = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local minimum = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_per_ms)
+
+local granted = math.min(requested, math.floor(tokens))
+if granted < minimum then
+    granted = 0
+end
+tokens = tokens - granted
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ttl)
+
+local retry_after_ms = 0
+if granted == 0 then
+    retry_after_ms = math.ceil((minimum - tokens) / refill_per_ms)
+end
+return {granted, math.floor(tokens), retry_after_ms}
@@ -34,6 +34,7 @@ class VaultConfig:
     verify_ssl: bool = True
     timeout: int = 30
     max_retries: int = 3
+    auth_retry_interval: int = 60  # seconds to wait after a failed login
     
     @classmethod
     def from_settings(cls) -> 'VaultConfig':
@@ -51,6 +52,7 @@ class VaultConfig:
             verify_ssl=vault_settings.get('VERIFY_SSL', True),
             timeout=vault_settings.get('TIMEOUT', 30),
             max_retries=vault_settings.get('MAX_RETRIES', 3),
+            auth_retry_interval=vault_settings.get('AUTH_RETRY_INTERVAL', 60),
         )
 
 
@@ -62,6 +64,7 @@ class VaultClient:
         self._client = None
         self._authenticated = False
         self._token_expires_at = None
+        self._auth_retry_at = None
         
     def _get_client(self) -> hvac.Client:
         """Get or create Vault client"""
@@ -84,10 +87,28 @@ class VaultClient:
         return self._client
     
     def authenticate(self) -> bool:
-        """Authenticate with Vault"""
-        if self._authenticated and self._token_expires_at and datetime.now() < self._token_expires_at:
+        """
+        Authenticate with Vault.
+        
+        Both outcomes are cached: a token is reused until it expires, and
+        after a failed login no new attempt is made for
+        ``auth_retry_interval`` seconds.
+        """
+        now = datetime.now()
+        if self._authenticated and self._token_expires_at and now < self._token_expires_at:
             return True
+        if self._auth_retry_at and now < self._auth_retry_at:
+            return False
         
+        self._authenticated = False
+        if self._login():
+            self._auth_retry_at = None
+            return True
+        self._auth_retry_at = datetime.now() + timedelta(seconds=self.config.auth_retry_interval)
+        return False
+    
+    def _login(self) -> bool:
+        """Log in with the configured method"""
         client = self._get_client()
         
         try:
@@ -362,6 +383,36 @@ class VaultClient:
             logger.error(f"Failed to decrypt data with Vault: {e}")
             raise SecurityException(f"Decryption failed: {e}")
     
+    def generate_data_key(self, key_name: str = "pricing-agent", bits: int = 256) -> Dict[str, str]:
+        """
+        Generate a data key wrapped by a transit key.
+        
+        Returns:
+            ``plaintext``: base64 encoded key, ``ciphertext``: the key
+            wrapped by ``key_name``, which ``decrypt_data`` unwraps
+        """
+        if not self.authenticate():
+            raise SecurityException("Failed to authenticate to Vault")
+        
+        client = self._get_client()
+        
+        try:
+            response = client.secrets.transit.generate_data_key(
+                name=key_name,
+                key_type='plaintext',
+                bits=bits,
+                mount_point='transit'
+            )
+            
+            return {
+                'plaintext': response['data']['plaintext'],
+                'ciphertext': response['data']['ciphertext'],
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to generate data key with Vault: {e}")
+            raise SecurityException(f"Data key generation failed: {e}")
+    
     def create_encryption_key(self, key_name: str, key_type: str = "aes256-gcm96") -> bool:
         """Create encryption key in Vault transit engine"""
         if not self.authenticate():
@@ -16,10 +16,9 @@ from rest_framework.decorators import api_view
 from rest_framework import viewsets
 from django.views.generic import ListView, DetailView
 try:
-    from apps.core.authentication import MLServiceClient
+    from apps.pricing.ml_client import get_batching_ml_client
 except ImportError:
-    MLServiceClient = None
-import asyncio
+    get_batching_ml_client = None
 
 
 class HomeView(TemplateView):
@@ -231,10 +230,9 @@ class HealthCheckView(APIView):
             
             # Check ML service connectivity
             ml_service_status = False
-            if MLServiceClient:
+            if get_batching_ml_client:
                 try:
-                    ml_client = MLServiceClient()
-                    ml_service_status = asyncio.run(ml_client.health_check())
+                    ml_service_status = get_batching_ml_client().is_healthy()
                 except:
                     pass
             
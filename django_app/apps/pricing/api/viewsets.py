@@ -2,6 +2,7 @@
 ViewSets for pricing API endpoints
 """
 import asyncio
+from dataclasses import asdict
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Dict, Any, List
@@ -25,6 +26,7 @@ from apps.pricing.models import (
 )
 from apps.core.models import Category
 from apps.core.authentication import MLServiceClient
+from apps.pricing.ml_client import get_batching_ml_client
 from apps.core.exceptions import (
     MaterialNotFound,
     MLServiceError,
@@ -127,17 +129,20 @@ class MaterialViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         
         try:
-            # Call ML service for prediction
-            ml_client = MLServiceClient()
-            prediction = asyncio.run(ml_client.predict_price(
+            # Call ML service for prediction; concurrent requests share one batch
+            data = serializer.data
+            additional_features = {
+                k: v for k, v in data.items()
+                if k not in ['material_id', 'quantity', 'supplier_id', 'unit_of_measure'] and v
+            }
+            prediction = get_batching_ml_client().predict_price(
                 material_id=str(material.id),
+                supplier_id=data.get('supplier_id') or None,
                 quantity=float(serializer.validated_data['quantity']),
-                user=request.user,
-                **{k: v for k, v in serializer.validated_data.items() 
-                   if k not in ['material_id', 'quantity']}
-            ))
+                additional_features=additional_features or None
+            )
             
-            return Response(prediction)
+            return Response(asdict(prediction))
             
         except Exception as e:
             if "unavailable" in str(e).lower():
@@ -490,13 +495,28 @@ class MLAnalyticsViewSet(viewsets.ViewSet):
         serializer.is_valid(raise_exception=True)
         
         try:
-            ml_client = MLServiceClient()
-            result = asyncio.run(ml_client.detect_anomalies(
-                prices=serializer.validated_data['prices'],
-                user=request.user
-            ))
+            prices = serializer.validated_data['prices']
+            results = get_batching_ml_client().detect_anomaly_many([
+                {
+                    'material_id': str(price['material_id']),
+                    'price': float(price['price']),
+                    'supplier_id': price.get('supplier_id'),
+                    'quantity': float(price.get('quantity', 1)),
+                }
+                for price in prices
+            ])
+            anomalies = [
+                dict(asdict(result), material_id=str(price['material_id']))
+                for price, result in zip(prices, results)
+                if result.is_anomaly
+            ]
             
-            return Response(result)
+            return Response({
+                'anomalies': anomalies,
+                'anomaly_count': len(anomalies),
+                'total_samples': len(prices),
+                'anomaly_rate': len(anomalies) / len(prices),
+            })
             
         except Exception as e:
             if "unavailable" in str(e).lower():
@@ -538,13 +558,31 @@ class MLAnalyticsViewSet(viewsets.ViewSet):
         serializer.is_valid(raise_exception=True)
         
         try:
-            ml_client = MLServiceClient()
-            result = asyncio.run(ml_client.batch_predict(
-                predictions=serializer.validated_data['predictions'],
-                user=request.user
-            ))
+            items = [
+                {
+                    'material_id': item['material_id'],
+                    'supplier_id': item.get('supplier_id') or None,
+                    'quantity': float(item['quantity']),
+                    'unit_of_measure': item['unit_of_measure'],
+                }
+                for item in serializer.validated_data['predictions']
+            ]
+            predictions = get_batching_ml_client().predict_prices_batch(items, return_exceptions=True)
             
-            return Response(result)
+            results, errors = [], []
+            for item, prediction in zip(items, predictions):
+                if isinstance(prediction, Exception):
+                    errors.append({'material_id': item['material_id'], 'error': str(prediction)})
+                else:
+                    results.append(dict(asdict(prediction), material_id=item['material_id']))
+            
+            return Response({
+                'total_predictions': len(items),
+                'completed_predictions': len(results),
+                'failed_predictions': len(errors),
+                'results': results,
+                'errors': errors,
+            })
             
         except Exception as e:
             if "unavailable" in str(e).lower():
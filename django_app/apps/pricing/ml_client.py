@@ -4,9 +4,16 @@ ML Service Client for Django-FastAPI Integration
 This module provides a client for communicating with the FastAPI ML service
 for price predictions, anomaly detection, and should-cost calculations.
 """
+import asyncio
+import concurrent.futures
+import json
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
 from decimal import Decimal
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 from dataclasses import dataclass
 
 import httpx
@@ -14,6 +21,12 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
 
 @dataclass
 class PricePrediction:
@@ -52,6 +65,148 @@ class MLServiceError(Exception):
     pass
 
 
+def _parse_price_prediction(data: Dict[str, Any]) -> PricePrediction:
+    return PricePrediction(
+        predicted_price=Decimal(str(data['predicted_price'])),
+        confidence_score=data.get('confidence_score', 0.0),
+        confidence_interval=data.get('confidence_interval', {}),
+        model_version=data.get('model_version', 'unknown'),
+        features_used=data.get('features_used', [])
+    )
+
+
+def _parse_anomaly_result(data: Dict[str, Any]) -> AnomalyResult:
+    return AnomalyResult(
+        is_anomaly=data.get('is_anomaly', False),
+        anomaly_score=data.get('anomaly_score', 0.0),
+        severity=data.get('severity', 'low'),
+        expected_price=Decimal(str(data['expected_price'])) if data.get('expected_price') else None,
+        deviation_percentage=data.get('deviation_percentage'),
+        explanation=data.get('explanation', '')
+    )
+
+
+def _parse_should_cost(data: Dict[str, Any]) -> ShouldCostResult:
+    return ShouldCostResult(
+        total_should_cost=Decimal(str(data.get('total_should_cost', 0))),
+        material_cost=Decimal(str(data.get('material_cost', 0))),
+        labor_cost=Decimal(str(data.get('labor_cost', 0))),
+        overhead_cost=Decimal(str(data.get('overhead_cost', 0))),
+        confidence=data.get('confidence', 0.0),
+        breakdown=data.get('breakdown', [])
+    )
+
+
+def _price_payload(material_id, supplier_id=None, quantity=1.0, additional_features=None) -> Dict[str, Any]:
+    payload = {
+        'material_id': str(material_id),
+        'quantity': quantity,
+    }
+    if supplier_id:
+        payload['supplier_id'] = str(supplier_id)
+    if additional_features:
+        payload['features'] = additional_features
+    return payload
+
+
+def _anomaly_payload(material_id, price, supplier_id=None, quantity=1.0) -> Dict[str, Any]:
+    payload = {
+        'material_id': str(material_id),
+        'price': price,
+        'quantity': quantity,
+    }
+    if supplier_id:
+        payload['supplier_id'] = str(supplier_id)
+    return payload
+
+
+def _should_cost_payload(material_id, components=None, quantity=1.0) -> Dict[str, Any]:
+    payload = {
+        'material_id': str(material_id),
+        'quantity': quantity,
+    }
+    if components:
+        payload['components'] = components
+    return payload
+
+
+# Item limits of the ML service's batch endpoints; larger batches are split
+PREDICTION_BATCH_LIMIT = 1000
+SHOULD_COST_BATCH_LIMIT = 10000
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _batch_price_payload(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    predictions = []
+    for item in items:
+        prediction = {
+            'material_id': str(item['material_id']),
+            'quantity': item.get('quantity', 1.0),
+            'unit_of_measure': item.get('unit_of_measure') or 'unit',
+        }
+        if item.get('supplier_id'):
+            prediction['supplier_id'] = str(item['supplier_id'])
+        predictions.append(prediction)
+    return {'predictions': predictions}
+
+
+def _match_batch_predictions(items: List[Dict[str, Any]], data: Dict[str, Any]) -> List[Any]:
+    """
+    Raw batch prediction results in request order.
+
+    The batch endpoint reports failed items separately, so results are
+    matched to requests by material id. Items without a result become an
+    MLServiceError in their place.
+    """
+    by_material: Dict[str, List[Dict[str, Any]]] = {}
+    for result in data.get('results', []):
+        by_material.setdefault(str(result.get('material_id')), []).append(result)
+    errors = {str(error.get('material_id')): error.get('error') for error in data.get('errors', [])}
+
+    matched = []
+    for item in items:
+        material_id = str(item['material_id'])
+        results = by_material.get(material_id)
+        if results:
+            matched.append(results.pop(0))
+        else:
+            matched.append(MLServiceError(
+                f"No prediction for material {material_id}: {errors.get(material_id, 'missing from response')}"
+            ))
+    return matched
+
+
+def _parse_batch_predictions(items: List[Dict[str, Any]], data: Dict[str, Any],
+                             return_exceptions: bool = False) -> List[Any]:
+    """
+    Batch prediction results in request order (see _match_batch_predictions).
+    Missing items raise, or are returned in place when ``return_exceptions`` is set.
+    """
+    parsed = []
+    for result in _match_batch_predictions(items, data):
+        if isinstance(result, MLServiceError):
+            if not return_exceptions:
+                raise result
+            parsed.append(result)
+        else:
+            parsed.append(_parse_price_prediction(result))
+    return parsed
+
+
+def _check_batch_should_costs(items: List[Dict[str, Any]], data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    results = data.get('results', [])
+    if len(results) != len(items):
+        raise MLServiceError(f"Batch should-cost returned {len(results)} results for {len(items)} items")
+    return results
+
+
+def _parse_batch_should_costs(items: List[Dict[str, Any]], data: Dict[str, Any]) -> List[ShouldCostResult]:
+    return [_parse_should_cost(result) for result in _check_batch_should_costs(items, data)]
+
+
 class MLServiceClient:
     """Client for communicating with FastAPI ML service"""
 
@@ -136,26 +291,11 @@ class MLServiceClient:
         """
         try:
             client = self._get_client()
-            payload = {
-                'material_id': str(material_id),
-                'quantity': quantity,
-            }
-            if supplier_id:
-                payload['supplier_id'] = str(supplier_id)
-            if additional_features:
-                payload['features'] = additional_features
+            payload = _price_payload(material_id, supplier_id, quantity, additional_features)
 
             response = client.post('/api/v1/predictions/price', json=payload)
             response.raise_for_status()
-            data = response.json()
-
-            return PricePrediction(
-                predicted_price=Decimal(str(data['predicted_price'])),
-                confidence_score=data.get('confidence_score', 0.0),
-                confidence_interval=data.get('confidence_interval', {}),
-                model_version=data.get('model_version', 'unknown'),
-                features_used=data.get('features_used', [])
-            )
+            return _parse_price_prediction(response.json())
         except httpx.HTTPError as e:
             logger.error(f"Price prediction failed for material {material_id}: {e}")
             raise MLServiceError(f"Price prediction failed: {e}")
@@ -168,32 +308,23 @@ class MLServiceClient:
         Get price predictions for multiple materials.
 
         Args:
-            materials: List of dicts with material_id, supplier_id (optional), quantity
+            materials: List of dicts with material_id, supplier_id (optional),
+                quantity and unit_of_measure
 
         Returns:
-            List of PricePrediction results
+            List of PricePrediction results in request order
 
         Raises:
-            MLServiceError: If batch prediction fails
+            MLServiceError: If batch prediction fails for any material
         """
         try:
             client = self._get_client()
-            payload = {'items': materials}
-
-            response = client.post('/api/v1/predictions/batch', json=payload)
-            response.raise_for_status()
-            data = response.json()
-
-            results = []
-            for item in data.get('predictions', []):
-                results.append(PricePrediction(
-                    predicted_price=Decimal(str(item['predicted_price'])),
-                    confidence_score=item.get('confidence_score', 0.0),
-                    confidence_interval=item.get('confidence_interval', {}),
-                    model_version=item.get('model_version', 'unknown'),
-                    features_used=item.get('features_used', [])
-                ))
-            return results
+            predictions = []
+            for chunk in _chunks(materials, PREDICTION_BATCH_LIMIT):
+                response = client.post('/api/v1/predictions/batch', json=_batch_price_payload(chunk))
+                response.raise_for_status()
+                predictions.extend(_parse_batch_predictions(chunk, response.json()))
+            return predictions
         except httpx.HTTPError as e:
             logger.error(f"Batch price prediction failed: {e}")
             raise MLServiceError(f"Batch prediction failed: {e}")
@@ -224,26 +355,11 @@ class MLServiceClient:
         """
         try:
             client = self._get_client()
-            payload = {
-                'material_id': str(material_id),
-                'price': price,
-                'quantity': quantity,
-            }
-            if supplier_id:
-                payload['supplier_id'] = str(supplier_id)
+            payload = _anomaly_payload(material_id, price, supplier_id, quantity)
 
             response = client.post('/api/v1/predictions/anomaly', json=payload)
             response.raise_for_status()
-            data = response.json()
-
-            return AnomalyResult(
-                is_anomaly=data.get('is_anomaly', False),
-                anomaly_score=data.get('anomaly_score', 0.0),
-                severity=data.get('severity', 'low'),
-                expected_price=Decimal(str(data['expected_price'])) if data.get('expected_price') else None,
-                deviation_percentage=data.get('deviation_percentage'),
-                explanation=data.get('explanation', '')
-            )
+            return _parse_anomaly_result(response.json())
         except httpx.HTTPError as e:
             logger.error(f"Anomaly detection failed for material {material_id}: {e}")
             raise MLServiceError(f"Anomaly detection failed: {e}")
@@ -272,17 +388,7 @@ class MLServiceClient:
             response.raise_for_status()
             data = response.json()
 
-            results = []
-            for item in data.get('results', []):
-                results.append(AnomalyResult(
-                    is_anomaly=item.get('is_anomaly', False),
-                    anomaly_score=item.get('anomaly_score', 0.0),
-                    severity=item.get('severity', 'low'),
-                    expected_price=Decimal(str(item['expected_price'])) if item.get('expected_price') else None,
-                    deviation_percentage=item.get('deviation_percentage'),
-                    explanation=item.get('explanation', '')
-                ))
-            return results
+            return [_parse_anomaly_result(item) for item in data.get('results', [])]
         except httpx.HTTPError as e:
             logger.error(f"Batch anomaly detection failed: {e}")
             raise MLServiceError(f"Batch anomaly detection failed: {e}")
@@ -311,29 +417,44 @@ class MLServiceClient:
         """
         try:
             client = self._get_client()
-            payload = {
-                'material_id': str(material_id),
-                'quantity': quantity,
-            }
-            if components:
-                payload['components'] = components
+            payload = _should_cost_payload(material_id, components, quantity)
 
             response = client.post('/api/v1/predictions/should-cost', json=payload)
             response.raise_for_status()
-            data = response.json()
-
-            return ShouldCostResult(
-                total_should_cost=Decimal(str(data.get('total_should_cost', 0))),
-                material_cost=Decimal(str(data.get('material_cost', 0))),
-                labor_cost=Decimal(str(data.get('labor_cost', 0))),
-                overhead_cost=Decimal(str(data.get('overhead_cost', 0))),
-                confidence=data.get('confidence', 0.0),
-                breakdown=data.get('breakdown', [])
-            )
+            return _parse_should_cost(response.json())
         except httpx.HTTPError as e:
             logger.error(f"Should-cost calculation failed for material {material_id}: {e}")
             raise MLServiceError(f"Should-cost calculation failed: {e}")
 
+    def calculate_should_cost_batch(
+        self,
+        items: List[Dict[str, Any]]
+    ) -> List[ShouldCostResult]:
+        """
+        Calculate should-costs for many materials in one request.
+
+        Args:
+            items: List of dicts with material_id, components (optional), quantity
+
+        Returns:
+            List of ShouldCostResult in request order
+
+        Raises:
+            MLServiceError: If the batch calculation fails
+        """
+        try:
+            client = self._get_client()
+            results = []
+            for chunk in _chunks(items, SHOULD_COST_BATCH_LIMIT):
+                payload = {'items': [_should_cost_payload(**item) for item in chunk]}
+                response = client.post('/api/v1/predictions/should-cost/batch', json=payload)
+                response.raise_for_status()
+                results.extend(_parse_batch_should_costs(chunk, response.json()))
+            return results
+        except httpx.HTTPError as e:
+            logger.error(f"Batch should-cost calculation failed: {e}")
+            raise MLServiceError(f"Batch should-cost calculation failed: {e}")
+
     # Model Management Methods
 
     def get_models(self) -> List[Dict[str, Any]]:
@@ -414,6 +535,429 @@ class MLServiceClient:
             raise MLServiceError(f"Failed to get drift status: {e}")
 
 
+class _TTLCache:
+    """Small bounded cache of JSON responses with a per-entry expiry"""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Tuple, value: Any):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class _MicroBatcher:
+    """
+    Merges single-item calls made within ``window`` seconds into one batch.
+
+    ``send_batch`` receives the queued payloads and returns one result per
+    payload, in order; a result that is an exception fails only its caller.
+    A batch is sent early once ``max_size`` payloads are queued.
+    """
+
+    def __init__(self, send_batch, window: float, max_size: int):
+        self._send_batch = send_batch
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def submit(self, payload: Dict[str, Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._dispatch(pending))
+
+    async def _dispatch(self, pending: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            results = await self._send_batch([payload for payload, _ in pending])
+        except Exception as e:
+            results = [e] * len(pending)
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class AsyncMLServiceClient:
+    """
+    Asynchronous client for the FastAPI ML service.
+
+    All calls share one pooled ``httpx.AsyncClient`` (HTTP/2 when ``h2`` is
+    installed, so concurrent requests multiplex over a single connection).
+    Identical in-flight requests are coalesced into one round trip, and
+    successful prediction responses are kept for ``cache_ttl`` seconds.
+    Single price predictions and should-cost calculations made within
+    ``batch_window`` seconds of each other are sent as one batch request.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: float = 30.0,
+        max_connections: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        batch_window: Optional[float] = None
+    ):
+        """
+        Initialize the async ML service client.
+
+        Args:
+            base_url: Base URL of the ML service. Defaults to settings.ML_SERVICE_URL
+            timeout: Request timeout in seconds
+            max_connections: Connection pool size. Defaults to settings.ML_CLIENT_MAX_CONNECTIONS
+            cache_ttl: Seconds to cache prediction responses. Defaults to settings.ML_CLIENT_CACHE_TTL
+            batch_window: Seconds to collect single calls into one batch request; 0 disables.
+                Defaults to settings.ML_CLIENT_BATCH_WINDOW
+        """
+        self.base_url = base_url or getattr(settings, 'ML_SERVICE_URL', 'http://localhost:8001')
+        self.timeout = timeout
+        self.max_connections = max_connections or getattr(settings, 'ML_CLIENT_MAX_CONNECTIONS', 20)
+        if cache_ttl is None:
+            cache_ttl = getattr(settings, 'ML_CLIENT_CACHE_TTL', 60)
+        if batch_window is None:
+            batch_window = getattr(settings, 'ML_CLIENT_BATCH_WINDOW', 0.01)
+        self._cache = _TTLCache(cache_ttl)
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._price_batcher = self._should_cost_batcher = None
+        if batch_window > 0:
+            self._price_batcher = _MicroBatcher(self._send_price_batch, batch_window, PREDICTION_BATCH_LIMIT)
+            self._should_cost_batcher = _MicroBatcher(
+                self._send_should_cost_batch, batch_window, SHOULD_COST_BATCH_LIMIT
+            )
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get or create the pooled HTTP client"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                headers={'Content-Type': 'application/json'}
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the HTTP client"""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def _send(self, method: str, path: str, payload: Optional[Dict[str, Any]]) -> Any:
+        response = await self._get_client().request(method, path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _send_price_batch(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        data = await self._send('POST', '/api/v1/predictions/batch', _batch_price_payload(payloads))
+        return _match_batch_predictions(payloads, data)
+
+    async def _send_should_cost_batch(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        data = await self._send('POST', '/api/v1/predictions/should-cost/batch', {'items': payloads})
+        return _check_batch_should_costs(payloads, data)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        cacheable: bool = False,
+        batcher: Optional[_MicroBatcher] = None
+    ) -> Any:
+        """
+        Send a request, sharing the response with identical concurrent callers.
+        With a ``batcher`` the payload is sent as one item of its next batch.
+        """
+        key = (method, path, json.dumps(payload, sort_keys=True, default=str))
+        if cacheable:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            if batcher is not None:
+                future = batcher.submit(payload)
+            else:
+                future = asyncio.ensure_future(self._send(method, path, payload))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so one caller's cancellation does not cancel the shared request
+        data = await asyncio.shield(future)
+        if cacheable:
+            self._cache.set(key, data)
+        return data
+
+    # Health Check Methods
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Check ML service health"""
+        try:
+            return await self._request('GET', '/health')
+        except httpx.HTTPError as e:
+            logger.error(f"ML service health check failed: {e}")
+            raise MLServiceError(f"Health check failed: {e}")
+
+    # Prediction Methods
+
+    async def predict_price(
+        self,
+        material_id: str,
+        supplier_id: Optional[str] = None,
+        quantity: float = 1.0,
+        additional_features: Optional[Dict[str, Any]] = None
+    ) -> PricePrediction:
+        """Get price prediction for a material (see MLServiceClient.predict_price)"""
+        try:
+            payload = _price_payload(material_id, supplier_id, quantity, additional_features)
+            # The batch endpoint takes no extra model features
+            batcher = None if additional_features else self._price_batcher
+            data = await self._request('POST', '/api/v1/predictions/price', payload, cacheable=True, batcher=batcher)
+            return _parse_price_prediction(data)
+        except httpx.HTTPError as e:
+            logger.error(f"Price prediction failed for material {material_id}: {e}")
+            raise MLServiceError(f"Price prediction failed: {e}")
+
+    async def detect_anomaly(
+        self,
+        material_id: str,
+        price: float,
+        supplier_id: Optional[str] = None,
+        quantity: float = 1.0
+    ) -> AnomalyResult:
+        """Detect if a price is anomalous (see MLServiceClient.detect_anomaly)"""
+        try:
+            payload = _anomaly_payload(material_id, price, supplier_id, quantity)
+            data = await self._request('POST', '/api/v1/predictions/anomaly', payload, cacheable=True)
+            return _parse_anomaly_result(data)
+        except httpx.HTTPError as e:
+            logger.error(f"Anomaly detection failed for material {material_id}: {e}")
+            raise MLServiceError(f"Anomaly detection failed: {e}")
+
+    async def calculate_should_cost(
+        self,
+        material_id: str,
+        components: Optional[Dict[str, Any]] = None,
+        quantity: float = 1.0
+    ) -> ShouldCostResult:
+        """Calculate should-cost for a material (see MLServiceClient.calculate_should_cost)"""
+        try:
+            payload = _should_cost_payload(material_id, components, quantity)
+            data = await self._request(
+                'POST', '/api/v1/predictions/should-cost', payload, cacheable=True, batcher=self._should_cost_batcher
+            )
+            return _parse_should_cost(data)
+        except httpx.HTTPError as e:
+            logger.error(f"Should-cost calculation failed for material {material_id}: {e}")
+            raise MLServiceError(f"Should-cost calculation failed: {e}")
+
+    async def predict_prices_batch(
+        self,
+        materials: List[Dict[str, Any]],
+        return_exceptions: bool = False
+    ) -> List[Any]:
+        """
+        Price predictions for many materials through the batch endpoint
+        (see MLServiceClient.predict_prices_batch). Batches above the
+        endpoint's limit are split into concurrent requests.
+        """
+        chunks = _chunks(materials, PREDICTION_BATCH_LIMIT)
+        try:
+            responses = await asyncio.gather(*(
+                self._request('POST', '/api/v1/predictions/batch', _batch_price_payload(chunk))
+                for chunk in chunks
+            ))
+        except httpx.HTTPError as e:
+            logger.error(f"Batch price prediction failed: {e}")
+            raise MLServiceError(f"Batch prediction failed: {e}")
+        return [
+            prediction
+            for chunk, data in zip(chunks, responses)
+            for prediction in _parse_batch_predictions(chunk, data, return_exceptions)
+        ]
+
+    async def calculate_should_cost_batch(self, items: List[Dict[str, Any]]) -> List[ShouldCostResult]:
+        """Should-costs for many materials (see MLServiceClient.calculate_should_cost_batch)"""
+        chunks = _chunks(items, SHOULD_COST_BATCH_LIMIT)
+        try:
+            responses = await asyncio.gather(*(
+                self._request(
+                    'POST', '/api/v1/predictions/should-cost/batch',
+                    {'items': [_should_cost_payload(**item) for item in chunk]}
+                )
+                for chunk in chunks
+            ))
+        except httpx.HTTPError as e:
+            logger.error(f"Batch should-cost calculation failed: {e}")
+            raise MLServiceError(f"Batch should-cost calculation failed: {e}")
+        return [
+            result
+            for chunk, data in zip(chunks, responses)
+            for result in _parse_batch_should_costs(chunk, data)
+        ]
+
+    # Model Management Methods
+
+    async def trigger_training(self, model_type: str, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Trigger model training (see MLServiceClient.trigger_training)"""
+        payload = {'model_type': model_type}
+        if parameters:
+            payload['parameters'] = parameters
+        try:
+            return await self._request('POST', '/api/v1/models/train', payload)
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to trigger training for {model_type}: {e}")
+            raise MLServiceError(f"Failed to trigger training: {e}")
+
+    async def get_drift_status(self) -> Dict[str, Any]:
+        """Get model drift detection status"""
+        try:
+            return await self._request('GET', '/api/v1/analytics/drift')
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get drift status: {e}")
+            raise MLServiceError(f"Failed to get drift status: {e}")
+
+    async def gather(self, method: str, requests: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+        """Run ``method`` (e.g. 'predict_price') concurrently for each kwargs dict in ``requests``"""
+        call = getattr(self, method)
+        return await asyncio.gather(*(call(**kwargs) for kwargs in requests), return_exceptions=return_exceptions)
+
+
+class BatchingMLServiceClient:
+    """
+    Thread-safe synchronous facade over AsyncMLServiceClient.
+
+    Calls from any thread run on one background event loop per process, so
+    concurrent callers (request threads, Celery task threads) share pooled
+    connections, are coalesced with each other, and their single price
+    predictions and should-cost calculations are merged into batch requests.
+    The ``*_many`` methods issue a whole list of calls at once, so they land
+    in the same batch instead of costing one round trip each.
+    """
+
+    def __init__(self, **client_kwargs):
+        self._client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._client = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # A loop started before a fork (e.g. Celery prefork) does not survive in the child
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                self._client = AsyncMLServiceClient(**self._client_kwargs)
+                threading.Thread(
+                    target=self._loop.run_forever, name='ml-client-loop', daemon=True
+                ).start()
+            return self._loop
+
+    def submit(self, method: str, *args, **kwargs) -> concurrent.futures.Future:
+        """Start an AsyncMLServiceClient call without waiting for it"""
+        loop = self._ensure_loop()
+        coroutine = getattr(self._client, method)(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    def _run(self, method: str, *args, **kwargs) -> Any:
+        return self.submit(method, *args, **kwargs).result()
+
+    def close(self):
+        """Close the HTTP client and stop the background loop"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._client = None
+
+    def health_check(self) -> Dict[str, Any]:
+        return self._run('health_check')
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.health_check().get('status') == 'healthy'
+        except MLServiceError:
+            return False
+
+    def predict_price(self, *args, **kwargs) -> PricePrediction:
+        return self._run('predict_price', *args, **kwargs)
+
+    def detect_anomaly(self, *args, **kwargs) -> AnomalyResult:
+        return self._run('detect_anomaly', *args, **kwargs)
+
+    def calculate_should_cost(self, *args, **kwargs) -> ShouldCostResult:
+        return self._run('calculate_should_cost', *args, **kwargs)
+
+    def predict_prices_batch(self, *args, **kwargs) -> List[Any]:
+        return self._run('predict_prices_batch', *args, **kwargs)
+
+    def calculate_should_cost_batch(self, *args, **kwargs) -> List[ShouldCostResult]:
+        return self._run('calculate_should_cost_batch', *args, **kwargs)
+
+    def trigger_training(self, *args, **kwargs) -> Dict[str, Any]:
+        return self._run('trigger_training', *args, **kwargs)
+
+    def get_drift_status(self) -> Dict[str, Any]:
+        return self._run('get_drift_status')
+
+    def predict_price_many(self, requests: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+        """Price predictions for a list of predict_price kwargs, sent as batch requests"""
+        return self._run('gather', 'predict_price', requests, return_exceptions)
+
+    def detect_anomaly_many(self, requests: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+        """Anomaly checks for a list of detect_anomaly kwargs, fetched concurrently"""
+        return self._run('gather', 'detect_anomaly', requests, return_exceptions)
+
+    def calculate_should_cost_many(self, requests: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+        """Should-cost results for a list of calculate_should_cost kwargs, sent as batch requests"""
+        return self._run('gather', 'calculate_should_cost', requests, return_exceptions)
+
+
 # Singleton instance for convenience
 _ml_client: Optional[MLServiceClient] = None
 
@@ -424,3 +968,14 @@ def get_ml_client() -> MLServiceClient:
     if _ml_client is None:
         _ml_client = MLServiceClient()
     return _ml_client
+
+
+_batching_ml_client: Optional[BatchingMLServiceClient] = None
+
+
+def get_batching_ml_client() -> BatchingMLServiceClient:
+    """Get singleton batching ML client instance"""
+    global _batching_ml_client
+    if _batching_ml_client is None:
+        _batching_ml_client = BatchingMLServiceClient()
+    return _batching_ml_client
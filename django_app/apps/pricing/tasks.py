@@ -2,7 +2,9 @@
 Celery tasks for ML operations in the pricing module.
 
 These tasks handle asynchronous ML operations like batch predictions,
-anomaly detection, and model training triggers.
+anomaly detection, and model training triggers. They share the process-wide
+batching client, so concurrent tasks in a worker pool coalesce and batch
+their ML requests.
 """
 import logging
 from decimal import Decimal
@@ -11,7 +13,7 @@ from typing import List, Optional
 from celery import shared_task
 from django.utils import timezone
 
-from .ml_client import get_ml_client, MLServiceError
+from .ml_client import get_batching_ml_client, MLServiceError
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,7 @@ def generate_price_prediction(self, material_id: str, supplier_id: Optional[str]
 
     try:
         material = Material.objects.get(id=material_id)
-        client = get_ml_client()
+        client = get_batching_ml_client()
 
         # Get prediction from ML service
         prediction = client.predict_price(
@@ -82,7 +84,7 @@ def generate_price_predictions_batch(self, material_ids: List[str]):
     from .models import Material, PricePrediction
 
     try:
-        client = get_ml_client()
+        client = get_batching_ml_client()
         materials = Material.objects.filter(id__in=material_ids)
 
         # Prepare batch request
@@ -124,6 +126,66 @@ def generate_price_predictions_batch(self, material_ids: List[str]):
         return {'error': str(e)}
 
 
+def _record_anomaly_result(price, result) -> dict:
+    """Create a triggered anomaly alert for ``price`` when ``result`` flags it"""
+    from .models import PriceAlert
+
+    if result.is_anomaly:
+        # Get or create a system user for auto-generated alerts
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        system_user = User.objects.filter(is_superuser=True).first()
+        if not system_user:
+            # Fall back to any user in the organization
+            from apps.accounts.models import UserProfile
+            profile = UserProfile.objects.filter(
+                organization=price.organization
+            ).select_related('user').first()
+            system_user = profile.user if profile else None
+
+        if not system_user:
+            logger.warning(f"No user found for alert creation, skipping alert for price {price.id}")
+            return {
+                'price_id': str(price.id),
+                'is_anomaly': True,
+                'severity': result.severity,
+                'alert_id': None,
+                'warning': 'No user available for alert creation'
+            }
+
+        # Create price alert
+        alert = PriceAlert.objects.create(
+            user=system_user,
+            material=price.material,
+            organization=price.organization,
+            name=f'Price anomaly detected: {price.material.name}',
+            alert_type='anomaly',
+            condition_type='above' if result.deviation_percentage and result.deviation_percentage > 0 else 'below',
+            threshold_value=result.expected_price or Decimal('0'),
+            status='triggered',
+            last_triggered=timezone.now(),
+            trigger_count=1
+        )
+
+        logger.warning(
+            f"Anomaly detected for price {price.id}: "
+            f"severity={result.severity}, score={result.anomaly_score:.2f}"
+        )
+
+        return {
+            'price_id': str(price.id),
+            'is_anomaly': True,
+            'severity': result.severity,
+            'alert_id': str(alert.id)
+        }
+
+    logger.debug(f"No anomaly detected for price {price.id}")
+    return {
+        'price_id': str(price.id),
+        'is_anomaly': False
+    }
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def check_price_anomaly(self, price_id: str):
     """
@@ -132,11 +194,11 @@ def check_price_anomaly(self, price_id: str):
     Args:
         price_id: UUID of the Price record to check
     """
-    from .models import Price, PriceAlert
+    from .models import Price
 
     try:
         price = Price.objects.select_related('material', 'organization').get(id=price_id)
-        client = get_ml_client()
+        client = get_batching_ml_client()
 
         # Detect anomaly
         result = client.detect_anomaly(
@@ -146,60 +208,7 @@ def check_price_anomaly(self, price_id: str):
             quantity=float(price.quantity)
         )
 
-        if result.is_anomaly:
-            # Get or create a system user for auto-generated alerts
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            system_user = User.objects.filter(is_superuser=True).first()
-            if not system_user:
-                # Fall back to any user in the organization
-                from apps.accounts.models import UserProfile
-                profile = UserProfile.objects.filter(
-                    organization=price.organization
-                ).select_related('user').first()
-                system_user = profile.user if profile else None
-
-            if not system_user:
-                logger.warning(f"No user found for alert creation, skipping alert for price {price_id}")
-                return {
-                    'price_id': price_id,
-                    'is_anomaly': True,
-                    'severity': result.severity,
-                    'alert_id': None,
-                    'warning': 'No user available for alert creation'
-                }
-
-            # Create price alert
-            alert = PriceAlert.objects.create(
-                user=system_user,
-                material=price.material,
-                organization=price.organization,
-                name=f'Price anomaly detected: {price.material.name}',
-                alert_type='anomaly',
-                condition_type='above' if result.deviation_percentage and result.deviation_percentage > 0 else 'below',
-                threshold_value=result.expected_price or Decimal('0'),
-                status='triggered',
-                last_triggered=timezone.now(),
-                trigger_count=1
-            )
-
-            logger.warning(
-                f"Anomaly detected for price {price_id}: "
-                f"severity={result.severity}, score={result.anomaly_score:.2f}"
-            )
-
-            return {
-                'price_id': price_id,
-                'is_anomaly': True,
-                'severity': result.severity,
-                'alert_id': str(alert.id)
-            }
-
-        logger.debug(f"No anomaly detected for price {price_id}")
-        return {
-            'price_id': price_id,
-            'is_anomaly': False
-        }
+        return _record_anomaly_result(price, result)
 
     except Price.DoesNotExist:
         logger.error(f"Price {price_id} not found")
@@ -228,17 +237,34 @@ def run_anomaly_detection_for_organization(self, organization_id: str, days: int
 
     try:
         cutoff_date = timezone.now() - timedelta(days=days)
-        recent_prices = Price.objects.filter(
+        recent_prices = list(Price.objects.filter(
             organization_id=organization_id,
             time__gte=cutoff_date
-        ).values_list('id', flat=True)
+        ).select_related('material', 'organization'))
 
-        # Queue individual anomaly checks
-        for price_id in recent_prices:
-            check_price_anomaly.delay(str(price_id))
-
-        logger.info(f"Queued anomaly detection for {len(recent_prices)} prices")
-        return {'prices_queued': len(recent_prices)}
+        # All checks go out together instead of one queued task per price
+        results = get_batching_ml_client().detect_anomaly_many([
+            {
+                'material_id': str(price.material_id),
+                'price': float(price.price),
+                'supplier_id': str(price.supplier_id) if price.supplier_id else None,
+                'quantity': float(price.quantity),
+            }
+            for price in recent_prices
+        ], return_exceptions=True)
+
+        anomalies = failed = 0
+        for price, result in zip(recent_prices, results):
+            if isinstance(result, Exception):
+                logger.warning(f"ML service error checking anomaly for price {price.id}: {result}")
+                failed += 1
+            elif _record_anomaly_result(price, result)['is_anomaly']:
+                anomalies += 1
+
+        logger.info(
+            f"Checked {len(recent_prices)} prices for anomalies: {anomalies} anomalous, {failed} failed"
+        )
+        return {'prices_checked': len(recent_prices), 'anomalies': anomalies, 'failed': failed}
 
     except Exception as e:
         logger.error(f"Error running anomaly detection for org {organization_id}: {e}")
@@ -258,7 +284,7 @@ def calculate_should_cost(self, material_id: str, components: Optional[dict] = N
 
     try:
         material = Material.objects.get(id=material_id)
-        client = get_ml_client()
+        client = get_batching_ml_client()
 
         # Calculate should-cost
         result = client.calculate_should_cost(
@@ -307,17 +333,108 @@ def calculate_should_cost(self, material_id: str, components: Optional[dict] = N
         return {'error': str(e)}
 
 
+def _should_cost_components(material) -> dict:
+    """Component specs for a material: its own breakdown, else its weight as one component"""
+    specifications = material.specifications or {}
+    if specifications.get('components'):
+        return specifications['components']
+    if material.weight:
+        return {
+            'body': {
+                'material_type': specifications.get('material', 'default'),
+                'weight': float(material.weight),
+            }
+        }
+    return {}
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=300)
+def refresh_category_should_costs(self, category_id: str, organization_id: Optional[str] = None):
+    """
+    Recalculate should-cost benchmarks for every active material in a category.
+
+    All materials are costed in one batch request, and today's benchmark rows
+    are upserted in one statement.
+
+    Args:
+        category_id: UUID of the category
+        organization_id: Optional UUID to restrict to one organization
+    """
+    from .models import Material, PriceBenchmark
+
+    try:
+        materials = Material.objects.filter(category_id=category_id, status='active')
+        if organization_id:
+            materials = materials.filter(organization_id=organization_id)
+        materials = list(materials)
+        if not materials:
+            return {'category_id': category_id, 'benchmarks_updated': 0}
+
+        client = get_batching_ml_client()
+        results = client.calculate_should_cost_batch([
+            {
+                'material_id': str(material.id),
+                'components': _should_cost_components(material),
+                'quantity': float(material.minimum_order_quantity or 1),
+            }
+            for material in materials
+        ])
+        # Results are matched to materials by position
+        if len(results) != len(materials):
+            raise MLServiceError(
+                f"Should-cost batch returned {len(results)} results for {len(materials)} materials"
+            )
+
+        today = timezone.now().date()
+        benchmarks = [
+            PriceBenchmark(
+                material=material,
+                organization_id=material.organization_id,
+                benchmark_type='should_cost',
+                benchmark_price=result.total_should_cost,
+                currency=material.currency or 'USD',
+                quantity=material.minimum_order_quantity or Decimal('1'),
+                period_start=today,
+                period_end=today + timezone.timedelta(days=90),
+                min_price=result.material_cost,
+                max_price=result.total_should_cost * Decimal('1.2'),  # +20% buffer
+                confidence_level=Decimal(str(round(result.confidence, 4))),
+                calculation_method=f"Material: ${result.material_cost}, Labor: ${result.labor_cost}, Overhead: ${result.overhead_cost}"
+            )
+            for material, result in zip(materials, results)
+        ]
+        PriceBenchmark.objects.bulk_create(
+            benchmarks,
+            update_conflicts=True,
+            unique_fields=['material', 'organization', 'benchmark_type', 'period_start', 'period_end'],
+            update_fields=['benchmark_price', 'currency', 'quantity', 'min_price', 'max_price',
+                           'confidence_level', 'calculation_method', 'updated_at'],
+        )
+
+        logger.info(f"Should-cost benchmarks refreshed for {len(benchmarks)} materials in category {category_id}")
+        return {'category_id': category_id, 'benchmarks_updated': len(benchmarks)}
+
+    except MLServiceError as e:
+        logger.warning(f"ML service error refreshing should-costs for category {category_id}: {e}")
+        raise self.retry(exc=e)
+
+    except Exception as e:
+        logger.error(f"Error refreshing should-costs for category {category_id}: {e}")
+        return {'error': str(e)}
+
+
 @shared_task(bind=True, max_retries=1, default_retry_delay=600)
 def trigger_model_training(self, model_type: str, parameters: Optional[dict] = None):
     """
     Trigger model training via ML service.
 
     Args:
-        model_type: Type of model to train (price, anomaly, demand, should_cost)
+        model_type: Type of model to train (price, anomaly, demand, should_cost,
+            or demand_forecasts for the per-material forecast refresh)
         parameters: Optional training parameters
     """
     try:
-        client = get_ml_client()
+        client = get_batching_ml_client()
         result = client.trigger_training(model_type, parameters)
 
         logger.info(f"Training triggered for {model_type}: {result}")
@@ -339,7 +456,7 @@ def check_ml_service_health():
     Can be scheduled via Celery Beat.
     """
     try:
-        client = get_ml_client()
+        client = get_batching_ml_client()
         health = client.health_check()
 
         if health.get('status') != 'healthy':
@@ -359,7 +476,7 @@ def check_model_drift():
     Should be scheduled daily or weekly via Celery Beat.
     """
     try:
-        client = get_ml_client()
+        client = get_batching_ml_client()
         drift_status = client.get_drift_status()
 
         # Check if any model has significant drift
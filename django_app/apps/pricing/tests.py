@@ -816,6 +816,123 @@ class MLServiceSingletonTests(TestCase):
         ml_client._ml_client = None
 
 
+class BatchingMLServiceClientTests(TestCase):
+    """Tests for the async, coalescing ML client."""
+
+    @patch('apps.pricing.ml_client.httpx.AsyncClient')
+    def test_identical_requests_are_coalesced_and_cached(self, mock_client_class):
+        """Concurrent identical predictions share one request; repeats hit the cache."""
+        from apps.pricing.ml_client import BatchingMLServiceClient
+        import asyncio
+
+        async def request(method, path, json=None):
+            await asyncio.sleep(0.05)
+            response = Mock()
+            response.json.return_value = {'predicted_price': json['quantity'] * 10}
+            response.raise_for_status = Mock()
+            return response
+
+        mock_client = Mock()
+        mock_client.request = Mock(side_effect=request)
+        mock_client_class.return_value = mock_client
+
+        client = BatchingMLServiceClient(cache_ttl=60, batch_window=0)
+        predictions = client.predict_price_many(
+            [{'material_id': 'uuid-123', 'quantity': 1.0}] * 5 + [{'material_id': 'uuid-123', 'quantity': 2.0}]
+        )
+        client.predict_price('uuid-123', quantity=1.0)
+
+        self.assertEqual([p.predicted_price for p in predictions], [Decimal('10.0')] * 5 + [Decimal('20.0')])
+        self.assertEqual(mock_client.request.call_count, 2)
+
+    def _batch_client(self, handler, **kwargs):
+        """Batching client whose requests go to ``handler``"""
+        import httpx
+        from apps.pricing.ml_client import AsyncMLServiceClient, BatchingMLServiceClient
+
+        http_client = httpx.AsyncClient(base_url='http://ml-service', transport=httpx.MockTransport(handler))
+        patcher = patch.object(AsyncMLServiceClient, '_get_client', lambda client: http_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = BatchingMLServiceClient(**kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_concurrent_single_predictions_share_one_batch_request(self):
+        """Single predictions from many threads go out as one batch; failed items fail only their caller."""
+        import httpx
+        from concurrent.futures import ThreadPoolExecutor
+        from apps.pricing.ml_client import MLServiceError
+
+        requests = []
+
+        def handler(request):
+            items = json.loads(request.content)['predictions']
+            requests.append((request.url.path, [item['material_id'] for item in items]))
+            return httpx.Response(200, json={
+                'results': [
+                    {'material_id': item['material_id'], 'predicted_price': item['quantity'] * 10}
+                    for item in items if item['material_id'] != 'missing'
+                ],
+                'errors': [{'material_id': 'missing', 'error': 'no model'}],
+            })
+
+        client = self._batch_client(handler, cache_ttl=0, batch_window=0.2)
+        material_ids = ['m1', 'm2', 'missing', 'm3']
+
+        def predict(material_id):
+            try:
+                return client.predict_price(material_id, quantity=2.0).predicted_price
+            except MLServiceError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=len(material_ids)) as pool:
+            results = list(pool.map(predict, material_ids))
+
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0][0], '/api/v1/predictions/batch')
+        self.assertEqual(sorted(requests[0][1]), sorted(material_ids))
+        self.assertEqual([results[0], results[1], results[3]], [Decimal('20.0')] * 3)
+        self.assertIsInstance(results[2], MLServiceError)
+
+    def test_should_cost_many_is_one_batch_request(self):
+        """calculate_should_cost_many sends a single should-cost batch."""
+        import httpx
+
+        paths = []
+
+        def handler(request):
+            paths.append(request.url.path)
+            items = json.loads(request.content)['items']
+            return httpx.Response(200, json={
+                'results': [{'total_should_cost': item['quantity'] * 3} for item in items],
+            })
+
+        client = self._batch_client(handler, cache_ttl=0, batch_window=0.05)
+        results = client.calculate_should_cost_many([
+            {'material_id': f'm{i}', 'quantity': float(i)} for i in range(1, 6)
+        ])
+
+        self.assertEqual(paths, ['/api/v1/predictions/should-cost/batch'])
+        self.assertEqual([r.total_should_cost for r in results], [Decimal(str(i * 3.0)) for i in range(1, 6)])
+
+    def test_predictions_with_extra_features_are_not_batched(self):
+        """The batch endpoint takes no extra features, so those calls use the single endpoint."""
+        import httpx
+
+        paths = []
+
+        def handler(request):
+            paths.append(request.url.path)
+            return httpx.Response(200, json={'predicted_price': 12.5})
+
+        client = self._batch_client(handler, cache_ttl=0, batch_window=0.05)
+        prediction = client.predict_price('m1', additional_features={'region': 'EU'})
+
+        self.assertEqual(paths, ['/api/v1/predictions/price'])
+        self.assertEqual(prediction.predicted_price, Decimal('12.5'))
+
+
 class SignalTests(PricingTestCase):
     """Tests for pricing signals (anomaly detection on price creation)."""
 
@@ -923,7 +1040,7 @@ class MLViewTests(PricingTestCase):
         self.assertTrue(data['success'])
         self.assertEqual(data['prediction']['predicted_price'], 110.0)
 
-    @patch('apps.pricing.ml_client.get_ml_client')
+    @patch('apps.pricing.ml_client.get_batching_ml_client')
     def test_material_prediction_view_post_success(self, mock_get_client):
         """Test generating new prediction via POST."""
         from apps.pricing.ml_client import PricePrediction as MLPricePrediction
@@ -946,7 +1063,7 @@ class MLViewTests(PricingTestCase):
         self.assertTrue(data['success'])
         self.assertEqual(data['prediction']['predicted_price'], 115.0)
 
-    @patch('apps.pricing.ml_client.get_ml_client')
+    @patch('apps.pricing.ml_client.get_batching_ml_client')
     def test_material_prediction_view_post_ml_error(self, mock_get_client):
         """Test prediction view handles ML service error."""
         from apps.pricing.ml_client import MLServiceError
@@ -995,7 +1112,7 @@ class MLViewTests(PricingTestCase):
         self.assertTrue(data['success'])
         self.assertEqual(data['should_cost']['total'], 95.0)
 
-    @patch('apps.pricing.ml_client.get_ml_client')
+    @patch('apps.pricing.ml_client.get_batching_ml_client')
     def test_material_should_cost_view_post_success(self, mock_get_client):
         """Test calculating should-cost via POST."""
         from apps.pricing.ml_client import ShouldCostResult
@@ -1033,7 +1150,7 @@ class MLViewTests(PricingTestCase):
         data = response.json()
         self.assertFalse(data['success'])
 
-    @patch('apps.pricing.ml_client.get_ml_client')
+    @patch('apps.pricing.ml_client.get_batching_ml_client')
     def test_anomaly_check_view_success(self, mock_get_client):
         """Test successful anomaly check."""
         from apps.pricing.ml_client import AnomalyResult
@@ -1062,7 +1179,7 @@ class MLViewTests(PricingTestCase):
         self.assertTrue(data['anomaly']['is_anomaly'])
         self.assertEqual(data['anomaly']['severity'], 'high')
 
-    @patch('apps.pricing.ml_client.get_ml_client')
+    @patch('apps.pricing.ml_client.get_batching_ml_client')
     def test_ml_health_view_success(self, mock_get_client):
         """Test ML health view when service is healthy."""
         mock_client = Mock()
@@ -1081,7 +1198,7 @@ class MLViewTests(PricingTestCase):
         self.assertTrue(data['success'])
         self.assertEqual(data['health']['status'], 'healthy')
 
-    @patch('apps.pricing.ml_client.get_ml_client')
+    @patch('apps.pricing.ml_client.get_batching_ml_client')
     def test_ml_health_view_service_down(self, mock_get_client):
         """Test ML health view when service is down."""
         from apps.pricing.ml_client import MLServiceError
@@ -1101,7 +1218,7 @@ class MLViewTests(PricingTestCase):
 class CeleryTaskTests(PricingTestCase):
     """Tests for Celery ML tasks (without actual task execution)."""
 
-    @patch('apps.pricing.tasks.get_ml_client')
+    @patch('apps.pricing.tasks.get_batching_ml_client')
     def test_generate_price_prediction_task(self, mock_get_client):
         """Test generate_price_prediction task logic."""
         from apps.pricing.tasks import generate_price_prediction
@@ -1140,7 +1257,7 @@ class CeleryTaskTests(PricingTestCase):
         self.assertIn('error', result)
         self.assertIn('not found', result['error'])
 
-    @patch('apps.pricing.tasks.get_ml_client')
+    @patch('apps.pricing.tasks.get_batching_ml_client')
     def test_check_price_anomaly_creates_alert(self, mock_get_client):
         """Test check_price_anomaly creates alert for anomalies."""
         from apps.pricing.tasks import check_price_anomaly
@@ -1171,7 +1288,7 @@ class CeleryTaskTests(PricingTestCase):
         self.assertIsNotNone(alert)
         self.assertEqual(alert.status, 'triggered')
 
-    @patch('apps.pricing.tasks.get_ml_client')
+    @patch('apps.pricing.tasks.get_batching_ml_client')
     def test_check_price_anomaly_no_anomaly(self, mock_get_client):
         """Test check_price_anomaly when price is normal."""
         from apps.pricing.tasks import check_price_anomaly
@@ -1194,7 +1311,42 @@ class CeleryTaskTests(PricingTestCase):
         self.assertFalse(result['is_anomaly'])
         self.assertNotIn('alert_id', result)
 
-    @patch('apps.pricing.tasks.get_ml_client')
+    @patch('apps.pricing.tasks.get_batching_ml_client')
+    def test_run_anomaly_detection_checks_prices_in_one_call(self, mock_get_client):
+        """Test organization-wide detection sends all checks together and alerts on anomalies."""
+        from apps.pricing.tasks import run_anomaly_detection_for_organization
+        from apps.pricing.ml_client import AnomalyResult, MLServiceError
+
+        recent = list(Price.objects.filter(organization=self.organization, time__gte=timezone.now() - timedelta(days=30)))
+        self.assertGreaterEqual(len(recent), 2)
+
+        def detect_anomaly_many(requests, return_exceptions=False):
+            results = [
+                AnomalyResult(
+                    is_anomaly=False, anomaly_score=0.1, severity='low',
+                    expected_price=None, deviation_percentage=None, explanation=''
+                )
+                for _ in requests
+            ]
+            results[0] = AnomalyResult(
+                is_anomaly=True, anomaly_score=0.95, severity='high',
+                expected_price=Decimal('100.00'), deviation_percentage=40.0, explanation='Anomaly detected'
+            )
+            results[-1] = MLServiceError('timeout')
+            return results
+
+        mock_client = Mock()
+        mock_client.detect_anomaly_many.side_effect = detect_anomaly_many
+        mock_get_client.return_value = mock_client
+
+        result = run_anomaly_detection_for_organization(str(self.organization.id), days=30)
+
+        mock_client.detect_anomaly_many.assert_called_once()
+        mock_client.detect_anomaly.assert_not_called()
+        self.assertEqual(result, {'prices_checked': len(recent), 'anomalies': 1, 'failed': 1})
+        self.assertEqual(PriceAlert.objects.filter(material=self.material, alert_type='anomaly').count(), 1)
+
+    @patch('apps.pricing.tasks.get_batching_ml_client')
     def test_calculate_should_cost_creates_benchmark(self, mock_get_client):
         """Test calculate_should_cost creates benchmark."""
         from apps.pricing.tasks import calculate_should_cost
@@ -1224,7 +1376,39 @@ class CeleryTaskTests(PricingTestCase):
         self.assertIsNotNone(benchmark)
         self.assertEqual(benchmark.benchmark_price, Decimal('90.00'))
 
-    @patch('apps.pricing.tasks.get_ml_client')
+    @patch('apps.pricing.tasks.get_batching_ml_client')
+    def test_refresh_category_should_costs_rejects_missing_results(self, mock_get_client):
+        """Test a short batch response stores nothing instead of pairing results with the wrong materials."""
+        from apps.pricing.tasks import refresh_category_should_costs
+        from apps.pricing.ml_client import MLServiceError, ShouldCostResult
+
+        Material.objects.create(
+            organization=self.organization,
+            code='MAT-PRICE-002',
+            name='Second Material',
+            material_type='raw_material',
+            category=self.category,
+            unit_of_measure='EA',
+            status='active',
+        )
+        mock_client = Mock()
+        mock_client.calculate_should_cost_batch.return_value = [ShouldCostResult(
+            total_should_cost=Decimal('90.00'),
+            material_cost=Decimal('50.00'),
+            labor_cost=Decimal('25.00'),
+            overhead_cost=Decimal('15.00'),
+            confidence=0.85,
+            breakdown=[]
+        )]
+        mock_get_client.return_value = mock_client
+
+        # Called directly, the task re-raises instead of scheduling a retry
+        with self.assertRaises(MLServiceError):
+            refresh_category_should_costs(str(self.category.id))
+
+        self.assertFalse(PriceBenchmark.objects.filter(benchmark_type='should_cost').exists())
+
+    @patch('apps.pricing.tasks.get_batching_ml_client')
     def test_check_ml_service_health(self, mock_get_client):
         """Test check_ml_service_health task."""
         from apps.pricing.tasks import check_ml_service_health
@@ -1237,7 +1421,7 @@ class CeleryTaskTests(PricingTestCase):
 
         self.assertEqual(result['status'], 'healthy')
 
-    @patch('apps.pricing.tasks.get_ml_client')
+    @patch('apps.pricing.tasks.get_batching_ml_client')
     def test_check_model_drift(self, mock_get_client):
         """Test check_model_drift task."""
         from apps.pricing.tasks import check_model_drift
@@ -559,7 +559,7 @@ class MaterialPriceHistoryAPIView(OrganizationRequiredMixin, View):
         material = get_object_or_404(
             Material,
             pk=pk,
-            organization=request.user.profile.organization
+            organization=self.get_user_organization()
         )
 
         # Get price history for last 90 days
@@ -895,7 +895,7 @@ class MaterialPricePredictionView(OrganizationRequiredMixin, View):
     def post(self, request, pk):
         """Generate new price prediction for material"""
         from .tasks import generate_price_prediction
-        from .ml_client import get_ml_client, MLServiceError
+        from .ml_client import get_batching_ml_client, MLServiceError
 
         material = get_object_or_404(
             Material,
@@ -905,7 +905,7 @@ class MaterialPricePredictionView(OrganizationRequiredMixin, View):
 
         # Check if ML service is available
         try:
-            client = get_ml_client()
+            client = get_batching_ml_client()
             if not client.is_healthy():
                 return JsonResponse({
                     'success': False,
@@ -991,7 +991,7 @@ class MaterialShouldCostView(OrganizationRequiredMixin, View):
 
     def post(self, request, pk):
         """Calculate should-cost for material"""
-        from .ml_client import get_ml_client, MLServiceError
+        from .ml_client import get_batching_ml_client, MLServiceError
         from .models import PriceBenchmark
         from decimal import Decimal
 
@@ -1010,7 +1010,7 @@ class MaterialShouldCostView(OrganizationRequiredMixin, View):
             components = {}
 
         try:
-            client = get_ml_client()
+            client = get_batching_ml_client()
 
             result = client.calculate_should_cost(
                 material_id=str(material.id),
@@ -1064,7 +1064,7 @@ class MaterialAnomalyCheckView(OrganizationRequiredMixin, View):
 
     def post(self, request, pk):
         """Check price for anomalies"""
-        from .ml_client import get_ml_client, MLServiceError
+        from .ml_client import get_batching_ml_client, MLServiceError
         import json
 
         material = get_object_or_404(
@@ -1085,7 +1085,7 @@ class MaterialAnomalyCheckView(OrganizationRequiredMixin, View):
                     'error': 'Price must be greater than 0'
                 }, status=400)
 
-            client = get_ml_client()
+            client = get_batching_ml_client()
 
             result = client.detect_anomaly(
                 material_id=str(material.id),
@@ -1130,10 +1130,10 @@ class MLServiceHealthView(OrganizationRequiredMixin, View):
 
     def get(self, request):
         """Get ML service health"""
-        from .ml_client import get_ml_client, MLServiceError
+        from .ml_client import get_batching_ml_client, MLServiceError
 
         try:
-            client = get_ml_client()
+            client = get_batching_ml_client()
             health = client.health_check()
 
             return JsonResponse({
@@ -42,8 +42,8 @@ class SupplierSerializer(serializers.ModelSerializer):
         ]
     
     def get_performance_score(self, obj):
-        """Calculate overall performance score"""
-        return obj.calculate_performance_score()
+        """Stored overall performance score"""
+        return float(obj.performance_score) if obj.performance_score is not None else None
     
     def get_recent_quotes_count(self, obj):
         """Get count of recent quotes (last 90 days)"""
@@ -74,8 +74,8 @@ class SupplierListSerializer(serializers.ModelSerializer):
         ]
     
     def get_performance_score(self, obj):
-        """Calculate overall performance score"""
-        return obj.calculate_performance_score()
+        """Stored overall performance score"""
+        return float(obj.performance_score) if obj.performance_score is not None else None
 
 
 class SupplierDetailSerializer(SupplierSerializer):
@@ -519,6 +519,7 @@ class QuoteComparisonSerializer(serializers.Serializer):
     rfq = RFQListSerializer()
     quotes = QuoteListSerializer(many=True)
     comparison_matrix = serializers.JSONField()
+    item_comparison = serializers.JSONField()
     recommendations = serializers.JSONField()
     scoring_criteria = serializers.JSONField()
 
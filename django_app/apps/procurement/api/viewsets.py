@@ -24,6 +24,9 @@ from .serializers import (
     RFQAnalyticsSerializer, QuoteComparisonSerializer,
     SupplierOnboardingSerializer, RFQItemSerializer
 )
+from apps.procurement.scorecards import supplier_scorecards
+from apps.procurement.quote_comparison import QuoteComparison
+from apps.procurement.savings import record_rfq_savings, savings_summary
 from apps.core.security import SecurityMixin, AuditMixin
 from apps.core.pagination import StandardResultsSetPagination
 
@@ -119,7 +122,7 @@ class SupplierViewSet(SecurityMixin, AuditMixin, viewsets.ModelViewSet):
         
         performance_data = {
             'supplier': SupplierListSerializer(supplier).data,
-            'performance_score': supplier.calculate_performance_score(),
+            'performance_score': float(supplier.performance_score) if supplier.performance_score is not None else None,
             'total_quotes': total_quotes,
             'accepted_quotes': accepted_quotes,
             'quote_acceptance_rate': (accepted_quotes / total_quotes * 100) if total_quotes > 0 else 0,
@@ -174,26 +177,31 @@ class SupplierViewSet(SecurityMixin, AuditMixin, viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def performance_ranking(self, request):
-        """Get supplier performance ranking"""
-        suppliers = self.get_queryset().filter(status='active')
-        
-        # Calculate performance scores for all suppliers
-        performance_data = []
-        for supplier in suppliers:
-            score = supplier.calculate_performance_score()
-            if score is not None:
-                performance_data.append({
-                    'supplier': SupplierListSerializer(supplier).data,
-                    'performance_score': score,
-                })
-        
-        # Sort by performance score descending
-        performance_data.sort(key=lambda x: x['performance_score'], reverse=True)
-        
-        # Add ranking
-        for i, data in enumerate(performance_data):
-            data['rank'] = i + 1
+        """
+        Get supplier performance ranking
+        
+        Ordered by the stored performance score; use page/page_size for
+        top-N and leaderboard pages.
+        """
+        suppliers = self.get_queryset().filter(
+            status='active', performance_score__isnull=False
+        ).order_by('-performance_score', 'name')
+        
+        page = self.paginate_queryset(suppliers)
+        ranked = page if page is not None else suppliers
+        first_rank = self.paginator.page.start_index() if page is not None else 1
+        
+        performance_data = [
+            {
+                'supplier': SupplierListSerializer(supplier).data,
+                'performance_score': float(supplier.performance_score),
+                'rank': first_rank + i,
+            }
+            for i, supplier in enumerate(ranked)
+        ]
         
+        if page is not None:
+            return self.get_paginated_response(performance_data)
         return Response(performance_data)
 
 
@@ -300,6 +308,7 @@ class RFQViewSet(SecurityMixin, AuditMixin, viewsets.ModelViewSet):
             )
         
         rfq.award_to_quote(quote, request.user)
+        record_rfq_savings(rfq)
         self.log_action('award', rfq, changes={'awarded_quote_id': str(quote.id)})
         
         return Response({'status': 'RFQ awarded successfully'})
@@ -350,19 +359,30 @@ class RFQViewSet(SecurityMixin, AuditMixin, viewsets.ModelViewSet):
     def compare_quotes(self, request, pk=None):
         """Compare quotes for RFQ"""
         rfq = self.get_object()
-        quotes = rfq.quotes.filter(status='submitted')
+        comparison = QuoteComparison(rfq, statuses=('submitted',))
+        quotes = comparison.quotes
         
-        if quotes.count() < 2:
+        if len(quotes) < 2:
             return Response(
                 {'error': 'At least 2 quotes are required for comparison'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Build comparison matrix
+        export_format = request.query_params.get('export')
+        if export_format in ('csv', 'json'):
+            return comparison.export_response(export_format)
+        
+        comparison_dict = comparison.to_dict()
         comparison_data = {
             'rfq': RFQListSerializer(rfq).data,
             'quotes': QuoteListSerializer(quotes, many=True).data,
-            'comparison_matrix': self._build_comparison_matrix(quotes),
+            'comparison_matrix': comparison_dict['suppliers'],
+            'item_comparison': {
+                'items': comparison_dict['items'],
+                'matrix': comparison_dict['matrix'],
+                'totals': comparison_dict['totals'],
+                'weights': comparison_dict['weights'],
+            },
             'recommendations': self._generate_recommendations(quotes),
             'scoring_criteria': self._get_scoring_criteria(),
         }
@@ -370,21 +390,6 @@ class RFQViewSet(SecurityMixin, AuditMixin, viewsets.ModelViewSet):
         serializer = QuoteComparisonSerializer(comparison_data)
         return Response(serializer.data)
     
-    def _build_comparison_matrix(self, quotes):
-        """Build quote comparison matrix"""
-        matrix = []
-        for quote in quotes:
-            matrix.append({
-                'quote_id': str(quote.id),
-                'supplier': quote.supplier.name,
-                'total_amount': float(quote.total_amount),
-                'lead_time_days': quote.lead_time_days,
-                'technical_score': float(quote.technical_score) if quote.technical_score else None,
-                'commercial_score': float(quote.commercial_score) if quote.commercial_score else None,
-                'overall_score': float(quote.overall_score) if quote.overall_score else None,
-            })
-        return matrix
-    
     def _generate_recommendations(self, quotes):
         """Generate recommendations based on quote analysis"""
         best_price = min(quotes, key=lambda q: q.total_amount)
@@ -792,58 +797,24 @@ class ProcurementAnalyticsViewSet(viewsets.ViewSet):
     def supplier_performance(self, request):
         """Get supplier performance analytics"""
         org = self.get_organization()
-        suppliers = Supplier.objects.filter(organization=org, status='active')
-
-        performance_data = []
-        for supplier in suppliers:
-            quotes = supplier.quotes.all()
-            contracts = supplier.contracts.all()
-
-            total_quotes = quotes.count()
-            accepted_quotes = quotes.filter(status='accepted').count()
-            total_contract_value = contracts.aggregate(
-                total=Sum('total_value')
-            )['total'] or Decimal('0')
-
-            # Calculate supplier-specific response time
-            supplier_response_time = self._calculate_supplier_response_time(supplier)
-
-            # Calculate delivery metrics from contracts
-            completed_contracts = contracts.filter(status='completed').count()
-            total_contracts = contracts.count()
-
-            performance_data.append({
-                'supplier': SupplierListSerializer(supplier).data,
-                'performance_score': supplier.calculate_performance_score() or 0,
-                'total_quotes': total_quotes,
-                'accepted_quotes': accepted_quotes,
-                'quote_acceptance_rate': (accepted_quotes / total_quotes * 100) if total_quotes > 0 else 0,
-                'average_response_time': supplier_response_time,
-                'total_contract_value': total_contract_value,
-                'on_time_deliveries': completed_contracts,
-                'total_deliveries': total_contracts,
-                'on_time_delivery_rate': supplier.on_time_delivery_rate or 0,
-            })
 
-        # Sort by performance score
-        performance_data.sort(key=lambda x: x['performance_score'], reverse=True)
+        performance_data = [
+            {
+                'supplier': card['supplier'],
+                'performance_score': card['performance_score'] or 0,
+                'total_quotes': card['total_quotes'],
+                'accepted_quotes': card['accepted_quotes'],
+                'quote_acceptance_rate': card['quote_acceptance_rate'],
+                'average_response_time': card['average_response_time'],
+                'total_contract_value': card['total_contract_value'],
+                'on_time_deliveries': card['completed_contracts'],
+                'total_deliveries': card['total_contracts'],
+                'on_time_delivery_rate': card['on_time_delivery_rate'],
+            }
+            for card in supplier_scorecards(org)
+        ]
 
         return Response(performance_data)
-
-    def _calculate_supplier_response_time(self, supplier):
-        """Calculate average response time for a specific supplier"""
-        quotes = supplier.quotes.select_related('rfq').all()[:20]
-
-        if not quotes:
-            return 0
-
-        response_times = []
-        for quote in quotes:
-            if quote.rfq:
-                delta = (quote.created_at - quote.rfq.created_at).total_seconds() / 86400
-                response_times.append(delta)
-
-        return round(sum(response_times) / len(response_times), 1) if response_times else 0
     
     @action(detail=False, methods=['get'])
     def spending_analysis(self, request):
@@ -876,41 +847,26 @@ class ProcurementAnalyticsViewSet(viewsets.ViewSet):
         """Get cost savings analysis"""
         org = self.get_organization()
 
-        # Calculate savings from competitive bidding
-        awarded_rfqs = RFQ.objects.filter(organization=org, status='awarded')
-        total_savings = Decimal('0')
-        total_highest = Decimal('0')
-        total_quote_count = 0
-        rfqs_with_quotes_count = 0
-
-        for rfq in awarded_rfqs:
-            quotes = rfq.quotes.all()
-            quote_count = quotes.count()
-            total_quote_count += quote_count
-
-            if quote_count > 1:
-                rfqs_with_quotes_count += 1
-                lowest_quote = min(quotes, key=lambda q: q.total_amount)
-                highest_quote = max(quotes, key=lambda q: q.total_amount)
-                savings = highest_quote.total_amount - lowest_quote.total_amount
-                total_savings += savings
-                total_highest += highest_quote.total_amount
+        # Savings from competitive bidding, from the savings ledger
+        summary = savings_summary(org)
+        total_savings = summary['competitive_savings']
+        total_rfqs = summary['awarded_rfqs']
 
         # Calculate savings percentage (savings vs highest quote total)
         savings_percentage = round(
-            (float(total_savings) / float(total_highest) * 100) if total_highest > 0 else 0, 1
+            (float(total_savings) / float(summary['highest_quote_total']) * 100)
+            if summary['highest_quote_total'] > 0 else 0, 1
         )
 
         # Calculate average quotes per RFQ
-        total_rfqs = awarded_rfqs.count()
-        avg_quotes_per_rfq = round(total_quote_count / total_rfqs, 1) if total_rfqs > 0 else 0
+        avg_quotes_per_rfq = round(summary['quote_count'] / total_rfqs, 1) if total_rfqs > 0 else 0
 
         return Response({
             'total_savings': total_savings,
             'savings_percentage': savings_percentage,
             'average_savings_per_rfq': total_savings / max(total_rfqs, 1),
             'competitive_bidding_impact': {
-                'rfqs_with_multiple_quotes': rfqs_with_quotes_count,
+                'rfqs_with_multiple_quotes': summary['rfqs_with_multiple_quotes'],
                 'average_quotes_per_rfq': avg_quotes_per_rfq,
             }
         })
\ No newline at end of file
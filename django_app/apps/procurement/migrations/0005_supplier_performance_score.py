@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Coalesce, NullIf
+
+
+def backfill_performance_scores(apps, schema_editor):
+    Supplier = apps.get_model("procurement", "Supplier")
+    output_field = models.DecimalField(max_digits=5, decimal_places=2)
+    metrics = [F("rating") * 20, F("on_time_delivery_rate"), F("quality_score")]
+    total = sum(
+        (Coalesce(metric, Value(Decimal("0")), output_field=output_field) for metric in metrics),
+        Value(Decimal("0"), output_field=output_field),
+    )
+    present = sum(
+        (
+            Case(When(**{f"{field}__isnull": False}, then=1), default=0)
+            for field in ("rating", "on_time_delivery_rate", "quality_score")
+        ),
+        Value(0),
+    )
+    Supplier.objects.update(
+        performance_score=ExpressionWrapper(total / NullIf(present, 0), output_field=output_field)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("procurement", "0004_alter_rfq_evaluation_criteria"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="supplier",
+            name="performance_score",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, editable=False, max_digits=5, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="supplier",
+            index=models.Index(
+                fields=["organization", "status", "-performance_score"],
+                name="suppliers_organiz_9a1ef2_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_performance_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Sum, Window
+from django.db.models.functions import FirstValue
+
+
+def backfill_rfq_savings(apps, schema_editor):
+    """Ledger entries for RFQs awarded before the ledger existed"""
+    Quote = apps.get_model("procurement", "Quote")
+    RFQSavings = apps.get_model("procurement", "RFQSavings")
+    cent = Decimal("0.01")
+    partition = {"partition_by": [F("rfq_id")]}
+    rows = (
+        Quote.objects.filter(rfq__awarded_quote__isnull=False)
+        .annotate(
+            rfq_awarded_quote_id=Window(FirstValue("rfq__awarded_quote_id"), **partition),
+            rfq_quote_count=Window(Count("id"), **partition),
+            rfq_quote_total=Window(Sum("total_amount"), **partition),
+            rfq_lowest_amount=Window(Min("total_amount"), **partition),
+            rfq_highest_amount=Window(Max("total_amount"), **partition),
+        )
+        .filter(id=F("rfq_awarded_quote_id"))
+        .values(
+            "id", "rfq_id", "organization_id", "currency", "total_amount", "rfq__updated_at",
+            "rfq_quote_count", "rfq_quote_total", "rfq_lowest_amount", "rfq_highest_amount",
+        )
+        .order_by()
+    )
+
+    entries = []
+    for row in rows:
+        awarded = Decimal(str(row["total_amount"])).quantize(cent)
+        count = row["rfq_quote_count"]
+        average = None
+        if count > 1:
+            average = ((Decimal(str(row["rfq_quote_total"])) - awarded) / (count - 1)).quantize(cent)
+        entries.append(RFQSavings(
+            organization_id=row["organization_id"],
+            rfq_id=row["rfq_id"],
+            awarded_quote_id=row["id"],
+            awarded_at=row["rfq__updated_at"],
+            currency=row["currency"],
+            quote_count=count,
+            awarded_amount=awarded,
+            lowest_amount=Decimal(str(row["rfq_lowest_amount"])).quantize(cent),
+            highest_amount=Decimal(str(row["rfq_highest_amount"])).quantize(cent),
+            average_alternative_amount=average,
+            savings=average - awarded if average is not None else Decimal("0"),
+        ))
+    RFQSavings.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('procurement', '0005_supplier_performance_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RFQSavings',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('awarded_at', models.DateTimeField()),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('quote_count', models.PositiveIntegerField(default=1)),
+                ('awarded_amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('lowest_amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('highest_amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('average_alternative_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('savings', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('awarded_quote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='procurement.quote')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rfq_savings', to='core.organization')),
+                ('rfq', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='savings', to='procurement.rfq')),
+            ],
+            options={
+                'db_table': 'rfq_savings',
+                'ordering': ['-awarded_at'],
+                'indexes': [models.Index(fields=['organization', 'awarded_at'], name='rfq_savings_organiz_c0f49a_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rfq_savings, migrations.RunPython.noop),
+    ]
@@ -4,6 +4,8 @@ Procurement and supplier management models
 import uuid
 from decimal import Decimal
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Coalesce, NullIf
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from django.contrib.postgres.indexes import GinIndex
 from django.utils import timezone
@@ -159,6 +161,14 @@ class Supplier(TimestampedModel):
         blank=True,
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    # Materialized calculate_performance_score(), kept current by save()
+    performance_score = models.DecimalField(
+        max_digits=5, 
+        decimal_places=2, 
+        null=True, 
+        blank=True,
+        editable=False
+    )
     
     # Risk and compliance
     risk_level = models.CharField(max_length=20, choices=RISK_LEVELS, default='medium')
@@ -184,6 +194,7 @@ class Supplier(TimestampedModel):
         ordering = ['name']
         indexes = [
             models.Index(fields=['organization', 'status']),
+            models.Index(fields=['organization', 'status', '-performance_score']),
             models.Index(fields=['supplier_type', 'status']),
             models.Index(fields=['country', 'region']),
             models.Index(fields=['rating']),
@@ -191,6 +202,9 @@ class Supplier(TimestampedModel):
             GinIndex(fields=['tags']),
         ]
     
+    # Inputs of calculate_performance_score()
+    PERFORMANCE_SCORE_FIELDS = ('rating', 'on_time_delivery_rate', 'quality_score')
+    
     def __str__(self):
         return f"{self.code} - {self.name}"
     
@@ -204,6 +218,36 @@ class Supplier(TimestampedModel):
         """Check if supplier is approved"""
         return self.status == 'active' and self.approved_at is not None
     
+    def save(self, *args, **kwargs):
+        score = self.calculate_performance_score()
+        self.performance_score = Decimal(str(round(score, 2))) if score is not None else None
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.PERFORMANCE_SCORE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | {'performance_score'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def performance_score_expression(cls):
+        """calculate_performance_score() as a database expression"""
+        output_field = models.DecimalField(max_digits=5, decimal_places=2)
+        metrics = [F('rating') * 20, F('on_time_delivery_rate'), F('quality_score')]
+        total = sum(
+            (Coalesce(metric, Value(Decimal('0')), output_field=output_field) for metric in metrics),
+            Value(Decimal('0'), output_field=output_field)
+        )
+        present = sum(
+            (Case(When(**{f'{field}__isnull': False}, then=1), default=0) for field in cls.PERFORMANCE_SCORE_FIELDS),
+            Value(0)
+        )
+        return ExpressionWrapper(total / NullIf(present, 0), output_field=output_field)
+    
+    @classmethod
+    def refresh_performance_scores(cls, queryset=None):
+        """Recompute stored scores in SQL, e.g. after a bulk update() that bypassed save()"""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(performance_score=cls.performance_score_expression())
+    
     def calculate_performance_score(self):
         """Calculate overall performance score"""
         metrics = []
@@ -558,6 +602,37 @@ class QuoteItem(TimestampedModel):
         super().save(*args, **kwargs)
 
 
+class RFQSavings(TimestampedModel):
+    """Savings ledger entry for an awarded RFQ, written when the RFQ is awarded"""
+    
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='rfq_savings')
+    rfq = models.OneToOneField(RFQ, on_delete=models.CASCADE, related_name='savings')
+    awarded_quote = models.ForeignKey(Quote, on_delete=models.CASCADE, related_name='+')
+    awarded_at = models.DateTimeField()
+    currency = models.CharField(max_length=3, default='USD')
+    
+    # Quote statistics at award time
+    quote_count = models.PositiveIntegerField(default=1)
+    awarded_amount = models.DecimalField(max_digits=15, decimal_places=2)
+    lowest_amount = models.DecimalField(max_digits=15, decimal_places=2)
+    highest_amount = models.DecimalField(max_digits=15, decimal_places=2)
+    average_alternative_amount = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    
+    # Average alternative quote minus awarded amount; negative when the award
+    # was above the average of the other quotes
+    savings = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'rfq_savings'
+        ordering = ['-awarded_at']
+        indexes = [
+            models.Index(fields=['organization', 'awarded_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.rfq.rfq_number} - {self.savings} {self.currency}"
+
+
 class Contract(TimestampedModel):
     """Procurement contracts"""
     
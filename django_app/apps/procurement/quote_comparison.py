@@ -0,0 +1,284 @@
+"""
+Quote comparison engine
+
+Builds a dense RFQ item x quote matrix for all quotes on an RFQ. Quote item
+cells (unit price, line price, lead time, delivery date) are loaded with a
+single ``values_list`` query and pivoted into numpy arrays. Per-item best
+prices, spreads and savings versus the median quote, and per-quote weighted
+scores, are then computed column- or row-wise over the whole matrix. This
+replaces nested Python loops over items and quotes.
+
+The same comparison serves the HTML comparison view, the
+``RFQViewSet.compare_quotes`` API and JSON/CSV exports.
+"""
+import csv
+import io
+import json
+import logging
+import warnings
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+COMPARABLE_QUOTE_STATUSES = ('submitted', 'under_review', 'accepted')
+
+# Weights of the per-quote score components; an RFQ can override them through
+# evaluation_criteria['weights']
+DEFAULT_SCORE_WEIGHTS = {
+    'price': 0.6,
+    'lead_time': 0.25,
+    'coverage': 0.15,
+}
+
+
+def _optional(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def _floats(values) -> np.ndarray:
+    """Decimal/int/None column as a float array with NaN for missing values"""
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+
+
+class QuoteComparison:
+    """
+    Item x quote comparison of the quotes received on one RFQ.
+
+    Columns (quotes) are ordered by total amount, lowest first; rows keep
+    RFQItem's own default ordering (material code), as the comparison view
+    listed them before.
+    """
+
+    def __init__(self, rfq, statuses: Sequence[str] = COMPARABLE_QUOTE_STATUSES,
+                 weights: Optional[Dict[str, float]] = None):
+        from .models import QuoteItem
+
+        self.rfq = rfq
+        self.quotes = list(
+            rfq.quotes.filter(status__in=statuses).select_related('supplier').order_by('total_amount', 'id')
+        )
+        self.items = list(rfq.items.select_related('material'))
+        self.weights = self._resolve_weights(rfq, weights)
+
+        item_index = {item.id: i for i, item in enumerate(self.items)}
+        quote_index = {quote.id: j for j, quote in enumerate(self.quotes)}
+        shape = (len(self.items), len(self.quotes))
+
+        self.unit_price = np.full(shape, np.nan)
+        self.line_price = np.full(shape, np.nan)
+        self.lead_time = np.full(shape, np.nan)
+        self.delivery_date = np.full(shape, None, dtype=object)
+
+        cells = QuoteItem.objects.filter(quote__in=[q.id for q in self.quotes]).values_list(
+            'rfq_item_id', 'quote_id', 'price', 'quantity', 'unit_price', 'lead_time_days', 'delivery_date'
+        ).order_by()
+        cells = [
+            (item_index[rfq_item_id], quote_index[quote_id], price, quantity, unit_price, lead_time, delivery)
+            for rfq_item_id, quote_id, price, quantity, unit_price, lead_time, delivery in cells
+            if rfq_item_id in item_index
+        ] if self.quotes else []
+
+        if cells:
+            i, j, price, quantity, unit_price, lead_time, delivery = zip(*cells)
+            i, j = np.array(i), np.array(j)
+            price = _floats(price)
+            quantity = _floats(quantity)
+            self.line_price[i, j] = price
+            self.unit_price[i, j] = np.where(
+                quantity > 0, price / np.where(quantity > 0, quantity, 1), _floats(unit_price)
+            )
+            self.lead_time[i, j] = _floats(lead_time)
+            self.delivery_date[i, j] = delivery
+
+        self.quantities = np.array([float(item.quantity) for item in self.items])
+        self._compute()
+
+    @staticmethod
+    def _resolve_weights(rfq, weights: Optional[Dict[str, float]]) -> Dict[str, float]:
+        configured = weights
+        if configured is None:
+            criteria = rfq.evaluation_criteria if isinstance(rfq.evaluation_criteria, dict) else {}
+            configured = criteria.get('weights') if isinstance(criteria.get('weights'), dict) else {}
+        resolved = {
+            key: float(configured.get(key, default))
+            for key, default in DEFAULT_SCORE_WEIGHTS.items()
+        }
+        total = sum(resolved.values())
+        return {key: value / total for key, value in resolved.items()} if total > 0 else dict(DEFAULT_SCORE_WEIGHTS)
+
+    def _compute(self) -> None:
+        n_items, n_quotes = self.unit_price.shape
+        quoted = ~np.isnan(self.unit_price)
+        self.quote_counts = quoted.sum(axis=1)
+
+        if n_items == 0 or n_quotes == 0:
+            missing = np.full(n_items, np.nan)
+            self.best_unit_price = self.highest_unit_price = self.median_unit_price = missing
+            self.spread = self.spread_pct = self.savings_vs_median = missing
+            self.best_quote_index = np.full(n_items, -1)
+            self.price_score = self.lead_time_score = self.coverage = np.zeros(n_quotes)
+        else:
+            # Items nobody quoted give all-NaN rows and NaN results; silence their warnings
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self.best_unit_price = np.nanmin(self.unit_price, axis=1)
+                self.highest_unit_price = np.nanmax(self.unit_price, axis=1)
+                self.median_unit_price = np.nanmedian(self.unit_price, axis=1)
+                self.best_quote_index = np.where(
+                    self.quote_counts > 0, np.argmin(np.where(quoted, self.unit_price, np.inf), axis=1), -1
+                )
+                self.spread = self.highest_unit_price - self.best_unit_price
+                self.spread_pct = np.where(self.best_unit_price > 0, self.spread / self.best_unit_price * 100, np.nan)
+                self.savings_vs_median = (self.median_unit_price - self.best_unit_price) * self.quantities
+
+                # Per-quote scores in [0, 1]: price and lead time relative to the
+                # best offer on each item, averaged over the items the quote covers
+                price_ratio = np.where(
+                    quoted & (self.unit_price > 0), self.best_unit_price[:, None] / self.unit_price, np.nan
+                )
+                best_lead = np.nanmin(self.lead_time, axis=1)
+                lead_ratio = np.maximum(best_lead[:, None], 1) / np.maximum(self.lead_time, 1)
+                self.price_score = np.nan_to_num(np.nanmean(price_ratio, axis=0))
+                self.lead_time_score = np.nan_to_num(np.nanmean(lead_ratio, axis=0))
+            self.coverage = quoted.sum(axis=0) / n_items
+
+        self.weighted_score = (
+            self.weights['price'] * self.price_score
+            + self.weights['lead_time'] * self.lead_time_score
+            + self.weights['coverage'] * self.coverage
+        ) * 100
+        self.score_rank = np.empty(n_quotes, dtype=int)
+        self.score_rank[np.argsort(-self.weighted_score, kind='stable')] = np.arange(1, n_quotes + 1)
+
+    # Output ---------------------------------------------------------------
+
+    def supplier_summaries(self) -> List[Dict[str, Any]]:
+        """One entry per quote, in column order"""
+        return [
+            {
+                'quote_id': str(quote.id),
+                'supplier_id': str(quote.supplier_id),
+                'supplier': quote.supplier.name,
+                'total_amount': float(quote.total_amount),
+                'lead_time_days': quote.lead_time_days,
+                'payment_terms': quote.payment_terms,
+                'delivery_terms': quote.delivery_terms,
+                'validity_period': quote.validity_period,
+                'technical_score': float(quote.technical_score) if quote.technical_score else None,
+                'commercial_score': float(quote.commercial_score) if quote.commercial_score else None,
+                'overall_score': float(quote.overall_score) if quote.overall_score else None,
+                'quoted_items': int(round(self.coverage[j] * len(self.items))),
+                'coverage': round(float(self.coverage[j]) * 100, 1),
+                'price_score': round(float(self.price_score[j]) * 100, 1),
+                'lead_time_score': round(float(self.lead_time_score[j]) * 100, 1),
+                'weighted_score': round(float(self.weighted_score[j]), 1),
+                'score_rank': int(self.score_rank[j]),
+            }
+            for j, quote in enumerate(self.quotes)
+        ]
+
+    def item_summaries(self) -> List[Dict[str, Any]]:
+        """One entry per RFQ item, in row order"""
+        summaries = []
+        for i, item in enumerate(self.items):
+            best = int(self.best_quote_index[i])
+            summaries.append({
+                'rfq_item_id': str(item.id),
+                'material_code': item.material.code,
+                'material_name': item.material.name,
+                'quantity': float(item.quantity),
+                'unit_of_measure': item.unit_of_measure,
+                'quote_count': int(self.quote_counts[i]),
+                'best_unit_price': _optional(self.best_unit_price[i]),
+                'best_quote_id': str(self.quotes[best].id) if best >= 0 else None,
+                'best_supplier': self.quotes[best].supplier.name if best >= 0 else None,
+                'highest_unit_price': _optional(self.highest_unit_price[i]),
+                'median_unit_price': _optional(self.median_unit_price[i]),
+                'spread': _optional(self.spread[i]),
+                'spread_pct': _optional(self.spread_pct[i]),
+                'savings_vs_median': _optional(self.savings_vs_median[i]),
+            })
+        return summaries
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Template rows: the RFQ item and one cell per quote, aligned with the quote columns"""
+        for i, item in enumerate(self.items):
+            best = int(self.best_quote_index[i])
+            yield {
+                'item': item,
+                'best_unit_price': _optional(self.best_unit_price[i]),
+                'savings_vs_median': _optional(self.savings_vs_median[i]),
+                'cells': [
+                    None if np.isnan(self.unit_price[i, j]) else {
+                        'unit_price': float(self.unit_price[i, j]),
+                        'price': float(self.line_price[i, j]),
+                        'lead_time_days': _optional(self.lead_time[i, j]),
+                        'delivery_date': self.delivery_date[i, j],
+                        'is_best': j == best,
+                    }
+                    for j in range(len(self.quotes))
+                ],
+            }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready comparison, including the dense matrices (None for unquoted cells)"""
+        def dense(matrix):
+            return [[_optional(value) for value in row] for row in matrix]
+
+        return {
+            'rfq_id': str(self.rfq.id),
+            'rfq_number': self.rfq.rfq_number,
+            'weights': self.weights,
+            'suppliers': self.supplier_summaries(),
+            'items': self.item_summaries(),
+            'matrix': {
+                'unit_price': dense(self.unit_price),
+                'lead_time_days': dense(self.lead_time),
+                'delivery_date': [[d.isoformat() if d else None for d in row] for row in self.delivery_date],
+            },
+            'totals': {
+                'best_price_total': float(np.nansum(self.best_unit_price * self.quantities)),
+                'savings_vs_median': float(np.nansum(self.savings_vs_median)),
+            },
+        }
+
+    def write_csv(self, stream) -> None:
+        """Item rows with one unit-price column per quote and the per-item statistics"""
+        writer = csv.writer(stream)
+        writer.writerow(
+            ['Material Code', 'Material', 'Quantity', 'UOM']
+            + [quote.supplier.name for quote in self.quotes]
+            + ['Best Unit Price', 'Best Supplier', 'Median Unit Price', 'Spread %', 'Savings vs Median']
+        )
+        for summary, prices in zip(self.item_summaries(), self.unit_price):
+            writer.writerow(
+                [summary['material_code'], summary['material_name'], summary['quantity'], summary['unit_of_measure']]
+                + ['' if np.isnan(price) else f'{price:.4f}' for price in prices]
+                + [
+                    '' if summary['best_unit_price'] is None else f"{summary['best_unit_price']:.4f}",
+                    summary['best_supplier'] or '',
+                    '' if summary['median_unit_price'] is None else f"{summary['median_unit_price']:.4f}",
+                    '' if summary['spread_pct'] is None else f"{summary['spread_pct']:.1f}",
+                    '' if summary['savings_vs_median'] is None else f"{summary['savings_vs_median']:.2f}",
+                ]
+            )
+        writer.writerow([])
+        writer.writerow(['Weighted Score', '', '', ''] + [f'{score:.1f}' for score in self.weighted_score])
+        writer.writerow(['Coverage %', '', '', ''] + [f'{c * 100:.1f}' for c in self.coverage])
+
+    def export_response(self, export_format: str) -> HttpResponse:
+        """Download response for ``json`` or ``csv`` exports"""
+        filename = f'quote_comparison_{self.rfq.rfq_number}'
+        if export_format == 'csv':
+            stream = io.StringIO()
+            self.write_csv(stream)
+            response = HttpResponse(stream.getvalue(), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        else:
+            response = HttpResponse(json.dumps(self.to_dict(), cls=DjangoJSONEncoder), content_type='application/json')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.json"'
+        return response
@@ -9,7 +9,7 @@ from decimal import Decimal
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
-from django.db.models import Avg, Min, Max
+from django.db.models import Avg, Min, Max, Count
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +47,9 @@ class NegotiationRecommendationEngine:
         """
         self.organization = organization
         self._ml_client = None
+        self._batch_ml_client = None
+        # material id -> {'historical', 'prediction', 'should_cost'}, filled by _prefetch_material_data
+        self._material_data: Dict[Any, Dict[str, Optional[Dict[str, Any]]]] = {}
 
     @property
     def ml_client(self):
@@ -56,6 +59,14 @@ class NegotiationRecommendationEngine:
             self._ml_client = get_ml_client()
         return self._ml_client
 
+    @property
+    def batch_ml_client(self):
+        """Lazy load the concurrent ML client used for batch prefetches"""
+        if self._batch_ml_client is None:
+            from apps.pricing.ml_client import get_batching_ml_client
+            self._batch_ml_client = get_batching_ml_client()
+        return self._batch_ml_client
+
     def get_rfq_recommendations(self, rfq_id: str) -> List[NegotiationRecommendation]:
         """
         Get negotiation recommendations for all items in an RFQ.
@@ -77,8 +88,11 @@ class NegotiationRecommendationEngine:
             logger.error(f"RFQ {rfq_id} not found")
             return []
 
+        items = list(rfq.items.all())
+        self._prefetch_material_data([item.material for item in items])
+
         recommendations = []
-        for item in rfq.items.all():
+        for item in items:
             rec = self._analyze_rfq_item(item)
             if rec:
                 recommendations.append(rec)
@@ -120,8 +134,11 @@ class NegotiationRecommendationEngine:
             logger.error(f"Quote {quote_id} not found")
             return []
 
+        items = list(quote.items.all())
+        self._prefetch_material_data([item.material for item in items])
+
         recommendations = []
-        for item in quote.items.all():
+        for item in items:
             rec = self._analyze_quote_item(item)
             if rec:
                 recommendations.append(rec)
@@ -228,12 +245,115 @@ class NegotiationRecommendationEngine:
             data_sources=data_sources
         )
 
+    def _prefetch_material_data(self, materials) -> None:
+        """
+        Load benchmark data for all materials at once.
+
+        Predictions and should-costs for every material are requested with
+        one batch call each (split only above the ML service's batch limits),
+        sent concurrently while a single grouped aggregate query computes the
+        historical statistics, so the whole batch costs about one ML round trip.
+        """
+        materials = list({material.id: material for material in materials if material}.values())
+        if not materials:
+            return
+
+        prediction_requests = [
+            {
+                'material_id': str(material.id),
+                'quantity': float(material.minimum_order_quantity or 1),
+                'unit_of_measure': material.unit_of_measure,
+            }
+            for material in materials
+        ]
+        should_cost_requests = [
+            {
+                'material_id': str(material.id),
+                'quantity': float(material.minimum_order_quantity or 1)
+            }
+            for material in materials
+        ]
+        try:
+            predictions = self.batch_ml_client.submit('predict_prices_batch', prediction_requests, True)
+            should_costs = self.batch_ml_client.submit('calculate_should_cost_batch', should_cost_requests)
+        except Exception as e:
+            logger.warning(f"Failed to start ML requests for {len(materials)} materials: {e}")
+            predictions = should_costs = None
+
+        historical = self._get_historical_prices_batch(materials)
+        prediction_results = self._collect_ml_results(predictions, materials, 'prediction')
+        should_cost_results = self._collect_ml_results(should_costs, materials, 'should-cost')
+
+        for material, prediction, should_cost in zip(materials, prediction_results, should_cost_results):
+            self._material_data[material.id] = {
+                'historical': historical.get(material.id),
+                'prediction': self._prediction_to_dict(prediction) if prediction else None,
+                'should_cost': self._should_cost_to_dict(should_cost) if should_cost else None,
+            }
+
+    def _collect_ml_results(self, future, materials, label: str) -> List[Any]:
+        """Wait for a batch of ML results; failed items become None"""
+        from apps.pricing.ml_client import MLServiceError
+
+        if future is None:
+            return [None] * len(materials)
+        try:
+            results = future.result()
+        except Exception as e:
+            logger.warning(f"Batch {label} request failed: {e}")
+            return [None] * len(materials)
+
+        collected = []
+        for material, result in zip(materials, results):
+            if isinstance(result, MLServiceError):
+                logger.debug(f"ML {label} not available for material {material.id}: {result}")
+                result = None
+            elif isinstance(result, Exception):
+                logger.warning(f"Error getting {label} for material {material.id}: {result}")
+                result = None
+            collected.append(result)
+        return collected
+
+    def _get_historical_prices_batch(self, materials) -> Dict[Any, Dict[str, Any]]:
+        """Historical price statistics for several materials in one aggregate query"""
+        from apps.pricing.models import Price
+        from django.utils import timezone
+        from datetime import timedelta
+
+        try:
+            ninety_days_ago = timezone.now() - timedelta(days=90)
+            rows = Price.objects.filter(
+                material__in=materials,
+                organization=self.organization,
+                time__gte=ninety_days_ago
+            ).values('material_id').annotate(
+                avg_price=Avg('price'),
+                min_price=Min('price'),
+                max_price=Max('price'),
+                count=Count('id')
+            )
+            return {
+                row['material_id']: {
+                    'avg_price': row['avg_price'],
+                    'min_price': row['min_price'],
+                    'max_price': row['max_price'],
+                    'count': row['count']
+                }
+                for row in rows
+            }
+        except Exception as e:
+            logger.warning(f"Failed to get historical prices for {len(materials)} materials: {e}")
+            return {}
+
     def _get_historical_prices(self, material) -> Optional[Dict[str, Any]]:
         """Get historical price statistics for material"""
         from apps.pricing.models import Price
         from django.utils import timezone
         from datetime import timedelta
 
+        if material.id in self._material_data:
+            return self._material_data[material.id]['historical']
+
         try:
             ninety_days_ago = timezone.now() - timedelta(days=90)
             prices = Price.objects.filter(
@@ -265,16 +385,15 @@ class NegotiationRecommendationEngine:
         """Get ML price prediction for material"""
         from apps.pricing.ml_client import MLServiceError
 
+        if material.id in self._material_data:
+            return self._material_data[material.id]['prediction']
+
         try:
             prediction = self.ml_client.predict_price(
                 material_id=str(material.id),
                 quantity=float(material.minimum_order_quantity or 1)
             )
-            return {
-                'predicted_price': prediction.predicted_price,
-                'confidence': prediction.confidence_score,
-                'model_version': prediction.model_version
-            }
+            return self._prediction_to_dict(prediction)
         except MLServiceError as e:
             logger.debug(f"ML prediction not available for material {material.id}: {e}")
             return None
@@ -286,18 +405,15 @@ class NegotiationRecommendationEngine:
         """Get should-cost calculation for material"""
         from apps.pricing.ml_client import MLServiceError
 
+        if material.id in self._material_data:
+            return self._material_data[material.id]['should_cost']
+
         try:
             result = self.ml_client.calculate_should_cost(
                 material_id=str(material.id),
                 quantity=float(material.minimum_order_quantity or 1)
             )
-            return {
-                'total': result.total_should_cost,
-                'material_cost': result.material_cost,
-                'labor_cost': result.labor_cost,
-                'overhead_cost': result.overhead_cost,
-                'confidence': result.confidence
-            }
+            return self._should_cost_to_dict(result)
         except MLServiceError as e:
             logger.debug(f"Should-cost not available for material {material.id}: {e}")
             return None
@@ -305,6 +421,24 @@ class NegotiationRecommendationEngine:
             logger.warning(f"Error getting should-cost for material {material.id}: {e}")
             return None
 
+    @staticmethod
+    def _prediction_to_dict(prediction) -> Dict[str, Any]:
+        return {
+            'predicted_price': prediction.predicted_price,
+            'confidence': prediction.confidence_score,
+            'model_version': prediction.model_version
+        }
+
+    @staticmethod
+    def _should_cost_to_dict(result) -> Dict[str, Any]:
+        return {
+            'total': result.total_should_cost,
+            'material_cost': result.material_cost,
+            'labor_cost': result.labor_cost,
+            'overhead_cost': result.overhead_cost,
+            'confidence': result.confidence
+        }
+
     def _generate_recommendation(
         self,
         item_id: str,
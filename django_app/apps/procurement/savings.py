@@ -0,0 +1,158 @@
+"""
+RFQ savings ledger
+
+When an RFQ is awarded, the awarded quote is compared with the other quotes
+on the same RFQ and the result is stored as an ``RFQSavings`` entry. Quote
+statistics for any number of RFQs are computed in one query: window
+aggregates partitioned by RFQ are evaluated over all quotes, then only the
+awarded quote's row is kept, so no per-RFQ queries are needed for a
+backfill.
+
+Dashboard and API savings figures are aggregated from the ledger rather than
+recomputed from quote history on every request.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.db.models import Count, F, Max, Min, Q, Sum, Window
+from django.db.models.functions import FirstValue
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+
+def _decimal(value) -> Decimal:
+    # SQLite returns window sums of decimals as floats
+    return (value if isinstance(value, Decimal) else Decimal(str(value))).quantize(CENT)
+
+
+def _awarded_quote_rows(rfqs):
+    """Awarded quote of each RFQ with statistics over all quotes of that RFQ"""
+    from .models import Quote
+
+    partition = {'partition_by': [F('rfq_id')]}
+    return (
+        Quote.objects.filter(rfq__in=rfqs.filter(awarded_quote__isnull=False))
+        .annotate(
+            rfq_awarded_quote_id=Window(FirstValue('rfq__awarded_quote_id'), **partition),
+            rfq_quote_count=Window(Count('id'), **partition),
+            rfq_quote_total=Window(Sum('total_amount'), **partition),
+            rfq_lowest_amount=Window(Min('total_amount'), **partition),
+            rfq_highest_amount=Window(Max('total_amount'), **partition),
+        )
+        # Filtering on a window annotation is applied after the window is
+        # evaluated, so the aggregates still cover every quote of the RFQ
+        .filter(id=F('rfq_awarded_quote_id'))
+        .values(
+            'id', 'rfq_id', 'organization_id', 'currency', 'total_amount', 'rfq__updated_at',
+            'rfq_quote_count', 'rfq_quote_total', 'rfq_lowest_amount', 'rfq_highest_amount',
+        )
+        .order_by()
+    )
+
+
+def record_savings(rfqs) -> int:
+    """
+    Write ledger entries for the awarded RFQs in ``rfqs``.
+
+    Existing entries are refreshed with the current quote statistics but keep
+    their original ``awarded_at``.
+
+    Returns:
+        Number of entries written
+    """
+    from .models import RFQSavings
+
+    entries = []
+    for row in _awarded_quote_rows(rfqs):
+        awarded_amount = _decimal(row['total_amount'])
+        quote_count = row['rfq_quote_count']
+        average_alternative = None
+        savings = Decimal('0')
+        if quote_count > 1:
+            average_alternative = _decimal(
+                (_decimal(row['rfq_quote_total']) - awarded_amount) / (quote_count - 1)
+            )
+            savings = average_alternative - awarded_amount
+
+        entries.append(RFQSavings(
+            organization_id=row['organization_id'],
+            rfq_id=row['rfq_id'],
+            awarded_quote_id=row['id'],
+            awarded_at=row['rfq__updated_at'],
+            currency=row['currency'],
+            quote_count=quote_count,
+            awarded_amount=awarded_amount,
+            lowest_amount=_decimal(row['rfq_lowest_amount']),
+            highest_amount=_decimal(row['rfq_highest_amount']),
+            average_alternative_amount=average_alternative,
+            savings=savings,
+        ))
+
+    RFQSavings.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['rfq'],
+        update_fields=[
+            'awarded_quote', 'currency', 'quote_count', 'awarded_amount', 'lowest_amount',
+            'highest_amount', 'average_alternative_amount', 'savings', 'updated_at',
+        ],
+    )
+    logger.debug(f"Recorded savings for {len(entries)} awarded RFQs")
+    return len(entries)
+
+
+def record_rfq_savings(rfq) -> None:
+    """Write the ledger entry of a just-awarded RFQ"""
+    from .models import RFQ
+
+    record_savings(RFQ.objects.filter(pk=rfq.pk))
+
+
+def savings_summary(organization,
+                    period_start: Optional[date] = None,
+                    period_end: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Savings totals of an organization from the ledger.
+
+    Args:
+        organization: Organization whose awards are summed
+        period_start: Only count RFQs awarded on or after this date
+        period_end: Only count RFQs awarded on or before this date
+
+    Returns:
+        ``total_savings`` sums positive savings against the average
+        alternative quote; ``competitive_savings`` sums highest minus lowest
+        quote over RFQs with more than one quote
+    """
+    from .models import RFQSavings
+
+    entries = RFQSavings.objects.filter(organization=organization)
+    if period_start:
+        entries = entries.filter(awarded_at__date__gte=period_start)
+    if period_end:
+        entries = entries.filter(awarded_at__date__lte=period_end)
+
+    multiple_quotes = Q(quote_count__gt=1)
+    totals = entries.aggregate(
+        total_savings=Sum('savings', filter=Q(savings__gt=0)),
+        competitive_savings=Sum(F('highest_amount') - F('lowest_amount'), filter=multiple_quotes),
+        highest_quote_total=Sum('highest_amount', filter=multiple_quotes),
+        awarded_amount=Sum('awarded_amount'),
+        awarded_rfqs=Count('id'),
+        rfqs_with_multiple_quotes=Count('id', filter=multiple_quotes),
+        quote_count=Sum('quote_count'),
+    )
+    for key in ('total_savings', 'competitive_savings', 'highest_quote_total', 'awarded_amount'):
+        totals[key] = _decimal(totals[key] or 0)
+    totals['quote_count'] = totals['quote_count'] or 0
+    return totals
+
+
+def year_to_date_savings(organization) -> Dict[str, Any]:
+    """:func:`savings_summary` for RFQs awarded since January 1st"""
+    return savings_summary(organization, period_start=timezone.now().date().replace(month=1, day=1))
@@ -0,0 +1,24 @@
+"""
+Django signals for the procurement module.
+
+Keeps cached supplier scorecards in step with the data they summarize.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Contract, PurchaseOrder, Quote, Supplier
+from .scorecards import invalidate_supplier_scorecards
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Quote)
+@receiver(post_delete, sender=Quote)
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+def invalidate_scorecards_on_change(sender, instance, **kwargs):
+    """Invalidate the organization's supplier scorecards when their inputs change"""
+    if instance.organization_id:
+        invalidate_supplier_scorecards(instance.organization_id)
@@ -453,6 +453,20 @@ class SupplierModelTests(ProcurementTestCase):
         self.assertIn('Test Supplier Inc', str(self.supplier))
         self.assertIn('SUP-TEST-001', str(self.supplier))
 
+    def test_performance_score_is_stored(self):
+        """The stored score follows the score inputs, including bulk updates."""
+        self.assertEqual(self.supplier.performance_score, Decimal('90.00'))
+
+        self.supplier.on_time_delivery_rate = Decimal('70.00')
+        self.supplier.save(update_fields=['on_time_delivery_rate'])
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.performance_score, Decimal('80.00'))
+
+        Supplier.objects.filter(pk=self.supplier.pk).update(rating=None, quality_score=Decimal('50.00'))
+        Supplier.refresh_performance_scores(Supplier.objects.filter(pk=self.supplier.pk))
+        self.supplier.refresh_from_db()
+        self.assertEqual(self.supplier.performance_score, Decimal('60.00'))
+
     def test_supplier_default_status(self):
         """Test supplier default status is active."""
         supplier = Supplier.objects.create(
@@ -548,6 +562,68 @@ class NegotiationRecommendationEngineTests(ProcurementTestCase):
 
         self.assertEqual(recommendations, [])
 
+    def test_get_rfq_recommendations_prefetches_in_batch(self):
+        """Test ML data for all items costs one batch prediction and one batch should-cost call."""
+        import json
+        import httpx
+        from apps.pricing.ml_client import AsyncMLServiceClient, BatchingMLServiceClient
+        from apps.procurement.recommendations import NegotiationRecommendationEngine
+
+        for i in range(3):
+            material = Material.objects.create(
+                organization=self.organization,
+                code=f'MAT-BATCH-{i}',
+                name=f'Batch Material {i}',
+                material_type='raw_material',
+                category=self.category,
+                unit_of_measure='EA',
+                status='active',
+                list_price=Decimal('100.00'),
+                currency='USD'
+            )
+            RFQItem.objects.create(
+                rfq=self.rfq,
+                material=material,
+                quantity=Decimal('10'),
+                unit_of_measure='EA',
+                budget_estimate=Decimal('90.00')
+            )
+
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.path)
+            if request.url.path == '/api/v1/predictions/batch':
+                items = json.loads(request.content)['predictions']
+                return httpx.Response(200, json={
+                    'results': [
+                        {'material_id': item['material_id'], 'predicted_price': '87.00',
+                         'confidence_score': 0.85, 'model_version': 'v1.0'}
+                        for item in items
+                    ],
+                    'errors': [],
+                })
+            return httpx.Response(503)
+
+        http_client = httpx.AsyncClient(base_url='http://ml-service', transport=httpx.MockTransport(handler))
+        batch_client = BatchingMLServiceClient()
+        engine = NegotiationRecommendationEngine(self.organization)
+        engine._batch_ml_client = batch_client
+        engine._ml_client = Mock()
+        try:
+            with patch.object(AsyncMLServiceClient, '_get_client', lambda client: http_client):
+                recommendations = engine.get_rfq_recommendations(str(self.rfq.id))
+        finally:
+            batch_client.close()
+
+        self.assertEqual(sorted(calls), ['/api/v1/predictions/batch', '/api/v1/predictions/should-cost/batch'])
+        engine._ml_client.predict_price.assert_not_called()
+        engine._ml_client.calculate_should_cost.assert_not_called()
+        self.assertEqual(len(recommendations), 4)
+        for rec in recommendations:
+            self.assertIn('ml_prediction', rec.data_sources)
+            self.assertNotIn('should_cost_model', rec.data_sources)
+
     @patch('apps.procurement.recommendations.NegotiationRecommendationEngine._get_historical_prices')
     @patch('apps.procurement.recommendations.NegotiationRecommendationEngine._get_price_prediction')
     @patch('apps.procurement.recommendations.NegotiationRecommendationEngine._get_should_cost')
@@ -802,3 +878,230 @@ class DetermineActionTests(ProcurementTestCase):
         self.assertEqual(priority, 'high')
         # Variance is (130-100)/130 = 23.1%, so check for "23" or "above target"
         self.assertIn('above target', reasoning)
+
+
+class SupplierScorecardTests(ProcurementTestCase):
+    """Tests for set-based supplier scorecards."""
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+
+        self.other_supplier = Supplier.objects.create(
+            organization=self.organization,
+            code='SUP-TEST-002',
+            name='Second Supplier',
+            status='active',
+            supplier_type='distributor',
+            rating=Decimal('3.0')
+        )
+        for number, (supplier, status) in enumerate([(self.supplier, 'accepted'), (self.other_supplier, 'rejected')]):
+            Quote.objects.create(
+                rfq=self.rfq, supplier=supplier, organization=self.organization,
+                quote_number=f'QUO-SC-{number}', status=status,
+                total_amount=Decimal('1000.00'), validity_period=30
+            )
+        Contract.objects.create(
+            organization=self.organization, supplier=self.supplier,
+            contract_number='CON-SC-001', title='Scorecard Contract',
+            contract_type='purchase_order', status='completed',
+            start_date=timezone.now().date(), end_date=timezone.now().date() + timedelta(days=30),
+            total_value=Decimal('5000.00'), payment_terms='Net 30', created_by=self.user
+        )
+
+    def test_scorecards_use_constant_queries(self):
+        """All suppliers are scored with a fixed number of queries."""
+        from apps.procurement.scorecards import build_supplier_scorecards
+
+        with self.assertNumQueries(4):
+            scorecards = build_supplier_scorecards(self.organization)
+
+        self.assertEqual([card['name'] for card in scorecards], ['Test Supplier Inc', 'Second Supplier'])
+        card = scorecards[0]
+        self.assertEqual(card['total_quotes'], 1)
+        self.assertEqual(card['accepted_quotes'], 1)
+        self.assertEqual(card['quote_acceptance_rate'], 100)
+        self.assertEqual(card['total_contract_value'], Decimal('5000.00'))
+        self.assertEqual(card['completed_contracts'], 1)
+        self.assertEqual(scorecards[1]['total_contracts'], 0)
+
+    def test_scorecard_cache_invalidated_on_change(self):
+        """Cached scorecards are rebuilt after a quote changes."""
+        from apps.procurement.scorecards import supplier_scorecards
+
+        self.assertEqual(supplier_scorecards(self.organization)[1]['accepted_quotes'], 0)
+        with self.assertNumQueries(0):
+            supplier_scorecards(self.organization)
+
+        quote = Quote.objects.get(supplier=self.other_supplier)
+        quote.status = 'accepted'
+        quote.save()
+
+        self.assertEqual(supplier_scorecards(self.organization)[1]['accepted_quotes'], 1)
+
+
+class QuoteComparisonTests(ProcurementTestCase):
+    """Tests for the vectorized quote comparison matrix."""
+
+    def setUp(self):
+        super().setUp()
+        self.second_material = Material.objects.create(
+            organization=self.organization,
+            code='MAT-002',
+            name='Second Material',
+            material_type='raw_material',
+            category=self.category,
+            unit_of_measure='EA',
+            status='active',
+            list_price=Decimal('10.00'),
+            currency='USD'
+        )
+        self.second_item = RFQItem.objects.create(
+            rfq=self.rfq,
+            material=self.second_material,
+            quantity=Decimal('10'),
+            unit_of_measure='EA'
+        )
+
+        # (supplier code, total, {rfq item: (line price, lead time)})
+        offers = [
+            ('SUP-CMP-A', '1050.00', {self.rfq_item: ('900.00', 10), self.second_item: ('150.00', 5)}),
+            ('SUP-CMP-B', '1100.00', {self.rfq_item: ('1000.00', 20), self.second_item: ('100.00', 10)}),
+            ('SUP-CMP-C', '1200.00', {self.rfq_item: ('1200.00', 30)}),
+        ]
+        for number, (code, total, items) in enumerate(offers):
+            supplier = Supplier.objects.create(
+                organization=self.organization, code=code, name=f'Supplier {code[-1]}',
+                status='active', supplier_type='distributor'
+            )
+            quote = Quote.objects.create(
+                rfq=self.rfq, supplier=supplier, organization=self.organization,
+                quote_number=f'QUO-CMP-{number}', status='submitted',
+                total_amount=Decimal(total), validity_period=30
+            )
+            for rfq_item, (price, lead_time) in items.items():
+                QuoteItem.objects.create(
+                    quote=quote, rfq_item=rfq_item, material=rfq_item.material,
+                    price=Decimal(price), unit_price=Decimal('0'), quantity=rfq_item.quantity,
+                    unit_of_measure='EA', lead_time_days=lead_time
+                )
+
+    def test_comparison_uses_constant_queries(self):
+        """Quotes, items and all quote item cells are loaded with three queries."""
+        from apps.procurement.quote_comparison import QuoteComparison
+
+        with self.assertNumQueries(3):
+            comparison = QuoteComparison(self.rfq)
+
+        self.assertEqual([s['supplier'] for s in comparison.supplier_summaries()],
+                         ['Supplier A', 'Supplier B', 'Supplier C'])
+        first, second = comparison.item_summaries()
+        self.assertEqual(first['best_unit_price'], 9.0)
+        self.assertEqual(first['best_supplier'], 'Supplier A')
+        self.assertEqual(first['median_unit_price'], 10.0)
+        self.assertAlmostEqual(first['savings_vs_median'], 100.0)
+        self.assertEqual(second['best_supplier'], 'Supplier B')
+        self.assertEqual(second['quote_count'], 2)
+
+    def test_rows_align_cells_with_quotes(self):
+        """Unquoted items leave an empty cell in the quote's column."""
+        from apps.procurement.quote_comparison import QuoteComparison
+
+        rows = list(QuoteComparison(self.rfq).rows())
+        self.assertTrue(rows[0]['cells'][0]['is_best'])
+        self.assertIsNone(rows[1]['cells'][2])
+        self.assertEqual(rows[1]['cells'][1]['lead_time_days'], 10.0)
+
+    def test_csv_export(self):
+        """CSV export has one unit-price column per quote."""
+        from apps.procurement.quote_comparison import QuoteComparison
+
+        response = QuoteComparison(self.rfq).export_response('csv')
+        lines = response.content.decode().splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(lines[0].startswith('Material Code,Material,Quantity,UOM,Supplier A,Supplier B,Supplier C'))
+        self.assertTrue(lines[2].startswith('MAT-002,Second Material,10.0,EA,15.0000,10.0000,,10.0000,Supplier B'))
+
+
+class RFQSavingsLedgerTests(ProcurementTestCase):
+    """Tests for the RFQ savings ledger."""
+
+    def setUp(self):
+        super().setUp()
+        suppliers = [self.supplier] + [
+            Supplier.objects.create(
+                organization=self.organization, code=f'SUP-SAV-{n}', name=f'Savings Supplier {n}',
+                status='active', supplier_type='distributor'
+            )
+            for n in range(2)
+        ]
+        self.second_rfq = RFQ.objects.create(
+            organization=self.organization,
+            rfq_number='RFQ-2026-002',
+            title='Second RFQ',
+            deadline=timezone.now() + timedelta(days=7),
+            created_by=self.user
+        )
+        self.awarded = []
+        for rfq, amounts in [(self.rfq, ['800.00', '1000.00', '1200.00']), (self.second_rfq, ['500.00'])]:
+            quotes = [
+                Quote.objects.create(
+                    rfq=rfq, supplier=suppliers[n],
+                    organization=self.organization, quote_number=f'{rfq.rfq_number}-Q{n}',
+                    status='submitted', total_amount=Decimal(amount), validity_period=30
+                )
+                for n, amount in enumerate(amounts)
+            ]
+            rfq.award_to_quote(quotes[0], self.user)
+            self.awarded.append(quotes[0])
+
+    def test_record_savings_for_all_rfqs_in_one_query(self):
+        """Ledger entries for any number of RFQs are computed with one windowed query."""
+        from apps.procurement.models import RFQSavings
+        from apps.procurement.savings import record_savings
+
+        with self.assertNumQueries(2):
+            self.assertEqual(record_savings(RFQ.objects.all()), 2)
+
+        entry = RFQSavings.objects.get(rfq=self.rfq)
+        self.assertEqual(entry.awarded_quote, self.awarded[0])
+        self.assertEqual(entry.quote_count, 3)
+        self.assertEqual(entry.average_alternative_amount, Decimal('1100.00'))
+        self.assertEqual(entry.savings, Decimal('300.00'))
+        self.assertEqual(entry.highest_amount, Decimal('1200.00'))
+
+        single = RFQSavings.objects.get(rfq=self.second_rfq)
+        self.assertIsNone(single.average_alternative_amount)
+        self.assertEqual(single.savings, Decimal('0'))
+
+    def test_rerecording_updates_entry(self):
+        """Recording an RFQ again refreshes its entry instead of duplicating it."""
+        from apps.procurement.models import RFQSavings
+        from apps.procurement.savings import record_rfq_savings
+
+        record_rfq_savings(self.rfq)
+        Quote.objects.filter(quote_number='RFQ-2026-001-Q2').update(total_amount=Decimal('1400.00'))
+        record_rfq_savings(self.rfq)
+
+        self.assertEqual(RFQSavings.objects.filter(rfq=self.rfq).count(), 1)
+        self.assertEqual(RFQSavings.objects.get(rfq=self.rfq).savings, Decimal('400.00'))
+
+    def test_savings_summary(self):
+        """Totals are aggregated from the ledger."""
+        from apps.procurement.savings import record_savings, savings_summary, year_to_date_savings
+
+        record_savings(RFQ.objects.all())
+        summary = savings_summary(self.organization)
+
+        self.assertEqual(summary['total_savings'], Decimal('300.00'))
+        self.assertEqual(summary['competitive_savings'], Decimal('400.00'))
+        self.assertEqual(summary['highest_quote_total'], Decimal('1200.00'))
+        self.assertEqual(summary['awarded_rfqs'], 2)
+        self.assertEqual(summary['rfqs_with_multiple_quotes'], 1)
+        self.assertEqual(summary['quote_count'], 4)
+        self.assertEqual(year_to_date_savings(self.organization)['total_savings'], Decimal('300.00'))
+        self.assertEqual(
+            savings_summary(self.organization, period_end=timezone.now().date() - timedelta(days=1))['awarded_rfqs'],
+            0
+        )
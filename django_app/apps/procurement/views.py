@@ -17,6 +17,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Supplier, RFQ, Quote, RFQItem, QuoteItem, Contract
 from .api.serializers import SupplierSerializer, RFQSerializer, QuoteSerializer
+from .scorecards import supplier_scorecards
+from .quote_comparison import QuoteComparison
+from .savings import savings_summary, year_to_date_savings
 from .forms import ContractForm, RFQForm, SupplierForm, QuoteForm
 from apps.pricing.models import Category
 from apps.core.rbac import RoleRequiredMixin, Role
@@ -693,16 +696,13 @@ class SupplierPerformanceView(OrganizationRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         
         # Get top performing suppliers
-        suppliers_performance = Supplier.objects.filter(
-            organization=self.get_user_organization(),
-            status='active'
-        ).annotate(
-            total_quotes=Count('quote'),
-            approved_quotes=Count('quote', filter=Q(quote__status='approved')),
-            avg_quote_value=Avg('quote__total_amount')
-        ).filter(total_quotes__gt=0).order_by('-approved_quotes')[:10]
+        scorecards = [
+            card for card in supplier_scorecards(self.get_user_organization())
+            if card['total_quotes'] > 0
+        ]
+        scorecards.sort(key=lambda card: card['accepted_quotes'], reverse=True)
         
-        context['top_suppliers'] = suppliers_performance
+        context['top_suppliers'] = scorecards[:10]
         
         return context
 
@@ -762,6 +762,14 @@ class QuoteComparisonView(OrganizationRequiredMixin, TemplateView):
     """Quote comparison view"""
     template_name = 'procurement/quote_comparison.html'
     
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('export')
+        rfq_id = request.GET.get('rfq_id')
+        if export_format in ('csv', 'json') and rfq_id:
+            rfq = get_object_or_404(RFQ, id=rfq_id, organization=self.get_user_organization())
+            return QuoteComparison(rfq).export_response(export_format)
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
@@ -772,59 +780,34 @@ class QuoteComparisonView(OrganizationRequiredMixin, TemplateView):
                     id=rfq_id,
                     organization=self.get_user_organization()
                 )
-                quotes = Quote.objects.filter(
-                    rfq=rfq,
-                    status__in=['submitted', 'under_review', 'accepted', 'approved']
-                ).select_related('supplier').prefetch_related('items__rfq_item__material')
-                
-                # Prepare comparison data
-                comparison_data = []
-                for quote in quotes:
-                    quote_data = {
+                # Item x quote matrix built from one query; quotes come back
+                # sorted by total amount
+                comparison = QuoteComparison(rfq)
+                comparison_data = [
+                    {
                         'quote': quote,
                         'supplier': quote.supplier,
                         'total_amount': quote.total_amount,
                         'validity_period': quote.validity_period,
                         'delivery_terms': quote.delivery_terms,
                         'payment_terms': quote.payment_terms,
-                        'lead_time': quote.lead_time,
-                        'items': {}
+                        'lead_time': quote.lead_time_days,
+                        'weighted_score': summary['weighted_score'],
+                        'coverage': summary['coverage'],
                     }
-                    
-                    # Add item-level pricing
-                    for item in quote.items.all():
-                        quote_data['items'][item.rfq_item.id] = {
-                            'price': item.price,
-                            'unit_price': item.price / item.quantity if item.quantity > 0 else 0,
-                            'quantity': item.quantity,
-                            'delivery_date': item.delivery_date
-                        }
-                    
-                    comparison_data.append(quote_data)
-                
-                # Sort by total amount
-                comparison_data.sort(key=lambda x: x['total_amount'])
+                    for quote, summary in zip(comparison.quotes, comparison.supplier_summaries())
+                ]
                 
                 context['rfq'] = rfq
                 context['comparison_data'] = comparison_data
-                context['quotes'] = quotes
-                
-                # Calculate best prices for each item
-                best_prices = {}
-                for item in rfq.items.all():
-                    prices = []
-                    for data in comparison_data:
-                        if item.id in data['items']:
-                            prices.append({
-                                'supplier': data['supplier'].name,
-                                'unit_price': data['items'][item.id]['unit_price']
-                            })
-                    if prices:
-                        prices.sort(key=lambda x: x['unit_price'])
-                        best_prices[item.id] = prices[0]
-                
-                context['best_prices'] = best_prices
-                context['rfq_items'] = rfq.items.select_related('material')
+                context['quotes'] = comparison.quotes
+                context['comparison_rows'] = list(comparison.rows())
+                context['best_prices'] = {
+                    item['rfq_item_id']: {'supplier': item['best_supplier'], 'unit_price': item['best_unit_price']}
+                    for item in comparison.item_summaries()
+                    if item['best_supplier']
+                }
+                context['rfq_items'] = comparison.items
                 
             except RFQ.DoesNotExist:
                 context['error'] = 'RFQ not found'
@@ -833,7 +816,7 @@ class QuoteComparisonView(OrganizationRequiredMixin, TemplateView):
             context['rfqs'] = RFQ.objects.filter(
                 organization=self.get_user_organization(),
                 status__in=['published', 'closed']
-            ).annotate(quote_count=models.Count('quotes')).filter(quote_count__gt=0)
+            ).annotate(quote_count=Count('quotes')).filter(quote_count__gt=0)
         
         return context
 
@@ -894,6 +877,7 @@ class ProcurementDashboardView(OrganizationRequiredMixin, TemplateView):
             'previous_spend': previous_spend,
             'avg_supplier_rating': round(avg_rating, 1) if avg_rating else 0,
             'cost_savings': self._calculate_cost_savings(organization),
+            'cost_savings_ytd': float(year_to_date_savings(organization)['total_savings']),
         }
 
         # Get recent RFQs
@@ -933,30 +917,8 @@ class ProcurementDashboardView(OrganizationRequiredMixin, TemplateView):
         return context
 
     def _calculate_cost_savings(self, organization):
-        """Calculate cost savings from accepted quotes vs other quotes for same RFQ"""
-        from decimal import Decimal
-
-        # Get awarded RFQs with multiple quotes
-        awarded_rfqs = RFQ.objects.filter(
-            organization=organization,
-            status='awarded',
-            awarded_quote__isnull=False
-        ).prefetch_related('quotes')
-
-        total_savings = Decimal('0')
-        for rfq in awarded_rfqs:
-            awarded_quote = rfq.awarded_quote
-            if awarded_quote:
-                # Compare with average of other quotes
-                other_quotes = rfq.quotes.exclude(id=awarded_quote.id)
-                if other_quotes.exists():
-                    avg_other = other_quotes.aggregate(avg=Avg('total_amount'))['avg']
-                    if avg_other and awarded_quote.total_amount:
-                        savings = avg_other - awarded_quote.total_amount
-                        if savings > 0:
-                            total_savings += Decimal(str(savings))
-
-        return float(total_savings)
+        """Savings of awarded quotes vs the average of the other quotes for the same RFQ"""
+        return float(savings_summary(organization)['total_savings'])
 
     def _get_recent_activities(self, organization):
         """Get recent activities from actual database records"""
@@ -3,6 +3,7 @@ Celery configuration for async processing
 """
 import os
 from celery import Celery
+from celery.schedules import crontab
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program
@@ -32,6 +33,11 @@ app.conf.beat_schedule = {
         'task': 'apps.analytics.tasks.generate_daily_reports',
         'schedule': 86400.0,  # Daily at midnight
     },
+    'refresh-demand-forecasts': {
+        'task': 'apps.pricing.tasks.trigger_model_training',
+        'schedule': crontab(hour=2, minute=0),  # Nightly; refits only materials with new demand
+        'args': ('demand_forecasts',),
+    },
 }
 
 @app.task(bind=True)
@@ -193,6 +193,9 @@ CELERY_TIMEZONE = TIME_ZONE
 # ML Service Configuration
 ML_SERVICE_URL = env('ML_SERVICE_URL', default='http://localhost:8001')
 ML_SERVICE_TOKEN = env('ML_SERVICE_TOKEN', default='your-ml-service-token')
+ML_CLIENT_MAX_CONNECTIONS = env.int('ML_CLIENT_MAX_CONNECTIONS', default=20)
+ML_CLIENT_CACHE_TTL = env.int('ML_CLIENT_CACHE_TTL', default=60)
+ML_CLIENT_BATCH_WINDOW = env.float('ML_CLIENT_BATCH_WINDOW', default=0.01)
 
 # Logging configuration
 LOGGING = {
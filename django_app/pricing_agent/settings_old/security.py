@@ -402,6 +402,9 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
+# Request body bytes scanned by ThreatDetectionMiddleware (textual content only)
+THREAT_SCAN_MAX_BODY_BYTES = 64 * 1024
+
 # Allowed File Types
 ALLOWED_FILE_EXTENSIONS = [
     '.pdf', '.doc', '.docx', '.xls', '.xlsx', 
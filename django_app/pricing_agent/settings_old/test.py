@@ -66,6 +66,9 @@ MIDDLEWARE = [
     'apps.core.middleware.OrganizationMiddleware',
 ]
 
+# Write audit logs on the request thread so tests see them immediately
+AUDIT_LOG_ASYNC = False
+
 # Celery test settings
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
@@ -1,9 +1,12 @@
 """
 Analytics API Endpoints for ML insights and monitoring
 """
+import asyncio
+import re
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query
+import pandas as pd
 import structlog
 
 from ...dependencies import (
@@ -11,10 +14,12 @@ from ...dependencies import (
     get_ml_service,
     require_staff,
     rate_limit,
-    get_redis
+    get_redis,
+    get_prediction_log_reader
 )
 from ...services.monitoring import ModelMonitor
 from ...services.optimization import PerformanceOptimizer
+from ...services.prediction_log import PredictionLogReader
 from ...models.schemas import (
     AnalyticsReport,
     DriftReport,
@@ -131,7 +136,8 @@ async def get_drift_analysis(
     days_back: int = Query(7, ge=1, le=30, description="Days of data to analyze"),
     model_registry=Depends(get_model_registry),
     user=Depends(require_staff),
-    redis_client=Depends(get_redis)
+    redis_client=Depends(get_redis),
+    prediction_log=Depends(get_prediction_log_reader)
 ):
     """Get drift analysis for a specific model"""
     try:
@@ -141,11 +147,12 @@ async def get_drift_analysis(
             raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
         
         # Initialize model monitor
-        model_monitor = ModelMonitor(model_registry, redis_client)
+        model_monitor = ModelMonitor(model_registry, redis_client, prediction_log)
         
         # Get drift analysis
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days_back)
+        drift_history = await _get_drift_history(model_name, days_back, model_monitor)
         
         drift_analysis = {
             'model_name': model_name,
@@ -156,8 +163,8 @@ async def get_drift_analysis(
             },
             'feature_drift': await model_monitor._check_feature_drift(model_name),
             'prediction_drift': await model_monitor._check_prediction_drift(model_name),
-            'drift_history': await _get_drift_history(model_name, start_time, end_time, redis_client),
-            'drift_trends': await _calculate_drift_trends(model_name, start_time, end_time, redis_client),
+            'drift_history': drift_history,
+            'drift_trends': _calculate_drift_trends(drift_history),
             'recommendations': await _generate_drift_recommendations(model_name, model_monitor)
         }
         
@@ -182,13 +189,18 @@ async def get_prediction_volume_analytics(
     hours_back: int = Query(24, ge=1, le=168, description="Hours of data to analyze"),
     granularity: str = Query("hour", regex="^(hour|day)$", description="Time granularity"),
     user=Depends(require_staff),
-    redis_client=Depends(get_redis)
+    prediction_log: PredictionLogReader = Depends(get_prediction_log_reader)
 ):
     """Get prediction volume analytics"""
     try:
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=hours_back)
         
+        # One scan of the (timestamp, success) columns feeds every volume metric
+        volumes = await asyncio.to_thread(
+            prediction_log.volume, model_name, start_time, end_time, granularity
+        )
+        
         volume_analytics = {
             'time_period': {
                 'start': start_time.isoformat(),
@@ -196,10 +208,10 @@ async def get_prediction_volume_analytics(
                 'hours': hours_back,
                 'granularity': granularity
             },
-            'volume_data': await _get_prediction_volumes(model_name, start_time, end_time, granularity, redis_client),
-            'volume_statistics': await _calculate_volume_statistics(model_name, start_time, end_time, redis_client),
-            'anomalous_periods': await _detect_volume_anomalies(model_name, start_time, end_time, redis_client),
-            'usage_patterns': await _analyze_usage_patterns(model_name, start_time, end_time, redis_client)
+            'volume_data': _format_volumes(volumes),
+            'volume_statistics': _calculate_volume_statistics(volumes, granularity),
+            'anomalous_periods': _detect_volume_anomalies(volumes),
+            'usage_patterns': _analyze_usage_patterns(volumes)
         }
         
         logger.info(f"Generated prediction volume analytics", model_name=model_name, hours_back=hours_back, user_id=user.id)
@@ -220,22 +232,28 @@ async def get_error_analytics(
     model_name: Optional[str] = Query(None, description="Specific model name (optional)"),
     hours_back: int = Query(24, ge=1, le=168, description="Hours of data to analyze"),
     user=Depends(require_staff),
-    redis_client=Depends(get_redis)
+    redis_client=Depends(get_redis),
+    prediction_log: PredictionLogReader = Depends(get_prediction_log_reader)
 ):
     """Get error analytics and failure patterns"""
     try:
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=hours_back)
         
+        volumes = await asyncio.to_thread(
+            prediction_log.volume, model_name, start_time, end_time, 'hour'
+        )
+        errors = await asyncio.to_thread(prediction_log.errors, model_name, start_time, end_time)
+        
         error_analytics = {
             'time_period': {
                 'start': start_time.isoformat(),
                 'end': end_time.isoformat(),
                 'hours': hours_back
             },
-            'error_summary': await _get_error_summary(model_name, start_time, end_time, redis_client),
-            'error_trends': await _get_error_trends(model_name, start_time, end_time, redis_client),
-            'error_categories': await _categorize_errors(model_name, start_time, end_time, redis_client),
+            'error_summary': _get_error_summary(volumes, errors),
+            'error_trends': _get_error_trends(volumes),
+            'error_categories': _categorize_errors(errors),
             'failure_patterns': await _analyze_failure_patterns(model_name, start_time, end_time, redis_client),
             'recommendations': await _generate_error_recommendations(model_name, start_time, end_time, redis_client)
         }
@@ -259,12 +277,13 @@ async def get_active_alerts(
     severity: Optional[str] = Query(None, regex="^(low|medium|high|critical)$", description="Alert severity filter"),
     model_registry=Depends(get_model_registry),
     user=Depends(require_staff),
-    redis_client=Depends(get_redis)
+    redis_client=Depends(get_redis),
+    prediction_log=Depends(get_prediction_log_reader)
 ):
     """Get active monitoring alerts"""
     try:
         # Initialize model monitor
-        model_monitor = ModelMonitor(model_registry, redis_client)
+        model_monitor = ModelMonitor(model_registry, redis_client, prediction_log)
         
         # Get active alerts
         alerts = await model_monitor.get_active_alerts(model_name)
@@ -386,24 +405,43 @@ async def _generate_performance_recommendations(optimization_metrics: Dict[str,
     return recommendations
 
 
-async def _get_drift_history(model_name: str, start_time: datetime, end_time: datetime, redis_client) -> List[Dict[str, Any]]:
-    """Get historical drift data"""
-    # Placeholder implementation - in production, query drift monitoring results
-    return [
-        {
-            'timestamp': (start_time + timedelta(days=i)).isoformat(),
-            'feature_drift_score': np.random.uniform(0, 0.1),
-            'prediction_drift_score': np.random.uniform(0, 0.1)
-        }
-        for i in range((end_time - start_time).days + 1)
-    ]
+async def _get_drift_history(model_name: str, days_back: int, model_monitor: ModelMonitor) -> List[Dict[str, Any]]:
+    """Get historical drift scores from stored monitoring results, oldest first"""
+    history = await model_monitor.get_monitoring_history(
+        model_name, hours_back=days_back * 24, limit=days_back * 24
+    )
+    
+    drift_history = []
+    for report in reversed(history):
+        checks = report.get('checks', {})
+        drift_history.append({
+            'timestamp': report.get('monitored_at'),
+            'feature_drift_score': checks.get('feature_drift', {}).get('drift_score'),
+            'prediction_drift_score': checks.get('prediction_drift', {}).get('drift_score')
+        })
+    return drift_history
 
 
-async def _calculate_drift_trends(model_name: str, start_time: datetime, end_time: datetime, redis_client) -> Dict[str, str]:
+def _trend(scores: List[float], tolerance: float = 0.1) -> str:
+    """Compare the later half of a series with the earlier half"""
+    scores = [score for score in scores if score is not None]
+    if len(scores) < 2:
+        return 'insufficient_data'
+    
+    half = len(scores) // 2
+    earlier, later = float(np.mean(scores[:half])), float(np.mean(scores[half:]))
+    if later > earlier * (1 + tolerance):
+        return 'increasing'
+    if later < earlier * (1 - tolerance):
+        return 'decreasing'
+    return 'stable'
+
+
+def _calculate_drift_trends(drift_history: List[Dict[str, Any]]) -> Dict[str, str]:
     """Calculate drift trends"""
     return {
-        'feature_drift_trend': 'stable',
-        'prediction_drift_trend': 'stable'
+        'feature_drift_trend': _trend([entry['feature_drift_score'] for entry in drift_history]),
+        'prediction_drift_trend': _trend([entry['prediction_drift_score'] for entry in drift_history])
     }
 
 
@@ -416,94 +454,127 @@ async def _generate_drift_recommendations(model_name: str, model_monitor: ModelM
     ]
 
 
-async def _get_prediction_volumes(model_name: Optional[str], start_time: datetime, end_time: datetime, granularity: str, redis_client) -> List[Dict[str, Any]]:
-    """Get prediction volume data"""
-    # Placeholder implementation
-    import numpy as np
-    
-    if granularity == 'hour':
-        periods = int((end_time - start_time).total_seconds() / 3600)
-        time_delta = timedelta(hours=1)
-    else:  # day
-        periods = (end_time - start_time).days + 1
-        time_delta = timedelta(days=1)
-    
-    volume_data = []
-    current_time = start_time
-    
-    for _ in range(periods):
-        volume_data.append({
-            'timestamp': current_time.isoformat(),
-            'prediction_count': int(np.random.poisson(50)),
-            'batch_count': int(np.random.poisson(5)),
-            'error_count': int(np.random.poisson(2))
-        })
-        current_time += time_delta
-    
-    return volume_data
+def _format_volumes(volumes: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Prediction volume data points"""
+    return [
+        {
+            'timestamp': row.timestamp.isoformat(),
+            'prediction_count': int(row.prediction_count),
+            'error_count': int(row.error_count)
+        }
+        for row in volumes.itertuples(index=False)
+    ]
 
 
-async def _calculate_volume_statistics(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> Dict[str, Any]:
+def _calculate_volume_statistics(volumes: pd.DataFrame, granularity: str) -> Dict[str, Any]:
     """Calculate volume statistics"""
+    counts = volumes['prediction_count']
+    hours_per_period = 1 if granularity == 'hour' else 24
+    total_hours = max(len(volumes) * hours_per_period, 1)
+    
+    # Growth of the second half of the window over the first half
+    half = len(counts) // 2
+    first_half, second_half = counts.iloc[:half].sum(), counts.iloc[half:].sum()
+    growth_rate = float((second_half - first_half) / first_half) if first_half > 0 else 0.0
+    
     return {
-        'total_predictions': int(np.random.poisson(1000)),
-        'avg_predictions_per_hour': int(np.random.poisson(50)),
-        'peak_hour_predictions': int(np.random.poisson(100)),
-        'prediction_growth_rate': np.random.uniform(-0.1, 0.2)
+        'total_predictions': int(counts.sum()),
+        'avg_predictions_per_hour': float(counts.sum() / total_hours),
+        'peak_period_predictions': int(counts.max()) if len(counts) else 0,
+        'prediction_growth_rate': growth_rate
     }
 
 
-async def _detect_volume_anomalies(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> List[Dict[str, Any]]:
-    """Detect volume anomalies"""
-    return [
-        {
-            'timestamp': (start_time + timedelta(hours=12)).isoformat(),
-            'type': 'spike',
-            'description': 'Prediction volume spike detected',
-            'severity': 'medium'
-        }
-    ]
+def _detect_volume_anomalies(volumes: pd.DataFrame, z_threshold: float = 3.0) -> List[Dict[str, Any]]:
+    """Detect periods whose volume deviates strongly from the window's typical volume"""
+    counts = volumes['prediction_count'].astype(float)
+    if len(counts) < 3:
+        return []
+    
+    # Median/MAD so the anomalies themselves do not mask each other
+    median = counts.median()
+    mad = (counts - median).abs().median() * 1.4826
+    if mad == 0:
+        return []
+    
+    anomalies = []
+    for row, z_score in zip(volumes.itertuples(index=False), (counts - median) / mad):
+        if abs(z_score) < z_threshold:
+            continue
+        kind = 'spike' if z_score > 0 else 'drop'
+        anomalies.append({
+            'timestamp': row.timestamp.isoformat(),
+            'type': kind,
+            'prediction_count': int(row.prediction_count),
+            'description': f'Prediction volume {kind} detected',
+            'severity': 'high' if abs(z_score) >= 2 * z_threshold else 'medium'
+        })
+    return anomalies
 
 
-async def _analyze_usage_patterns(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> Dict[str, Any]:
+def _analyze_usage_patterns(volumes: pd.DataFrame) -> Dict[str, Any]:
     """Analyze usage patterns"""
+    if volumes['prediction_count'].sum() == 0:
+        return {'peak_hours': [], 'peak_days': []}
+    
+    timestamps = volumes['timestamp']
+    by_hour = volumes['prediction_count'].groupby(timestamps.dt.hour).sum()
+    by_day = volumes['prediction_count'].groupby(timestamps.dt.day_name()).sum()
+    
     return {
-        'peak_hours': [9, 10, 11, 14, 15, 16],
-        'peak_days': ['Monday', 'Tuesday', 'Wednesday'],
-        'seasonal_patterns': 'Business hours focused usage'
+        'peak_hours': sorted(int(hour) for hour in by_hour.nlargest(6).index if by_hour[hour] > 0),
+        'peak_days': [day for day in by_day.nlargest(3).index if by_day[day] > 0],
     }
 
 
-async def _get_error_summary(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> Dict[str, Any]:
+def _get_error_summary(volumes: pd.DataFrame, errors: pd.DataFrame) -> Dict[str, Any]:
     """Get error summary statistics"""
+    total_errors = int(volumes['error_count'].sum())
+    total_requests = total_errors + int(volumes['prediction_count'].sum())
+    categories = _categorize_errors(errors)
+    
     return {
-        'total_errors': int(np.random.poisson(10)),
-        'error_rate': np.random.uniform(0.01, 0.05),
-        'most_common_error': 'Timeout',
-        'error_trend': 'decreasing'
+        'total_errors': total_errors,
+        'error_rate': total_errors / total_requests if total_requests else 0.0,
+        'most_common_error': max(categories, key=categories.get) if total_errors else None,
     }
 
 
-async def _get_error_trends(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> List[Dict[str, Any]]:
+def _get_error_trends(volumes: pd.DataFrame) -> List[Dict[str, Any]]:
     """Get error trends over time"""
-    return [
-        {
-            'timestamp': (start_time + timedelta(hours=i)).isoformat(),
-            'error_count': int(np.random.poisson(1)),
-            'error_rate': np.random.uniform(0.01, 0.03)
-        }
-        for i in range(int((end_time - start_time).total_seconds() / 3600))
-    ]
+    trends = []
+    for row in volumes.itertuples(index=False):
+        attempts = row.prediction_count + row.error_count
+        trends.append({
+            'timestamp': row.timestamp.isoformat(),
+            'error_count': int(row.error_count),
+            'error_rate': row.error_count / attempts if attempts else 0.0
+        })
+    return trends
+
 
+_ERROR_CATEGORIES = [
+    ('timeout', re.compile(r'timeout|timed out', re.IGNORECASE)),
+    ('validation', re.compile(r'valid|missing|not found in|column', re.IGNORECASE)),
+    ('model_error', re.compile(r'model|predict|booster|feature', re.IGNORECASE)),
+]
 
-async def _categorize_errors(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> Dict[str, int]:
+
+def _categorize_errors(errors: pd.DataFrame) -> Dict[str, int]:
     """Categorize errors by type"""
-    return {
-        'timeout': int(np.random.poisson(3)),
-        'validation': int(np.random.poisson(2)),
-        'model_error': int(np.random.poisson(1)),
-        'system_error': int(np.random.poisson(1))
-    }
+    categories = {name: 0 for name, _ in _ERROR_CATEGORIES}
+    categories['system_error'] = 0
+    
+    if errors.empty:
+        return categories
+    
+    for message, count in errors['error'].fillna('').value_counts().items():
+        category = next(
+            (name for name, pattern in _ERROR_CATEGORIES if pattern.search(message)),
+            'system_error'
+        )
+        categories[category] += int(count)
+    return categories
 
 
 async def _analyze_failure_patterns(model_name: Optional[str], start_time: datetime, end_time: datetime, redis_client) -> List[str]:
@@ -222,7 +222,7 @@ async def train_model(
         # Initialize AutoML trainer
         automl_trainer = AutoMLTrainer(model_registry)
         
-        if request.model_type not in ['price_predictor', 'anomaly_detector', 'demand_forecaster']:
+        if request.model_type not in ['price_predictor', 'anomaly_detector', 'demand_forecaster', 'demand_forecasts']:
             raise HTTPException(status_code=400, detail=f"Unsupported model type: {request.model_type}")
         
         # Start training in background
@@ -344,6 +344,7 @@ async def train_model_background(
         logger.info(f"Starting background training for {model_type}")
         
         # Run training pipeline
+        await automl_trainer.setup_training_schedule()
         results = await automl_trainer.run_training_pipeline([model_type])
         
         logger.info(
@@ -1,12 +1,13 @@
 """
 Prediction endpoints for the ML service
 """
-import asyncio
+import time
 import uuid
 from typing import List, Dict, Any
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.security import HTTPBearer
+import pandas as pd
 import structlog
 
 from ...models.schemas import (
@@ -15,10 +16,17 @@ from ...models.schemas import (
     BatchPredictionRequest,
     BatchPredictionResponse,
     PredictionStatus,
+    ShouldCostRequest,
+    ShouldCostResponse,
+    BatchShouldCostRequest,
+    BatchShouldCostResponse,
+    BatchDemandForecastRequest,
+    BatchDemandForecastResponse,
     ErrorResponse,
 )
 from ...services.ml_service import MLService
 from ...services.model_registry import ModelRegistry
+from ...services.prediction_log import get_prediction_log_writer
 from ...dependencies import (
     get_ml_service,
     get_current_user,
@@ -32,6 +40,47 @@ router = APIRouter()
 security = HTTPBearer()
 
 
+def _prediction_item(request: PricePredictionRequest) -> Dict[str, Any]:
+    """MLService.predict_prices item for a prediction request"""
+    return {
+        'item_id': request.material_id,
+        'material_id': request.material_id,
+        'quantity': float(request.quantity),
+        'supplier_id': request.supplier_id,
+        'delivery_date': request.delivery_date,
+        'region': request.region,
+        'payment_terms': request.payment_terms,
+        'specifications': request.specifications or {},
+        'context': request.context or {},
+        'category': request.specifications.get('category', 'general') if request.specifications else 'general'
+    }
+
+
+def _prediction_response(request: PricePredictionRequest, prediction_result: Dict[str, Any]) -> PricePredictionResponse:
+    confidence_interval = prediction_result.get("confidence_interval", {})
+    predicted_price = prediction_result.get("predicted_price", 0)
+    unit_price = predicted_price / float(request.quantity) if request.quantity > 0 else 0
+    
+    return PricePredictionResponse(
+        material_id=request.material_id,
+        quantity=request.quantity,
+        predicted_price=predicted_price,
+        unit_price=unit_price,
+        currency="USD",
+        confidence_score=0.85,  # Default confidence
+        prediction_interval={
+            "lower": confidence_interval.get("lower", predicted_price * 0.9),
+            "upper": confidence_interval.get("upper", predicted_price * 1.1)
+        },
+        model_version=prediction_result.get("model_version", "1.0"),
+        features_used=[],
+        similar_quotes=[],
+        recommendations=[],
+        metadata={"prediction_timestamp": prediction_result.get("prediction_timestamp")},
+        created_at=datetime.utcnow(),
+    )
+
+
 @router.post(
     "/price",
     response_model=PricePredictionResponse,
@@ -64,50 +113,14 @@ async def predict_price(
             user_id=str(user.id) if user else None,
         )
         
-        # Prepare prediction items
-        items = [{
-            'item_id': request.material_id,
-            'material_id': request.material_id,
-            'quantity': float(request.quantity),
-            'supplier_id': request.supplier_id,
-            'delivery_date': request.delivery_date,
-            'region': request.region,
-            'payment_terms': request.payment_terms,
-            'specifications': request.specifications or {},
-            'context': request.context or {},
-            'category': request.specifications.get('category', 'general') if request.specifications else 'general'
-        }]
-        
         # Generate prediction
-        prediction_results = await ml_service.predict_prices(items, include_uncertainty=True)
+        prediction_results = await ml_service.predict_prices([_prediction_item(request)], include_uncertainty=True)
         prediction_result = prediction_results[0] if prediction_results else None
         
         if not prediction_result:
             raise HTTPException(status_code=503, detail="Prediction service unavailable")
         
-        # Create response
-        confidence_interval = prediction_result.get("confidence_interval", {})
-        predicted_price = prediction_result.get("predicted_price", 0)
-        unit_price = predicted_price / float(request.quantity) if request.quantity > 0 else 0
-        
-        response = PricePredictionResponse(
-            material_id=request.material_id,
-            quantity=request.quantity,
-            predicted_price=predicted_price,
-            unit_price=unit_price,
-            currency="USD",
-            confidence_score=0.85,  # Default confidence
-            prediction_interval={
-                "lower": confidence_interval.get("lower", predicted_price * 0.9),
-                "upper": confidence_interval.get("upper", predicted_price * 1.1)
-            },
-            model_version=prediction_result.get("model_version", "1.0"),
-            features_used=[],
-            similar_quotes=[],
-            recommendations=[],
-            metadata={"prediction_timestamp": prediction_result.get("prediction_timestamp")},
-            created_at=datetime.utcnow(),
-        )
+        response = _prediction_response(request, prediction_result)
         
         # Log successful prediction
         background_tasks.add_task(
@@ -156,18 +169,25 @@ async def predict_price(
 )
 async def predict_price_batch(
     request: BatchPredictionRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     ml_service: MLService = Depends(get_ml_service),
     user=Depends(get_current_user),
     redis=Depends(get_redis),
-    _=Depends(rate_limit("bulk_operations")),
+    _=Depends(rate_limit("batch_predict")),
 ):
     """
     Generate price predictions for multiple materials in batch.
     
     Supports both synchronous and asynchronous processing modes.
     For large batches, use async_processing=True to avoid timeouts.
+    Synchronous batches are scored in one vectorized call and count as a
+    single batch request; background jobs also count against the bulk
+    operations limit.
     """
+    if request.async_processing:
+        await rate_limit("bulk_operations")(http_request)
+    
     try:
         batch_id = str(uuid.uuid4())
         
@@ -224,6 +244,153 @@ async def predict_price_batch(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _should_cost_response(item: ShouldCostRequest, breakdown: Dict[str, Any]) -> ShouldCostResponse:
+    return ShouldCostResponse(
+        material_id=item.material_id,
+        quantity=item.quantity,
+        total_should_cost=breakdown['total_cost'],
+        material_cost=breakdown['material_cost'],
+        labor_cost=breakdown['labor_cost'],
+        overhead_cost=breakdown['overhead_cost'],
+        unit_cost=breakdown['unit_cost'],
+        confidence=breakdown['rate_coverage'],
+        breakdown=breakdown['components'],
+        calculated_at=breakdown['calculated_at'],
+    )
+
+
+@router.post(
+    "/should-cost",
+    response_model=ShouldCostResponse,
+    summary="Calculate should-cost",
+    description="Calculate the should-cost component breakdown for a single material",
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid request"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+    }
+)
+async def calculate_should_cost(
+    request: ShouldCostRequest,
+    ml_service: MLService = Depends(get_ml_service),
+    user=Depends(get_current_user),
+    _=Depends(rate_limit("ml_predict")),
+):
+    """Calculate should-cost for one material from its component specifications."""
+    try:
+        breakdowns = await ml_service.calculate_should_cost_batch([(request.components, request.quantity)])
+        return _should_cost_response(request, breakdowns[0])
+    
+    except (ValueError, TypeError) as e:
+        logger.error(f"Validation error in should-cost: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except Exception as e:
+        logger.error(f"Error in should-cost calculation: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post(
+    "/should-cost/batch",
+    response_model=BatchShouldCostResponse,
+    summary="Batch should-cost",
+    description="Calculate should-cost breakdowns for many materials in one vectorized pass",
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid request"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+    }
+)
+async def calculate_should_cost_batch(
+    request: BatchShouldCostRequest,
+    ml_service: MLService = Depends(get_ml_service),
+    user=Depends(get_current_user),
+    _=Depends(rate_limit("ml_predict")),
+):
+    """
+    Calculate should-costs for up to 10,000 materials at once.
+    
+    Results are returned in request order.
+    """
+    started = time.perf_counter()
+    try:
+        breakdowns = await ml_service.calculate_should_cost_batch(
+            [(item.components, item.quantity) for item in request.items]
+        )
+        
+        logger.info(
+            "Batch should-cost request",
+            item_count=len(request.items),
+            user_id=str(user.id) if user else None,
+        )
+        
+        return BatchShouldCostResponse(
+            results=[
+                _should_cost_response(item, breakdown)
+                for item, breakdown in zip(request.items, breakdowns)
+            ],
+            total_items=len(request.items),
+            processing_time_seconds=time.perf_counter() - started,
+        )
+    
+    except (ValueError, TypeError) as e:
+        logger.error(f"Validation error in batch should-cost: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except Exception as e:
+        logger.error(f"Error in batch should-cost: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post(
+    "/demand-forecast/batch",
+    response_model=BatchDemandForecastResponse,
+    summary="Batch demand forecasts",
+    description="Forecast demand for many materials, each from its own history",
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid request"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+    }
+)
+async def forecast_demand_batch(
+    request: BatchDemandForecastRequest,
+    ml_service: MLService = Depends(get_ml_service),
+    user=Depends(get_current_user),
+    _=Depends(rate_limit("ml_predict")),
+):
+    """
+    Forecast demand for many materials in one call.
+    
+    Per-material Prophet models are fitted in parallel worker processes and
+    cached; a material is refitted only when its history has changed.
+    """
+    started = time.perf_counter()
+    try:
+        histories = {
+            material.material_id: pd.DataFrame(
+                [(point.ds, point.y) for point in material.history], columns=['ds', 'y']
+            )
+            for material in request.materials
+        }
+        forecasts = await ml_service.forecast_demand_many(histories, request.forecast_periods)
+        
+        logger.info(
+            "Batch demand forecast request",
+            material_count=len(histories),
+            user_id=str(user.id) if user else None,
+        )
+        
+        return BatchDemandForecastResponse(
+            forecasts=forecasts,
+            total_materials=len(histories),
+            refitted_models=sum(1 for forecast in forecasts if forecast.get('refitted')),
+            failed_materials=sum(1 for forecast in forecasts if 'error' in forecast),
+            processing_time_seconds=time.perf_counter() - started,
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in batch demand forecast: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.get(
     "/batch/{batch_id}",
     response_model=BatchPredictionResponse,
@@ -333,64 +500,27 @@ async def process_batch_sync(
     
     start_time = datetime.utcnow()
     
-    # Process predictions concurrently with semaphore to limit concurrency
-    semaphore = asyncio.Semaphore(10)  # Max 10 concurrent predictions
-    
-    async def process_single_prediction(pred_request):
-        async with semaphore:
-            try:
-                result = await ml_service.predict_price(
-                    material_id=pred_request.material_id,
-                    quantity=float(pred_request.quantity),
-                    supplier_id=pred_request.supplier_id,
-                    delivery_date=pred_request.delivery_date,
-                    region=pred_request.region,
-                    payment_terms=pred_request.payment_terms,
-                    specifications=pred_request.specifications,
-                    context=pred_request.context,
-                )
-                
-                return PricePredictionResponse(
-                    material_id=pred_request.material_id,
-                    quantity=pred_request.quantity,
-                    predicted_price=result["predicted_price"],
-                    unit_price=result["unit_price"],
-                    currency=result.get("currency", "USD"),
-                    confidence_score=result["confidence_score"],
-                    prediction_interval=result["prediction_interval"],
-                    model_version=result["model_version"],
-                    features_used=result["features_used"],
-                    similar_quotes=result.get("similar_quotes", []),
-                    recommendations=result.get("recommendations", []),
-                    metadata=result.get("metadata", {}),
-                    created_at=datetime.utcnow(),
-                )
-                
-            except Exception as e:
-                logger.error(f"Error processing prediction: {e}")
-                return {
-                    "error": str(e),
-                    "material_id": pred_request.material_id,
-                }
-    
-    # Execute all predictions
-    results = await asyncio.gather(
-        *[process_single_prediction(pred) for pred in predictions],
-        return_exceptions=True
-    )
+    # One vectorized, segment-routed call for the whole batch
+    try:
+        prediction_results = await ml_service.predict_prices(
+            [_prediction_item(pred_request) for pred_request in predictions],
+            include_uncertainty=True,
+        )
+    except Exception as e:
+        logger.error(f"Error processing batch {batch_id}: {e}", exc_info=True)
+        prediction_results = []
     
-    # Separate successful results from errors
-    for result in results:
-        if isinstance(result, dict) and "error" in result:
-            batch_response.errors.append(result)
-            batch_response.failed_predictions += 1
-        elif isinstance(result, PricePredictionResponse):
-            batch_response.results.append(result)
+    for index, pred_request in enumerate(predictions):
+        try:
+            if index >= len(prediction_results) or not prediction_results[index]:
+                raise ValueError("No prediction returned")
+            batch_response.results.append(_prediction_response(pred_request, prediction_results[index]))
             batch_response.completed_predictions += 1
-        else:
+        except Exception as e:
+            logger.error(f"Error processing prediction: {e}")
             batch_response.errors.append({
-                "error": "Unknown error",
-                "result": str(result),
+                "error": str(e),
+                "material_id": pred_request.material_id,
             })
             batch_response.failed_predictions += 1
     
@@ -494,7 +624,11 @@ async def log_prediction(
 ):
     """Log prediction for audit and monitoring"""
     try:
-        # This would typically log to database or monitoring system
+        # Successful predictions are written to the prediction log by MLService;
+        # request-level failures never reach a model, so record them here
+        if not success:
+            get_prediction_log_writer().log_failure('price_predictor', error or 'unknown error')
+        
         logger.info(
             "Prediction logged",
             user_id=user_id,
@@ -39,6 +39,38 @@ class Settings(BaseSettings):
     MODEL_CACHE_TTL: int = 3600  # seconds
     MODEL_PREDICTION_TIMEOUT: int = 30  # seconds
     MAX_BATCH_SIZE: int = 1000
+    MODEL_MEMORY_BUDGET_MB: int = 2048
+    MODEL_IDLE_EVICTION_SECONDS: int = 1800
+    MODEL_HOUSEKEEPING_SECONDS: float = 60.0  # idle-eviction sweep and usage-count flush; 0 disables
+    MODEL_MMAP_MODE: Optional[str] = "r"
+    MODEL_WARMUP_LIST: List[str] = ["price_predictor", "anomaly_detector"]
+    MODEL_WARMUP_TOP_N: int = 3
+    COMPILED_INFERENCE_ENABLED: bool = True
+    # Columns the scheduled retraining segments price models by, category first
+    # (e.g. ["material_category", "supplier_region"]; serving routes on these
+    # two columns only); empty trains the global model only
+    PRICE_SEGMENT_BY: List[str] = []
+    SEGMENT_MIN_SAMPLES: int = 200
+    SEGMENT_TRAINING_JOBS: int = -1
+    OPTUNA_STORAGE_URL: str = "sqlite:///ml_artifacts/optuna.db"
+    OPTUNA_JOBS: int = 0  # parallel trial workers; 0 = one per CPU
+    
+    # Prediction Log
+    PREDICTION_LOG_ENABLED: bool = True
+    PREDICTION_LOG_PATH: str = "./ml_artifacts/prediction_log"
+    PREDICTION_LOG_BUFFER_SIZE: int = 5000
+    PREDICTION_LOG_FLUSH_SECONDS: float = 10.0
+    PREDICTION_LOG_RETENTION_DAYS: int = 90
+    
+    # Training Data Snapshots
+    TRAINING_SNAPSHOT_PATH: str = "./ml_artifacts/training_snapshots"
+    TRAINING_SNAPSHOT_MAX_PARTS: int = 32
+    ETL_CHUNK_SIZE: int = 10000
+    ONLINE_FEATURE_SYNC_SECONDS: float = 30.0  # prices table polling for serving lag features; 0 disables
+    PRICE_TRAINING_LOOKBACK_DAYS: int = 730
+    FORECAST_JOBS: int = 0  # worker processes for per-material forecasts; 0 = CPUs / threads per task
+    FORECAST_THREADS_PER_TASK: int = 1
+    FORECAST_MODEL_CACHE_SIZE: int = 5000
     
     # Feature Store
     FEATURE_STORE_ENABLED: bool = False
@@ -64,6 +96,13 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_REQUESTS_PER_MINUTE: int = 60
     RATE_LIMIT_BURST: int = 10
+    RATE_LIMIT_LEASE_SIZE: int = 10  # tokens each worker claims per Redis round trip
+    RATE_LIMIT_LEASE_TTL: float = 1.0  # seconds before unused leased tokens lapse
+    # Token bucket Lua script, shared with the Django app
+    RATE_LIMIT_SCRIPT_PATH: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "django_app", "apps", "core", "token_bucket.lua",
+    )
     
     # Caching
     PREDICTION_CACHE_TTL: int = 300  # 5 minutes
@@ -146,6 +185,8 @@ MODEL_CONFIG = {
             "seasonality",
         ],
         "target": "price",
+        # Bounds of the 80% prediction interval; the point model gives the estimate
+        "quantiles": [0.1, 0.9],
         "preprocessing": {
             "scaler": "StandardScaler",
             "categorical_encoding": "LabelEncoder",
@@ -3,8 +3,9 @@ FastAPI dependencies for authentication, authorization, and services
 """
 import asyncio
 import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Dict, Any
-from functools import wraps
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import redis.asyncio as redis
@@ -36,11 +37,60 @@ async def get_redis() -> redis.Redis:
 
 
 # Rate limiting
+#
+# Token bucket evaluated atomically in Redis: one round trip per check, using
+# the Redis server clock. ``requested`` tokens are granted when available;
+# otherwise as many as are left, provided that is at least ``minimum``. The
+# script is the one Django's ThreatDetectionMiddleware runs
+# (django_app/apps/core/token_bucket.lua). Buckets are not shared: keys are
+# namespaced by this service's limit types.
+@lru_cache(maxsize=1)
+def load_token_bucket_script() -> str:
+    """Lua source of the token bucket, read from ``RATE_LIMIT_SCRIPT_PATH``"""
+    with open(settings.RATE_LIMIT_SCRIPT_PATH, encoding="utf-8") as script_file:
+        return script_file.read()
+
+
 class RateLimiter:
-    """Rate limiter using Redis"""
+    """
+    Token-bucket rate limiter using Redis
+    
+    With ``lease_size`` > 1 each process claims up to that many tokens per
+    round trip and serves subsequent requests for the same key from the local
+    lease until it runs out or expires after ``lease_ttl`` seconds. Unused
+    leased tokens are simply forgotten, so leasing can only make the limit
+    stricter, never looser.
+    """
     
-    def __init__(self, redis_client: redis.Redis):
+    MAX_LEASES = 10000
+    
+    def __init__(self, redis_client: redis.Redis, lease_size: int = None, lease_ttl: float = None):
         self.redis = redis_client
+        self.lease_size = lease_size if lease_size is not None else settings.RATE_LIMIT_LEASE_SIZE
+        self.lease_ttl = lease_ttl if lease_ttl is not None else settings.RATE_LIMIT_LEASE_TTL
+        self._script = redis_client.register_script(load_token_bucket_script())
+        # key -> [tokens left, lease expiry (monotonic)]
+        self._leases: "OrderedDict[str, list]" = OrderedDict()
+    
+    def _take_leased(self, key: str) -> Optional[int]:
+        """Consume one locally leased token; returns the tokens left or None"""
+        lease = self._leases.get(key)
+        if lease is None:
+            return None
+        if lease[0] <= 0 or lease[1] < time.monotonic():
+            del self._leases[key]
+            return None
+        lease[0] -= 1
+        self._leases.move_to_end(key)
+        return lease[0]
+    
+    def _store_lease(self, key: str, tokens: int) -> None:
+        if tokens <= 0:
+            return
+        self._leases[key] = [tokens, time.monotonic() + self.lease_ttl]
+        self._leases.move_to_end(key)
+        while len(self._leases) > self.MAX_LEASES:
+            self._leases.popitem(last=False)
     
     async def is_allowed(
         self,
@@ -56,104 +106,98 @@ class RateLimiter:
             key: Rate limit key (user_id, IP, etc.)
             limit: Number of requests allowed per window
             window: Time window in seconds
-            burst: Burst allowance (optional)
+            burst: Burst allowance on top of ``limit`` (optional)
         
         Returns:
             (is_allowed, metadata)
         """
-        now = int(time.time())
-        pipeline = self.redis.pipeline()
-        
-        # Remove expired entries
-        pipeline.zremrangebyscore(key, 0, now - window)
-        
-        # Count current requests
-        pipeline.zcard(key)
-        
-        # Add current request
-        pipeline.zadd(key, {str(now): now})
-        
-        # Set expiry
-        pipeline.expire(key, window)
-        
-        results = await pipeline.execute()
-        current_requests = results[1]
-        
-        # Check if allowed
-        allowed = current_requests < limit
-        
-        if burst and not allowed:
-            # Check burst allowance
-            burst_key = f"{key}:burst"
-            burst_count = await self.redis.get(burst_key)
-            if burst_count is None:
-                burst_count = 0
-            else:
-                burst_count = int(burst_count)
-            
-            if burst_count < burst:
-                allowed = True
-                await self.redis.incr(burst_key)
-                await self.redis.expire(burst_key, 60)  # Reset burst every minute
-        
+        capacity = limit + (burst or 0)
         metadata = {
             "limit": limit,
             "window": window,
-            "current": current_requests,
-            "remaining": max(0, limit - current_requests),
-            "reset_at": now + window,
         }
         
-        return allowed, metadata
+        leased_left = self._take_leased(key)
+        if leased_left is not None:
+            metadata.update({"remaining": leased_left, "retry_after": 0, "leased": True})
+            return True, metadata
+        
+        # Never lease more than a tenth of the bucket so other workers are not starved
+        lease_size = max(1, min(self.lease_size, capacity // 10))
+        granted, tokens_left, retry_after_ms = await self._script(
+            keys=[key],
+            args=[capacity, limit / (window * 1000), lease_size, 1, window * 2],
+        )
+        granted = int(granted)
+        
+        self._store_lease(key, granted - 1)
+        metadata.update({
+            "remaining": int(tokens_left) + max(granted - 1, 0),
+            "retry_after": max(1, -(-int(retry_after_ms) // 1000)) if not granted else 0,
+            "leased": False,
+        })
+        return granted > 0, metadata
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+async def get_rate_limiter() -> RateLimiter:
+    """Process-wide rate limiter, so token leases persist across requests"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(await get_redis())
+    return _rate_limiter
+
+
+RATE_LIMITS = {
+    "default": (100, 3600),  # 100 requests per hour
+    "ml_predict": (60, 60),   # 60 predictions per minute
+    "batch_predict": (60, 60),  # 60 synchronous batch calls per minute
+    "bulk_operations": (10, 3600),  # 10 bulk operations per hour
+}
 
 
 def rate_limit(limit_type: str = "default"):
     """Rate limiting dependency"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            request = kwargs.get('request') or next((arg for arg in args if isinstance(arg, Request)), None)
-            redis_client = await get_redis()
-            rate_limiter = RateLimiter(redis_client)
-            
-            # Get rate limit configuration
-            limits = {
-                "default": (100, 3600),  # 100 requests per hour
-                "ml_predict": (60, 60),   # 60 predictions per minute
-                "bulk_operations": (10, 3600),  # 10 bulk operations per hour
-            }
-            
-            limit, window = limits.get(limit_type, limits["default"])
-            
-            # Create rate limit key
-            client_ip = request.client.host if request else "unknown"
-            user_id = getattr(request, 'user_id', None) if request else None
-            key = f"rate_limit:{limit_type}:{user_id or client_ip}"
-            
-            # Check rate limit
+    async def dependency(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        
+        rate_limiter = await get_rate_limiter()
+        limit, window = RATE_LIMITS.get(limit_type, RATE_LIMITS["default"])
+        
+        # Create rate limit key; get_current_user sets request.state.user_id,
+        # so endpoints must declare the user dependency before this one
+        client_ip = request.client.host if request.client else "unknown"
+        user_id = getattr(request.state, 'user_id', None)
+        key = f"rate_limit:bucket:{limit_type}:{user_id or client_ip}"
+        
+        # Check rate limit; fail open so an unavailable Redis does not take
+        # the service down
+        try:
             allowed, metadata = await rate_limiter.is_allowed(key, limit, window)
-            
-            if not allowed:
-                logger.warning(
-                    "Rate limit exceeded",
-                    limit_type=limit_type,
-                    key=key,
-                    metadata=metadata
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=f"Rate limit exceeded: {metadata['current']}/{metadata['limit']} requests",
-                    headers={
-                        "X-RateLimit-Limit": str(metadata['limit']),
-                        "X-RateLimit-Remaining": str(metadata['remaining']),
-                        "X-RateLimit-Reset": str(metadata['reset_at']),
-                        "Retry-After": str(window),
-                    }
-                )
-            
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+        except Exception as e:
+            logger.warning("Rate limit check failed", key=key, error=str(e))
+            return
+        
+        if not allowed:
+            logger.warning(
+                "Rate limit exceeded",
+                limit_type=limit_type,
+                key=key,
+                metadata=metadata
+            )
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: {metadata['limit']} requests per {metadata['window']}s",
+                headers={
+                    "X-RateLimit-Limit": str(metadata['limit']),
+                    "X-RateLimit-Remaining": str(metadata['remaining']),
+                    "Retry-After": str(metadata['retry_after']),
+                }
+            )
+    return dependency
 
 
 # Authentication dependencies
@@ -204,7 +248,7 @@ async def get_current_user(
                     self.is_superuser = payload.get('is_superuser', False)
             
             user = User(payload)
-            request.user_id = user.id
+            request.state.user_id = user.id
             return user
     
     # Try service key authentication
@@ -219,7 +263,7 @@ async def get_current_user(
                 self.is_superuser = False
         
         user = SystemUser()
-        request.user_id = user.id
+        request.state.user_id = user.id
         return user
     
     # No valid authentication found
@@ -291,6 +335,14 @@ async def get_ml_service():
     return _ml_service_instance
 
 
+async def close_ml_service():
+    """Stop the ML service singleton's background work, if it was created"""
+    if _ml_service_instance is not None:
+        await _ml_service_instance.close()
+    if _model_registry_instance is not None:
+        await _model_registry_instance.close()
+
+
 async def get_model_registry():
     """Get model registry instance"""
     global _model_registry_instance
@@ -302,6 +354,19 @@ async def get_model_registry():
     return _model_registry_instance
 
 
+_prediction_log_reader = None
+
+def get_prediction_log_reader():
+    """Get prediction log reader instance"""
+    global _prediction_log_reader
+    
+    if _prediction_log_reader is None:
+        from .services.prediction_log import PredictionLogReader
+        _prediction_log_reader = PredictionLogReader()
+    
+    return _prediction_log_reader
+
+
 # Database dependencies (if needed for direct DB access)
 async def get_db():
     """Get database connection"""
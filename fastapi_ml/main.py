@@ -16,11 +16,13 @@ import structlog
 from datetime import datetime
 
 from config import settings
-from dependencies import get_redis, get_db
+from dependencies import get_redis, get_db, close_ml_service
 from api.v1 import predictions, analytics, models as model_endpoints
 from api import websockets
 from services.model_registry import ModelRegistry
 from services.ml_service import MLService
+from services.monitoring import ModelMonitor
+from services.prediction_log import get_prediction_log_writer
 
 
 # Metrics
@@ -43,14 +45,20 @@ async def lifespan(app: FastAPI):
     app.state.model_registry = ModelRegistry()
     app.state.ml_service = MLService(app.state.model_registry)
     
-    # Load ML models
+    # Discover ML models and warm up the hottest ones
     try:
         await app.state.model_registry.load_models()
-        logger.info("ML models loaded successfully")
+        logger.info("ML models discovered successfully")
     except Exception as e:
         logger.error(f"Failed to load ML models: {e}")
         # Continue without models for now
     
+    # Index alert lists written before the alerts:models set existed
+    try:
+        await ModelMonitor.backfill_alert_index(app.state.redis)
+    except Exception as e:
+        logger.error(f"Failed to backfill alert index: {e}")
+    
     # Health check
     logger.info("ML service started successfully")
     
@@ -58,6 +66,11 @@ async def lifespan(app: FastAPI):
     
     # Cleanup
     logger.info("Shutting down ML service...")
+    # Stop the price sync loops before the stores they read and write close
+    await app.state.ml_service.close()
+    await app.state.model_registry.close()
+    await close_ml_service()
+    await get_prediction_log_writer().close()
     await app.state.redis.close()
     logger.info("ML service shutdown complete")
 
@@ -208,15 +221,15 @@ async def health_check():
 async def readiness_check():
     """Readiness check for Kubernetes"""
     try:
-        # Check if models are loaded
-        model_count = await app.state.model_registry.get_loaded_model_count()
+        # Models load lazily, so readiness only needs them to be discoverable
+        model_count = await app.state.model_registry.get_available_model_count()
         
         if model_count == 0:
             return JSONResponse(
                 status_code=503,
                 content={
                     "status": "not_ready",
-                    "reason": "No models loaded",
+                    "reason": "No models available",
                     "timestamp": datetime.utcnow().isoformat(),
                 }
             )
@@ -224,7 +237,8 @@ async def readiness_check():
         return {
             "status": "ready",
             "timestamp": datetime.utcnow().isoformat(),
-            "loaded_models": model_count,
+            "available_models": model_count,
+            "loaded_models": await app.state.model_registry.get_loaded_model_count(),
         }
     except Exception as e:
         return JSONResponse(
@@ -145,6 +145,43 @@ class BatchPredictionResponse(BaseModel):
     completed_at: Optional[datetime] = None
 
 
+# Should-cost schemas
+class ShouldCostRequest(BaseModel):
+    """Should-cost request"""
+    material_id: Optional[str] = Field(None, description="Material ID")
+    quantity: float = Field(default=1.0, gt=0, description="Quantity")
+    components: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Component specs (material_type, weight, complexity) plus optional labor_hours"
+    )
+
+
+class ShouldCostResponse(BaseModel):
+    """Should-cost response"""
+    material_id: Optional[str] = None
+    quantity: float
+    total_should_cost: float
+    material_cost: float
+    labor_cost: float
+    overhead_cost: float
+    unit_cost: float
+    confidence: float = Field(..., ge=0, le=1, description="Share of component weight priced from known material rates")
+    breakdown: List[Dict[str, Any]] = Field(default_factory=list)
+    calculated_at: datetime
+
+
+class BatchShouldCostRequest(BaseModel):
+    """Batch should-cost request"""
+    items: List[ShouldCostRequest] = Field(..., min_items=1, max_items=10000)
+
+
+class BatchShouldCostResponse(BaseModel):
+    """Batch should-cost response"""
+    results: List[ShouldCostResponse]
+    total_items: int
+    processing_time_seconds: float
+
+
 # Analytics schemas
 class AnomalyDetectionRequest(BaseModel):
     """Anomaly detection request"""
@@ -213,6 +250,33 @@ class DemandForecastResponse(BaseModel):
     created_at: datetime
 
 
+class DemandHistoryPoint(BaseModel):
+    """One observation of a material's demand history"""
+    ds: date
+    y: float
+
+
+class MaterialDemandHistory(BaseModel):
+    """Demand history of one material"""
+    material_id: str
+    history: List[DemandHistoryPoint] = Field(..., min_items=2)
+
+
+class BatchDemandForecastRequest(BaseModel):
+    """Batch demand forecast request"""
+    materials: List[MaterialDemandHistory] = Field(..., min_items=1, max_items=10000)
+    forecast_periods: int = Field(default=30, ge=1, le=365)
+
+
+class BatchDemandForecastResponse(BaseModel):
+    """Batch demand forecast response"""
+    forecasts: List[Dict[str, Any]]
+    total_materials: int
+    refitted_models: int
+    failed_materials: int
+    processing_time_seconds: float
+
+
 # Model management schemas
 class ModelInfo(BaseModel):
     """Model information"""
@@ -0,0 +1,456 @@
+"""
+Compiled Inference - Flat-array tree ensemble evaluation
+
+Trained LightGBM boosters and sklearn IsolationForests are exported to a
+single set of flat node arrays and evaluated with NumPy-vectorized traversal
+over every (row, tree) pair at once. This avoids the per-call DataFrame
+validation and Python-level overhead of the stock predictors, which dominates
+for the small batches typical of online serving.
+
+Compiled predictors are drop-in replacements: they expose the same predict /
+decision_function methods and delegate everything else to the wrapped model.
+``compile_model`` verifies outputs against the stock predictor before
+swapping it in, and leaves the model untouched if anything is unsupported.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import structlog
+
+logger = structlog.get_logger()
+
+# LightGBM missing-value handling codes
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# LightGBM kZeroThreshold
+_ZERO_THRESHOLD = 1e-35
+
+# Objectives whose raw score is the prediction (no output transform)
+_IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape')
+
+_ROW_CHUNK = 4096
+
+# Batch sizes above which the stock (multi-threaded C/Cython) predictors win;
+# see tests/performance/benchmark_tree_inference.py
+LIGHTGBM_MAX_COMPILED_ROWS = 32
+ISOLATION_FOREST_MAX_COMPILED_ROWS = 2048
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a model uses features the flat evaluator does not implement"""
+
+
+class FlatTreeEnsemble:
+    """
+    Tree ensemble stored as concatenated node arrays
+
+    Internal nodes route ``x[feature] <= threshold`` to ``left``; leaves have
+    ``feature == -1`` and carry ``value``. Tree outputs are accumulated in tree
+    order so sums match the stock predictors bit for bit.
+    """
+
+    def __init__(self,
+                 roots: np.ndarray,
+                 feature: np.ndarray,
+                 threshold: np.ndarray,
+                 left: np.ndarray,
+                 right: np.ndarray,
+                 value: np.ndarray,
+                 default_left: np.ndarray,
+                 missing_type: np.ndarray,
+                 max_depth: int,
+                 input_dtype: Any = np.float64):
+        self.roots = roots.astype(np.int64)
+        self.feature = feature.astype(np.int64)
+        self.threshold = threshold.astype(np.float64)
+        self.left = left.astype(np.int64)
+        self.right = right.astype(np.int64)
+        self.value = value.astype(np.float64)
+        self.default_left = default_left.astype(bool)
+        self.missing_type = missing_type.astype(np.int8)
+        self.max_depth = max_depth
+        self.input_dtype = input_dtype
+        self.n_trees = len(roots)
+
+        # Leaves loop back to themselves (threshold +inf, both children self)
+        # so the fast traversal can run a fixed number of levels unmasked
+        is_leaf = self.feature < 0
+        nodes = np.arange(len(self.feature))
+        self._fast_feature = np.where(is_leaf, 0, self.feature)
+        self._fast_threshold = np.where(is_leaf, np.inf, self.threshold)
+        self._children = np.stack([
+            np.where(is_leaf, nodes, self.left),
+            np.where(is_leaf, nodes, self.right),
+        ], axis=1).ravel()
+        self._has_zero_missing = bool(np.any(self.missing_type[~is_leaf] == MISSING_ZERO))
+
+    def _needs_missing_handling(self, X: np.ndarray) -> bool:
+        if np.isnan(X).any():
+            return True
+        return self._has_zero_missing and bool((np.abs(X) <= _ZERO_THRESHOLD).any())
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """Leaf value reached by every row in every tree, shape (rows, trees)"""
+        X = np.ascontiguousarray(np.asarray(X, dtype=self.input_dtype), dtype=np.float64)
+        if self._needs_missing_handling(X):
+            return self._leaf_values_with_missing(X)
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+
+        for _ in range(self.max_depth):
+            go_right = flat[row_offset + self._fast_feature[node]] > self._fast_threshold[node]
+            node = self._children[2 * node + go_right]
+
+        return self.value[node].reshape(n_rows, self.n_trees)
+
+    def _leaf_values_with_missing(self, X: np.ndarray) -> np.ndarray:
+        """Traversal applying LightGBM/sklearn missing-value routing"""
+        n_rows = X.shape[0]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        rows = np.arange(n_rows)[:, None]
+
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            active = feature >= 0
+            if not active.any():
+                break
+
+            x = X[rows, np.where(active, feature, 0)]
+            missing_type = self.missing_type[node]
+            is_nan = np.isnan(x)
+            x = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, x)
+            use_default = (
+                ((missing_type == MISSING_ZERO) & (np.abs(x) <= _ZERO_THRESHOLD))
+                | ((missing_type == MISSING_NAN) & is_nan)
+            )
+            go_left = np.where(use_default, self.default_left[node], x <= self.threshold[node])
+            next_node = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(active, next_node, node)
+
+        return self.value[node]
+
+    def accumulate(self, X: np.ndarray) -> np.ndarray:
+        """Sum of tree outputs per row, evaluated in row chunks"""
+        n_rows = X.shape[0]
+        output = np.zeros(n_rows, dtype=np.float64)
+        for start in range(0, n_rows, _ROW_CHUNK):
+            leaves = self.leaf_values(X[start:start + _ROW_CHUNK])
+            # cumsum adds strictly left to right, unlike pairwise sum()
+            output[start:start + _ROW_CHUNK] = np.cumsum(leaves, axis=1)[:, -1]
+        return output
+
+
+class _EnsembleBuilder:
+    """Accumulates nodes for FlatTreeEnsemble"""
+
+    def __init__(self):
+        self.roots: List[int] = []
+        self.feature: List[int] = []
+        self.threshold: List[float] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.value: List[float] = []
+        self.default_left: List[bool] = []
+        self.missing_type: List[int] = []
+        self.max_depth = 0
+
+    def add_node(self) -> int:
+        self.feature.append(-1)
+        self.threshold.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(0.0)
+        self.default_left.append(False)
+        self.missing_type.append(MISSING_NONE)
+        return len(self.feature) - 1
+
+    def build(self, input_dtype: Any = np.float64) -> FlatTreeEnsemble:
+        return FlatTreeEnsemble(
+            roots=np.array(self.roots),
+            feature=np.array(self.feature),
+            threshold=np.array(self.threshold),
+            left=np.array(self.left),
+            right=np.array(self.right),
+            value=np.array(self.value),
+            default_left=np.array(self.default_left),
+            missing_type=np.array(self.missing_type),
+            max_depth=self.max_depth,
+            input_dtype=input_dtype,
+        )
+
+
+def _to_matrix(X: Any, columns: Optional[List[str]] = None) -> np.ndarray:
+    if isinstance(X, pd.DataFrame):
+        if columns is not None and set(columns).issubset(X.columns):
+            X = X[columns]
+        return X.to_numpy(dtype=np.float64)
+    return np.asarray(X, dtype=np.float64)
+
+
+def _check_width(X: np.ndarray, n_features: int) -> np.ndarray:
+    """Reject inputs the flat traversal would silently misread"""
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise ValueError(
+            f"Input has shape {X.shape}, expected 2-D data with {n_features} features "
+            f"as in training"
+        )
+    return X
+
+
+# ----------------------------------------------------------------------
+# LightGBM
+# ----------------------------------------------------------------------
+
+def flatten_lightgbm(booster: Any) -> FlatTreeEnsemble:
+    """Export a LightGBM booster (up to its best iteration) to flat arrays"""
+    dump = booster.dump_model()
+    objective = str(dump.get('objective', '')).split(' ')[0]
+
+    if dump.get('num_class', 1) != 1 or dump.get('num_tree_per_iteration', 1) != 1:
+        raise UnsupportedModelError("Multiclass boosters are not supported")
+    if objective not in _IDENTITY_OBJECTIVES:
+        raise UnsupportedModelError(f"Objective '{objective}' has an output transform")
+    if dump.get('average_output'):
+        raise UnsupportedModelError("Random forest mode is not supported")
+
+    builder = _EnsembleBuilder()
+
+    def visit(tree_node: Dict[str, Any], depth: int) -> int:
+        index = builder.add_node()
+        if 'leaf_value' in tree_node:
+            builder.value[index] = float(tree_node['leaf_value'])
+            builder.max_depth = max(builder.max_depth, depth)
+            return index
+
+        if tree_node.get('decision_type') != '<=':
+            raise UnsupportedModelError("Categorical splits are not supported")
+
+        builder.feature[index] = int(tree_node['split_feature'])
+        builder.threshold[index] = float(tree_node['threshold'])
+        builder.default_left[index] = bool(tree_node.get('default_left', False))
+        builder.missing_type[index] = _MISSING_TYPES[tree_node.get('missing_type', 'None')]
+        builder.left[index] = visit(tree_node['left_child'], depth + 1)
+        builder.right[index] = visit(tree_node['right_child'], depth + 1)
+        return index
+
+    for tree_info in dump['tree_info']:
+        if tree_info.get('is_linear'):
+            raise UnsupportedModelError("Linear trees are not supported")
+        builder.roots.append(visit(tree_info['tree_structure'], 0))
+
+    return builder.build()
+
+
+class CompiledLightGBMPredictor:
+    """Drop-in ``lgb.Booster`` replacement for plain ``predict`` calls"""
+
+    def __init__(self, booster: Any, max_rows: Optional[int] = LIGHTGBM_MAX_COMPILED_ROWS):
+        self.booster = booster
+        self.ensemble = flatten_lightgbm(booster)
+        self.feature_names = booster.feature_name()
+        self.n_features = booster.num_feature()
+        self.max_rows = max_rows
+
+    def predict(self, data: Any, **kwargs) -> np.ndarray:
+        if kwargs or (self.max_rows is not None and len(data) > self.max_rows):
+            # raw_score, pred_leaf, pred_contrib, num_iteration... and large
+            # batches stay on the stock path
+            return self.booster.predict(data, **kwargs)
+        return self.ensemble.accumulate(_check_width(_to_matrix(data), self.n_features))
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'booster':
+            raise AttributeError(name)
+        return getattr(self.booster, name)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'booster': self.booster, 'max_rows': self.max_rows}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state['booster'], state.get('max_rows', LIGHTGBM_MAX_COMPILED_ROWS))
+
+
+# ----------------------------------------------------------------------
+# IsolationForest
+# ----------------------------------------------------------------------
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Average path length of an unsuccessful BST search (as in sklearn)"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    mask = n_samples > 2
+    n = n_samples[mask]
+    result[mask] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+
+def flatten_isolation_forest(forest: Any) -> FlatTreeEnsemble:
+    """Export a fitted IsolationForest; leaf values are path-length contributions"""
+    builder = _EnsembleBuilder()
+
+    for estimator, features in zip(forest.estimators_, forest.estimators_features_):
+        tree = estimator.tree_
+        path_lengths = _average_path_length(tree.n_node_samples)
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        offset = len(builder.feature)
+
+        # Node depth with the root at 1, matching decision_path().sum()
+        depths = np.zeros(tree.node_count, dtype=np.float64)
+        depths[0] = 1.0
+        for node in range(tree.node_count):
+            for child in (tree.children_left[node], tree.children_right[node]):
+                if child != -1:
+                    depths[child] = depths[node] + 1.0
+
+        for node in range(tree.node_count):
+            index = builder.add_node()
+            if tree.children_left[node] == -1:
+                builder.value[index] = depths[node] + path_lengths[node] - 1.0
+                builder.max_depth = max(builder.max_depth, int(depths[node]))
+                continue
+
+            builder.feature[index] = int(features[tree.feature[node]])
+            builder.threshold[index] = float(tree.threshold[node])
+            builder.left[index] = offset + int(tree.children_left[node])
+            builder.right[index] = offset + int(tree.children_right[node])
+            # NaN follows missing_go_to_left when trained with missing values,
+            # otherwise ``NaN <= threshold`` is false and goes right
+            builder.missing_type[index] = MISSING_NAN
+            builder.default_left[index] = bool(missing_left[node]) if missing_left is not None else False
+
+        builder.roots.append(offset)
+
+    # sklearn trees compare float32 inputs against float64 thresholds
+    return builder.build(input_dtype=np.float32)
+
+
+class CompiledIsolationForest:
+    """Drop-in ``IsolationForest`` replacement for scoring"""
+
+    def __init__(self, forest: Any, max_rows: Optional[int] = ISOLATION_FOREST_MAX_COMPILED_ROWS):
+        self.forest = forest
+        self.max_rows = max_rows
+        self.ensemble = flatten_isolation_forest(forest)
+        self.feature_names = list(getattr(forest, 'feature_names_in_', [])) or None
+        self.n_features = forest.n_features_in_
+        self.denominator = len(forest.estimators_) * float(_average_path_length([forest.max_samples_])[0])
+
+    def score_samples(self, X: Any) -> np.ndarray:
+        if self.max_rows is not None and len(X) > self.max_rows:
+            return self.forest.score_samples(X)
+        depths = self.ensemble.accumulate(_check_width(_to_matrix(X, self.feature_names), self.n_features))
+        if self.denominator == 0:
+            return -np.ones_like(depths)
+        return -(2 ** (-(depths / self.denominator)))
+
+    def decision_function(self, X: Any) -> np.ndarray:
+        return self.score_samples(X) - self.forest.offset_
+
+    def predict(self, X: Any) -> np.ndarray:
+        is_inlier = np.ones(len(X), dtype=int)
+        is_inlier[self.decision_function(X) < 0] = -1
+        return is_inlier
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'forest':
+            raise AttributeError(name)
+        return getattr(self.forest, name)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'forest': self.forest, 'max_rows': self.max_rows}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state['forest'], state.get('max_rows', ISOLATION_FOREST_MAX_COMPILED_ROWS))
+
+
+# ----------------------------------------------------------------------
+# Load-time selection
+# ----------------------------------------------------------------------
+
+def _probe_inputs(ensemble: FlatTreeEnsemble, n_features: int, n_rows: int = 256) -> np.ndarray:
+    """Random rows spread around the split thresholds of every feature"""
+    rng = np.random.default_rng(0)
+    probe = rng.normal(size=(n_rows, n_features))
+    internal = ensemble.feature >= 0
+    for feature in range(n_features):
+        thresholds = ensemble.threshold[internal & (ensemble.feature == feature)]
+        if len(thresholds):
+            probe[:, feature] = rng.choice(thresholds, n_rows) + rng.normal(scale=1e-3, size=n_rows)
+    # Exercise the missing-value routing on a slice of the rows
+    probe[:n_rows // 8][rng.random((n_rows // 8, n_features)) < 0.2] = np.nan
+    return probe
+
+
+def _compile_estimator(estimator: Any) -> Optional[Any]:
+    """Compile a single booster/forest if supported and verified"""
+    if isinstance(estimator, (CompiledLightGBMPredictor, CompiledIsolationForest)):
+        return estimator
+
+    try:
+        if hasattr(estimator, 'dump_model') and hasattr(estimator, 'num_feature'):
+            # Verify the compiled path itself, whatever the batch-size cutoff
+            compiled = CompiledLightGBMPredictor(estimator, max_rows=None)
+            probe = _probe_inputs(compiled.ensemble, estimator.num_feature())
+            expected, actual = estimator.predict(probe), compiled.predict(probe)
+            compiled.max_rows = LIGHTGBM_MAX_COMPILED_ROWS
+        elif hasattr(estimator, 'estimators_features_') and hasattr(estimator, 'offset_'):
+            compiled = CompiledIsolationForest(estimator, max_rows=None)
+            probe = _probe_inputs(compiled.ensemble, estimator.n_features_in_)
+            if compiled.feature_names:
+                probe = pd.DataFrame(probe, columns=compiled.feature_names)
+            expected, actual = estimator.decision_function(probe), compiled.decision_function(probe)
+            compiled.max_rows = ISOLATION_FOREST_MAX_COMPILED_ROWS
+        else:
+            return None
+    except UnsupportedModelError as e:
+        logger.info("Compiled inference not applicable", reason=str(e))
+        return None
+
+    if not np.allclose(expected, actual, rtol=0, atol=1e-9):
+        logger.warning(
+            "Compiled inference mismatch, keeping stock predictor",
+            max_abs_diff=float(np.max(np.abs(expected - actual)))
+        )
+        return None
+    return compiled
+
+
+def compile_model(model: Any) -> Tuple[Any, int]:
+    """
+    Swap supported estimators inside a served model for compiled evaluators
+
+    Handles bare boosters/forests as well as the service wrappers
+    (``PricePredictionModel.model`` / ``.quantile_models`` and
+    ``AnomalyDetectionModel.model``). Returns the model and the number of
+    estimators that were compiled.
+    """
+    compiled_count = 0
+
+    standalone = _compile_estimator(model)
+    if standalone is not None:
+        return standalone, 1
+
+    inner = getattr(model, 'model', None)
+    if inner is not None:
+        compiled = _compile_estimator(inner)
+        if compiled is not None:
+            model.model = compiled
+            compiled_count += 1
+
+    quantile_models = getattr(model, 'quantile_models', None)
+    if quantile_models:
+        for quantile, booster in list(quantile_models.items()):
+            compiled = _compile_estimator(booster)
+            if compiled is not None:
+                quantile_models[quantile] = compiled
+                compiled_count += 1
+
+    return model, compiled_count
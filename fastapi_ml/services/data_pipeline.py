@@ -14,6 +14,7 @@ import redis.asyncio as redis
 from pathlib import Path
 import json
 
+from .training_data import PriceDataExtractor
 from ..config import settings
 
 logger = structlog.get_logger()
@@ -247,6 +248,7 @@ class ETLPipeline:
         self.async_session = sessionmaker(
             self.db_engine, class_=AsyncSession, expire_on_commit=False
         )
+        self.price_extractor = PriceDataExtractor(self.db_engine)
     
     async def initialize(self, redis_client: redis.Redis):
         """Initialize ETL pipeline"""
@@ -257,53 +259,27 @@ class ETLPipeline:
                                  start_date: Optional[datetime] = None,
                                  end_date: Optional[datetime] = None,
                                  limit: Optional[int] = None) -> pd.DataFrame:
-        """Extract pricing data from database"""
+        """
+        Extract pricing data from database, streamed in chunks
+        
+        Rows are selected by the price's observation ``time`` within
+        ``[start_date, end_date]``; the prices table has no ``created_at``.
+        """
         try:
-            query = """
-            SELECT 
-                p.material_id,
-                p.supplier_id,
-                p.price_per_unit as price,
-                p.quantity,
-                p.currency,
-                p.created_at as timestamp,
-                m.category as material_category,
-                s.name as supplier_name,
-                s.region as supplier_region,
-                s.rating as supplier_rating
-            FROM pricing_rfq p
-            LEFT JOIN pricing_material m ON p.material_id = m.id
-            LEFT JOIN pricing_supplier s ON p.supplier_id = s.id
-            WHERE 1=1
-            """
-            
-            params = {}
-            if start_date:
-                query += " AND p.created_at >= :start_date"
-                params['start_date'] = start_date
-            
-            if end_date:
-                query += " AND p.created_at <= :end_date"
-                params['end_date'] = end_date
-            
-            query += " ORDER BY p.created_at DESC"
-            
-            if limit:
-                query += " LIMIT :limit"
-                params['limit'] = limit
+            df = await self.price_extractor.extract_frame(
+                since=start_date,
+                until=end_date,
+                limit=limit,
+                newest_first=True
+            )
+            if df.empty:
+                logger.warning("No pricing data found")
+                return pd.DataFrame()
             
-            async with self.async_session() as session:
-                result = await session.execute(text(query), params)
-                data = result.fetchall()
-                
-                if data:
-                    columns = result.keys()
-                    df = pd.DataFrame(data, columns=columns)
-                    logger.info(f"Extracted {len(df)} pricing records")
-                    return df
-                else:
-                    logger.warning("No pricing data found")
-                    return pd.DataFrame()
+            # Downstream validation compares against naive UTC timestamps
+            df['timestamp'] = df['timestamp'].dt.tz_localize(None)
+            logger.info(f"Extracted {len(df)} pricing records")
+            return df
                     
         except Exception as e:
             logger.error(f"Failed to extract pricing data: {e}")
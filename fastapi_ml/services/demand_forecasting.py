@@ -0,0 +1,240 @@
+"""
+Demand Forecasting - Per-material Prophet models fitted across worker processes
+
+Each material gets its own Prophet model. Fits and forecasts for a batch of
+materials are spread over a loky process pool, with each task limited to
+``threads_per_task`` BLAS/OpenMP threads so the pool never oversubscribes
+the machine. Fitted models are cached (in memory and as Prophet JSON on
+disk) under a version derived from the material's history: a material is
+only refitted when its history has changed since the last fit.
+
+A forecaster is shared by requests running in worker threads and may share
+its cache directory with other processes, so the in-memory caches are
+guarded by a lock and model files are written through unique temp files.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+import structlog
+from joblib import Parallel, delayed, parallel_backend
+
+from ..config import settings, MODEL_CONFIG
+
+logger = structlog.get_logger()
+
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def history_version(history: pd.DataFrame) -> str:
+    """Content hash of a ``ds``/``y`` history; changes whenever a point is added or revised"""
+    frame = history[['ds', 'y']].reset_index(drop=True)
+    return f"{len(frame)}-{pd.util.hash_pandas_object(frame, index=False).sum() & 0xFFFFFFFFFFFF:012x}"
+
+
+def _forecast_material(material_id: str,
+                       history: Optional[pd.DataFrame],
+                       model_json: Optional[str],
+                       hyperparameters: Dict[str, Any],
+                       periods: int) -> Tuple[str, Optional[str], Optional[pd.DataFrame], Optional[str]]:
+    """Fit (unless ``model_json`` is given) and forecast one material (runs in a worker process)"""
+    from prophet import Prophet
+    from prophet.serialize import model_from_json, model_to_json
+
+    # Prophet reports every fit through cmdstanpy at INFO
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    try:
+        if model_json is None:
+            model = Prophet(**hyperparameters)
+            model.fit(history)
+            model_json = model_to_json(model)
+        else:
+            model = model_from_json(model_json)
+
+        future = model.make_future_dataframe(periods=periods, include_history=False)
+        forecast = model.predict(future)[FORECAST_COLUMNS]
+        return material_id, model_json, forecast, None
+    except Exception as e:
+        return material_id, None, None, str(e)
+
+
+class DemandForecaster:
+    """
+    Serves per-material demand forecasts, reusing fits whose history is unchanged
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 n_jobs: Optional[int] = None,
+                 threads_per_task: Optional[int] = None,
+                 cache_size: Optional[int] = None,
+                 hyperparameters: Optional[Dict[str, Any]] = None):
+        self.cache_dir = Path(cache_dir or Path(settings.MODEL_STORAGE_PATH) / 'demand_forecasts')
+        self.threads_per_task = threads_per_task or settings.FORECAST_THREADS_PER_TASK
+        self.n_jobs = n_jobs or settings.FORECAST_JOBS or max(1, (os.cpu_count() or 1) // self.threads_per_task)
+        self.cache_size = cache_size or settings.FORECAST_MODEL_CACHE_SIZE
+        self.hyperparameters = hyperparameters or MODEL_CONFIG['demand_forecaster']['hyperparameters']
+
+        # material_id -> (history version, Prophet JSON)
+        self._models: 'OrderedDict[str, Tuple[str, str]]' = OrderedDict()
+        # (material_id, history version, periods) -> forecast frame
+        self._forecasts: 'OrderedDict[Tuple[str, str, int], pd.DataFrame]' = OrderedDict()
+        # Guards both caches; forecast_many runs in worker threads
+        self._lock = threading.Lock()
+
+    def _model_path(self, material_id: str) -> Path:
+        return self.cache_dir / f"{quote(str(material_id), safe='')}.json"
+
+    def _cached_model(self, material_id: str, version: str) -> Optional[str]:
+        """Fitted model JSON for this history version, from memory or disk"""
+        entry = self._lookup(self._models, material_id)
+        if entry is None:
+            path = self._model_path(material_id)
+            if path.exists():
+                try:
+                    stored = json.loads(path.read_text())
+                    entry = (stored['version'], stored['model'])
+                    self._remember(self._models, material_id, entry)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("Unreadable cached forecast model", material_id=material_id, error=str(e))
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def _store_model(self, material_id: str, version: str, model_json: str) -> None:
+        self._remember(self._models, material_id, (version, model_json))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._model_path(material_id)
+        # Concurrent refits of one material each write their own file; the
+        # last rename wins and readers never see a partial model
+        tmp = tempfile.NamedTemporaryFile('w', dir=self.cache_dir, prefix=f'.{path.stem}.',
+                                          suffix='.tmp', delete=False)
+        try:
+            with tmp:
+                json.dump({'version': version, 'model': model_json}, tmp)
+            os.replace(tmp.name, path)
+        except OSError:
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+
+    def _lookup(self, cache: OrderedDict, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _remember(self, cache: OrderedDict, key, value) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def _prepare_history(history: pd.DataFrame) -> pd.DataFrame:
+        """Prophet-ready history: ``ds``/``y`` only, deduplicated and sorted"""
+        if not {'ds', 'y'}.issubset(history.columns):
+            raise ValueError("Prophet requires 'ds' (datestamp) and 'y' (value) columns")
+        prepared = pd.DataFrame({'ds': pd.to_datetime(history['ds']), 'y': history['y'].astype(float)})
+        return prepared.drop_duplicates(subset=['ds'], keep='last').sort_values('ds').reset_index(drop=True)
+
+    def forecast_many(self,
+                      histories: Dict[str, pd.DataFrame],
+                      periods: int = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        Forecast ``periods`` days ahead for every material in ``histories``
+
+        Returns ``{material_id: {'forecast', 'version', 'refitted'}}``, or
+        ``{'error': ...}`` for materials whose fit failed. Blocking; call it
+        from a thread when on the event loop.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        jobs, versions = [], {}
+
+        for material_id, history in histories.items():
+            try:
+                prepared = self._prepare_history(history)
+            except (ValueError, TypeError) as e:
+                results[material_id] = {'error': str(e)}
+                continue
+            if len(prepared) < 2:
+                results[material_id] = {'error': 'Not enough history to fit a forecast'}
+                continue
+
+            version = history_version(prepared)
+            versions[material_id] = version
+            forecast = self._lookup(self._forecasts, (material_id, version, periods))
+            if forecast is not None:
+                results[material_id] = {'forecast': forecast, 'version': version, 'refitted': False}
+                continue
+
+            model_json = self._cached_model(material_id, version)
+            jobs.append(delayed(_forecast_material)(
+                material_id,
+                prepared if model_json is None else None,
+                model_json,
+                self.hyperparameters,
+                periods,
+            ))
+            results[material_id] = {'refitted': model_json is None}
+
+        if jobs:
+            logger.info(
+                "Running demand forecasts",
+                materials=len(jobs),
+                refits=sum(1 for r in results.values() if r.get('refitted')),
+                n_jobs=self.n_jobs,
+            )
+            with parallel_backend('loky', inner_max_num_threads=self.threads_per_task):
+                outputs = Parallel(n_jobs=min(self.n_jobs, len(jobs)))(jobs)
+
+            for material_id, model_json, forecast, error in outputs:
+                if error is not None:
+                    logger.warning("Demand forecast failed", material_id=material_id, error=error)
+                    results[material_id] = {'error': error}
+                    continue
+                version = versions[material_id]
+                if results[material_id]['refitted']:
+                    try:
+                        self._store_model(material_id, version, model_json)
+                    except OSError as e:
+                        # The fit is still cached in memory and served
+                        logger.warning("Could not store forecast model", material_id=material_id, error=str(e))
+                self._remember(self._forecasts, (material_id, version, periods), forecast)
+                results[material_id].update({'forecast': forecast, 'version': version})
+
+        return results
+
+    @staticmethod
+    def format_forecast(forecast: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Forecast rows as the ``predictions`` list returned by the API"""
+        return [
+            {
+                'date': ds.isoformat(),
+                'predicted_demand': float(yhat),
+                'lower_bound': float(lower),
+                'upper_bound': float(upper),
+            }
+            for ds, yhat, lower, upper in zip(
+                forecast['ds'], forecast['yhat'], forecast['yhat_lower'], forecast['yhat_upper']
+            )
+        ]
+
+
+_demand_forecaster: Optional[DemandForecaster] = None
+
+
+def get_demand_forecaster() -> DemandForecaster:
+    """Process-wide demand forecaster"""
+    global _demand_forecaster
+    if _demand_forecaster is None:
+        _demand_forecaster = DemandForecaster()
+    return _demand_forecaster
@@ -0,0 +1,233 @@
+"""
+Drift Sketches - Mergeable per-feature distribution sketches
+
+Each feature is summarized by a log-bucketed histogram (the DDSketch layout):
+a value ``x`` falls in bucket ``ceil(log_gamma(|x| / MIN_MAGNITUDE))`` on its
+sign's side, with a single bucket for values near zero. Bucket boundaries are
+fixed up front, so sketches built by different workers or for different
+time buckets merge by adding counts, quantiles are accurate to a relative
+``GAMMA - 1``, and a sketch never holds more than ``N_BINS`` counters.
+
+Drift statistics (PSI, Jensen-Shannon, KS) are computed from the ordered
+bucket counts in O(N_BINS) per feature, independent of sample size.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.spatial.distance import jensenshannon
+
+GAMMA = 1.04
+MIN_MAGNITUDE = 1e-6
+MAX_MAGNITUDE = 1e12
+
+_LOG_GAMMA = np.log(GAMMA)
+_MAGNITUDE_BINS = int(np.ceil(np.log(MAX_MAGNITUDE / MIN_MAGNITUDE) / _LOG_GAMMA)) + 1
+ZERO_BIN = _MAGNITUDE_BINS
+N_BINS = 2 * _MAGNITUDE_BINS + 1
+
+# Moment columns: non-null count, sum, sum of squares, null count
+_COUNT, _SUM, _SUMSQ, _NULLS = range(4)
+
+PREDICTION_FEATURE = '__prediction__'
+
+
+def bucket_index(values: np.ndarray) -> np.ndarray:
+    """Ordered bucket of each (finite) value; negative values come first"""
+    magnitude = np.abs(values)
+    scaled = np.clip(magnitude, MIN_MAGNITUDE, MAX_MAGNITUDE) / MIN_MAGNITUDE
+    offset = np.minimum(np.ceil(np.log(scaled) / _LOG_GAMMA).astype(np.int64), _MAGNITUDE_BINS - 1)
+
+    bins = np.where(values > 0, ZERO_BIN + 1 + offset, ZERO_BIN - 1 - offset)
+    return np.where(magnitude < MIN_MAGNITUDE, ZERO_BIN, bins)
+
+
+def bucket_value(bins: np.ndarray) -> np.ndarray:
+    """Representative value (bucket midpoint in log space) of each bucket"""
+    bins = np.asarray(bins)
+    offset = np.abs(bins - ZERO_BIN) - 1
+    magnitude = MIN_MAGNITUDE * GAMMA ** offset * 2 / (1 + GAMMA)
+    return np.where(bins == ZERO_BIN, 0.0, np.sign(bins - ZERO_BIN) * magnitude)
+
+
+class SketchSet:
+    """
+    Sketches of several features over one model and time range
+
+    ``counts`` is a dense ``(features, N_BINS)`` matrix; ``moments`` holds
+    count/sum/sum-of-squares/nulls per feature.
+    """
+
+    def __init__(self, features: List[str], counts: np.ndarray, moments: np.ndarray):
+        self.features = list(features)
+        self.counts = counts
+        self.moments = moments
+        self._index = {feature: i for i, feature in enumerate(self.features)}
+
+    @classmethod
+    def empty(cls, features: Iterable[str] = ()) -> 'SketchSet':
+        features = list(features)
+        return cls(features, np.zeros((len(features), N_BINS)), np.zeros((len(features), 4)))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'SketchSet':
+        """Sketch every column of a numeric frame"""
+        features = list(frame.columns)
+        values = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+        n_features = len(features)
+
+        finite = np.isfinite(values)
+        rows = np.broadcast_to(np.arange(n_features), values.shape)[finite]
+        bins = bucket_index(values[finite])
+        counts = np.bincount(rows * N_BINS + bins, minlength=n_features * N_BINS)
+
+        observed = np.where(finite, values, 0.0)
+        moments = np.column_stack([
+            finite.sum(axis=0),
+            observed.sum(axis=0),
+            (observed ** 2).sum(axis=0),
+            (~finite).sum(axis=0),
+        ]).astype(np.float64)
+
+        return cls(features, counts.reshape(n_features, N_BINS).astype(np.float64), moments)
+
+    @classmethod
+    def merge(cls, sketches: Iterable['SketchSet'], features: Optional[List[str]] = None) -> 'SketchSet':
+        """Sum of several sketch sets, optionally restricted to ``features``"""
+        sketches = list(sketches)
+        if features is None:
+            features = list(dict.fromkeys(f for sketch in sketches for f in sketch.features))
+        merged = cls.empty(features)
+
+        for sketch in sketches:
+            source, target = [], []
+            for position, feature in enumerate(features):
+                index = sketch._index.get(feature)
+                if index is not None:
+                    source.append(index)
+                    target.append(position)
+            if source:
+                merged.counts[target] += sketch.counts[source]
+                merged.moments[target] += sketch.moments[source]
+        return merged
+
+    def __contains__(self, feature: str) -> bool:
+        return feature in self._index
+
+    def histogram(self, feature: str) -> np.ndarray:
+        return self.counts[self._index[feature]]
+
+    def count(self, feature: str) -> int:
+        return int(self.moments[self._index[feature], _COUNT])
+
+    def mean(self, feature: str) -> float:
+        count, total = self.moments[self._index[feature], [_COUNT, _SUM]]
+        return float(total / count) if count else float('nan')
+
+    def std(self, feature: str) -> float:
+        count, total, total_sq = self.moments[self._index[feature], [_COUNT, _SUM, _SUMSQ]]
+        if not count:
+            return float('nan')
+        return float(np.sqrt(max(total_sq / count - (total / count) ** 2, 0.0)))
+
+    def quantiles(self, feature: str, q: Iterable[float]) -> np.ndarray:
+        """Approximate quantiles, accurate to a relative ``GAMMA - 1``"""
+        cumulative = np.cumsum(self.histogram(feature))
+        if cumulative[-1] == 0:
+            return np.full(len(list(q)), np.nan)
+        positions = np.searchsorted(cumulative, np.asarray(list(q)) * cumulative[-1], side='left')
+        return bucket_value(np.minimum(positions, N_BINS - 1))
+
+    # Sparse (feature, bin, count) form for storage
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        rows, bins = np.nonzero(self.counts)
+        return {
+            'features': np.array(self.features, dtype=str),
+            'rows': rows.astype(np.int32),
+            'bins': bins.astype(np.int32),
+            'counts': self.counts[rows, bins],
+            'moments': self.moments,
+        }
+
+    @classmethod
+    def from_arrays(cls,
+                    stored: Iterable[Dict[str, np.ndarray]],
+                    features: Optional[List[str]] = None) -> 'SketchSet':
+        """Merge sparse stored sketches with a single bincount"""
+        stored = list(stored)
+        if features is None:
+            features = list(dict.fromkeys(str(f) for arrays in stored for f in arrays['features']))
+        position = {feature: i for i, feature in enumerate(features)}
+
+        flat_parts, weight_parts = [], []
+        moments = np.zeros((len(features), 4))
+        for arrays in stored:
+            # Stored feature index -> merged position (-1 when not requested)
+            mapping = np.array([position.get(str(f), -1) for f in arrays['features']], dtype=np.int64)
+            if not len(mapping) or (mapping < 0).all():
+                continue
+            rows = mapping[arrays['rows']]
+            keep = rows >= 0
+            flat_parts.append(rows[keep] * N_BINS + arrays['bins'][keep])
+            weight_parts.append(arrays['counts'][keep])
+            requested = mapping >= 0
+            np.add.at(moments, mapping[requested], arrays['moments'][requested])
+
+        counts = np.bincount(
+            np.concatenate(flat_parts) if flat_parts else np.array([], dtype=np.int64),
+            weights=np.concatenate(weight_parts) if weight_parts else None,
+            minlength=len(features) * N_BINS,
+        ).astype(np.float64)
+        return cls(features, counts.reshape(len(features), N_BINS), moments)
+
+
+# ----------------------------------------------------------------------
+# Drift statistics over bucket counts
+# ----------------------------------------------------------------------
+
+_EPSILON = 1e-10
+
+
+def _grouped_proportions(reference: np.ndarray, current: np.ndarray, boundaries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Proportions of each histogram within the bucket groups starting at ``boundaries``"""
+    ref_groups = np.add.reduceat(reference, boundaries)
+    curr_groups = np.add.reduceat(current, boundaries)
+    return ref_groups / ref_groups.sum(), curr_groups / curr_groups.sum()
+
+
+def _quantile_boundaries(histogram: np.ndarray, n_groups: int) -> np.ndarray:
+    """First bucket of each of ``n_groups`` groups with roughly equal mass"""
+    cumulative = np.cumsum(histogram) / histogram.sum()
+    cuts = np.searchsorted(cumulative, np.linspace(0, 1, n_groups + 1)[1:-1], side='left') + 1
+    return np.unique(np.concatenate([[0], np.minimum(cuts, N_BINS - 1)]))
+
+
+def sketch_ks(reference: np.ndarray, current: np.ndarray) -> Tuple[float, float]:
+    """Two-sample KS statistic over bucketed CDFs and its asymptotic p-value"""
+    n_ref, n_curr = reference.sum(), current.sum()
+    statistic = float(np.max(np.abs(np.cumsum(reference) / n_ref - np.cumsum(current) / n_curr)))
+    effective_n = n_ref * n_curr / (n_ref + n_curr)
+    p_value = float(stats.kstwobign.sf(statistic * np.sqrt(effective_n)))
+    return statistic, p_value
+
+
+def sketch_psi(reference: np.ndarray, current: np.ndarray, n_groups: int = 10) -> float:
+    """PSI over reference-decile bucket groups"""
+    boundaries = _quantile_boundaries(reference, n_groups)
+    if len(boundaries) < 2:
+        return 0.0
+    ref_props, curr_props = _grouped_proportions(reference, current, boundaries)
+    ref_props = np.maximum(ref_props, _EPSILON)
+    curr_props = np.maximum(curr_props, _EPSILON)
+    return float(np.sum((curr_props - ref_props) * np.log(curr_props / ref_props)))
+
+
+def sketch_js(reference: np.ndarray, current: np.ndarray, n_groups: int = 50) -> float:
+    """Jensen-Shannon distance over bucket groups of equal combined mass"""
+    combined = reference / reference.sum() + current / current.sum()
+    boundaries = _quantile_boundaries(combined, n_groups)
+    ref_props, curr_props = _grouped_proportions(reference, current, boundaries)
+    ref_props = (ref_props + _EPSILON) / np.sum(ref_props + _EPSILON)
+    curr_props = (curr_props + _EPSILON) / np.sum(curr_props + _EPSILON)
+    return float(jensenshannon(ref_props, curr_props))
@@ -13,6 +13,7 @@ import structlog
 from redis import Redis
 import json
 
+from .temporal_features import TemporalFeatureEngine
 from ..config import settings, FEATURE_CONFIG
 
 logger = structlog.get_logger()
@@ -83,6 +84,7 @@ class FeatureEngineer:
         self.feature_store = feature_store
         self.feature_transformers = {}
         self.feature_history = {}
+        self.temporal_features = TemporalFeatureEngine(FEATURE_CONFIG.get('price_features', []))
         
     async def engineer_price_features(self, 
                                     data: pd.DataFrame,
@@ -95,9 +97,12 @@ class FeatureEngineer:
             if 'timestamp' in features.columns:
                 features = self._add_time_features(features)
             
-            # Price lag features
+            # Price lag features: computed from history when training, served
+            # from the incremental per-(material, supplier) state at inference
             if target_column in features.columns:
                 features = self._add_price_lag_features(features, target_column)
+            else:
+                features = self.temporal_features.transform_online(features)
             
             # Statistical features
             features = self._add_statistical_features(features, target_column)
@@ -168,48 +173,11 @@ class FeatureEngineer:
         return features
     
     def _add_price_lag_features(self, df: pd.DataFrame, target_column: str) -> pd.DataFrame:
-        """Add price lag and rolling window features"""
-        features = df.copy()
-        
-        if target_column not in features.columns:
-            return features
-        
-        # Sort by timestamp for proper lag calculation
-        if 'timestamp' in features.columns:
-            features = features.sort_values('timestamp')
-        
-        # Group by material/supplier for meaningful lags
-        group_cols = []
-        for col in ['material_id', 'supplier_id', 'category']:
-            if col in features.columns:
-                group_cols.append(col)
+        """Add calendar-based price lag and rolling window features"""
+        if target_column not in df.columns:
+            return df.copy()
         
-        if group_cols:
-            # Lag features
-            price_features = FEATURE_CONFIG.get('price_features', [])
-            
-            for feature_name in price_features:
-                if 'lag' in feature_name:
-                    lag_days = int(feature_name.split('_')[-1])
-                    features[feature_name] = features.groupby(group_cols)[target_column].shift(lag_days)
-                
-                elif 'rolling_mean' in feature_name:
-                    window_days = int(feature_name.split('_')[-1])
-                    features[feature_name] = (
-                        features.groupby(group_cols)[target_column]
-                        .rolling(window=window_days, min_periods=1)
-                        .mean()
-                        .reset_index(level=0, drop=True)
-                    )
-                
-                elif 'rolling_std' in feature_name:
-                    window_days = int(feature_name.split('_')[-1])
-                    features[feature_name] = (
-                        features.groupby(group_cols)[target_column]
-                        .rolling(window=window_days, min_periods=1)
-                        .std()
-                        .reset_index(level=0, drop=True)
-                    )
+        features = self.temporal_features.compute_batch(df, target_column)
         
         # Price change features
         if 'price_lag_1' in features.columns:
@@ -220,6 +188,12 @@ class FeatureEngineer:
         
         return features
     
+    def ingest_prices(self, prices: pd.DataFrame, target_column: str = 'price') -> int:
+        """Fold observed prices into the online lag/rolling state"""
+        if prices.empty:
+            return 0
+        return self.temporal_features.ingest(prices, target_column)
+    
     def _add_statistical_features(self, df: pd.DataFrame, target_column: str) -> pd.DataFrame:
         """Add statistical aggregation features"""
         features = df.copy()
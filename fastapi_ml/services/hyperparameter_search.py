@@ -0,0 +1,203 @@
+"""
+Hyperparameter Search - Parallel, resumable Optuna studies for LightGBM
+
+Trials run in loky worker processes that share one Optuna study through an
+RDB storage (SQLite by default), so an interrupted search resumes from the
+trials already recorded. The training and validation sets are binned into
+``lgb.Dataset`` binaries once; every trial loads those instead of
+re-binning the raw frames. Unpromising trials are pruned from the
+validation metric reported after each boosting round.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import lightgbm as lgb
+import optuna
+import pandas as pd
+import structlog
+from joblib import Parallel, delayed
+
+from ..config import settings
+
+logger = structlog.get_logger()
+
+FIXED_PARAMS = {
+    'objective': 'regression',
+    'metric': 'rmse',
+    'boosting_type': 'gbdt',
+    'verbosity': -1,
+}
+
+# Binning is fixed when the Dataset is built; disabling the pre-filter lets
+# trials vary min_child_samples on the same binary
+DATASET_PARAMS = {'feature_pre_filter': False, 'verbosity': -1}
+
+
+def suggest_lgb_params(trial: optuna.Trial) -> Dict[str, Any]:
+    """LightGBM search space"""
+    return {
+        'num_leaves': trial.suggest_int('num_leaves', 10, 100),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+        'feature_fraction': trial.suggest_float('feature_fraction', 0.4, 1.0),
+        'bagging_fraction': trial.suggest_float('bagging_fraction', 0.4, 1.0),
+        'bagging_freq': trial.suggest_int('bagging_freq', 1, 7),
+        'min_child_samples': trial.suggest_int('min_child_samples', 5, 100),
+        'max_depth': trial.suggest_int('max_depth', 3, 12),
+        'reg_alpha': trial.suggest_float('reg_alpha', 0, 10),
+        'reg_lambda': trial.suggest_float('reg_lambda', 0, 10),
+        'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+    }
+
+
+class LightGBMPruningCallback:
+    """Report the validation metric each round and stop trials Optuna prunes"""
+
+    def __init__(self, trial: optuna.Trial, metric: str, valid_name: str = 'valid'):
+        self.trial = trial
+        self.metric = metric
+        self.valid_name = valid_name
+
+    def __call__(self, env: lgb.callback.CallbackEnv) -> None:
+        for data_name, metric, value, _ in env.evaluation_result_list:
+            if data_name == self.valid_name and metric == self.metric:
+                self.trial.report(value, step=env.iteration)
+                if self.trial.should_prune():
+                    raise optuna.TrialPruned(f"Pruned at iteration {env.iteration}")
+                return
+
+
+def create_storage(storage_url: str) -> optuna.storages.BaseStorage:
+    """RDB storage; SQLite gets a long busy timeout for concurrent workers"""
+    engine_kwargs = {'connect_args': {'timeout': 60}} if storage_url.startswith('sqlite') else {}
+    return optuna.storages.RDBStorage(storage_url, engine_kwargs=engine_kwargs)
+
+
+def data_fingerprint(X: pd.DataFrame, y: pd.Series) -> str:
+    """Short hash identifying a training set, used to name resumable studies"""
+    digest = hashlib.sha1()
+    digest.update(','.join(map(str, X.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).values.tobytes())
+    return digest.hexdigest()[:12]
+
+
+def _run_trials(study_name: str,
+                storage_url: str,
+                train_path: str,
+                valid_path: str,
+                n_trials: int,
+                num_threads: int,
+                seed: int) -> int:
+    """Run trials until the study holds ``n_trials`` finished ones (runs in a worker process)"""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=create_storage(storage_url),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+    )
+    train_data = lgb.Dataset(train_path, params=DATASET_PARAMS).construct()
+    valid_data = lgb.Dataset(valid_path, reference=train_data, params=DATASET_PARAMS).construct()
+
+    def objective(trial: optuna.Trial) -> float:
+        params = {**FIXED_PARAMS, **suggest_lgb_params(trial), 'num_threads': num_threads}
+        model = lgb.train(
+            params,
+            train_data,
+            valid_sets=[valid_data],
+            valid_names=['valid'],
+            callbacks=[
+                lgb.early_stopping(10, verbose=False),
+                LightGBMPruningCallback(trial, 'rmse'),
+            ],
+        )
+        return float(model.best_score['valid']['rmse'])
+
+    finished = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    study.optimize(
+        objective,
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=finished)],
+        catch=(lgb.basic.LightGBMError,),
+    )
+    return len(study.trials)
+
+
+def optimize_lgb_hyperparams(X_train: pd.DataFrame,
+                             y_train: pd.Series,
+                             X_val: pd.DataFrame,
+                             y_val: pd.Series,
+                             n_trials: int = 100,
+                             n_jobs: Optional[int] = None,
+                             study_name: Optional[str] = None,
+                             storage_url: Optional[str] = None) -> optuna.Study:
+    """
+    Search LightGBM hyperparameters with ``n_jobs`` parallel workers
+
+    The study is named after the training data unless ``study_name`` is
+    given, so re-running on the same data resumes the earlier search and
+    only runs the remaining trials. Blocking.
+    """
+    n_jobs = n_jobs or settings.OPTUNA_JOBS or os.cpu_count() or 1
+    storage_url = storage_url or settings.OPTUNA_STORAGE_URL
+    study_name = study_name or f"price_predictor_{data_fingerprint(X_train, y_train)}"
+
+    if storage_url.startswith('sqlite:///'):
+        Path(storage_url[len('sqlite:///'):]).parent.mkdir(parents=True, exist_ok=True)
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=create_storage(storage_url),
+        direction='minimize',
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=10),
+        load_if_exists=True,
+    )
+    already_finished = sum(
+        1 for trial in study.trials
+        if trial.state in (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+    )
+    remaining = n_trials - already_finished
+    if remaining <= 0:
+        logger.info("Hyperparameter search already complete", study_name=study_name, trials=already_finished)
+        return study
+    n_jobs = min(n_jobs, remaining)
+    num_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+
+    with tempfile.TemporaryDirectory(prefix='lgb_search_') as workdir:
+        train_path = os.path.join(workdir, 'train.bin')
+        valid_path = os.path.join(workdir, 'valid.bin')
+        train_data = lgb.Dataset(X_train, label=y_train, params=DATASET_PARAMS, free_raw_data=False)
+        train_data.save_binary(train_path)
+        lgb.Dataset(X_val, label=y_val, reference=train_data, params=DATASET_PARAMS).save_binary(valid_path)
+
+        logger.info(
+            "Starting hyperparameter search",
+            study_name=study_name,
+            n_trials=n_trials,
+            resumed_trials=already_finished,
+            n_jobs=n_jobs,
+            threads_per_trial=num_threads,
+        )
+        Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(_run_trials)(study_name, storage_url, train_path, valid_path, n_trials, num_threads, seed)
+            for seed in range(n_jobs)
+        )
+
+    return optuna.load_study(study_name=study_name, storage=create_storage(storage_url))
+
+
+def best_lgb_params(study: optuna.Study) -> Dict[str, Any]:
+    """Full LightGBM parameter set of the study's best trial"""
+    return {**FIXED_PARAMS, **study.best_params}
+
+
+def study_summary(study: optuna.Study) -> Dict[str, float]:
+    """Trial counts and best score, logged as MLflow metrics"""
+    states = [trial.state for trial in study.trials]
+    return {
+        'optuna_best_rmse': float(study.best_value),
+        'optuna_trials_complete': float(states.count(optuna.trial.TrialState.COMPLETE)),
+        'optuna_trials_pruned': float(states.count(optuna.trial.TrialState.PRUNED)),
+        'optuna_trials_failed': float(states.count(optuna.trial.TrialState.FAIL)),
+    }
+
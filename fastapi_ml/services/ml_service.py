@@ -2,10 +2,11 @@
 ML Service - Core machine learning service for pricing predictions
 """
 import asyncio
+import time
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple, Union
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import structlog
 from sklearn.ensemble import IsolationForest, RandomForestRegressor
 import lightgbm as lgb
@@ -15,6 +16,10 @@ from redis import Redis
 
 from .model_registry import ModelRegistry, ModelMetadata
 from .feature_engineering import FeatureEngineer, FeatureStore
+from .model_routing import SegmentModelRouter
+from .prediction_log import get_prediction_log_writer
+from .demand_forecasting import get_demand_forecaster
+from .training_data import PriceDataExtractor, TRAINING_PRICE_TYPES
 from ..config import settings, MODEL_CONFIG
 
 logger = structlog.get_logger()
@@ -23,11 +28,21 @@ logger = structlog.get_logger()
 class PricePredictionModel:
     """
     LightGBM-based price prediction model with business logic
+    
+    Alongside the point model, quantile boosters (``objective='quantile'``)
+    are trained for each configured quantile. The outermost quantiles give
+    the prediction interval for each row independently of the rest of the batch.
     """
     
+    # z-score of the 90th percentile, used when no quantile models are available
+    FALLBACK_INTERVAL_Z = 1.2816
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.model = None
+        self.quantile_models: Dict[float, Any] = {}
+        self.quantiles = sorted(config.get('quantiles', MODEL_CONFIG['price_predictor'].get('quantiles', [])))
+        self.residual_std: Optional[float] = None
         self.feature_names = config.get('features', [])
         self.is_trained = False
         
@@ -36,12 +51,12 @@ class PricePredictionModel:
               y_val: Optional[pd.Series] = None) -> Dict[str, float]:
         """Train the price prediction model"""
         try:
-            # Prepare LightGBM datasets
-            train_data = lgb.Dataset(X, label=y, feature_name=self.feature_names)
+            # Prepare LightGBM datasets (binned once, shared by all boosters)
+            train_data = lgb.Dataset(X, label=y, feature_name=self.feature_names, free_raw_data=False)
             
             valid_sets = [train_data]
             if X_val is not None and y_val is not None:
-                val_data = lgb.Dataset(X_val, label=y_val, feature_name=self.feature_names)
+                val_data = lgb.Dataset(X_val, label=y_val, feature_name=self.feature_names, reference=train_data)
                 valid_sets.append(val_data)
             
             # Train model
@@ -54,6 +69,22 @@ class PricePredictionModel:
                 callbacks=[lgb.early_stopping(50), lgb.log_evaluation(0)]
             )
             
+            # Quantile models for prediction intervals
+            self.quantile_models = {}
+            for quantile in self.quantiles:
+                quantile_params = {
+                    **hyperparams,
+                    'objective': 'quantile',
+                    'alpha': quantile,
+                    'metric': 'quantile',
+                }
+                self.quantile_models[quantile] = lgb.train(
+                    quantile_params,
+                    train_data,
+                    valid_sets=valid_sets,
+                    callbacks=[lgb.early_stopping(50), lgb.log_evaluation(0)]
+                )
+            
             self.is_trained = True
             
             # Calculate metrics
@@ -61,17 +92,30 @@ class PricePredictionModel:
             metrics = self._calculate_metrics(y, y_pred)
             
             if X_val is not None and y_val is not None:
-                y_val_pred = self.model.predict(X_val)
+                y_val_pred, lower, upper = self.predict_interval(X_val)
                 val_metrics = self._calculate_metrics(y_val, y_val_pred)
                 metrics.update({f'val_{k}': v for k, v in val_metrics.items()})
+                metrics['val_interval_coverage'] = float(np.mean((y_val >= lower) & (y_val <= upper)))
+                self.residual_std = float(np.std(np.asarray(y_val) - y_val_pred))
+            else:
+                self.residual_std = float(np.std(np.asarray(y) - y_pred))
             
-            logger.info("Price prediction model trained", metrics=metrics)
+            logger.info("Price prediction model trained", metrics=metrics, quantiles=self.quantiles)
             return metrics
             
         except Exception as e:
             logger.error("Model training failed", error=str(e), exc_info=True)
             raise
     
+    @staticmethod
+    def _as_matrix(X: pd.DataFrame) -> Any:
+        """Convert once so each booster skips its own DataFrame validation"""
+        if isinstance(X, pd.DataFrame) and all(
+            pd.api.types.is_numeric_dtype(dtype) for dtype in X.dtypes
+        ):
+            return X.to_numpy(dtype=np.float64)
+        return X
+    
     def predict(self, X: pd.DataFrame) -> np.ndarray:
         """Make price predictions"""
         if not self.is_trained or self.model is None:
@@ -79,16 +123,39 @@ class PricePredictionModel:
         
         return self.model.predict(X)
     
-    def predict_with_uncertainty(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Predict with uncertainty estimation"""
-        predictions = self.predict(X)
+    def predict_quantiles(self, X: pd.DataFrame) -> Dict[float, np.ndarray]:
+        """Predict every configured quantile from a single input conversion"""
+        if not self.is_trained or self.model is None:
+            raise ValueError("Model not trained")
+        
+        data = self._as_matrix(X)
+        return {quantile: booster.predict(data) for quantile, booster in self.quantile_models.items()}
+    
+    def predict_interval(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Point prediction with per-row lower/upper interval bounds"""
+        if not self.is_trained or self.model is None:
+            raise ValueError("Model not trained")
+        
+        data = self._as_matrix(X)
+        predictions = self.model.predict(data)
         
-        # Simple uncertainty based on feature importance and prediction confidence
-        # In production, consider using quantile regression or ensemble methods
-        feature_importance = self.model.feature_importance()
-        uncertainty = np.std(predictions) * np.ones_like(predictions) * 0.1
+        quantile_models = getattr(self, 'quantile_models', {})
+        if len(quantile_models) >= 2:
+            lower_q, upper_q = min(quantile_models), max(quantile_models)
+            lower = np.minimum(quantile_models[lower_q].predict(data), predictions)
+            upper = np.maximum(quantile_models[upper_q].predict(data), predictions)
+        else:
+            # Models trained before quantile support: constant residual band
+            half_width = self.FALLBACK_INTERVAL_Z * (getattr(self, 'residual_std', None) or 0.0)
+            lower = predictions - half_width
+            upper = predictions + half_width
         
-        return predictions, uncertainty
+        return predictions, lower, upper
+    
+    def predict_with_uncertainty(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict with uncertainty (half-width of the quantile interval)"""
+        predictions, lower, upper = self.predict_interval(X)
+        return predictions, (upper - lower) / 2
     
     def _calculate_metrics(self, y_true: pd.Series, y_pred: np.ndarray) -> Dict[str, float]:
         """Calculate model performance metrics"""
@@ -205,8 +272,8 @@ class DemandForecastModel:
         self.model = Prophet(**config.get('hyperparameters', {}))
         self.is_trained = False
         
-    def train(self, data: pd.DataFrame) -> Dict[str, float]:
-        """Train demand forecast model"""
+    def train(self, data: pd.DataFrame, cv_parallel: Optional[str] = 'processes') -> Dict[str, float]:
+        """Train demand forecast model; cutoffs are cross-validated in parallel by default"""
         try:
             # Prepare data for Prophet (requires 'ds' and 'y' columns)
             if not all(col in data.columns for col in ['ds', 'y']):
@@ -218,7 +285,9 @@ class DemandForecastModel:
             # Calculate metrics using cross-validation
             from prophet.diagnostics import cross_validation, performance_metrics
             
-            df_cv = cross_validation(self.model, initial='180 days', period='30 days', horizon='30 days')
+            df_cv = cross_validation(
+                self.model, initial='180 days', period='30 days', horizon='30 days', parallel=cv_parallel
+            )
             df_metrics = performance_metrics(df_cv)
             
             metrics = {
@@ -256,8 +325,16 @@ class DemandForecastModel:
 class ShouldCostModel:
     """
     Should-cost modeling with component breakdown
+    
+    Material, labor and overhead tables are held as arrays (the last entry
+    of each is the default), and a batch of items is costed with array
+    operations over all of their components at once.
     """
     
+    DEFAULT_MATERIAL_COST = 10.0  # $10/kg
+    DEFAULT_LABOR_RATE = 50.0  # $50/hour
+    DEFAULT_OVERHEAD_FACTOR = 0.2  # 20%
+    
     def __init__(self):
         self.material_costs = {}
         self.labor_rates = {}
@@ -269,70 +346,108 @@ class ShouldCostModel:
         self.material_costs = cost_data.get('materials', {})
         self.labor_rates = cost_data.get('labor', {})
         self.overhead_factors = cost_data.get('overhead', {})
+        
+        self._material_index, self._material_table = self._build_table(
+            self.material_costs, self.DEFAULT_MATERIAL_COST)
+        self._labor_index, self._labor_table = self._build_table(
+            self.labor_rates, self.DEFAULT_LABOR_RATE)
+        self._overhead_index, self._overhead_table = self._build_table(
+            self.overhead_factors, self.DEFAULT_OVERHEAD_FACTOR)
         self.is_initialized = True
         
         logger.info("Should-cost model initialized")
     
+    @staticmethod
+    def _build_table(rates: Dict[str, float], fallback: float) -> Tuple[Dict[str, int], np.ndarray]:
+        """Key -> row index and a rate array whose last row is the default"""
+        keys = [key for key in rates if key != 'default']
+        table = np.array([float(rates[key]) for key in keys] + [float(rates.get('default', fallback))])
+        return {key: i for i, key in enumerate(keys)}, table
+    
     def calculate_should_cost(self, 
                             material_specs: Dict[str, Any],
                             quantity: int = 1) -> Dict[str, Any]:
         """Calculate should-cost with component breakdown"""
+        return self.calculate_should_cost_batch([(material_specs, quantity)])[0]
+    
+    def calculate_should_cost_batch(self,
+                                    items: List[Tuple[Dict[str, Any], float]]) -> List[Dict[str, Any]]:
+        """
+        Calculate should-costs for many ``(material_specs, quantity)`` pairs
+        
+        Dict-valued entries of ``material_specs`` are components
+        (``material_type``, ``weight`` in kg, ``complexity``); ``labor_hours``,
+        ``labor_type`` and ``overhead_category`` apply to the whole item.
+        """
         if not self.is_initialized:
             raise ValueError("Model not initialized")
         
-        breakdown = {
-            'material_cost': 0,
-            'labor_cost': 0,
-            'overhead_cost': 0,
-            'total_cost': 0,
-            'unit_cost': 0,
-            'components': []
-        }
+        n_items = len(items)
+        material_default = len(self._material_table) - 1
+        
+        # Flatten every item's components into parallel arrays
+        names, specs_list, owner, material_idx, weights, complexity = [], [], [], [], [], []
+        labor_hours = np.zeros(n_items)
+        labor_idx = np.full(n_items, len(self._labor_table) - 1)
+        overhead_idx = np.full(n_items, len(self._overhead_table) - 1)
+        quantities = np.zeros(n_items)
+        
+        for i, (material_specs, quantity) in enumerate(items):
+            quantities[i] = quantity
+            labor_hours[i] = material_specs.get('labor_hours', 0)
+            labor_idx[i] = self._labor_index.get(material_specs.get('labor_type'), labor_idx[i])
+            overhead_idx[i] = self._overhead_index.get(material_specs.get('overhead_category'), overhead_idx[i])
+            for component, specs in material_specs.items():
+                if not isinstance(specs, dict):
+                    continue
+                names.append(component)
+                specs_list.append(specs)
+                owner.append(i)
+                material_idx.append(self._material_index.get(specs.get('material_type', 'default'), material_default))
+                weights.append(specs.get('weight', 0))
+                complexity.append(specs.get('complexity', 1.0))
+        
+        owner = np.asarray(owner, dtype=np.int64)
+        material_idx = np.asarray(material_idx, dtype=np.int64)
+        component_costs = (
+            np.asarray(weights, dtype=np.float64)
+            * self._material_table[material_idx]
+            * np.asarray(complexity, dtype=np.float64)
+        )
         
-        # Calculate material costs
-        for component, specs in material_specs.items():
-            component_cost = self._calculate_component_cost(component, specs)
-            breakdown['components'].append({
-                'component': component,
-                'cost': component_cost,
+        material_cost = np.bincount(owner, weights=component_costs, minlength=n_items)
+        labor_cost = labor_hours * self._labor_table[labor_idx]
+        overhead_cost = (material_cost + labor_cost) * self._overhead_table[overhead_idx]
+        total_cost = material_cost + labor_cost + overhead_cost
+        unit_cost = np.divide(total_cost, quantities, out=np.zeros(n_items), where=quantities > 0)
+        
+        # Share of each item's component weight priced from a known material rate
+        known = (material_idx != material_default).astype(np.float64)
+        weight_array = np.asarray(weights, dtype=np.float64)
+        total_weight = np.bincount(owner, weights=weight_array, minlength=n_items)
+        known_weight = np.bincount(owner, weights=weight_array * known, minlength=n_items)
+        rate_coverage = np.divide(known_weight, total_weight, out=np.zeros(n_items), where=total_weight > 0)
+        
+        breakdowns = [
+            {
+                'material_cost': float(material_cost[i]),
+                'labor_cost': float(labor_cost[i]),
+                'overhead_cost': float(overhead_cost[i]),
+                'total_cost': float(total_cost[i]),
+                'unit_cost': float(unit_cost[i]),
+                'rate_coverage': float(rate_coverage[i]),
+                'components': []
+            }
+            for i in range(n_items)
+        ]
+        for name, specs, i, cost in zip(names, specs_list, owner.tolist(), component_costs.tolist()):
+            breakdowns[i]['components'].append({
+                'component': name,
+                'cost': cost,
                 'specs': specs
             })
-            breakdown['material_cost'] += component_cost
-        
-        # Calculate labor costs
-        labor_hours = material_specs.get('labor_hours', 0)
-        labor_rate = self.labor_rates.get('default', 50)  # $50/hour default
-        breakdown['labor_cost'] = labor_hours * labor_rate
-        
-        # Calculate overhead
-        base_cost = breakdown['material_cost'] + breakdown['labor_cost']
-        overhead_factor = self.overhead_factors.get('default', 0.2)  # 20% default
-        breakdown['overhead_cost'] = base_cost * overhead_factor
-        
-        # Total costs
-        breakdown['total_cost'] = (
-            breakdown['material_cost'] + 
-            breakdown['labor_cost'] + 
-            breakdown['overhead_cost']
-        )
-        breakdown['unit_cost'] = breakdown['total_cost'] / quantity if quantity > 0 else 0
-        
-        return breakdown
-    
-    def _calculate_component_cost(self, component: str, specs: Dict[str, Any]) -> float:
-        """Calculate cost for individual component"""
-        material_type = specs.get('material_type', 'default')
-        weight = specs.get('weight', 0)  # in kg
-        complexity_factor = specs.get('complexity', 1.0)
-        
-        # Base material cost
-        cost_per_kg = self.material_costs.get(material_type, 10)  # $10/kg default
-        base_cost = weight * cost_per_kg
-        
-        # Apply complexity factor
-        adjusted_cost = base_cost * complexity_factor
         
-        return adjusted_cost
+        return breakdowns
 
 
 class MLService:
@@ -345,8 +460,16 @@ class MLService:
         self.feature_engineer = FeatureEngineer()
         self.feature_store = FeatureStore()
         self.should_cost_model = ShouldCostModel()
+        self.demand_forecaster = get_demand_forecaster()
+        self.model_router = SegmentModelRouter(model_registry, 'price_predictor')
+        self.prediction_log = get_prediction_log_writer()
+        self.price_extractor = PriceDataExtractor()
         self.redis_client: Optional[Redis] = None
         
+        # Largest price id folded into the online lag/rolling feature state
+        self._last_price_id: Optional[int] = None
+        self._price_sync_task: Optional[asyncio.Task] = None
+        
         # Model instances
         self.price_model = None
         self.anomaly_model = None
@@ -371,12 +494,29 @@ class MLService:
             'overhead': {'default': 0.25}  # 25%
         })
         
+        # Keep the online lag/rolling feature state in step with the prices table
+        if settings.ONLINE_FEATURE_SYNC_SECONDS > 0 and self._price_sync_task is None:
+            self._price_sync_task = asyncio.create_task(self._sync_prices_periodically())
+        
         logger.info("ML service initialized")
     
+    async def close(self) -> None:
+        """Stop the price sync loop and wait for it to finish"""
+        task, self._price_sync_task = self._price_sync_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        logger.info("ML service closed")
+    
     async def predict_prices(self, 
                            items: List[Dict[str, Any]],
                            include_uncertainty: bool = True) -> List[Dict[str, Any]]:
         """Predict prices for multiple items"""
+        started = time.perf_counter()
         try:
             # Convert to DataFrame
             df = pd.DataFrame(items)
@@ -384,31 +524,69 @@ class MLService:
             # Engineer features
             engineered_df = await self.feature_engineer.engineer_price_features(df)
             
-            # Get model
-            model = await self.model_registry.get_model('price_predictor')
-            if model is None:
-                # Fallback to simple heuristic
+            # Route rows to per-segment models, falling back to the global model
+            routes = self.model_router.route(engineered_df)
+            if None in routes:
+                # No segment or global model for these rows
                 return await self._fallback_price_prediction(items)
             
-            # Make predictions
-            if include_uncertainty:
-                predictions, uncertainties = model.predict_with_uncertainty(engineered_df)
-            else:
-                predictions = model.predict(engineered_df)
-                uncertainties = None
+            predictions = np.empty(len(items))
+            lower_bounds = np.empty(len(items)) if include_uncertainty else None
+            upper_bounds = np.empty(len(items)) if include_uncertainty else None
+            versions: List[str] = [''] * len(items)
+            served: List[Tuple[str, str, np.ndarray, List[str]]] = []
+            
+            # One vectorized call per segment model
+            for model_name, positions in routes.items():
+                model = await self.model_registry.get_model(model_name)
+                if model is None:
+                    return await self._fallback_price_prediction(items)
+                
+                segment_df = engineered_df.iloc[positions]
+                if include_uncertainty and hasattr(model, 'predict_interval'):
+                    segment_pred, segment_lower, segment_upper = model.predict_interval(segment_df)
+                    lower_bounds[positions] = segment_lower
+                    upper_bounds[positions] = segment_upper
+                elif include_uncertainty:
+                    segment_pred, segment_unc = model.predict_with_uncertainty(segment_df)
+                    lower_bounds[positions] = segment_pred - segment_unc
+                    upper_bounds[positions] = segment_pred + segment_unc
+                else:
+                    segment_pred = model.predict(segment_df)
+                predictions[positions] = segment_pred
+                
+                metadata = await self.model_registry.get_model_metadata(model_name)
+                version = f"{model_name}:{metadata.version}" if metadata else model_name
+                for position in positions:
+                    versions[position] = version
+                served.append((model_name, metadata.version if metadata else '', positions,
+                               getattr(model, 'feature_names', None) or []))
+            
+            latency_ms = (time.perf_counter() - started) * 1000
+            for model_name, version, positions, feature_names in served:
+                segment_df = engineered_df.iloc[positions]
+                logged_features = [col for col in feature_names if col in segment_df.columns]
+                self.prediction_log.log_predictions(
+                    model_name,
+                    version,
+                    predictions[positions],
+                    features=segment_df[logged_features] if logged_features else segment_df,
+                    latency_ms=latency_ms,
+                )
             
             # Format results
+            prediction_timestamp = datetime.utcnow().isoformat()
             results = []
             for i, item in enumerate(items):
                 result = {
                     'item_id': item.get('item_id', f'item_{i}'),
                     'predicted_price': float(predictions[i]),
                     'confidence_interval': {
-                        'lower': float(predictions[i] - uncertainties[i]) if uncertainties is not None else None,
-                        'upper': float(predictions[i] + uncertainties[i]) if uncertainties is not None else None
+                        'lower': float(lower_bounds[i]) if lower_bounds is not None else None,
+                        'upper': float(upper_bounds[i]) if upper_bounds is not None else None
                     },
-                    'prediction_timestamp': datetime.utcnow().isoformat(),
-                    'model_version': (await self.model_registry.get_model_metadata('price_predictor')).version
+                    'prediction_timestamp': prediction_timestamp,
+                    'model_version': versions[i]
                 }
                 results.append(result)
             
@@ -417,8 +595,55 @@ class MLService:
             
         except Exception as e:
             logger.error("Price prediction failed", error=str(e), exc_info=True)
+            self.prediction_log.log_failure(
+                'price_predictor', str(e),
+                latency_ms=(time.perf_counter() - started) * 1000,
+                count=len(items)
+            )
             return await self._fallback_price_prediction(items)
     
+    async def sync_price_observations(self) -> int:
+        """
+        Fold prices inserted since the last sync into the online lag/rolling
+        feature state; the first sync loads the whole feature horizon.
+        
+        Every worker process keeps its own state, so each one follows the
+        prices table by id (insertion order) rather than relying on pushed
+        updates. Rows older than the feature horizon cannot affect serving
+        features and are not read.
+        """
+        horizon = self.feature_engineer.temporal_features.horizon.to_pytimedelta()
+        # Twice the horizon, so the longest lag also has its as-of value
+        since = datetime.now(timezone.utc) - 2 * horizon
+        
+        frames = []
+        async for batch in self.price_extractor.iter_batches(since=since, after_id=self._last_price_id):
+            if batch.num_rows:
+                frames.append(batch.to_pandas())
+        if not frames:
+            return 0
+        
+        prices = pd.concat(frames, ignore_index=True)
+        last_price_id = int(prices['price_id'].max())
+        self._last_price_id = max(self._last_price_id or last_price_id, last_price_id)
+
+        # Segment routing looks up the supplier region by supplier_id
+        self.model_router.update_supplier_regions(prices)
+
+        # Serving lookups use naive UTC timestamps
+        prices = prices[prices['price_type'].isin(TRAINING_PRICE_TYPES)]
+        prices = prices.assign(timestamp=prices['timestamp'].dt.tz_localize(None))
+        # Folding a whole horizon of prices is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self.feature_engineer.ingest_prices, prices)
+    
+    async def _sync_prices_periodically(self) -> None:
+        while True:
+            try:
+                await self.sync_price_observations()
+            except Exception as e:
+                logger.warning("Price observation sync failed", error=str(e))
+            await asyncio.sleep(settings.ONLINE_FEATURE_SYNC_SECONDS)
+    
     async def _fallback_price_prediction(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Fallback price prediction using business rules"""
         results = []
@@ -460,6 +685,7 @@ class MLService:
     async def detect_anomalies(self, 
                              data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Detect pricing anomalies"""
+        started = time.perf_counter()
         try:
             df = pd.DataFrame(data)
             
@@ -474,6 +700,15 @@ class MLService:
             # Detect anomalies
             anomaly_results = model.detect_price_anomalies(engineered_df)
             
+            metadata = await self.model_registry.get_model_metadata('anomaly_detector')
+            self.prediction_log.log_predictions(
+                'anomaly_detector',
+                metadata.version if metadata else '',
+                anomaly_results['anomaly_score'].to_numpy(),
+                features=engineered_df,
+                latency_ms=(time.perf_counter() - started) * 1000,
+            )
+            
             # Format results
             results = []
             for idx, row in anomaly_results.iterrows():
@@ -571,35 +806,40 @@ class MLService:
     
     async def forecast_demand(self, 
                             material_id: str,
-                            periods: int = 30) -> Dict[str, Any]:
-        """Forecast demand for a material"""
+                            periods: int = 30,
+                            history: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        Forecast demand for a material
+        
+        With the material's own ``ds``/``y`` history the forecast comes from
+        the per-material DemandForecaster (reusing the cached fit while the
+        history is unchanged); otherwise from the registry's global demand
+        model. Prophet runs in a worker thread so the event loop never blocks.
+        """
         try:
+            if history is not None:
+                result = (await self.forecast_demand_many({material_id: history}, periods))[0]
+                if 'error' in result:
+                    logger.warning("Demand forecast failed", material_id=material_id, error=result['error'])
+                    return await self._fallback_demand_forecast(material_id, periods)
+                return result
+            
             # Get demand model
             model = await self.model_registry.get_model('demand_forecaster')
             if model is None:
                 return await self._fallback_demand_forecast(material_id, periods)
             
             # Generate forecast
-            forecast = model.predict(periods)
+            forecast = await asyncio.to_thread(model.predict, periods)
             
-            # Format results
             result = {
                 'material_id': material_id,
                 'forecast_periods': periods,
-                'predictions': [],
+                'predictions': self.demand_forecaster.format_forecast(forecast),
                 'generated_at': datetime.utcnow().isoformat(),
                 'model_version': (await self.model_registry.get_model_metadata('demand_forecaster')).version
             }
             
-            for _, row in forecast.iterrows():
-                prediction = {
-                    'date': row['ds'].isoformat() if hasattr(row['ds'], 'isoformat') else str(row['ds']),
-                    'predicted_demand': float(row['yhat']),
-                    'lower_bound': float(row['yhat_lower']),
-                    'upper_bound': float(row['yhat_upper'])
-                }
-                result['predictions'].append(prediction)
-            
             logger.info("Demand forecast completed", material_id=material_id, periods=periods)
             return result
             
@@ -607,6 +847,30 @@ class MLService:
             logger.error("Demand forecasting failed", error=str(e))
             return await self._fallback_demand_forecast(material_id, periods)
     
+    async def forecast_demand_many(self,
+                                   histories: Dict[str, pd.DataFrame],
+                                   periods: int = 30) -> List[Dict[str, Any]]:
+        """Forecast demand for many materials from their own ``ds``/``y`` histories"""
+        results = await asyncio.to_thread(self.demand_forecaster.forecast_many, histories, periods)
+        
+        generated_at = datetime.utcnow().isoformat()
+        formatted = []
+        for material_id, result in results.items():
+            if 'error' in result:
+                formatted.append({'material_id': material_id, 'error': result['error']})
+                continue
+            formatted.append({
+                'material_id': material_id,
+                'forecast_periods': periods,
+                'predictions': self.demand_forecaster.format_forecast(result['forecast']),
+                'generated_at': generated_at,
+                'model_version': result['version'],
+                'refitted': result['refitted'],
+            })
+        
+        logger.info("Demand forecasts completed", materials=len(histories), periods=periods)
+        return formatted
+    
     async def _fallback_demand_forecast(self, material_id: str, periods: int) -> Dict[str, Any]:
         """Fallback demand forecast using simple trend"""
         base_demand = 100  # Base demand
@@ -642,6 +906,27 @@ class MLService:
             'fallback_used': True
         }
     
+    async def calculate_should_cost_batch(self,
+                                        items: List[Tuple[Dict[str, Any], float]]) -> List[Dict[str, Any]]:
+        """Calculate should-costs for many ``(material_specs, quantity)`` pairs"""
+        try:
+            breakdowns = self.should_cost_model.calculate_should_cost_batch(items)
+            
+            calculated_at = datetime.utcnow().isoformat()
+            for breakdown, (material_specs, quantity) in zip(breakdowns, items):
+                breakdown.update({
+                    'calculated_at': calculated_at,
+                    'quantity': quantity,
+                    'material_specs': material_specs
+                })
+            
+            logger.info("Should-cost batch calculated", items=len(items))
+            return breakdowns
+            
+        except Exception as e:
+            logger.error("Should-cost batch calculation failed", error=str(e), items=len(items))
+            raise
+    
     async def calculate_should_cost(self, 
                                   material_specs: Dict[str, Any],
                                   quantity: int = 1) -> Dict[str, Any]:
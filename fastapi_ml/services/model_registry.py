@@ -5,17 +5,21 @@ import asyncio
 import os
 import pickle
 import json
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
 import structlog
+import joblib
 import mlflow
+import mlflow.artifacts
 import mlflow.pyfunc
 from mlflow.tracking import MlflowClient
 from redis import Redis
 import numpy as np
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
+from .compiled_inference import compile_model
 from ..config import settings, MODEL_CONFIG
 
 logger = structlog.get_logger()
@@ -60,14 +64,57 @@ class ModelMetadata:
         }
 
 
+class ModelSource:
+    """Location of a discovered model that can be loaded on demand"""
+    
+    def __init__(self,
+                 name: str,
+                 kind: str,
+                 uri: str,
+                 size_bytes: int = 0,
+                 booster_path: Optional[str] = None):
+        self.name = name
+        self.kind = kind  # 'mlflow', 'joblib' or 'pickle'
+        self.uri = uri
+        self.size_bytes = size_bytes
+        self.booster_path = booster_path
+
+
+def _path_size(path: Path) -> int:
+    """Size on disk of a file or directory tree"""
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+
 class ModelRegistry:
     """
     Production-ready model registry with caching, versioning, and health monitoring
+    
+    Models are discovered at startup but only loaded on first use. Resident
+    models are kept in LRU order and evicted when idle or when their combined
+    on-disk footprint exceeds ``MODEL_MEMORY_BUDGET_MB``. Local models are
+    stored with joblib (memory-mapped on load) and LightGBM boosters in their
+    native text format, so uvicorn workers share the page cache.
+    
+    A housekeeping task sweeps idle models even when no requests arrive and
+    persists per-model prediction counts (summed across workers in Redis,
+    else into the local metadata files), which rank the warm-up list.
     """
     
+    USAGE_COUNTS_KEY = "model_registry:prediction_counts"
+    
     def __init__(self):
-        self.models: Dict[str, Any] = {}
+        self.models: "OrderedDict[str, Any]" = OrderedDict()
         self.metadata: Dict[str, ModelMetadata] = {}
+        self.sources: Dict[str, ModelSource] = {}
+        self.model_sizes: Dict[str, int] = {}
+        self.memory_budget_bytes = settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        self.idle_eviction = timedelta(seconds=settings.MODEL_IDLE_EVICTION_SECONDS)
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        # Predictions served since the last usage-count flush
+        self._unflushed_counts: Dict[str, int] = {}
+        self._housekeeping_task: Optional[asyncio.Task] = None
         self.redis_client: Optional[Redis] = None
         self.mlflow_client = MlflowClient(settings.MLFLOW_TRACKING_URI)
         self.model_cache_ttl = settings.MODEL_CACHE_TTL
@@ -88,28 +135,29 @@ class ModelRegistry:
         logger.info("Redis initialized for model registry")
     
     async def load_models(self) -> None:
-        """Load all models from storage and MLflow"""
+        """Discover models in MLflow and local storage, then warm up the hottest"""
         try:
-            # Load from MLflow first
-            await self._load_from_mlflow()
+            # MLflow first, local storage as fallback
+            await self._discover_mlflow_models()
+            await self._discover_local_models()
             
-            # Load local models as fallback
-            await self._load_local_models()
+            warmed = await self.warm_up()
+            self.start_housekeeping()
             
             logger.info(
-                "Models loaded successfully",
-                total_models=len(self.models),
-                model_names=list(self.models.keys())
+                "Models discovered successfully",
+                available_models=len(self.sources),
+                model_names=list(self.sources.keys()),
+                warmed_models=warmed
             )
             
         except Exception as e:
-            logger.error("Failed to load models", error=str(e), exc_info=True)
+            logger.error("Failed to discover models", error=str(e), exc_info=True)
             raise
     
-    async def _load_from_mlflow(self) -> None:
-        """Load models from MLflow"""
+    async def _discover_mlflow_models(self) -> None:
+        """Register latest MLflow model versions without loading them"""
         try:
-            # Get latest versions of registered models
             for model_name in MODEL_CONFIG.keys():
                 try:
                     # Get latest production model
@@ -129,13 +177,9 @@ class ModelRegistry:
                         version_info = model_version[0]
                         model_uri = f"models:/{model_name}/{version_info.version}"
                         
-                        # Load model
-                        model = mlflow.pyfunc.load_model(model_uri)
-                        
                         # Get run info for metadata
                         run = self.mlflow_client.get_run(version_info.run_id)
                         
-                        # Create metadata
                         metadata = ModelMetadata(
                             name=model_name,
                             version=version_info.version,
@@ -146,11 +190,11 @@ class ModelRegistry:
                             mlflow_run_id=version_info.run_id
                         )
                         
-                        self.models[model_name] = model
+                        self.sources[model_name] = ModelSource(model_name, 'mlflow', model_uri)
                         self.metadata[model_name] = metadata
                         
                         logger.info(
-                            "Loaded model from MLflow",
+                            "Discovered model in MLflow",
                             model_name=model_name,
                             version=version_info.version,
                             stage=version_info.current_stage
@@ -158,7 +202,7 @@ class ModelRegistry:
                         
                 except Exception as e:
                     logger.warning(
-                        "Failed to load model from MLflow",
+                        "Failed to discover model in MLflow",
                         model_name=model_name,
                         error=str(e)
                     )
@@ -168,18 +212,24 @@ class ModelRegistry:
             logger.error("MLflow connection failed", error=str(e))
             raise
     
-    async def _load_local_models(self) -> None:
-        """Load models from local storage as fallback"""
-        for model_file in self.storage_path.glob("*.pkl"):
+    async def _discover_local_models(self) -> None:
+        """Register models from local storage as fallback"""
+        # joblib artifacts take precedence over legacy pickles of the same name
+        model_files = list(self.storage_path.glob("*.joblib")) + list(self.storage_path.glob("*.pkl"))
+        
+        for model_file in model_files:
             try:
                 model_name = model_file.stem
                 
-                # Skip if already loaded from MLflow
-                if model_name in self.models:
+                # Skip if already discovered in MLflow or as a joblib artifact
+                if model_name in self.sources or model_name == "preprocessing_artifacts":
                     continue
                 
-                with open(model_file, 'rb') as f:
-                    model_data = pickle.load(f)
+                booster_file = self.storage_path / f"{model_name}.lgb.txt"
+                booster_path = str(booster_file) if booster_file.exists() else None
+                size_bytes = model_file.stat().st_size + (
+                    booster_file.stat().st_size if booster_path else 0
+                )
                 
                 # Load metadata if exists
                 metadata_file = self.storage_path / f"{model_name}_metadata.json"
@@ -196,6 +246,7 @@ class ModelRegistry:
                         features=metadata_dict["features"],
                         model_path=str(model_file)
                     )
+                    metadata.prediction_count = metadata_dict.get("prediction_count", 0)
                 else:
                     # Create basic metadata for legacy models
                     metadata = ModelMetadata(
@@ -208,31 +259,245 @@ class ModelRegistry:
                         model_path=str(model_file)
                     )
                 
-                self.models[model_name] = model_data
+                kind = 'joblib' if model_file.suffix == '.joblib' else 'pickle'
+                self.sources[model_name] = ModelSource(
+                    model_name, kind, str(model_file), size_bytes, booster_path
+                )
                 self.metadata[model_name] = metadata
                 
-                logger.info("Loaded local model", model_name=model_name)
+                logger.info("Discovered local model", model_name=model_name, format=kind)
                 
             except Exception as e:
                 logger.warning(
-                    "Failed to load local model",
+                    "Failed to discover local model",
                     model_file=str(model_file),
                     error=str(e)
                 )
                 continue
     
+    def _load_from_source(self, source: ModelSource) -> Any:
+        """Load a model from its source (blocking, run off the event loop)"""
+        if source.kind == 'mlflow':
+            local_path = mlflow.artifacts.download_artifacts(source.uri)
+            source.size_bytes = _path_size(Path(local_path))
+            return mlflow.pyfunc.load_model(local_path)
+        
+        if source.kind == 'joblib':
+            model = joblib.load(source.uri, mmap_mode=settings.MODEL_MMAP_MODE)
+            if source.booster_path:
+                import lightgbm as lgb
+                model.model = lgb.Booster(model_file=source.booster_path)
+            return model
+        
+        with open(source.uri, 'rb') as f:
+            return pickle.load(f)
+    
+    async def _ensure_loaded(self, model_name: str) -> Optional[Any]:
+        """Load a discovered model once, even under concurrent requests"""
+        lock = self._load_locks.setdefault(model_name, asyncio.Lock())
+        async with lock:
+            if model_name in self.models:
+                return self.models[model_name]
+            
+            source = self.sources.get(model_name)
+            if source is None:
+                return None
+            
+            started = datetime.utcnow()
+            try:
+                model = await asyncio.to_thread(self._load_from_source, source)
+                model = await asyncio.to_thread(self._prepare_for_serving, model_name, model)
+            except Exception as e:
+                logger.error(
+                    "Failed to load model",
+                    model_name=model_name,
+                    source=source.kind,
+                    error=str(e)
+                )
+                return None
+            
+            self.models[model_name] = model
+            self.model_sizes[model_name] = source.size_bytes
+            self._enforce_memory_budget(keep=model_name)
+            
+            logger.info(
+                "Model loaded",
+                model_name=model_name,
+                source=source.kind,
+                size_mb=round(source.size_bytes / (1024 * 1024), 2),
+                load_seconds=(datetime.utcnow() - started).total_seconds()
+            )
+            return model
+    
+    def _prepare_for_serving(self, model_name: str, model: Any) -> Any:
+        """Select the compiled tree backend where it reproduces stock outputs"""
+        if not settings.COMPILED_INFERENCE_ENABLED:
+            return model
+        
+        try:
+            model, compiled_count = compile_model(model)
+        except Exception as e:
+            logger.warning("Compiled inference unavailable", model_name=model_name, error=str(e))
+            return model
+        
+        if compiled_count:
+            logger.info("Compiled inference enabled", model_name=model_name, estimators=compiled_count)
+        return model
+    
+    def _enforce_memory_budget(self, keep: Optional[str] = None) -> None:
+        """Evict idle models, then least recently used ones, until under budget"""
+        # Only models with a backing source can be evicted; they reload on demand
+        evictable = [name for name in self.models if name != keep and name in self.sources]
+        
+        now = datetime.utcnow()
+        for model_name in list(evictable):
+            metadata = self.metadata.get(model_name)
+            if metadata and now - metadata.last_used > self.idle_eviction:
+                self._evict(model_name, reason="idle")
+                evictable.remove(model_name)
+        
+        resident_bytes = sum(self.model_sizes.get(name, 0) for name in self.models)
+        for model_name in evictable:
+            if resident_bytes <= self.memory_budget_bytes:
+                break
+            resident_bytes -= self.model_sizes.get(model_name, 0)
+            self._evict(model_name, reason="memory_budget")
+    
+    def _evict(self, model_name: str, reason: str) -> None:
+        self.models.pop(model_name, None)
+        self.model_sizes.pop(model_name, None)
+        logger.info("Model evicted", model_name=model_name, reason=reason)
+    
+    async def get_usage_counts(self) -> Dict[str, int]:
+        """Persisted prediction counts per model, plus those not yet flushed"""
+        counts = {name: metadata.prediction_count for name, metadata in self.metadata.items()}
+        if self.redis_client:
+            try:
+                stored = await self.redis_client.hgetall(self.USAGE_COUNTS_KEY)
+                counts = {
+                    (name.decode() if isinstance(name, bytes) else name): int(count)
+                    for name, count in stored.items()
+                }
+                for name, count in self._unflushed_counts.items():
+                    counts[name] = counts.get(name, 0) + count
+            except Exception as e:
+                logger.warning("Failed to read model usage counts", error=str(e))
+        return counts
+    
+    async def get_warmup_list(self) -> List[str]:
+        """Configured warm-up models followed by the most used ones"""
+        counts = await self.get_usage_counts()
+        hottest = sorted(
+            self.sources,
+            key=lambda name: counts.get(name, 0),
+            reverse=True
+        )[:settings.MODEL_WARMUP_TOP_N]
+        
+        warmup = []
+        for model_name in list(settings.MODEL_WARMUP_LIST) + hottest:
+            if model_name in self.sources and model_name not in warmup:
+                warmup.append(model_name)
+        return warmup
+    
+    async def flush_usage_counts(self) -> None:
+        """Persist prediction counts accumulated since the last flush"""
+        pending, self._unflushed_counts = self._unflushed_counts, {}
+        if not pending:
+            return
+        
+        try:
+            if self.redis_client:
+                pipeline = self.redis_client.pipeline()
+                for model_name, count in pending.items():
+                    pipeline.hincrby(self.USAGE_COUNTS_KEY, model_name, count)
+                await pipeline.execute()
+            else:
+                await asyncio.to_thread(self._write_usage_counts, list(pending))
+        except Exception:
+            # Keep the counts for the next flush
+            for model_name, count in pending.items():
+                self._unflushed_counts[model_name] = self._unflushed_counts.get(model_name, 0) + count
+            raise
+    
+    def _write_usage_counts(self, model_names: List[str]) -> None:
+        """Update prediction_count in the local metadata files (blocking)"""
+        for model_name in model_names:
+            metadata_path = self.storage_path / f"{model_name}_metadata.json"
+            metadata = self.metadata.get(model_name)
+            if metadata is None or not metadata_path.exists():
+                continue
+            with open(metadata_path, 'r') as f:
+                metadata_dict = json.load(f)
+            metadata_dict["prediction_count"] = metadata.prediction_count
+            tmp_path = metadata_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(metadata_dict, f, indent=2)
+            os.replace(tmp_path, metadata_path)
+    
+    def start_housekeeping(self) -> None:
+        """Start the periodic idle sweep and usage-count flush"""
+        if settings.MODEL_HOUSEKEEPING_SECONDS > 0 and self._housekeeping_task is None:
+            self._housekeeping_task = asyncio.create_task(self._housekeep_periodically())
+    
+    async def _housekeep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.MODEL_HOUSEKEEPING_SECONDS)
+            try:
+                # Idle models go even when no request reaches get_model
+                self._enforce_memory_budget()
+                await self.flush_usage_counts()
+            except Exception as e:
+                logger.warning("Model registry housekeeping failed", error=str(e))
+    
+    async def close(self) -> None:
+        """Stop housekeeping and persist outstanding usage counts"""
+        task, self._housekeeping_task = self._housekeeping_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush_usage_counts()
+        except Exception as e:
+            logger.warning("Failed to persist model usage counts", error=str(e))
+    
+    async def warm_up(self, model_names: Optional[List[str]] = None) -> List[str]:
+        """Preload models so their first request does not pay the load cost"""
+        if model_names is None:
+            model_names = await self.get_warmup_list()
+        
+        warmed = []
+        for model_name in model_names:
+            if await self._ensure_loaded(model_name) is not None:
+                warmed.append(model_name)
+        return warmed
+    
+    def has_model(self, model_name: str) -> bool:
+        """Whether a model is resident or can be loaded on demand"""
+        return model_name in self.models or model_name in self.sources
+    
     async def get_model(self, model_name: str) -> Optional[Any]:
-        """Get model by name with caching"""
-        if model_name not in self.models:
-            logger.warning("Model not found", model_name=model_name)
-            return None
+        """Get model by name, loading it on first use"""
+        model = self.models.get(model_name)
+        if model is None:
+            if model_name not in self.sources:
+                logger.warning("Model not found", model_name=model_name)
+                return None
+            model = await self._ensure_loaded(model_name)
+            if model is None:
+                return None
+        else:
+            self.models.move_to_end(model_name)
         
         # Update usage stats
         if model_name in self.metadata:
             self.metadata[model_name].last_used = datetime.utcnow()
             self.metadata[model_name].prediction_count += 1
+        self._unflushed_counts[model_name] = self._unflushed_counts.get(model_name, 0) + 1
         
-        return self.models[model_name]
+        return model
     
     async def register_model(self, 
                            model_name: str,
@@ -252,19 +517,22 @@ class ModelRegistry:
             
             # Save model locally
             if save_local:
-                model_path = self.storage_path / f"{model_name}.pkl"
-                with open(model_path, 'wb') as f:
-                    pickle.dump(model, f)
+                source = await asyncio.to_thread(self._save_local, model_name, model)
+                metadata.model_path = source.uri
                 
                 metadata_path = self.storage_path / f"{model_name}_metadata.json"
                 with open(metadata_path, 'w') as f:
                     json.dump(metadata.to_dict(), f, indent=2)
                 
-                metadata.model_path = str(model_path)
+                self.sources[model_name] = source
+                self.model_sizes[model_name] = source.size_bytes
             
-            # Store in memory
+            # Store in memory as most recently used
+            model = await asyncio.to_thread(self._prepare_for_serving, model_name, model)
             self.models[model_name] = model
+            self.models.move_to_end(model_name)
             self.metadata[model_name] = metadata
+            self._enforce_memory_budget(keep=model_name)
             
             # Cache in Redis if available
             if self.redis_client:
@@ -293,6 +561,32 @@ class ModelRegistry:
             )
             return False
     
+    def _save_local(self, model_name: str, model: Any) -> ModelSource:
+        """Persist a model in a memory-map friendly layout"""
+        model_path = self.storage_path / f"{model_name}.joblib"
+        booster_file = self.storage_path / f"{model_name}.lgb.txt"
+        booster = getattr(model, 'model', None)
+        
+        if booster is not None and hasattr(booster, 'save_model') and hasattr(booster, 'model_to_string'):
+            # LightGBM boosters go to their native format; the wrapper is saved without it
+            booster.save_model(str(booster_file))
+            model.model = None
+            try:
+                joblib.dump(model, model_path)
+            finally:
+                model.model = booster
+            booster_path = str(booster_file)
+        else:
+            joblib.dump(model, model_path)
+            booster_file.unlink(missing_ok=True)
+            booster_path = None
+        
+        # Drop any legacy pickle so discovery does not pick up a stale copy
+        (self.storage_path / f"{model_name}.pkl").unlink(missing_ok=True)
+        
+        size_bytes = model_path.stat().st_size + (booster_file.stat().st_size if booster_path else 0)
+        return ModelSource(model_name, 'joblib', str(model_path), size_bytes, booster_path)
+    
     async def _validate_model_performance(self, 
                                         model_name: str, 
                                         metadata: ModelMetadata) -> bool:
@@ -345,7 +639,7 @@ class ModelRegistry:
         """Check model health status"""
         try:
             if model_name not in self.models:
-                return "not_loaded"
+                return "available" if model_name in self.sources else "not_loaded"
             
             # Check if model was used recently
             metadata = self.metadata.get(model_name)
@@ -381,21 +675,24 @@ class ModelRegistry:
         """Get health status of all models"""
         health_status = {}
         
-        for model_name in self.models:
+        for model_name in set(self.sources) | set(self.models):
             health_status[model_name] = await self._check_model_health(model_name)
         
         return health_status
     
     async def get_loaded_model_count(self) -> int:
-        """Get number of loaded models"""
+        """Get number of models resident in memory"""
         return len(self.models)
     
+    async def get_available_model_count(self) -> int:
+        """Get number of models that can be served (loaded or loadable)"""
+        return len(set(self.sources) | set(self.models))
+    
     async def unload_model(self, model_name: str) -> bool:
         """Unload model from memory"""
         try:
             if model_name in self.models:
-                del self.models[model_name]
-                logger.info("Model unloaded", model_name=model_name)
+                self._evict(model_name, reason="manual")
                 return True
             return False
         except Exception as e:
@@ -408,12 +705,13 @@ class ModelRegistry:
             # Unload first
             await self.unload_model(model_name)
             
-            # Reload from MLflow or local
-            await self._load_from_mlflow()
-            if model_name not in self.models:
-                await self._load_local_models()
+            # Rediscover from MLflow or local, then load
+            self.sources.pop(model_name, None)
+            await self._discover_mlflow_models()
+            if model_name not in self.sources:
+                await self._discover_local_models()
             
-            return model_name in self.models
+            return await self._ensure_loaded(model_name) is not None
             
         except Exception as e:
             logger.error("Failed to reload model", model_name=model_name, error=str(e))
@@ -0,0 +1,119 @@
+"""
+Model Routing - Per-segment model selection for price prediction
+
+Segment models are registered in the ModelRegistry next to the global model
+using a ``<base>__<category>[__<region>]`` naming scheme, e.g.
+``price_predictor__electronics`` or ``price_predictor__electronics__emea``.
+Rows are routed to the most specific model available, falling back to the
+global model, and each routed group is scored with a single vectorized call.
+
+The region of a segment is the supplier's region (``supplier_region``), the
+column the training data carries. Requests usually name only the supplier,
+so the router keeps a supplier -> region map fed from the prices table and
+fills the region in from ``supplier_id``. The request's ``region`` field is
+the delivery region and is only a model feature, never a routing key.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import structlog
+
+from .model_registry import ModelRegistry
+
+logger = structlog.get_logger()
+
+SEGMENT_SEPARATOR = '__'
+CATEGORY_COLUMNS = ('material_category', 'category')
+REGION_COLUMN = 'supplier_region'
+SUPPLIER_COLUMN = 'supplier_id'
+
+
+def _slugify(value: object) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', str(value).strip().lower()).strip('_')
+
+
+def segment_model_name(base_name: str,
+                       category: Optional[object] = None,
+                       region: Optional[object] = None) -> str:
+    """Registry name of the model serving a (category, region) segment"""
+    parts = [base_name]
+    if category is not None and not pd.isna(category):
+        parts.append(_slugify(category))
+        if region is not None and not pd.isna(region):
+            parts.append(_slugify(region))
+    return SEGMENT_SEPARATOR.join(parts)
+
+
+class SegmentModelRouter:
+    """
+    Routes prediction rows to category/region models with global fallback
+    """
+
+    def __init__(self, model_registry: ModelRegistry, base_name: str = 'price_predictor'):
+        self.model_registry = model_registry
+        self.base_name = base_name
+        self.supplier_regions: Dict[str, str] = {}
+
+    def update_supplier_regions(self, df: pd.DataFrame) -> int:
+        """Remember the region of every supplier in a frame of price rows"""
+        if SUPPLIER_COLUMN not in df.columns or REGION_COLUMN not in df.columns:
+            return 0
+        known = df[[SUPPLIER_COLUMN, REGION_COLUMN]].dropna().drop_duplicates(SUPPLIER_COLUMN, keep='last')
+        self.supplier_regions.update(zip(known[SUPPLIER_COLUMN].astype(str), known[REGION_COLUMN]))
+        return len(known)
+
+    def _regions(self, df: pd.DataFrame) -> pd.Series:
+        """Supplier region per row, looked up by supplier where not given"""
+        regions = df[REGION_COLUMN] if REGION_COLUMN in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if SUPPLIER_COLUMN in df.columns and self.supplier_regions:
+            looked_up = df[SUPPLIER_COLUMN].map(
+                lambda supplier_id: None if pd.isna(supplier_id) else self.supplier_regions.get(str(supplier_id))
+            )
+            regions = regions.where(regions.notna(), looked_up)
+        return regions
+
+    def resolve(self, category: Optional[object], region: Optional[object]) -> Optional[str]:
+        """Most specific registered model for a segment"""
+        candidates = []
+        if category is not None and not pd.isna(category):
+            if region is not None and not pd.isna(region):
+                candidates.append(segment_model_name(self.base_name, category, region))
+            candidates.append(segment_model_name(self.base_name, category))
+        candidates.append(self.base_name)
+
+        for model_name in candidates:
+            if self.model_registry.has_model(model_name):
+                return model_name
+        return None
+
+    def route(self, df: pd.DataFrame) -> Dict[Optional[str], np.ndarray]:
+        """Group row positions by the model that should score them"""
+        category_column = next((col for col in CATEGORY_COLUMNS if col in df.columns), None)
+        keys: List[pd.Series] = [
+            df[category_column] if category_column else pd.Series(None, index=df.index, dtype=object),
+            self._regions(df),
+        ]
+
+        segments = pd.DataFrame({'category': keys[0].values, 'region': keys[1].values})
+        routes: Dict[Optional[str], List[np.ndarray]] = {}
+        for (category, region), positions in segments.groupby(
+            ['category', 'region'], dropna=False, sort=False
+        ).indices.items():
+            model_name = self.resolve(category, region)
+            routes.setdefault(model_name, []).append(positions)
+
+        return {name: np.sort(np.concatenate(parts)) for name, parts in routes.items()}
+
+    @staticmethod
+    def split_segments(df: pd.DataFrame,
+                       segment_by: List[str],
+                       min_samples: int = 1) -> Dict[Tuple, pd.Index]:
+        """Row labels per training segment with at least ``min_samples`` rows"""
+        groups = df.groupby(segment_by, dropna=True, sort=True).groups
+        return {
+            (key if isinstance(key, tuple) else (key,)): index
+            for key, index in groups.items()
+            if len(index) >= min_samples
+        }
@@ -14,7 +14,9 @@ import json
 import redis.asyncio as redis
 from pathlib import Path
 
+from .drift_sketches import PREDICTION_FEATURE, SketchSet, sketch_js, sketch_ks, sketch_psi
 from .model_registry import ModelRegistry
+from .prediction_log import PredictionLogReader
 from ..config import settings
 
 logger = structlog.get_logger()
@@ -137,6 +139,134 @@ class DriftDetector:
         
         return result
     
+    def _sketch_drift_score(self,
+                            reference: SketchSet,
+                            current: SketchSet,
+                            feature: str,
+                            method: str) -> Tuple[float, bool]:
+        """Drift score of one feature from bucket counts and moments, O(bins)"""
+        ref_hist, curr_hist = reference.histogram(feature), current.histogram(feature)
+        threshold = self.drift_thresholds[method]
+        
+        if method == 'ks_test':
+            _, p_value = sketch_ks(ref_hist, curr_hist)
+            return p_value, p_value < threshold
+        if method == 'js_divergence':
+            js_distance = sketch_js(ref_hist, curr_hist)
+            return js_distance, js_distance > threshold
+        if method == 'psi':
+            psi = sketch_psi(ref_hist, curr_hist)
+            return psi, psi > threshold
+        
+        # statistical_test: Welch t-test and F-test from the stored moments
+        n_ref, n_curr = reference.count(feature), current.count(feature)
+        ref_std, curr_std = reference.std(feature), current.std(feature)
+        _, t_p_value = stats.ttest_ind_from_stats(
+            current.mean(feature), curr_std, n_curr,
+            reference.mean(feature), ref_std, n_ref,
+            equal_var=False
+        )
+        f_stat = (curr_std ** 2) / (ref_std ** 2) if ref_std > 0 else 1.0
+        f_p_value = 2 * min(stats.f.cdf(f_stat, n_curr - 1, n_ref - 1),
+                            1 - stats.f.cdf(f_stat, n_curr - 1, n_ref - 1))
+        combined_p = stats.combine_pvalues([t_p_value, f_p_value], method='fisher')[1]
+        return float(combined_p), combined_p < threshold
+    
+    async def detect_sketch_feature_drift(self,
+                                        reference: SketchSet,
+                                        current: SketchSet,
+                                        feature_columns: List[str],
+                                        method: str = 'ks_test') -> Dict[str, Any]:
+        """Detect drift in input features from streaming sketches"""
+        
+        if method not in self.drift_methods:
+            raise ValueError(f"Unknown drift detection method: {method}")
+        
+        drift_results = {
+            'overall_drift_detected': False,
+            'method': method,
+            'threshold': self.drift_thresholds[method],
+            'feature_drift': {},
+            'drift_score': 0.0,
+            'detected_at': datetime.utcnow().isoformat()
+        }
+        
+        drift_scores = []
+        
+        for feature in feature_columns:
+            if feature not in reference or feature not in current:
+                continue
+            if reference.count(feature) < 2 or current.count(feature) < 2:
+                continue
+            
+            try:
+                drift_score, is_drift = self._sketch_drift_score(reference, current, feature, method)
+            except Exception as e:
+                logger.warning(f"Sketch drift calculation failed for {feature}: {e}")
+                continue
+            
+            drift_results['feature_drift'][feature] = {
+                'drift_score': drift_score,
+                'is_drift': bool(is_drift),
+                'reference_samples': reference.count(feature),
+                'current_samples': current.count(feature)
+            }
+            
+            if is_drift:
+                drift_results['overall_drift_detected'] = True
+            
+            drift_scores.append(drift_score)
+        
+        if drift_scores:
+            drift_results['drift_score'] = float(np.mean(drift_scores))
+        
+        drift_results['features_analyzed'] = len(drift_results['feature_drift'])
+        drift_results['features_with_drift'] = sum(
+            1 for f in drift_results['feature_drift'].values() if f['is_drift']
+        )
+        
+        logger.info(
+            "Sketch feature drift detection completed",
+            method=method,
+            features_analyzed=drift_results['features_analyzed'],
+            features_with_drift=drift_results['features_with_drift'],
+            overall_drift=drift_results['overall_drift_detected']
+        )
+        
+        return drift_results
+    
+    async def detect_sketch_prediction_drift(self,
+                                           reference: SketchSet,
+                                           current: SketchSet,
+                                           method: str = 'ks_test') -> Dict[str, Any]:
+        """Detect drift in model predictions from streaming sketches"""
+        
+        if method not in self.drift_methods:
+            raise ValueError(f"Unknown drift detection method: {method}")
+        
+        drift_score, is_drift = self._sketch_drift_score(reference, current, PREDICTION_FEATURE, method)
+        
+        reference_mean, current_mean = reference.mean(PREDICTION_FEATURE), current.mean(PREDICTION_FEATURE)
+        reference_std, current_std = reference.std(PREDICTION_FEATURE), current.std(PREDICTION_FEATURE)
+        
+        return {
+            'drift_detected': bool(is_drift),
+            'drift_score': drift_score,
+            'method': method,
+            'threshold': self.drift_thresholds[method],
+            'reference_samples': reference.count(PREDICTION_FEATURE),
+            'current_samples': current.count(PREDICTION_FEATURE),
+            'detected_at': datetime.utcnow().isoformat(),
+            'statistics': {
+                'reference_mean': reference_mean,
+                'reference_std': reference_std,
+                'current_mean': current_mean,
+                'current_std': current_std,
+                'mean_shift': current_mean - reference_mean,
+                'std_ratio': current_std / reference_std if reference_std > 0 else 1.0
+            }
+        }
+    
     async def _kolmogorov_smirnov_test(self, 
                                      reference: np.ndarray, 
                                      current: np.ndarray) -> Tuple[float, bool]:
@@ -393,9 +523,16 @@ class PerformanceMonitor:
 class ModelMonitor:
     """Comprehensive model monitoring system"""
     
-    def __init__(self, model_registry: ModelRegistry, redis_client: redis.Redis):
+    ALERT_MODELS_KEY = "alerts:models"
+    ALERT_INDEX_BACKFILLED_KEY = "alerts:models:backfilled"
+    
+    def __init__(self,
+                 model_registry: ModelRegistry,
+                 redis_client: redis.Redis,
+                 prediction_log: Optional[PredictionLogReader] = None):
         self.model_registry = model_registry
         self.redis_client = redis_client
+        self.prediction_log = prediction_log or PredictionLogReader()
         self.drift_detector = DriftDetector()
         self.performance_monitor = PerformanceMonitor()
         
@@ -404,6 +541,7 @@ class ModelMonitor:
             'drift_check_interval': timedelta(hours=6),
             'performance_check_interval': timedelta(hours=12),
             'data_retention_days': 30,
+            'recent_window': timedelta(hours=24),
             'alert_thresholds': {
                 'drift_score': 0.1,
                 'performance_degradation': 0.15,
@@ -550,18 +688,6 @@ class ModelMonitor:
     async def _check_feature_drift(self, model_name: str) -> Dict[str, Any]:
         """Check for feature drift"""
         try:
-            # Get reference data (baseline) and current data
-            reference_data = await self._get_reference_data(model_name)
-            current_data = await self._get_recent_data(model_name)
-            
-            if reference_data.empty or current_data.empty:
-                return {
-                    'drift_detected': False,
-                    'message': 'Insufficient data for drift detection',
-                    'reference_samples': len(reference_data),
-                    'current_samples': len(current_data)
-                }
-            
             # Get model feature columns
             metadata = await self.model_registry.get_model_metadata(model_name)
             feature_columns = metadata.features if metadata else []
@@ -572,9 +698,23 @@ class ModelMonitor:
                     'message': 'No feature columns defined for model'
                 }
             
+            # Merge the streaming sketches of the baseline and current windows
+            reference_sketch = await self._get_reference_sketch(model_name, feature_columns)
+            current_sketch = await self._get_recent_sketch(model_name, feature_columns)
+            
+            reference_samples = max((reference_sketch.count(f) for f in feature_columns), default=0)
+            current_samples = max((current_sketch.count(f) for f in feature_columns), default=0)
+            if reference_samples == 0 or current_samples == 0:
+                return {
+                    'drift_detected': False,
+                    'message': 'Insufficient data for drift detection',
+                    'reference_samples': reference_samples,
+                    'current_samples': current_samples
+                }
+            
             # Detect drift
-            drift_results = await self.drift_detector.detect_feature_drift(
-                reference_data, current_data, feature_columns, method='ks_test'
+            drift_results = await self.drift_detector.detect_sketch_feature_drift(
+                reference_sketch, current_sketch, feature_columns, method='ks_test'
             )
             
             return drift_results
@@ -589,19 +729,19 @@ class ModelMonitor:
     async def _check_prediction_drift(self, model_name: str) -> Dict[str, Any]:
         """Check for prediction drift"""
         try:
-            # Get historical predictions
-            reference_predictions = await self._get_reference_predictions(model_name)
-            current_predictions = await self._get_recent_predictions(model_name)
+            # Get historical and recent prediction sketches
+            reference_sketch = await self._get_reference_sketch(model_name, [PREDICTION_FEATURE])
+            current_sketch = await self._get_recent_sketch(model_name, [PREDICTION_FEATURE])
             
-            if len(reference_predictions) == 0 or len(current_predictions) == 0:
+            if reference_sketch.count(PREDICTION_FEATURE) < 2 or current_sketch.count(PREDICTION_FEATURE) < 2:
                 return {
                     'drift_detected': False,
                     'message': 'Insufficient prediction data for drift detection'
                 }
             
             # Detect drift in predictions
-            drift_results = await self.drift_detector.detect_prediction_drift(
-                reference_predictions, current_predictions, method='ks_test'
+            drift_results = await self.drift_detector.detect_sketch_prediction_drift(
+                reference_sketch, current_sketch, method='ks_test'
             )
             
             return drift_results
@@ -689,29 +829,64 @@ class ModelMonitor:
                 'error': str(e)
             }
     
-    async def _get_reference_data(self, model_name: str, days_back: int = 30) -> pd.DataFrame:
+    def _reference_window(self, days_back: int) -> Tuple[datetime, datetime]:
+        """Baseline window ending where the recent window starts"""
+        reference_end = datetime.utcnow() - self.monitoring_config['recent_window']
+        return reference_end - timedelta(days=days_back), reference_end
+    
+    async def _get_reference_sketch(self,
+                                    model_name: str,
+                                    features: List[str],
+                                    days_back: int = 30) -> SketchSet:
+        """Merged baseline sketches for drift detection"""
+        start_time, end_time = self._reference_window(days_back)
+        return await asyncio.to_thread(
+            self.prediction_log.sketches, model_name, start_time, end_time, features
+        )
+    
+    async def _get_recent_sketch(self,
+                                 model_name: str,
+                                 features: List[str],
+                                 hours_back: int = 24) -> SketchSet:
+        """Merged recent sketches for drift detection"""
+        start_time = datetime.utcnow() - timedelta(hours=hours_back)
+        return await asyncio.to_thread(
+            self.prediction_log.sketches, model_name, start_time, None, features
+        )
+    
+    async def _get_reference_data(self,
+                                  model_name: str,
+                                  days_back: int = 30,
+                                  columns: Optional[List[str]] = None) -> pd.DataFrame:
         """Get reference data for drift detection"""
-        # This would typically query your database for historical input data
-        # For now, return empty DataFrame (implement based on your data storage)
-        return pd.DataFrame()
+        start_time, end_time = self._reference_window(days_back)
+        return await asyncio.to_thread(
+            self.prediction_log.features, model_name, columns, start_time, end_time
+        )
     
-    async def _get_recent_data(self, model_name: str, hours_back: int = 24) -> pd.DataFrame:
+    async def _get_recent_data(self,
+                               model_name: str,
+                               hours_back: int = 24,
+                               columns: Optional[List[str]] = None) -> pd.DataFrame:
         """Get recent data for drift detection"""
-        # This would typically query recent input data
-        # For now, return empty DataFrame (implement based on your data storage)
-        return pd.DataFrame()
+        start_time = datetime.utcnow() - timedelta(hours=hours_back)
+        return await asyncio.to_thread(
+            self.prediction_log.features, model_name, columns, start_time, None
+        )
     
     async def _get_reference_predictions(self, model_name: str, days_back: int = 30) -> np.ndarray:
         """Get reference predictions for drift detection"""
-        # This would query historical predictions
-        # For now, return empty array
-        return np.array([])
+        start_time, end_time = self._reference_window(days_back)
+        return await asyncio.to_thread(
+            self.prediction_log.predictions, model_name, start_time, end_time
+        )
     
     async def _get_recent_predictions(self, model_name: str, hours_back: int = 24) -> np.ndarray:
         """Get recent predictions for drift detection"""
-        # This would query recent predictions
-        # For now, return empty array
-        return np.array([])
+        start_time = datetime.utcnow() - timedelta(hours=hours_back)
+        return await asyncio.to_thread(
+            self.prediction_log.predictions, model_name, start_time, None
+        )
     
     async def _get_labeled_predictions(self, model_name: str) -> Tuple[np.ndarray, np.ndarray]:
         """Get predictions with ground truth labels"""
@@ -725,71 +900,51 @@ class ModelMonitor:
                                   end_time: datetime) -> int:
         """Get prediction count for time period"""
         try:
-            # This would query your prediction logs
-            # For now, return a placeholder count
-            cache_key = f"prediction_count:{model_name}:{start_time.isoformat()}:{end_time.isoformat()}"
-            cached_count = await self.redis_client.get(cache_key)
-            
-            if cached_count:
-                return int(cached_count)
-            
-            # Placeholder implementation
-            # In production, query your prediction logs database
-            count = np.random.randint(50, 200)  # Random count for demonstration
-            
-            # Cache for 1 hour
-            await self.redis_client.setex(cache_key, 3600, str(count))
-            
-            return count
-            
+            return await asyncio.to_thread(
+                self.prediction_log.count, model_name, start_time, end_time
+            )
         except Exception as e:
             logger.error(f"Failed to get prediction count: {e}")
             return 0
     
+    @staticmethod
+    def _history_key(model_name: str) -> str:
+        return f"monitoring:history:{model_name}"
+    
     async def _store_monitoring_results(self, model_name: str, health_report: Dict[str, Any]):
         """Store monitoring results for historical analysis"""
         try:
-            # Store in Redis with timestamp
-            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            key = f"monitoring:{model_name}:{timestamp}"
-            
-            await self.redis_client.setex(
-                key,
-                self.monitoring_config['data_retention_days'] * 24 * 3600,  # Convert to seconds
-                json.dumps(health_report, default=str)
-            )
-            
-            # Also store latest result
-            latest_key = f"monitoring:latest:{model_name}"
-            await self.redis_client.setex(
-                latest_key,
-                24 * 3600,  # 24 hours
-                json.dumps(health_report, default=str)
-            )
+            # Per-model sorted set scored by timestamp: range reads, no KEYS scans
+            now = datetime.utcnow()
+            retention_seconds = self.monitoring_config['data_retention_days'] * 24 * 3600
+            history_key = self._history_key(model_name)
+            report_json = json.dumps(health_report, default=str)
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.zadd(history_key, {report_json: now.timestamp()})
+                pipe.zremrangebyscore(history_key, '-inf', now.timestamp() - retention_seconds)
+                pipe.expire(history_key, retention_seconds)
+                
+                # Also store latest result
+                pipe.setex(f"monitoring:latest:{model_name}", 24 * 3600, report_json)
+                await pipe.execute()
             
         except Exception as e:
             logger.error(f"Failed to store monitoring results: {e}")
     
     async def get_monitoring_history(self, 
                                    model_name: str, 
-                                   hours_back: int = 168) -> List[Dict[str, Any]]:
-        """Get monitoring history for a model"""
+                                   hours_back: int = 168,
+                                   limit: int = 100) -> List[Dict[str, Any]]:
+        """Get monitoring history for a model, newest first"""
         try:
-            # Get monitoring keys for the specified time period
-            pattern = f"monitoring:{model_name}:*"
-            keys = await self.redis_client.keys(pattern)
-            
-            history = []
-            for key in keys:
-                data = await self.redis_client.get(key)
-                if data:
-                    monitoring_result = json.loads(data)
-                    history.append(monitoring_result)
-            
-            # Sort by timestamp
-            history.sort(key=lambda x: x.get('monitored_at', ''), reverse=True)
+            since = datetime.utcnow() - timedelta(hours=hours_back)
             
-            return history[:100]  # Limit to last 100 results
+            # Single range query over the model's history
+            entries = await self.redis_client.zrevrangebyscore(
+                self._history_key(model_name), '+inf', since.timestamp(), start=0, num=limit
+            )
+            return [json.loads(entry) for entry in entries]
             
         except Exception as e:
             logger.error(f"Failed to get monitoring history: {e}")
@@ -815,10 +970,13 @@ class ModelMonitor:
             alert_key = f"alert:{model_name}:{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
             await self.redis_client.setex(alert_key, 7 * 24 * 3600, json.dumps(alert))  # 7 days
             
-            # Add to alerts list
+            # Add to alerts list, and index the model so listing never scans keys
             alerts_list_key = f"alerts:{model_name}"
-            await self.redis_client.lpush(alerts_list_key, json.dumps(alert))
-            await self.redis_client.ltrim(alerts_list_key, 0, 99)  # Keep last 100 alerts
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.lpush(alerts_list_key, json.dumps(alert))
+                pipe.ltrim(alerts_list_key, 0, 99)  # Keep last 100 alerts
+                pipe.sadd(self.ALERT_MODELS_KEY, model_name)
+                await pipe.execute()
             
             logger.info(
                 "Monitoring alert created",
@@ -830,6 +988,31 @@ class ModelMonitor:
         except Exception as e:
             logger.error(f"Failed to create monitoring alert: {e}")
     
+    @classmethod
+    async def backfill_alert_index(cls, redis_client: redis.Redis) -> int:
+        """
+        One-time index of ``alerts:<model>`` lists written before the
+        ``alerts:models`` set existed, so their alerts stay listed for all
+        models. Runs a SCAN once per Redis instance; repeated or concurrent
+        runs are harmless.
+        """
+        if await redis_client.exists(cls.ALERT_INDEX_BACKFILLED_KEY):
+            return 0
+        
+        model_names = set()
+        async for key in redis_client.scan_iter(match="alerts:*", count=1000, _type="list"):
+            key = key.decode() if isinstance(key, bytes) else key
+            model_names.add(key.split(":", 1)[1])
+        
+        async with redis_client.pipeline(transaction=False) as pipe:
+            if model_names:
+                pipe.sadd(cls.ALERT_MODELS_KEY, *model_names)
+            pipe.set(cls.ALERT_INDEX_BACKFILLED_KEY, datetime.utcnow().isoformat())
+            await pipe.execute()
+        
+        logger.info("Alert model index backfilled", models=len(model_names))
+        return len(model_names)
+    
     async def get_active_alerts(self, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get active monitoring alerts"""
         try:
@@ -837,14 +1020,16 @@ class ModelMonitor:
                 alerts_key = f"alerts:{model_name}"
                 alerts_data = await self.redis_client.lrange(alerts_key, 0, -1)
             else:
-                # Get alerts for all models
-                pattern = "alerts:*"
-                keys = await self.redis_client.keys(pattern)
+                # Get alerts for all models in one pipelined round trip
+                model_names = await self.redis_client.smembers(self.ALERT_MODELS_KEY)
                 alerts_data = []
                 
-                for key in keys:
-                    key_alerts = await self.redis_client.lrange(key, 0, -1)
-                    alerts_data.extend(key_alerts)
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for name in model_names:
+                        name = name.decode() if isinstance(name, bytes) else name
+                        pipe.lrange(f"alerts:{name}", 0, -1)
+                    for key_alerts in await pipe.execute():
+                        alerts_data.extend(key_alerts)
             
             alerts = []
             for alert_json in alerts_data:
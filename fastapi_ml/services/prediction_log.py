@@ -0,0 +1,598 @@
+"""
+Prediction Log - Append-only columnar log of served predictions
+
+Predictions are buffered in memory and flushed asynchronously to Parquet
+segment files, hive-partitioned by model and hour::
+
+    <root>/model_name=price_predictor/hour=2024-05-01T13/part-<ts>-<id>.parquet
+
+Each row holds the timestamp, model name/version, a digest of the input
+features, the numeric feature values (``feature__<name>`` columns), the
+prediction and the serving latency. Every segment is written with a
+mergeable distribution sketch of its features and predictions (see
+drift_sketches), so drift checks never rescan raw rows. Closed hours are
+compacted into a single segment and sketch, and partitions past the
+retention window are dropped. Every worker process runs maintenance, so
+compaction of an hour partition holds an exclusive lock on its
+``.compact.lock`` file; other workers skip that hour.
+
+Readers only open the model/hour partitions overlapping the query window,
+push timestamp predicates down to Parquet row groups through pyarrow
+datasets, and read only the requested columns.
+"""
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import structlog
+
+from .drift_sketches import PREDICTION_FEATURE, SketchSet
+from ..config import settings
+
+logger = structlog.get_logger()
+
+FEATURE_PREFIX = 'feature__'
+HOUR_FORMAT = '%Y-%m-%dT%H'
+
+BASE_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('model_version', pa.string()),
+    ('features_digest', pa.string()),
+    ('prediction', pa.float64()),
+    ('latency_ms', pa.float64()),
+    ('success', pa.bool_()),
+    ('error', pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('model_name', pa.string()), ('hour', pa.string())]),
+    flavor='hive',
+)
+
+
+def _hour_key(timestamp: datetime) -> str:
+    return timestamp.strftime(HOUR_FORMAT)
+
+
+def features_digest(features: pd.DataFrame) -> np.ndarray:
+    """Stable per-row digest of feature values"""
+    if features.empty and len(features.columns) == 0:
+        return np.full(len(features), '', dtype=object)
+    hashes = pd.util.hash_pandas_object(features, index=False).to_numpy()
+    return np.array([format(value, '016x') for value in hashes], dtype=object)
+
+
+@contextmanager
+def try_lock_file(path: Path) -> Iterator[bool]:
+    """
+    Hold a non-blocking exclusive lock on ``path`` (created if missing),
+    yielding whether it was acquired. Uses ``flock`` on POSIX and
+    ``msvcrt.locking`` on the first byte of the file on Windows.
+    """
+    with open(path, 'a+') as lock:
+        if os.name == 'nt':
+            import msvcrt
+
+            lock.seek(0)
+            try:
+                msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class PredictionLogWriter:
+    """
+    Buffered, asynchronous writer for the prediction log
+
+    ``log_predictions`` only appends to an in-memory buffer. The buffer is
+    written out when it reaches ``buffer_size`` rows or every
+    ``flush_interval`` seconds, in a worker thread so serving never blocks
+    on disk I/O.
+    """
+
+    def __init__(self,
+                 root: Optional[str] = None,
+                 buffer_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None,
+                 retention_days: Optional[int] = None):
+        self.root = Path(root or settings.PREDICTION_LOG_PATH)
+        self.buffer_size = buffer_size or settings.PREDICTION_LOG_BUFFER_SIZE
+        self.flush_interval = flush_interval or settings.PREDICTION_LOG_FLUSH_SECONDS
+        self.retention_days = retention_days or settings.PREDICTION_LOG_RETENTION_DAYS
+
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered_rows = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._pending_flushes: set = set()
+        self._last_maintained_hour: Optional[str] = None
+
+    def log_predictions(self,
+                        model_name: str,
+                        model_version: str,
+                        predictions: Sequence[float],
+                        features: Optional[pd.DataFrame] = None,
+                        latency_ms: float = 0.0,
+                        timestamp: Optional[datetime] = None) -> None:
+        """Buffer one row per prediction"""
+        n_rows = len(predictions)
+        if n_rows == 0:
+            return
+
+        features = features if features is not None else pd.DataFrame(index=range(n_rows))
+        numeric = features.select_dtypes(include=[np.number, 'bool']).astype(np.float64)
+
+        frame = pd.DataFrame({
+            'timestamp': np.full(n_rows, np.datetime64(timestamp or datetime.utcnow(), 'us')),
+            'model_name': model_name,
+            'model_version': model_version,
+            'features_digest': features_digest(numeric),
+            'prediction': np.asarray(predictions, dtype=np.float64),
+            'latency_ms': float(latency_ms),
+            'success': True,
+            'error': None,
+        })
+        for column in numeric.columns:
+            frame[f'{FEATURE_PREFIX}{column}'] = numeric[column].to_numpy()
+
+        self._append(frame)
+
+    def log_failure(self,
+                    model_name: str,
+                    error: str,
+                    latency_ms: float = 0.0,
+                    count: int = 1,
+                    timestamp: Optional[datetime] = None) -> None:
+        """Buffer failed prediction attempts"""
+        self._append(pd.DataFrame({
+            'timestamp': np.full(count, np.datetime64(timestamp or datetime.utcnow(), 'us')),
+            'model_name': model_name,
+            'model_version': None,
+            'features_digest': None,
+            'prediction': np.nan,
+            'latency_ms': float(latency_ms),
+            'success': False,
+            'error': str(error)[:500],
+        }))
+
+    def _append(self, frame: pd.DataFrame) -> None:
+        if not settings.PREDICTION_LOG_ENABLED:
+            return
+
+        self._buffer.append(frame)
+        self._buffered_rows += len(frame)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, training jobs): write through
+            self._write_segments(self._drain())
+            return
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_periodically())
+        if self._buffered_rows >= self.buffer_size:
+            task = loop.create_task(self.flush())
+            self._pending_flushes.add(task)
+            task.add_done_callback(self._pending_flushes.discard)
+
+    def _drain(self) -> Optional[pd.DataFrame]:
+        if not self._buffer:
+            return None
+        frames, self._buffer, self._buffered_rows = self._buffer, [], 0
+        return pd.concat(frames, ignore_index=True, sort=False)
+
+    async def flush(self) -> int:
+        """Write buffered rows to new segment files"""
+        async with self._flush_lock:
+            frame = self._drain()
+            if frame is None:
+                return 0
+            try:
+                await asyncio.to_thread(self._write_segments, frame)
+            except Exception as e:
+                logger.error("Failed to flush prediction log", rows=len(frame), error=str(e))
+                return 0
+            return len(frame)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+            current_hour = _hour_key(datetime.utcnow())
+            if current_hour != self._last_maintained_hour:
+                self._last_maintained_hour = current_hour
+                async with self._flush_lock:
+                    try:
+                        await asyncio.to_thread(self._maintain, current_hour)
+                    except Exception as e:
+                        logger.error("Prediction log maintenance failed", error=str(e))
+
+    async def close(self) -> None:
+        """Stop the flush loop and write everything still buffered"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._pending_flushes:
+            await asyncio.gather(*self._pending_flushes, return_exceptions=True)
+        await self.flush()
+
+    def _partition_dir(self, model_name: str, hour: str) -> Path:
+        return self.root / f'model_name={quote(model_name, safe="")}' / f'hour={hour}'
+
+    def _write_segments(self, frame: Optional[pd.DataFrame]) -> None:
+        if frame is None or frame.empty:
+            return
+
+        hours = frame['timestamp'].dt.strftime(HOUR_FORMAT)
+        for (model_name, hour), group in frame.groupby([frame['model_name'], hours], sort=False):
+            columns = [col for col in group.columns if col != 'model_name']
+            group = group[columns].dropna(axis=1, how='all').reset_index(drop=True)
+            table = pa.Table.from_pandas(group, preserve_index=False)
+            table = self._conform(table)
+
+            directory = self._partition_dir(model_name, hour)
+            directory.mkdir(parents=True, exist_ok=True)
+            stem = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+            tmp_path = directory / f'.part-{stem}.tmp'
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.replace(tmp_path, directory / f'part-{stem}.parquet')
+
+            sketch = self._sketch(group)
+            if sketch is not None:
+                self._write_sketch(directory / f'sketch-{stem}.npz', sketch)
+
+    @staticmethod
+    def _sketch(group: pd.DataFrame) -> Optional[SketchSet]:
+        """Distribution sketch of the features and predictions of successful rows"""
+        successful = group[group['success'].astype(bool)]
+        if successful.empty:
+            return None
+        columns = {
+            col: col[len(FEATURE_PREFIX):]
+            for col in successful.columns if col.startswith(FEATURE_PREFIX)
+        }
+        columns['prediction'] = PREDICTION_FEATURE
+        return SketchSet.from_frame(successful[list(columns)].rename(columns=columns))
+
+    @staticmethod
+    def _write_sketch(path: Path, sketch: SketchSet) -> None:
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **sketch.to_arrays())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _conform(table: pa.Table) -> pa.Table:
+        """Cast the fixed columns to the log schema, adding any that are missing"""
+        for field in BASE_SCHEMA:
+            if field.name in table.column_names:
+                index = table.column_names.index(field.name)
+                table = table.set_column(index, field, table.column(field.name).cast(field.type))
+            else:
+                table = table.append_column(field, pa.nulls(len(table), field.type))
+        return table
+
+    def _maintain(self, current_hour: str) -> None:
+        """Compact closed hours and drop partitions past retention"""
+        if not self.root.exists():
+            return
+
+        cutoff = _hour_key(datetime.utcnow() - timedelta(days=self.retention_days))
+        for model_dir in self.root.glob('model_name=*'):
+            for hour_dir in model_dir.glob('hour=*'):
+                hour = hour_dir.name.split('=', 1)[1]
+                if hour < cutoff:
+                    shutil.rmtree(hour_dir, ignore_errors=True)
+                elif hour < current_hour:
+                    self._compact(hour_dir)
+
+    @classmethod
+    def _compact(cls, hour_dir: Path) -> None:
+        with try_lock_file(hour_dir / '.compact.lock') as acquired:
+            if not acquired:
+                # Another worker is compacting this hour
+                return
+            cls._compact_locked(hour_dir)
+
+    @classmethod
+    def _compact_locked(cls, hour_dir: Path) -> None:
+        # Compacted sketches are never merged again, so a sketch is only ever
+        # counted once even if a late segment arrives for a compacted hour
+        sketches = sorted(path for path in hour_dir.glob('sketch-*.npz') if not path.name.startswith('sketch-c'))
+        if len(sketches) >= 2:
+            merged = SketchSet.from_arrays(_load_sketch(path) for path in sketches)
+            cls._write_sketch(hour_dir / sketches[-1].name.replace('sketch-', 'sketch-c', 1), merged)
+            for path in sketches:
+                path.unlink(missing_ok=True)
+
+        segments = sorted(hour_dir.glob('part-*.parquet'))
+        if len(segments) < 2:
+            return
+
+        table = pa.concat_tables(
+            [pq.read_table(segment) for segment in segments],
+            promote_options='default'
+        ).sort_by('timestamp')
+        tmp_path = hour_dir / f'.compacted-{uuid.uuid4().hex}.tmp'
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, hour_dir / segments[-1].name.replace('part-', 'part-c', 1))
+        for segment in segments:
+            segment.unlink(missing_ok=True)
+
+
+def _load_sketch(path: Path) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+class PredictionLogReader:
+    """Query API over the prediction log"""
+
+    # Stored sketches are small and immutable once written; keep recent ones in memory
+    SKETCH_CACHE_SIZE = 4096
+    # Scans re-list the partitions when compaction removes a file mid-scan
+    SCAN_ATTEMPTS = 3
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.PREDICTION_LOG_PATH)
+        self._sketch_cache: 'OrderedDict[str, Dict[str, np.ndarray]]' = OrderedDict()
+
+    def _segment_paths(self,
+                       model_name: Optional[str],
+                       start_time: Optional[datetime],
+                       end_time: Optional[datetime],
+                       pattern: str = 'part-*.parquet',
+                       include_end_hour: bool = True) -> List[str]:
+        """Segment files in the partitions overlapping the query window"""
+        if model_name is not None:
+            model_dirs = [self.root / f'model_name={quote(model_name, safe="")}']
+        else:
+            model_dirs = list(self.root.glob('model_name=*'))
+        first_hour = _hour_key(start_time) if start_time is not None else None
+        last_hour = _hour_key(end_time) if end_time is not None else None
+
+        paths = []
+        for model_dir in model_dirs:
+            if not model_dir.is_dir():
+                continue
+            for hour_dir in model_dir.glob('hour=*'):
+                hour = hour_dir.name.split('=', 1)[1]
+                if first_hour and hour < first_hour:
+                    continue
+                if last_hour and (hour > last_hour or (hour == last_hour and not include_end_hour)):
+                    continue
+                paths.extend(str(path) for path in hour_dir.glob(pattern))
+        return paths
+
+    def _dataset(self,
+                 model_name: Optional[str],
+                 start_time: Optional[datetime],
+                 end_time: Optional[datetime]) -> Optional[ds.Dataset]:
+        paths = self._segment_paths(model_name, start_time, end_time)
+        if not paths:
+            return None
+
+        # Segments written by different model versions may carry different
+        # feature columns; unify so missing columns read as nulls
+        schema = pa.unify_schemas(
+            [pq.read_schema(path) for path in paths] + [PARTITIONING.schema],
+            promote_options='permissive'
+        )
+        return ds.dataset(
+            paths,
+            schema=schema,
+            format='parquet',
+            partitioning=PARTITIONING,
+            partition_base_dir=str(self.root),
+        )
+
+    @staticmethod
+    def _row_filter(start_time: Optional[datetime],
+                    end_time: Optional[datetime],
+                    success: Optional[bool]) -> Optional[ds.Expression]:
+        conditions = []
+        if start_time is not None:
+            conditions.append(ds.field('timestamp') >= pa.scalar(start_time, pa.timestamp('us')))
+        if end_time is not None:
+            conditions.append(ds.field('timestamp') < pa.scalar(end_time, pa.timestamp('us')))
+        if success is not None:
+            conditions.append(ds.field('success') == success)
+        return _combine(conditions)
+
+    def read(self,
+             model_name: Optional[str] = None,
+             start_time: Optional[datetime] = None,
+             end_time: Optional[datetime] = None,
+             columns: Optional[List[str]] = None,
+             success: Optional[bool] = True) -> pd.DataFrame:
+        """Rows in ``[start_time, end_time)``, projected onto ``columns``"""
+        def scan():
+            dataset = self._dataset(model_name, start_time, end_time)
+            if dataset is None:
+                return pd.DataFrame(columns=columns or [])
+            projection = columns
+            if projection is not None:
+                projection = [col for col in projection if col in dataset.schema.names]
+            return dataset.to_table(
+                columns=projection, filter=self._row_filter(start_time, end_time, success)
+            ).to_pandas()
+
+        return self._scan(scan)
+
+    def count(self,
+              model_name: Optional[str] = None,
+              start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None,
+              success: Optional[bool] = True) -> int:
+        """Number of logged predictions in ``[start_time, end_time)``"""
+        def scan():
+            dataset = self._dataset(model_name, start_time, end_time)
+            if dataset is None:
+                return 0
+            return dataset.count_rows(filter=self._row_filter(start_time, end_time, success))
+
+        return self._scan(scan)
+
+    def predictions(self,
+                    model_name: str,
+                    start_time: Optional[datetime] = None,
+                    end_time: Optional[datetime] = None) -> np.ndarray:
+        """Predicted values only"""
+        frame = self.read(model_name, start_time, end_time, columns=['prediction'])
+        if frame.empty:
+            return np.array([])
+        return frame['prediction'].dropna().to_numpy()
+
+    def features(self,
+                 model_name: str,
+                 feature_columns: Optional[List[str]] = None,
+                 start_time: Optional[datetime] = None,
+                 end_time: Optional[datetime] = None) -> pd.DataFrame:
+        """Logged input features, reading only the requested feature columns"""
+        if feature_columns is None:
+            frame = self.read(model_name, start_time, end_time)
+            frame = frame[[col for col in frame.columns if col.startswith(FEATURE_PREFIX)]]
+        else:
+            frame = self.read(
+                model_name, start_time, end_time,
+                columns=[f'{FEATURE_PREFIX}{feature}' for feature in feature_columns]
+            )
+        return frame.rename(columns=lambda col: col[len(FEATURE_PREFIX):])
+
+    def sketches(self,
+                 model_name: str,
+                 start_time: Optional[datetime] = None,
+                 end_time: Optional[datetime] = None,
+                 features: Optional[List[str]] = None) -> SketchSet:
+        """
+        Merged distribution sketches of features (and ``PREDICTION_FEATURE``)
+
+        Sketches are kept per hour partition, so the window is aligned to
+        whole hours: the hour containing ``start_time`` is included and the
+        hour containing ``end_time`` is not, so adjacent windows (such as a
+        drift reference window and the recent window after it) never share
+        an hour.
+        """
+        def scan():
+            stored = []
+            paths = self._segment_paths(
+                model_name, start_time, end_time, pattern='sketch-*.npz', include_end_hour=False
+            )
+            for path in paths:
+                arrays = self._sketch_cache.get(path)
+                if arrays is None:
+                    arrays = _load_sketch(Path(path))
+                    self._sketch_cache[path] = arrays
+                    if len(self._sketch_cache) > self.SKETCH_CACHE_SIZE:
+                        self._sketch_cache.popitem(last=False)
+                else:
+                    self._sketch_cache.move_to_end(path)
+                stored.append(arrays)
+            return stored
+
+        return SketchSet.from_arrays(self._scan(scan), features)
+
+    def _scan(self, scan):
+        """Run ``scan``, retrying with a fresh listing if compaction removed a file mid-scan"""
+        for attempt in range(self.SCAN_ATTEMPTS):
+            try:
+                return scan()
+            except FileNotFoundError:
+                if attempt == self.SCAN_ATTEMPTS - 1:
+                    raise
+                logger.debug("Prediction log file compacted away during scan, retrying")
+
+    def volume(self,
+               model_name: Optional[str],
+               start_time: datetime,
+               end_time: datetime,
+               granularity: str = 'hour') -> pd.DataFrame:
+        """Prediction and error counts per time bucket, zero-filled"""
+        freq = 'h' if granularity == 'hour' else 'D'
+        buckets = pd.date_range(
+            pd.Timestamp(start_time).floor(freq), pd.Timestamp(end_time).floor(freq), freq=freq
+        )
+
+        frame = self.read(model_name, start_time, end_time,
+                          columns=['timestamp', 'success'], success=None)
+        if frame.empty:
+            counts = pd.DataFrame(0, index=buckets, columns=['prediction_count', 'error_count'])
+        else:
+            bucket = frame['timestamp'].dt.floor(freq)
+            counts = pd.DataFrame({
+                'prediction_count': frame['success'].groupby(bucket).sum(),
+                'error_count': (~frame['success']).groupby(bucket).sum(),
+            }).reindex(buckets, fill_value=0)
+
+        counts.index.name = 'timestamp'
+        return counts.astype(int).reset_index()
+
+    def errors(self,
+               model_name: Optional[str],
+               start_time: datetime,
+               end_time: datetime) -> pd.DataFrame:
+        """Failed prediction attempts"""
+        return self.read(model_name, start_time, end_time,
+                         columns=['timestamp', 'model_name', 'error'], success=False)
+
+    def model_names(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(unquote(path.name.split('=', 1)[1]) for path in self.root.glob('model_name=*'))
+
+
+def _combine(conditions: List[Optional[ds.Expression]]) -> Optional[ds.Expression]:
+    combined = None
+    for condition in conditions:
+        if condition is None:
+            continue
+        combined = condition if combined is None else combined & condition
+    return combined
+
+
+_writer: Optional[PredictionLogWriter] = None
+
+
+def get_prediction_log_writer() -> PredictionLogWriter:
+    """Process-wide prediction log writer"""
+    global _writer
+    if _writer is None:
+        _writer = PredictionLogWriter()
+    return _writer
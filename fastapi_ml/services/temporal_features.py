@@ -0,0 +1,389 @@
+"""
+Temporal Feature Engine - Calendar-aware lag and rolling price features
+
+Lags and rolling windows are defined in calendar days rather than rows, so
+``price_lag_7`` is the last observed price at or before ``t - 7 days`` and
+``price_rolling_mean_30`` aggregates observations in ``[t - 30 days, t)``.
+Windows are left-closed: a row's own price never leaks into its features,
+which keeps training features identical to what is available at serving time.
+
+The same window specification drives two execution paths:
+
+* ``compute_batch`` - vectorized training path using ``merge_asof`` for lags
+  and ``groupby().rolling('<N>D')`` for windows.
+* ``update`` / ``lookup`` - online path keeping per-(material, supplier)
+  incremental state so a new price costs O(1) amortized work.
+"""
+import copy
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import structlog
+
+from ..config import FEATURE_CONFIG
+
+logger = structlog.get_logger()
+
+ENTITY_COLUMNS = ('material_id', 'supplier_id')
+
+
+@dataclass(frozen=True)
+class WindowSpec:
+    """A single calendar-based price feature parsed from FEATURE_CONFIG"""
+
+    name: str
+    kind: str  # 'lag', 'rolling_mean' or 'rolling_std'
+    days: int
+
+    @property
+    def offset(self) -> pd.Timedelta:
+        return pd.Timedelta(days=self.days)
+
+
+def parse_window_specs(feature_names: List[str]) -> List[WindowSpec]:
+    """Parse ``price_lag_N`` / ``price_rolling_{mean,std}_N`` feature names"""
+    specs = []
+    for feature_name in feature_names:
+        try:
+            days = int(feature_name.split('_')[-1])
+        except ValueError:
+            logger.warning("Unrecognised price feature", feature=feature_name)
+            continue
+
+        if 'rolling_mean' in feature_name:
+            kind = 'rolling_mean'
+        elif 'rolling_std' in feature_name:
+            kind = 'rolling_std'
+        elif 'lag' in feature_name:
+            kind = 'lag'
+        else:
+            logger.warning("Unrecognised price feature", feature=feature_name)
+            continue
+
+        specs.append(WindowSpec(name=feature_name, kind=kind, days=days))
+    return specs
+
+
+class _RollingWindow:
+    """Running sum / sum-of-squares over observations in ``[t - N, t)``"""
+
+    __slots__ = ('offset', 'values', 'total', 'total_sq')
+
+    def __init__(self, offset: pd.Timedelta):
+        self.offset = offset
+        self.values: Deque[Tuple[pd.Timestamp, float]] = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, timestamp: pd.Timestamp, value: float) -> None:
+        self.values.append((timestamp, value))
+        self.total += value
+        self.total_sq += value * value
+
+    def advance(self, now: pd.Timestamp) -> None:
+        cutoff = now - self.offset
+        while self.values and self.values[0][0] < cutoff:
+            _, value = self.values.popleft()
+            self.total -= value
+            self.total_sq -= value * value
+
+    def _stats(self, now: pd.Timestamp) -> Tuple[int, float, float]:
+        """Stats over ``[now - N, now)`` without evicting anything"""
+        count, total, total_sq = len(self.values), self.total, self.total_sq
+        # Observations stamped at or after ``now`` sit outside the window
+        for timestamp, value in reversed(self.values):
+            if timestamp < now:
+                break
+            count -= 1
+            total -= value
+            total_sq -= value * value
+        # As do those the next ``advance`` would evict
+        cutoff = now - self.offset
+        for timestamp, value in self.values:
+            if timestamp >= cutoff:
+                break
+            count -= 1
+            total -= value
+            total_sq -= value * value
+        return count, total, total_sq
+
+    def mean(self, now: pd.Timestamp) -> float:
+        count, total, _ = self._stats(now)
+        return total / count if count else np.nan
+
+    def std(self, now: pd.Timestamp) -> float:
+        count, total, total_sq = self._stats(now)
+        if count < 2:
+            return np.nan
+        variance = (total_sq - total * total / count) / (count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+
+class _LagCursor:
+    """Tracks the last observation at or before ``t - N``"""
+
+    __slots__ = ('offset', 'pending', 'value')
+
+    def __init__(self, offset: pd.Timedelta):
+        self.offset = offset
+        self.pending: Deque[Tuple[pd.Timestamp, float]] = deque()
+        self.value = np.nan
+
+    def push(self, timestamp: pd.Timestamp, value: float) -> None:
+        self.pending.append((timestamp, value))
+
+    def advance(self, now: pd.Timestamp) -> None:
+        cutoff = now - self.offset
+        while self.pending and self.pending[0][0] <= cutoff:
+            _, self.value = self.pending.popleft()
+
+    def value_at(self, now: pd.Timestamp) -> float:
+        """Lag value as of ``now`` without consuming pending observations"""
+        cutoff = now - self.offset
+        value = self.value
+        for timestamp, pending_value in self.pending:
+            if timestamp > cutoff:
+                break
+            value = pending_value
+        return value
+
+
+@dataclass
+class EntityState:
+    """Incremental feature state for one (material, supplier) pair"""
+
+    lags: Dict[str, _LagCursor]
+    windows: Dict[str, _RollingWindow]
+    history: Deque[Tuple[pd.Timestamp, float]] = field(default_factory=deque)
+    clock: Optional[pd.Timestamp] = None
+
+
+class TemporalFeatureEngine:
+    """
+    Calendar-aware lag/rolling feature computation shared by training and serving
+    """
+
+    def __init__(self,
+                 feature_names: Optional[List[str]] = None,
+                 entity_columns: Tuple[str, ...] = ENTITY_COLUMNS):
+        if feature_names is None:
+            feature_names = FEATURE_CONFIG.get('price_features', [])
+        self.specs = parse_window_specs(feature_names)
+        self.entity_columns = entity_columns
+        self.horizon = max((spec.offset for spec in self.specs), default=pd.Timedelta(0))
+        self.states: Dict[Hashable, EntityState] = {}
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [spec.name for spec in self.specs]
+
+    # ------------------------------------------------------------------
+    # Batch (training) path
+    # ------------------------------------------------------------------
+
+    def compute_batch(self,
+                      df: pd.DataFrame,
+                      target_column: str = 'price',
+                      timestamp_column: str = 'timestamp') -> pd.DataFrame:
+        """Compute all configured features for a historical frame"""
+        keys = [col for col in self.entity_columns if col in df.columns]
+        if not keys or target_column not in df.columns or timestamp_column not in df.columns:
+            return df
+
+        features = df.copy()
+        original_index = features.index
+        features = features.reset_index(drop=True)
+        features[timestamp_column] = pd.to_datetime(features[timestamp_column])
+        features = features.sort_values(timestamp_column, kind='mergesort')
+
+        observations = features[keys + [timestamp_column, target_column]].dropna(
+            subset=[timestamp_column, target_column]
+        )
+
+        for spec in self.specs:
+            if spec.kind == 'lag':
+                features[spec.name] = self._batch_lag(
+                    features, observations, keys, spec, target_column, timestamp_column
+                )
+            else:
+                features[spec.name] = self._batch_rolling(
+                    observations, keys, spec, target_column, timestamp_column
+                ).reindex(features.index)
+
+        features = features.sort_index()
+        features.index = original_index
+        return features
+
+    def _batch_lag(self,
+                   features: pd.DataFrame,
+                   observations: pd.DataFrame,
+                   keys: List[str],
+                   spec: WindowSpec,
+                   target_column: str,
+                   timestamp_column: str) -> pd.Series:
+        left = features[keys + [timestamp_column]].copy()
+        left['_row'] = left.index
+        left['_as_of'] = left[timestamp_column] - spec.offset
+        left = left.drop(columns=[timestamp_column]).sort_values('_as_of', kind='mergesort')
+
+        right = observations.rename(
+            columns={timestamp_column: '_as_of', target_column: '_lag_value'}
+        ).sort_values('_as_of', kind='mergesort')
+
+        merged = pd.merge_asof(
+            left, right, on='_as_of', by=keys, direction='backward', allow_exact_matches=True
+        )
+        return merged.set_index('_row')['_lag_value'].reindex(features.index)
+
+    def _batch_rolling(self,
+                       observations: pd.DataFrame,
+                       keys: List[str],
+                       spec: WindowSpec,
+                       target_column: str,
+                       timestamp_column: str) -> pd.Series:
+        # Grouped rolling output is ordered by group key, then by time within
+        # the group; sort the same way so values line up with row labels
+        ordered = observations.dropna(subset=keys).sort_values(
+            keys + [timestamp_column], kind='mergesort'
+        )
+        rolling = (
+            ordered.groupby(keys, sort=True)
+            .rolling(f'{spec.days}D', on=timestamp_column, closed='left', min_periods=1)
+        )[target_column]
+        result = rolling.mean() if spec.kind == 'rolling_mean' else rolling.std()
+        return pd.Series(result.to_numpy(), index=ordered.index)
+
+    # ------------------------------------------------------------------
+    # Online (serving) path
+    # ------------------------------------------------------------------
+
+    def _entity_key(self, record: Dict[str, Any]) -> Hashable:
+        return tuple(record.get(col) for col in self.entity_columns)
+
+    def _new_state(self) -> EntityState:
+        return EntityState(
+            lags={s.name: _LagCursor(s.offset) for s in self.specs if s.kind == 'lag'},
+            windows={s.name: _RollingWindow(s.offset) for s in self.specs if s.kind != 'lag'},
+        )
+
+    def _advance(self, state: EntityState, now: pd.Timestamp) -> None:
+        for cursor in state.lags.values():
+            cursor.advance(now)
+        for window in state.windows.values():
+            window.advance(now)
+        state.clock = now
+
+    def update(self, record: Dict[str, Any], timestamp: Any, price: float) -> None:
+        """Fold a newly observed price into the entity's incremental state"""
+        key = self._entity_key(record)
+        self.states[key] = self._fold(self.states.get(key), pd.Timestamp(timestamp), float(price))
+
+    def _fold(self, state: Optional[EntityState], timestamp: pd.Timestamp, price: float) -> EntityState:
+        """Fold one observation into ``state``, returning the state to keep"""
+        if state is None:
+            state = self._new_state()
+
+        if state.clock is not None and timestamp < state.clock:
+            # Late arrival: rebuild from the retained horizon in timestamp order
+            replay = sorted(list(state.history) + [(timestamp, price)], key=lambda x: x[0])
+            state = self._new_state()
+            for ts, value in replay:
+                self._push(state, ts, value)
+            return state
+
+        self._push(state, timestamp, price)
+        return state
+
+    def _push(self, state: EntityState, timestamp: pd.Timestamp, price: float) -> None:
+        self._advance(state, timestamp)
+        for cursor in state.lags.values():
+            cursor.push(timestamp, price)
+        for window in state.windows.values():
+            window.push(timestamp, price)
+        state.history.append((timestamp, price))
+
+        # Retain the horizon plus the newest observation before it, which is
+        # still the as-of value for the longest lag
+        cutoff = timestamp - self.horizon
+        while len(state.history) > 1 and state.history[1][0] <= cutoff:
+            state.history.popleft()
+
+    def lookup(self, record: Dict[str, Any], timestamp: Any = None) -> Dict[str, float]:
+        """
+        Return features for an entity as of ``timestamp`` (defaults to now)
+
+        Lookups never modify the entity state: only ``update`` moves its
+        clock, so observations stamped before a query are not treated as
+        late arrivals.
+        """
+        now = pd.Timestamp(timestamp) if timestamp is not None else pd.Timestamp(datetime.utcnow())
+        state = self.states.get(self._entity_key(record))
+        if state is None:
+            return {spec.name: np.nan for spec in self.specs}
+
+        if state.clock is not None and now < state.clock:
+            # Point-in-time query behind the live state: evaluate on a scratch copy
+            scratch = self._new_state()
+            for ts, value in state.history:
+                if ts >= now:
+                    break
+                self._push(scratch, ts, value)
+            state = scratch
+
+        values = {name: cursor.value_at(now) for name, cursor in state.lags.items()}
+        for spec in self.specs:
+            if spec.kind == 'rolling_mean':
+                values[spec.name] = state.windows[spec.name].mean(now)
+            elif spec.kind == 'rolling_std':
+                values[spec.name] = state.windows[spec.name].std(now)
+        return values
+
+    def transform_online(self,
+                         df: pd.DataFrame,
+                         timestamp_column: str = 'timestamp') -> pd.DataFrame:
+        """Attach features for inference rows from the incremental state"""
+        features = df.copy()
+        has_timestamp = timestamp_column in features.columns
+        rows = [
+            self.lookup(record, record.get(timestamp_column) if has_timestamp else None)
+            for record in features.to_dict('records')
+        ]
+        lookup_df = pd.DataFrame(rows, index=features.index, columns=self.feature_names)
+        for name in self.feature_names:
+            features[name] = lookup_df[name]
+        return features
+
+    def ingest(self,
+               df: pd.DataFrame,
+               target_column: str = 'price',
+               timestamp_column: str = 'timestamp') -> int:
+        """Warm the online state from historical observations"""
+        if target_column not in df.columns or timestamp_column not in df.columns:
+            return 0
+
+        columns = [col for col in self.entity_columns if col in df.columns]
+        history = df[columns + [timestamp_column, target_column]].dropna(
+            subset=[timestamp_column, target_column]
+        )
+        history = history.assign(
+            **{timestamp_column: pd.to_datetime(history[timestamp_column])}
+        ).sort_values(timestamp_column, kind='mergesort')
+
+        # Fold into copies of the touched entity states and publish each one
+        # whole at the end, so lookups served while this runs in a worker
+        # thread never see a state half-updated
+        staged: Dict[Hashable, EntityState] = {}
+        for record in history.to_dict('records'):
+            key = self._entity_key(record)
+            if key not in staged:
+                current = self.states.get(key)
+                staged[key] = copy.deepcopy(current) if current is not None else None
+            staged[key] = self._fold(staged[key], pd.Timestamp(record[timestamp_column]), float(record[target_column]))
+        self.states.update(staged)
+
+        logger.info("Temporal feature state warmed", observations=len(history), entities=len(self.states))
+        return len(history)
@@ -0,0 +1,306 @@
+"""
+Training Data - Streaming price extraction and Parquet training snapshots
+
+Price history is read from the Django ``prices`` table (joined with
+``materials``, ``pricing_categories`` and ``suppliers``) through a
+server-side cursor, ``chunk_size`` rows at a time. Each chunk is converted
+straight into an Arrow record batch, so the full result set never exists as
+Python tuples or as one large DataFrame.
+
+Snapshots are kept as Parquet parts under ``<root>/prices`` with a manifest
+recording the parts and the extraction watermark::
+
+    <root>/prices/_manifest.json
+    <root>/prices/part-<ts>-<id>.parquet
+
+The watermark is the largest price ``id`` in the snapshot. Ids come from the
+table's sequence, so they follow insertion order even for back-dated rows
+such as imported purchase history, whose ``time`` lies in the past. An
+incremental refresh only extracts rows with a larger id and appends them as
+a new part (``prices`` is append-only); parts are compacted once there are
+more than ``max_parts``.
+Readers only see the parts listed in the manifest, which is replaced
+atomically, so training can read while a refresh is running.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from ..config import settings
+
+logger = structlog.get_logger()
+
+PRICE_SCHEMA = pa.schema([
+    ('price_id', pa.int64()),
+    ('material_id', pa.string()),
+    ('supplier_id', pa.string()),
+    ('organization_id', pa.string()),
+    ('price', pa.float64()),
+    ('quantity', pa.float64()),
+    ('currency', pa.string()),
+    ('price_type', pa.string()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    ('material_category', pa.string()),
+    ('material_type', pa.string()),
+    ('supplier_name', pa.string()),
+    ('supplier_region', pa.string()),
+    ('supplier_rating', pa.float64()),
+])
+
+# Column order matches PRICE_SCHEMA; numeric and UUID columns are cast in SQL
+# so rows convert to Arrow without per-value Python conversion
+PRICE_QUERY = """
+SELECT
+    p.id AS price_id,
+    p.material_id::text AS material_id,
+    p.supplier_id::text AS supplier_id,
+    p.organization_id::text AS organization_id,
+    p.price::double precision AS price,
+    p.quantity::double precision AS quantity,
+    p.currency,
+    p.price_type,
+    p.time AS timestamp,
+    c.name AS material_category,
+    m.material_type,
+    s.name AS supplier_name,
+    s.region AS supplier_region,
+    s.rating::double precision AS supplier_rating
+FROM prices p
+JOIN materials m ON m.id = p.material_id
+LEFT JOIN pricing_categories c ON c.id = m.category_id
+LEFT JOIN suppliers s ON s.id = p.supplier_id
+"""
+
+# Model outputs are excluded from training data; 'historical' rows are
+# imported purchase history (data_ingestion)
+TRAINING_PRICE_TYPES = ('quote', 'contract', 'market', 'benchmark', 'historical')
+
+
+def create_db_engine() -> AsyncEngine:
+    """Async engine for the application database"""
+    return create_async_engine(
+        settings.DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://'),
+        echo=False,
+        pool_pre_ping=True
+    )
+
+
+def rows_to_batch(rows: Sequence[Sequence[Any]], schema: pa.Schema = PRICE_SCHEMA) -> pa.RecordBatch:
+    """Column-wise conversion of result rows to a record batch"""
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+class PriceDataExtractor:
+    """Streams price history out of the database as Arrow record batches"""
+
+    def __init__(self, engine: Optional[AsyncEngine] = None, chunk_size: Optional[int] = None):
+        self._engine = engine
+        self.chunk_size = chunk_size or settings.ETL_CHUNK_SIZE
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = create_db_engine()
+        return self._engine
+
+    async def iter_batches(self,
+                           since: Optional[datetime] = None,
+                           until: Optional[datetime] = None,
+                           limit: Optional[int] = None,
+                           newest_first: bool = False,
+                           after_id: Optional[int] = None) -> AsyncIterator[pa.RecordBatch]:
+        """
+        Yield batches of prices with ``since <= time <= until`` and ``id > after_id``
+
+        ``time`` is when the price was observed (the table has no insertion
+        timestamp), so date bounds select by observation time; insertion
+        order is only tracked through the strict ``after_id`` watermark.
+        """
+        query = PRICE_QUERY + " WHERE 1=1"
+        params: Dict[str, Any] = {}
+        if after_id is not None:
+            query += " AND p.id > :after_id"
+            params['after_id'] = after_id
+        if since is not None:
+            query += " AND p.time >= :since"
+            params['since'] = since
+        if until is not None:
+            query += " AND p.time <= :until"
+            params['until'] = until
+        query += f" ORDER BY p.time {'DESC' if newest_first else 'ASC'}, p.id"
+        if limit:
+            query += " LIMIT :limit"
+            params['limit'] = limit
+
+        async with self.engine.connect() as conn:
+            result = await conn.stream(
+                text(query).execution_options(yield_per=self.chunk_size),
+                params
+            )
+            async for rows in result.partitions(self.chunk_size):
+                yield rows_to_batch(rows)
+
+    async def extract_frame(self, **kwargs) -> pd.DataFrame:
+        """All matching prices as one DataFrame, assembled from the Arrow batches"""
+        batches = [batch async for batch in self.iter_batches(**kwargs)]
+        return pa.Table.from_batches(batches, schema=PRICE_SCHEMA).to_pandas()
+
+
+class PriceSnapshotStore:
+    """Parquet snapshots of price history, refreshed incrementally"""
+
+    def __init__(self,
+                 root: Optional[str] = None,
+                 extractor: Optional[PriceDataExtractor] = None,
+                 max_parts: Optional[int] = None,
+                 clock: Optional[Callable[[], datetime]] = None):
+        self.root = Path(root or settings.TRAINING_SNAPSHOT_PATH) / 'prices'
+        self.extractor = extractor or PriceDataExtractor()
+        self.max_parts = max_parts or settings.TRAINING_SNAPSHOT_MAX_PARTS
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self._refresh_lock = asyncio.Lock()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / '_manifest.json'
+
+    def manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.manifest_path.read_text())
+        except FileNotFoundError:
+            return {'watermark': None, 'parts': [], 'rows': 0}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = self.root / '._manifest.tmp'
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, self.manifest_path)
+
+    async def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Extract prices inserted after the watermark (everything when
+        ``full``) into a new snapshot part
+        """
+        async with self._refresh_lock:
+            manifest = self.manifest()
+            watermark = manifest['watermark']
+            if watermark is not None and not isinstance(watermark, int):
+                # Snapshots from before id watermarks are rebuilt once
+                full = True
+            after_id = since_id = None if full else watermark
+            refreshed_at = self.clock()
+
+            self.root.mkdir(parents=True, exist_ok=True)
+            stem = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+            tmp_path = self.root / f'.part-{stem}.tmp'
+            rows = 0
+            writer = pq.ParquetWriter(tmp_path, PRICE_SCHEMA, compression='zstd')
+            try:
+                async for batch in self.extractor.iter_batches(after_id=after_id):
+                    if not batch.num_rows:
+                        continue
+                    await asyncio.to_thread(writer.write_batch, batch)
+                    rows += batch.num_rows
+                    last_id = pc.max(batch.column('price_id')).as_py()
+                    after_id = last_id if after_id is None else max(after_id, last_id)
+            except BaseException:
+                writer.close()
+                tmp_path.unlink(missing_ok=True)
+                raise
+            writer.close()
+
+            replaced = manifest['parts'] if full else []
+            parts = [] if full else list(manifest['parts'])
+            if rows:
+                part_name = f'part-{stem}.parquet'
+                os.replace(tmp_path, self.root / part_name)
+                parts.append(part_name)
+            else:
+                tmp_path.unlink(missing_ok=True)
+
+            manifest = {
+                'watermark': after_id,
+                'parts': parts,
+                'rows': (0 if full else manifest['rows']) + rows,
+                'refreshed_at': refreshed_at.isoformat(),
+            }
+            self._write_manifest(manifest)
+            self._remove_parts(replaced)
+            if len(parts) > self.max_parts:
+                await asyncio.to_thread(self._compact)
+
+        logger.info("Price snapshot refreshed", full=since_id is None, new_rows=rows, total_rows=manifest['rows'])
+        return {'new_rows': rows, 'total_rows': manifest['rows'], 'watermark': manifest['watermark']}
+
+    def _remove_parts(self, parts: List[str]) -> None:
+        for name in parts:
+            (self.root / name).unlink(missing_ok=True)
+
+    def _compact(self) -> None:
+        """Merge all listed parts into one"""
+        manifest = self.manifest()
+        parts = manifest['parts']
+        if len(parts) < 2:
+            return
+
+        stem = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+        tmp_path = self.root / f'.part-{stem}.tmp'
+        with pq.ParquetWriter(tmp_path, PRICE_SCHEMA, compression='zstd') as writer:
+            for name in parts:
+                writer.write_table(pq.read_table(self.root / name, schema=PRICE_SCHEMA))
+        part_name = f'part-c{stem}.parquet'
+        os.replace(tmp_path, self.root / part_name)
+
+        self._write_manifest({**manifest, 'parts': [part_name]})
+        self._remove_parts(parts)
+
+    def read(self,
+             since: Optional[datetime] = None,
+             price_types: Optional[Sequence[str]] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Snapshot rows as a DataFrame, filtered in the Parquet scan (``timestamp >= since``)"""
+        parts = self.manifest()['parts']
+        if not parts:
+            return pd.DataFrame(columns=columns or PRICE_SCHEMA.names)
+
+        dataset = ds.dataset([str(self.root / name) for name in parts], schema=PRICE_SCHEMA, format='parquet')
+        conditions = []
+        if since is not None:
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            conditions.append(ds.field('timestamp') >= pa.scalar(since, PRICE_SCHEMA.field('timestamp').type))
+        if price_types:
+            conditions.append(ds.field('price_type').isin(list(price_types)))
+
+        scan_filter = None
+        for condition in conditions:
+            scan_filter = condition if scan_filter is None else scan_filter & condition
+        return dataset.to_table(columns=columns, filter=scan_filter).to_pandas()
+
+
+_snapshot_store: Optional[PriceSnapshotStore] = None
+
+
+def get_price_snapshot_store() -> PriceSnapshotStore:
+    """Process-wide price snapshot store"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        _snapshot_store = PriceSnapshotStore()
+    return _snapshot_store
@@ -2,10 +2,11 @@
 Model Training Pipeline with MLflow Integration
 """
 import asyncio
+import os
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import structlog
 import mlflow
@@ -15,19 +16,57 @@ from mlflow.tracking import MlflowClient
 from sklearn.model_selection import train_test_split, cross_val_score, TimeSeriesSplit
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.ensemble import IsolationForest
-import lightgbm as lgb
 from prophet import Prophet
-import optuna
-from optuna.integration.mlflow import MLflowCallback
 import joblib
+from joblib import Parallel, delayed
 
 from .model_registry import ModelRegistry, ModelMetadata
 from .feature_engineering import FeatureEngineer
 from .ml_service import PricePredictionModel, AnomalyDetectionModel, DemandForecastModel
+from .model_routing import SegmentModelRouter, segment_model_name
+from .demand_forecasting import get_demand_forecaster
+from .training_data import get_price_snapshot_store, TRAINING_PRICE_TYPES
+from .hyperparameter_search import optimize_lgb_hyperparams, best_lgb_params, study_summary
 from ..config import settings, MODEL_CONFIG
 
 logger = structlog.get_logger()
 
+# Price rows that record actual purchases, used as per-material demand
+DEMAND_PRICE_TYPES = ('contract', 'historical')
+
+
+def _fit_segment_model(segment: Tuple,
+                       features: List[str],
+                       hyperparams: Dict[str, Any],
+                       X_train: pd.DataFrame,
+                       y_train: pd.Series,
+                       X_val: Optional[pd.DataFrame],
+                       y_val: Optional[pd.Series]) -> Tuple[Tuple, PricePredictionModel, Dict[str, float]]:
+    """Fit one segment model (runs in a worker process)"""
+    # Segments already run in parallel; keep each booster single-threaded
+    model = PricePredictionModel({
+        'features': features,
+        'hyperparameters': {**hyperparams, 'num_threads': 1, 'verbosity': -1}
+    })
+    metrics = model.train(X_train, y_train, X_val, y_val)
+    return segment, model, metrics
+
+
+def _fit_cv_fold(config: Dict[str, Any],
+                 X_train: pd.DataFrame,
+                 y_train: pd.Series,
+                 X_val: pd.DataFrame,
+                 y_val: pd.Series) -> Dict[str, float]:
+    """Fit and score one CV fold (runs in a worker process)"""
+    model = PricePredictionModel(config)
+    model.train(X_train, y_train)
+    y_pred = model.predict(X_val)
+    return {
+        'mae': mean_absolute_error(y_val, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_val, y_pred)),
+        'r2': r2_score(y_val, y_pred),
+    }
+
 
 class ModelTrainer:
     """
@@ -47,8 +86,16 @@ class ModelTrainer:
                                          training_data: pd.DataFrame,
                                          target_column: str = 'price',
                                          test_size: float = 0.2,
-                                         optimize_hyperparams: bool = True) -> Dict[str, Any]:
-        """Train price prediction model with MLflow tracking"""
+                                         optimize_hyperparams: bool = True,
+                                         segment_by: Optional[List[str]] = None,
+                                         n_jobs: Optional[int] = None) -> Dict[str, Any]:
+        """Train price prediction model with MLflow tracking
+        
+        When ``segment_by`` is given (e.g. ``['material_category']`` or
+        ``['material_category', 'supplier_region']``), a model per segment is also
+        fitted in parallel and registered for routing; the global model
+        remains the fallback.
+        """
         
         with mlflow.start_run(run_name=f"price_predictor_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"):
             try:
@@ -182,10 +229,23 @@ class ModelTrainer:
                 
                 await self.model_registry.register_model('price_predictor', model, metadata)
                 
+                # Per-segment models routed ahead of the global fallback
+                segment_results = {}
+                if segment_by:
+                    segment_columns = engineered_data[segment_by]
+                    segment_results = await self._train_segment_models(
+                        segment_columns.loc[X_train.index],
+                        segment_columns.loc[X_test.index],
+                        X_train, y_train, X_test, y_test,
+                        selected_features, best_params, run_id,
+                        n_jobs=n_jobs if n_jobs is not None else settings.SEGMENT_TRAINING_JOBS
+                    )
+                
                 # Log success
                 logger.info(
                     "Price prediction model training completed",
                     metrics=train_metrics,
+                    segment_models=len(segment_results),
                     run_id=run_id
                 )
                 
@@ -195,7 +255,8 @@ class ModelTrainer:
                     'run_id': run_id,
                     'metrics': train_metrics,
                     'cv_metrics': {metric: np.mean(scores) for metric, scores in cv_scores.items()},
-                    'selected_features': selected_features
+                    'selected_features': selected_features,
+                    'segment_models': segment_results
                 }
                 
             except Exception as e:
@@ -203,100 +264,121 @@ class ModelTrainer:
                 logger.error("Model training failed", error=str(e), exc_info=True)
                 raise
     
+    async def _train_segment_models(self,
+                                    train_segments: pd.DataFrame,
+                                    test_segments: pd.DataFrame,
+                                    X_train: pd.DataFrame,
+                                    y_train: pd.Series,
+                                    X_test: pd.DataFrame,
+                                    y_test: pd.Series,
+                                    features: List[str],
+                                    hyperparams: Dict[str, Any],
+                                    run_id: str,
+                                    n_jobs: int = -1) -> Dict[str, Dict[str, float]]:
+        """Fit and register one model per segment across worker processes"""
+        segment_by = list(train_segments.columns)
+        train_groups = SegmentModelRouter.split_segments(
+            train_segments, segment_by, min_samples=settings.SEGMENT_MIN_SAMPLES
+        )
+        test_groups = SegmentModelRouter.split_segments(test_segments, segment_by)
+        
+        if not train_groups:
+            logger.info("No segment has enough samples", segment_by=segment_by)
+            return {}
+        
+        jobs = []
+        for segment, train_index in train_groups.items():
+            test_index = test_groups.get(segment)
+            jobs.append(delayed(_fit_segment_model)(
+                segment,
+                features,
+                hyperparams,
+                X_train.loc[train_index],
+                y_train.loc[train_index],
+                X_test.loc[test_index] if test_index is not None else None,
+                y_test.loc[test_index] if test_index is not None else None,
+            ))
+        
+        logger.info("Training segment models", segments=len(jobs), n_jobs=n_jobs)
+        fitted = await asyncio.to_thread(
+            lambda: Parallel(n_jobs=n_jobs, backend='loky')(jobs)
+        )
+        
+        results = {}
+        for segment, segment_model, metrics in fitted:
+            model_name = segment_model_name('price_predictor', *segment)
+            metadata = ModelMetadata(
+                name=model_name,
+                version=datetime.utcnow().strftime('%Y%m%d_%H%M%S'),
+                model_type='lightgbm',
+                created_at=datetime.utcnow(),
+                performance_metrics=metrics,
+                features=features,
+                mlflow_run_id=run_id
+            )
+            if await self.model_registry.register_model(model_name, segment_model, metadata):
+                results[model_name] = metrics
+                mlflow.log_metrics({
+                    f'{model_name}_{metric}': value
+                    for metric, value in metrics.items()
+                })
+        
+        return results
+    
     async def _optimize_lgb_hyperparams(self, 
                                       X_train: pd.DataFrame,
                                       y_train: pd.Series,
                                       X_val: pd.DataFrame,
                                       y_val: pd.Series,
                                       n_trials: int = 100) -> Dict[str, Any]:
-        """Optimize LightGBM hyperparameters using Optuna"""
-        
-        def objective(trial):
-            # Hyperparameter space
-            params = {
-                'objective': 'regression',
-                'metric': 'rmse',
-                'boosting_type': 'gbdt',
-                'num_leaves': trial.suggest_int('num_leaves', 10, 100),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'feature_fraction': trial.suggest_float('feature_fraction', 0.4, 1.0),
-                'bagging_fraction': trial.suggest_float('bagging_fraction', 0.4, 1.0),
-                'bagging_freq': trial.suggest_int('bagging_freq', 1, 7),
-                'min_child_samples': trial.suggest_int('min_child_samples', 5, 100),
-                'max_depth': trial.suggest_int('max_depth', 3, 12),
-                'reg_alpha': trial.suggest_float('reg_alpha', 0, 10),
-                'reg_lambda': trial.suggest_float('reg_lambda', 0, 10),
-                'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                'verbosity': -1
-            }
-            
-            # Train model
-            train_data = lgb.Dataset(X_train, label=y_train)
-            val_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
-            
-            model = lgb.train(
-                params,
-                train_data,
-                valid_sets=[val_data],
-                callbacks=[lgb.early_stopping(10), lgb.log_evaluation(0)]
-            )
-            
-            # Evaluate
-            y_pred = model.predict(X_val)
-            rmse = np.sqrt(mean_squared_error(y_val, y_pred))
-            
-            return rmse
-        
-        # Create study with MLflow callback
-        mlflow_callback = MLflowCallback(
-            tracking_uri=settings.MLFLOW_TRACKING_URI,
-            metric_name="rmse"
+        """Optimize LightGBM hyperparameters with a parallel, resumable Optuna study"""
+        study = await asyncio.to_thread(
+            optimize_lgb_hyperparams, X_train, y_train, X_val, y_val, n_trials=n_trials
         )
-        
-        study = optuna.create_study(direction='minimize')
-        study.optimize(objective, n_trials=n_trials, callbacks=[mlflow_callback])
+        summary = study_summary(study)
+        mlflow.log_param('optuna_study', study.study_name)
+        mlflow.log_metrics(summary)
         
         logger.info(
             "Hyperparameter optimization completed",
             best_value=study.best_value,
-            n_trials=n_trials
+            n_trials=n_trials,
+            **summary
         )
         
-        return study.best_params
+        return best_lgb_params(study)
     
     async def _cross_validate_model(self, 
                                   model: PricePredictionModel,
                                   X: pd.DataFrame,
                                   y: pd.Series,
-                                  cv_folds: int = 5) -> Dict[str, List[float]]:
-        """Perform cross-validation"""
+                                  cv_folds: int = 5,
+                                  n_jobs: Optional[int] = None) -> Dict[str, List[float]]:
+        """Perform cross-validation, fitting the folds in parallel worker processes"""
+        n_jobs = min(cv_folds, n_jobs or os.cpu_count() or 1)
+        hyperparams = model.config.get('hyperparameters', {})
         
         # Use TimeSeriesSplit if we have temporal data
         tscv = TimeSeriesSplit(n_splits=cv_folds)
         
-        cv_scores = {'mae': [], 'rmse': [], 'r2': []}
-        
-        for train_idx, val_idx in tscv.split(X):
-            X_train_cv = X.iloc[train_idx]
-            X_val_cv = X.iloc[val_idx]
-            y_train_cv = y.iloc[train_idx]
-            y_val_cv = y.iloc[val_idx]
-            
-            # Train model
-            temp_model = PricePredictionModel({
-                'features': model.feature_names,
-                'hyperparameters': model.config.get('hyperparameters', {})
-            })
-            temp_model.train(X_train_cv, y_train_cv)
-            
-            # Evaluate
-            y_pred_cv = temp_model.predict(X_val_cv)
-            
-            cv_scores['mae'].append(mean_absolute_error(y_val_cv, y_pred_cv))
-            cv_scores['rmse'].append(np.sqrt(mean_squared_error(y_val_cv, y_pred_cv)))
-            cv_scores['r2'].append(r2_score(y_val_cv, y_pred_cv))
+        # Fold models only need point predictions for the CV metrics
+        config = {
+            'features': model.feature_names,
+            'hyperparameters': {**hyperparams, 'num_threads': max(1, (os.cpu_count() or 1) // n_jobs)},
+            'quantiles': []
+        }
+        jobs = [
+            delayed(_fit_cv_fold)(config, X.iloc[train_idx], y.iloc[train_idx], X.iloc[val_idx], y.iloc[val_idx])
+            for train_idx, val_idx in tscv.split(X)
+        ]
+        fold_scores = await asyncio.to_thread(
+            lambda: Parallel(n_jobs=n_jobs, backend='loky')(jobs)
+        )
         
-        return cv_scores
+        return {
+            metric: [scores[metric] for scores in fold_scores]
+            for metric in ('mae', 'rmse', 'r2')
+        }
     
     async def train_anomaly_detection_model(self, 
                                           training_data: pd.DataFrame) -> Dict[str, Any]:
@@ -446,6 +528,28 @@ class ModelTrainer:
                 raise
 
 
+    async def refresh_demand_forecasts(self,
+                                       demand_history: pd.DataFrame,
+                                       periods: int = 30,
+                                       material_column: str = 'material_id',
+                                       ds_column: str = 'timestamp',
+                                       y_column: str = 'demand') -> Dict[str, Any]:
+        """Refit (where history changed) and forecast every material's demand model"""
+        histories = {
+            material_id: group.rename(columns={ds_column: 'ds', y_column: 'y'})[['ds', 'y']]
+            for material_id, group in demand_history.groupby(material_column, sort=False)
+        }
+        results = await asyncio.to_thread(get_demand_forecaster().forecast_many, histories, periods)
+        
+        summary = {
+            'materials': len(results),
+            'refitted': sum(1 for r in results.values() if r.get('refitted') and 'error' not in r),
+            'failed': sum(1 for r in results.values() if 'error' in r),
+        }
+        logger.info("Demand forecasts refreshed", **summary)
+        return summary
+
+
 class AutoMLTrainer:
     """
     Automated ML training pipeline with scheduling and retraining
@@ -454,6 +558,7 @@ class AutoMLTrainer:
     def __init__(self, model_registry: ModelRegistry):
         self.model_trainer = ModelTrainer(model_registry)
         self.model_registry = model_registry
+        self.snapshot_store = get_price_snapshot_store()
         self.training_schedule = {}
         self.performance_thresholds = {
             'price_predictor': {'min_r2': 0.85, 'max_mae': 0.1},
@@ -468,7 +573,7 @@ class AutoMLTrainer:
                 'frequency': timedelta(days=7),  # Weekly retraining
                 'last_trained': None,
                 'data_query': self._get_price_training_data,
-                'train_function': self.model_trainer.train_price_prediction_model
+                'train_function': self._train_price_model
             },
             'anomaly_detector': {
                 'frequency': timedelta(days=14),  # Bi-weekly
@@ -481,11 +586,27 @@ class AutoMLTrainer:
                 'last_trained': None,
                 'data_query': self._get_demand_training_data,
                 'train_function': self.model_trainer.train_demand_forecast_model
+            },
+            'demand_forecasts': {
+                'frequency': timedelta(days=1),  # Nightly per-material refresh
+                'last_trained': None,
+                'data_query': self._get_material_demand_history,
+                'train_function': self.model_trainer.refresh_demand_forecasts
             }
         }
         
         logger.info("Training schedule configured", models=list(self.training_schedule.keys()))
     
+    async def _train_price_model(self, training_data: pd.DataFrame) -> Dict[str, Any]:
+        """Train the global price model, plus segment models for ``PRICE_SEGMENT_BY``"""
+        segment_by = [col for col in settings.PRICE_SEGMENT_BY if col in training_data.columns]
+        missing = [col for col in settings.PRICE_SEGMENT_BY if col not in segment_by]
+        if missing:
+            logger.warning("Segment columns missing from training data", columns=missing)
+        return await self.model_trainer.train_price_prediction_model(
+            training_data, segment_by=segment_by or None
+        )
+    
     async def check_and_retrain_models(self) -> Dict[str, Any]:
         """Check if models need retraining and execute if needed"""
         retrain_results = {}
@@ -587,12 +708,25 @@ class AutoMLTrainer:
             }
     
     async def _get_price_training_data(self) -> pd.DataFrame:
-        """Get training data for price prediction model"""
-        # This would query your database for recent pricing data
-        # For now, return placeholder data
+        """Get training data for price prediction model from the price snapshot"""
         logger.info("Fetching price training data...")
         
-        # Placeholder - implement based on your data sources
+        # Bring the snapshot up to date; only prices inserted after its watermark are queried
+        try:
+            await self.snapshot_store.refresh()
+        except Exception as e:
+            logger.warning("Price snapshot refresh failed, using existing snapshot", error=str(e))
+        
+        since = datetime.now(timezone.utc) - timedelta(days=settings.PRICE_TRAINING_LOOKBACK_DAYS)
+        data = await asyncio.to_thread(
+            self.snapshot_store.read, since=since, price_types=TRAINING_PRICE_TYPES
+        )
+        if not data.empty:
+            data['timestamp'] = data['timestamp'].dt.tz_localize(None)
+            return data
+        
+        # Placeholder for development environments without price history
+        logger.warning("Price snapshot is empty, using placeholder training data")
         return pd.DataFrame({
             'timestamp': pd.date_range('2023-01-01', periods=1000, freq='D'),
             'material_id': np.random.randint(1, 100, 1000),
@@ -622,6 +756,32 @@ class AutoMLTrainer:
             'demand': demand
         })
     
+    async def _get_material_demand_history(self) -> pd.DataFrame:
+        """Daily purchased quantity per material from the price snapshot"""
+        logger.info("Fetching material demand history...")
+        
+        try:
+            await self.snapshot_store.refresh()
+        except Exception as e:
+            logger.warning("Price snapshot refresh failed, using existing snapshot", error=str(e))
+        
+        since = datetime.now(timezone.utc) - timedelta(days=settings.PRICE_TRAINING_LOOKBACK_DAYS)
+        purchases = await asyncio.to_thread(
+            self.snapshot_store.read,
+            since=since,
+            price_types=DEMAND_PRICE_TYPES,
+            columns=['material_id', 'timestamp', 'quantity']
+        )
+        if purchases.empty:
+            return pd.DataFrame(columns=['material_id', 'timestamp', 'demand'])
+        
+        purchases['timestamp'] = purchases['timestamp'].dt.tz_localize(None).dt.floor('D')
+        return (
+            purchases.groupby(['material_id', 'timestamp'], sort=False)['quantity'].sum()
+            .rename('demand')
+            .reset_index()
+        )
+    
     async def run_training_pipeline(self, 
                                   model_names: Optional[List[str]] = None) -> Dict[str, Any]:
         """Run training pipeline for specified models or all models"""
@@ -0,0 +1,190 @@
+"""
+Compiled tree inference tests.
+"""
+import pickle
+from types import SimpleNamespace
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from fastapi_ml.services.compiled_inference import (
+    CompiledIsolationForest,
+    CompiledLightGBMPredictor,
+    UnsupportedModelError,
+    compile_model,
+    flatten_lightgbm,
+)
+
+N_FEATURES = 5
+COLUMNS = [f'feature_{i}' for i in range(N_FEATURES)]
+
+
+def _train_booster(X, y, **params):
+    return lgb.train(
+        {'objective': 'regression', 'num_leaves': 15, 'min_data_in_leaf': 5, 'verbosity': -1, **params},
+        lgb.Dataset(X, label=y),
+        num_boost_round=30,
+    )
+
+
+def _assert_same(expected, actual):
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+
+
+def _internal_nodes(booster):
+    """Every split node of a booster's dumped trees"""
+    stack = [tree['tree_structure'] for tree in booster.dump_model()['tree_info']]
+    while stack:
+        node = stack.pop()
+        if 'leaf_value' not in node:
+            yield node
+            stack.extend([node['left_child'], node['right_child']])
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, N_FEATURES))
+    y = 3 * X[:, 0] + X[:, 1] ** 2 + rng.normal(scale=0.1, size=len(X))
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def booster(data):
+    return _train_booster(*data)
+
+
+@pytest.fixture(scope='module')
+def forest(data):
+    return IsolationForest(n_estimators=50, random_state=0).fit(pd.DataFrame(data[0], columns=COLUMNS))
+
+
+class TestCompiledLightGBM:
+    """Test cases for the compiled LightGBM predictor."""
+
+    def test_matches_stock_predictions(self, booster):
+        X = np.random.default_rng(1).normal(size=(20, N_FEATURES))
+
+        _assert_same(booster.predict(X), CompiledLightGBMPredictor(booster).predict(X))
+
+    def test_nan_follows_default_direction(self):
+        rng = np.random.default_rng(2)
+        X = rng.normal(size=(2000, N_FEATURES))
+        X[rng.random(X.shape) < 0.2] = np.nan
+        # Missing values carry their own signal so splits learn a direction
+        y = np.where(np.isnan(X[:, 0]), 10.0, X[:, 0]) + rng.normal(scale=0.1, size=len(X))
+        booster = _train_booster(X, y)
+        probe = rng.normal(size=(30, N_FEATURES))
+        probe[rng.random(probe.shape) < 0.3] = np.nan
+
+        assert any(
+            node.get('missing_type') == 'NaN'
+            for node in _internal_nodes(booster)
+        )
+        _assert_same(booster.predict(probe), CompiledLightGBMPredictor(booster).predict(probe))
+
+    def test_zero_as_missing(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(2000, N_FEATURES))
+        X[rng.random(X.shape) < 0.2] = 0.0
+        y = np.where(X[:, 0] == 0, 10.0, X[:, 0]) + rng.normal(scale=0.1, size=len(X))
+        booster = _train_booster(X, y, zero_as_missing=True)
+        probe = rng.normal(size=(30, N_FEATURES))
+        probe[rng.random(probe.shape) < 0.3] = 0.0
+        probe[:5, 1] = np.nan
+
+        assert any(
+            node.get('missing_type') == 'Zero'
+            for node in _internal_nodes(booster)
+        )
+        _assert_same(booster.predict(probe), CompiledLightGBMPredictor(booster).predict(probe))
+
+    def test_unsupported_objective_is_rejected(self, data):
+        X, y = data
+        booster = _train_booster(X, (y > 0).astype(int), objective='binary')
+
+        with pytest.raises(UnsupportedModelError):
+            flatten_lightgbm(booster)
+        model, compiled_count = compile_model(booster)
+        assert model is booster
+        assert compiled_count == 0
+
+    def test_rejects_wrong_feature_count(self, booster):
+        compiled = CompiledLightGBMPredictor(booster)
+
+        with pytest.raises(ValueError, match='5 features'):
+            compiled.predict(np.zeros((3, N_FEATURES - 1)))
+        with pytest.raises(ValueError, match='5 features'):
+            compiled.predict(np.zeros((3, N_FEATURES + 2)))
+
+    def test_large_batches_and_options_use_stock_predictor(self, booster):
+        X = np.random.default_rng(4).normal(size=(100, N_FEATURES))
+        compiled = CompiledLightGBMPredictor(booster, max_rows=10)
+
+        _assert_same(booster.predict(X), compiled.predict(X))
+        np.testing.assert_array_equal(
+            booster.predict(X[:3], pred_leaf=True), compiled.predict(X[:3], pred_leaf=True)
+        )
+
+    def test_pickle_round_trip(self, booster):
+        X = np.random.default_rng(5).normal(size=(10, N_FEATURES))
+        compiled = CompiledLightGBMPredictor(booster, max_rows=7)
+
+        restored = pickle.loads(pickle.dumps(compiled))
+
+        assert isinstance(restored, CompiledLightGBMPredictor)
+        assert restored.max_rows == 7
+        assert restored.num_trees() == booster.num_trees()
+        _assert_same(booster.predict(X), restored.predict(X))
+
+    def test_compile_model_swaps_verified_booster(self, booster):
+        model, compiled_count = compile_model(booster)
+
+        assert isinstance(model, CompiledLightGBMPredictor)
+        assert compiled_count == 1
+        assert compile_model(model) == (model, 1)
+
+
+class TestCompiledIsolationForest:
+    """Test cases for the compiled IsolationForest."""
+
+    def test_matches_stock_scores(self, forest):
+        X = pd.DataFrame(np.random.default_rng(6).normal(size=(50, N_FEATURES)), columns=COLUMNS)
+        compiled = CompiledIsolationForest(forest)
+
+        _assert_same(forest.score_samples(X), compiled.score_samples(X))
+        _assert_same(forest.decision_function(X), compiled.decision_function(X))
+        np.testing.assert_array_equal(forest.predict(X), compiled.predict(X))
+
+    def test_columns_are_selected_by_name(self, forest):
+        X = pd.DataFrame(np.random.default_rng(7).normal(size=(10, N_FEATURES)), columns=COLUMNS)
+        shuffled = X[COLUMNS[::-1]].assign(extra=1.0)
+
+        _assert_same(forest.decision_function(X), CompiledIsolationForest(forest).decision_function(shuffled))
+
+    def test_rejects_wrong_feature_count(self, forest):
+        with pytest.raises(ValueError, match='5 features'):
+            CompiledIsolationForest(forest).score_samples(np.zeros((3, N_FEATURES - 1)))
+
+    def test_pickle_round_trip(self, forest):
+        X = pd.DataFrame(np.random.default_rng(8).normal(size=(10, N_FEATURES)), columns=COLUMNS)
+        compiled = CompiledIsolationForest(forest, max_rows=5)
+
+        restored = pickle.loads(pickle.dumps(compiled))
+
+        assert isinstance(restored, CompiledIsolationForest)
+        assert restored.max_rows == 5
+        assert restored.offset_ == forest.offset_
+        _assert_same(forest.decision_function(X), restored.decision_function(X))
+
+    def test_compile_model_swaps_wrapped_forest(self, forest):
+        wrapper = SimpleNamespace(model=forest)
+        model, compiled_count = compile_model(wrapper)
+
+        assert model is wrapper
+        assert compiled_count == 1
+        assert isinstance(wrapper.model, CompiledIsolationForest)
+
@@ -0,0 +1,132 @@
+"""
+Per-material demand forecasting tests.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+
+from fastapi_ml.services import training_pipeline
+from fastapi_ml.services.demand_forecasting import DemandForecaster
+
+
+HYPERPARAMETERS = {'yearly_seasonality': False, 'weekly_seasonality': True, 'daily_seasonality': False}
+
+
+def _histories(n_materials=3, days=120):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    return {
+        f'material-{i}': pd.DataFrame({'ds': dates, 'y': rng.poisson(50 + 10 * i, days).astype(float)})
+        for i in range(n_materials)
+    }
+
+
+class TestDemandForecaster:
+    """Test cases for the pooled Prophet forecaster."""
+
+    def test_fits_are_reused_until_history_changes(self, tmp_path):
+        """Only materials with new history are refitted, including across instances."""
+        histories = _histories()
+        forecaster = DemandForecaster(cache_dir=str(tmp_path), n_jobs=2, hyperparameters=HYPERPARAMETERS)
+
+        first = forecaster.forecast_many(histories, periods=7)
+        assert all(result['refitted'] for result in first.values())
+        assert len(first['material-0']['forecast']) == 7
+        assert first['material-0']['forecast']['ds'].min() > histories['material-0']['ds'].max()
+
+        histories['material-1'] = pd.concat([
+            histories['material-1'],
+            pd.DataFrame({'ds': [pd.Timestamp('2024-04-30')], 'y': [75.0]}),
+        ])
+        restarted = DemandForecaster(cache_dir=str(tmp_path), n_jobs=2, hyperparameters=HYPERPARAMETERS)
+        second = restarted.forecast_many(histories, periods=7)
+
+        assert [m for m, result in second.items() if result['refitted']] == ['material-1']
+        pd.testing.assert_frame_equal(
+            second['material-0']['forecast'][['ds', 'yhat']].reset_index(drop=True),
+            first['material-0']['forecast'][['ds', 'yhat']].reset_index(drop=True),
+        )
+
+    def test_bad_history_fails_only_that_material(self, tmp_path):
+        """A material without usable history is reported, others still forecast."""
+        histories = _histories(n_materials=1)
+        histories['empty'] = pd.DataFrame({'ds': [pd.Timestamp('2024-01-01')], 'y': [1.0]})
+
+        results = DemandForecaster(cache_dir=str(tmp_path), n_jobs=1, hyperparameters=HYPERPARAMETERS).forecast_many(histories)
+
+        assert 'error' in results['empty']
+        assert len(results['material-0']['forecast']) == 30
+
+    def test_concurrent_batches_share_one_cache(self, tmp_path, monkeypatch):
+        """Two overlapping batches refitting the same materials both succeed."""
+        histories = _histories(n_materials=3, days=60)
+        forecaster = DemandForecaster(cache_dir=str(tmp_path), n_jobs=2, cache_size=1,
+                                      hyperparameters=HYPERPARAMETERS)
+        # Both batches rename their copy of material-0 at the same moment
+        barrier = threading.Barrier(2, timeout=60)
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if os.path.basename(dst) == 'material-0.json':
+                barrier.wait()
+            real_replace(src, dst)
+
+        monkeypatch.setattr(os, 'replace', replace)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            batches = [pool.submit(forecaster.forecast_many, histories, 7) for _ in range(2)]
+            results = [batch.result() for batch in batches]
+
+        for result in results:
+            assert all(len(result[m]['forecast']) == 7 for m in histories)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [f'material-{i}.json' for i in range(3)]
+        restarted = DemandForecaster(cache_dir=str(tmp_path), n_jobs=2, hyperparameters=HYPERPARAMETERS)
+        assert not any(r['refitted'] for r in restarted.forecast_many(histories, periods=7).values())
+
+    def test_store_failure_only_affects_that_material(self, tmp_path, monkeypatch):
+        """A model that cannot be written is still forecast, and the rest of the batch is stored."""
+        histories = _histories(n_materials=2, days=60)
+        forecaster = DemandForecaster(cache_dir=str(tmp_path), n_jobs=1, hyperparameters=HYPERPARAMETERS)
+        real_replace = os.replace
+
+        def replace(src, dst):
+            if os.path.basename(dst) == 'material-0.json':
+                raise FileNotFoundError(src)
+            real_replace(src, dst)
+
+        monkeypatch.setattr(os, 'replace', replace)
+        results = forecaster.forecast_many(histories, periods=7)
+
+        assert len(results['material-0']['forecast']) == 7
+        assert len(results['material-1']['forecast']) == 7
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['material-1.json']
+
+
+class TestScheduledDemandRefresh:
+    """Test cases for the nightly per-material forecast refresh."""
+
+    def test_refresh_is_scheduled_nightly(self, tmp_path, monkeypatch):
+        """The schedule refreshes every material's forecast from its daily demand history."""
+        # Skip ModelTrainer's MLflow setup; the refresh does not use it
+        model_trainer = training_pipeline.ModelTrainer.__new__(training_pipeline.ModelTrainer)
+        monkeypatch.setattr(training_pipeline, 'ModelTrainer', lambda model_registry: model_trainer)
+        monkeypatch.setattr(training_pipeline, 'get_price_snapshot_store', lambda: None)
+        forecaster = DemandForecaster(cache_dir=str(tmp_path), n_jobs=1, hyperparameters=HYPERPARAMETERS)
+        monkeypatch.setattr(training_pipeline, 'get_demand_forecaster', lambda: forecaster)
+        trainer = training_pipeline.AutoMLTrainer(Mock())
+        asyncio.run(trainer.setup_training_schedule())
+
+        schedule = trainer.training_schedule['demand_forecasts']
+        demand_history = pd.concat([
+            history.rename(columns={'ds': 'timestamp', 'y': 'demand'}).assign(material_id=material_id)
+            for material_id, history in _histories(n_materials=2).items()
+        ], ignore_index=True)
+        summary = asyncio.run(schedule['train_function'](demand_history))
+
+        assert schedule['frequency'] == timedelta(days=1)
+        assert summary == {'materials': 2, 'refitted': 2, 'failed': 0}
@@ -0,0 +1,47 @@
+"""
+Streaming drift sketch tests.
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from fastapi_ml.services.drift_sketches import SketchSet, sketch_ks, sketch_psi
+
+
+def _sketch(values, feature='price'):
+    return SketchSet.from_frame(pd.DataFrame({feature: values}))
+
+
+class TestDriftSketches:
+    """Test cases for mergeable drift sketches."""
+
+    def test_quantiles_within_relative_accuracy(self):
+        """Sketch quantiles stay within the bucket's relative error."""
+        values = np.random.default_rng(0).lognormal(3, 1, 50000)
+        sketch = _sketch(values)
+
+        expected = np.quantile(values, [0.1, 0.5, 0.9])
+        np.testing.assert_allclose(sketch.quantiles('price', [0.1, 0.5, 0.9]), expected, rtol=0.05)
+
+    def test_merge_equals_single_pass(self):
+        """Merging per-bucket sketches gives the sketch of all the data."""
+        values = np.random.default_rng(1).normal(0, 100, 10000)
+        parts = [_sketch(chunk) for chunk in np.array_split(values, 7)]
+        whole = _sketch(values)
+
+        stored = SketchSet.from_arrays(part.to_arrays() for part in parts)
+        np.testing.assert_array_equal(SketchSet.merge(parts).counts, whole.counts)
+        np.testing.assert_array_equal(stored.counts, whole.counts)
+        assert stored.count('price') == 10000
+        assert np.isclose(stored.mean('price'), values.mean())
+
+    def test_drift_statistics_track_exact_tests(self):
+        """KS and PSI from sketches approximate the full-sample statistics."""
+        rng = np.random.default_rng(2)
+        reference, current = rng.lognormal(3, 1, 100000), rng.lognormal(3.2, 1, 100000)
+        ref_hist, curr_hist = _sketch(reference).histogram('price'), _sketch(current).histogram('price')
+
+        statistic, p_value = sketch_ks(ref_hist, curr_hist)
+        assert abs(statistic - stats.ks_2samp(reference, current).statistic) < 0.01
+        assert p_value < 0.05
+        assert sketch_psi(ref_hist, curr_hist) > sketch_psi(ref_hist, _sketch(rng.lognormal(3, 1, 100000)).histogram('price'))
@@ -0,0 +1,38 @@
+"""
+Parallel, resumable hyperparameter search tests.
+"""
+import numpy as np
+import optuna
+import pandas as pd
+
+from fastapi_ml.services.hyperparameter_search import optimize_lgb_hyperparams, best_lgb_params
+
+
+def _data(n=400):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'quantity': rng.uniform(1, 100, n), 'weight': rng.uniform(0, 10, n)})
+    y = pd.Series(3 * X['weight'] + 0.1 * X['quantity'] + rng.normal(0, 1, n))
+    return X.iloc[:300], y.iloc[:300], X.iloc[300:], y.iloc[300:]
+
+
+class TestHyperparameterSearch:
+    """Test cases for the shared-storage Optuna search."""
+
+    def test_parallel_search_resumes_stored_study(self, tmp_path):
+        """Workers share one study, and a re-run only adds the missing trials."""
+        storage_url = f"sqlite:///{tmp_path / 'optuna.db'}"
+        X_train, y_train, X_val, y_val = _data()
+
+        study = optimize_lgb_hyperparams(X_train, y_train, X_val, y_val, n_trials=6, n_jobs=2, storage_url=storage_url)
+        finished = [t for t in study.trials if t.state.is_finished()]
+        assert 6 <= len(finished) <= 7
+        assert best_lgb_params(study)['objective'] == 'regression'
+
+        resumed = optimize_lgb_hyperparams(X_train, y_train, X_val, y_val, n_trials=10, n_jobs=2, storage_url=storage_url)
+        assert resumed.study_name == study.study_name
+        assert 10 <= len(resumed.trials) <= 11
+        assert resumed.best_value <= study.best_value
+
+        again = optimize_lgb_hyperparams(X_train, y_train, X_val, y_val, n_trials=10, n_jobs=2, storage_url=storage_url)
+        assert len(again.trials) == len(resumed.trials)
+        assert all(t.state != optuna.trial.TrialState.FAIL for t in again.trials)
@@ -0,0 +1,233 @@
+"""
+Lazy loading and memory-budget eviction tests for the model registry.
+"""
+import asyncio
+import json
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import fakeredis
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from fastapi_ml.config import settings
+from fastapi_ml.services import model_registry
+from fastapi_ml.services.model_registry import ModelRegistry
+
+
+class BoosterWrapper:
+    """Model wrapper holding a LightGBM booster, like PricePredictionModel"""
+
+    def __init__(self, model, weights):
+        self.model = model
+        self.weights = weights
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+def _linear_model(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(50, 3))
+    return LinearRegression().fit(X, X @ rng.normal(size=3))
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "MODEL_WARMUP_LIST", [])
+    monkeypatch.setattr(settings, "MODEL_WARMUP_TOP_N", 0)
+    monkeypatch.setattr(settings, "COMPILED_INFERENCE_ENABLED", False)
+    monkeypatch.setattr(settings, "MODEL_HOUSEKEEPING_SECONDS", 0)
+    # No MLflow server: discovery falls back to local storage
+    mlflow_client = MagicMock()
+    mlflow_client.get_latest_versions.return_value = []
+    monkeypatch.setattr(model_registry, "MlflowClient", lambda *args, **kwargs: mlflow_client)
+    for i, name in enumerate(("model_a", "model_b", "model_c")):
+        joblib.dump(_linear_model(i), tmp_path / f"{name}.joblib")
+    return tmp_path
+
+
+def _write_metadata(storage, name):
+    (storage / f"{name}_metadata.json").write_text(json.dumps({
+        "name": name, "version": "1", "model_type": "regression",
+        "created_at": "2024-01-01T00:00:00", "performance_metrics": {}, "features": [],
+    }))
+
+
+async def _serve(registry, *names):
+    for name in names:
+        await registry.get_model(name)
+
+
+def _count_loads(registry, delay=0.0):
+    """Record every load from a source, optionally slowing it down"""
+    loads = []
+    load_from_source = registry._load_from_source
+
+    def counting_load(source):
+        loads.append(source.name)
+        time.sleep(delay)
+        return load_from_source(source)
+
+    registry._load_from_source = counting_load
+    return loads
+
+
+class TestModelRegistry:
+    """Test cases for lazy discovery, per-model load locks and LRU eviction."""
+
+    def test_discovery_loads_nothing(self, storage):
+        """Startup only registers sources; models load on first request."""
+        registry = ModelRegistry()
+        asyncio.run(registry.load_models())
+
+        assert asyncio.run(registry.get_available_model_count()) == 3
+        assert asyncio.run(registry.get_loaded_model_count()) == 0
+        assert registry.has_model("model_a")
+        assert not registry.models
+
+        model = asyncio.run(registry.get_model("model_a"))
+
+        assert isinstance(model, LinearRegression)
+        assert list(registry.models) == ["model_a"]
+
+    def test_concurrent_first_requests_load_once(self, storage):
+        """Requests racing for an unloaded model share a single load."""
+        registry = ModelRegistry()
+        asyncio.run(registry.load_models())
+        loads = _count_loads(registry, delay=0.05)
+
+        async def first_requests():
+            return await asyncio.gather(*(registry.get_model("model_b") for _ in range(5)))
+
+        models = asyncio.run(first_requests())
+
+        assert loads == ["model_b"]
+        assert all(model is models[0] for model in models)
+        assert registry.metadata["model_b"].prediction_count == 5
+
+    def test_least_recently_used_model_is_evicted(self, storage):
+        """Going over the memory budget evicts the least recently used model, which reloads on demand."""
+        registry = ModelRegistry()
+        asyncio.run(registry.load_models())
+        for source in registry.sources.values():
+            source.size_bytes = 100
+        registry.memory_budget_bytes = 250
+        loads = _count_loads(registry)
+
+        async def requests(*names):
+            for name in names:
+                await registry.get_model(name)
+
+        asyncio.run(requests("model_a", "model_b", "model_a", "model_c"))
+
+        assert list(registry.models) == ["model_a", "model_c"]
+        assert loads == ["model_a", "model_b", "model_c"]
+
+        asyncio.run(requests("model_b"))
+
+        assert loads == ["model_a", "model_b", "model_c", "model_b"]
+        assert list(registry.models) == ["model_c", "model_b"]
+        assert sum(registry.model_sizes.values()) <= registry.memory_budget_bytes
+
+    def test_booster_is_stored_natively_and_arrays_are_memory_mapped(self, storage):
+        """LightGBM boosters round-trip through .lgb.txt and joblib arrays load memory-mapped."""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, 4))
+        booster = lgb.train({'objective': 'regression', 'verbose': -1},
+                            lgb.Dataset(X, X[:, 0] * 2 + X[:, 1]), num_boost_round=5)
+        wrapper = BoosterWrapper(booster, rng.normal(size=1000))
+
+        registry = ModelRegistry()
+        source = registry._save_local("price_model", wrapper)
+
+        assert (storage / "price_model.lgb.txt").exists()
+        assert wrapper.model is booster
+
+        restarted = ModelRegistry()
+        asyncio.run(restarted.load_models())
+        assert restarted.sources["price_model"].booster_path == source.booster_path
+        assert restarted.sources["price_model"].size_bytes == source.size_bytes
+
+        loaded = asyncio.run(restarted.get_model("price_model"))
+
+        assert isinstance(loaded.model, lgb.Booster)
+        assert isinstance(loaded.weights, np.memmap)
+        np.testing.assert_array_equal(loaded.weights, wrapper.weights)
+        np.testing.assert_allclose(loaded.predict(X), booster.predict(X))
+
+
+class TestRegistryHousekeeping:
+    """Test cases for persisted usage counts and the idle sweep."""
+
+    def test_warmup_ranking_survives_restart_from_metadata_files(self, storage, monkeypatch):
+        """Without Redis, usage counts are written back to the metadata files."""
+        monkeypatch.setattr(settings, "MODEL_WARMUP_TOP_N", 2)
+        for name in ("model_a", "model_b", "model_c"):
+            _write_metadata(storage, name)
+
+        async def first_run():
+            registry = ModelRegistry()
+            await registry.load_models()
+            await _serve(registry, "model_c", "model_c", "model_c", "model_b")
+            await registry.close()
+
+        asyncio.run(first_run())
+
+        restarted = ModelRegistry()
+        asyncio.run(restarted.load_models())
+
+        assert json.loads((storage / "model_c_metadata.json").read_text())["prediction_count"] == 3
+        assert asyncio.run(restarted.get_warmup_list()) == ["model_c", "model_b"]
+        assert list(restarted.models) == ["model_c", "model_b"]
+
+    def test_usage_counts_are_summed_across_workers_in_redis(self, storage, monkeypatch):
+        """Each worker adds its counts to one Redis hash that ranks the warm-up list."""
+        monkeypatch.setattr(settings, "MODEL_WARMUP_TOP_N", 1)
+
+        async def scenario():
+            redis_client = fakeredis.FakeAsyncRedis()
+            workers = [ModelRegistry(), ModelRegistry()]
+            for worker in workers:
+                await worker.initialize_redis(redis_client)
+                await worker.load_models()
+            await _serve(workers[0], "model_a", "model_a", "model_b")
+            await _serve(workers[1], "model_b", "model_b")
+            for worker in workers:
+                await worker.flush_usage_counts()
+
+            restarted = ModelRegistry()
+            await restarted.initialize_redis(redis_client)
+            await restarted.load_models()
+            return await restarted.get_usage_counts(), await restarted.get_warmup_list()
+
+        counts, warmup = asyncio.run(scenario())
+
+        assert counts == {"model_a": 2, "model_b": 3}
+        assert warmup == ["model_b"]
+
+    def test_idle_models_are_evicted_without_traffic(self, storage, monkeypatch):
+        """The periodic sweep evicts idle models even when get_model is never called again."""
+        monkeypatch.setattr(settings, "MODEL_HOUSEKEEPING_SECONDS", 0.01)
+
+        async def scenario():
+            registry = ModelRegistry()
+            await registry.load_models()
+            await _serve(registry, "model_a", "model_b")
+            assert list(registry.models) == ["model_a", "model_b"]
+
+            registry.idle_eviction = timedelta(0)
+            await asyncio.sleep(0.1)
+            resident = list(registry.models)
+            await registry.close()
+            return resident, registry._housekeeping_task
+
+        resident, task = asyncio.run(scenario())
+
+        assert resident == []
+        assert task is None
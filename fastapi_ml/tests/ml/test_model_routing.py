@@ -0,0 +1,236 @@
+"""
+Segment model routing tests.
+"""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fastapi_ml.config import settings
+from fastapi_ml.services import training_pipeline
+from fastapi_ml.services.ml_service import MLService
+from fastapi_ml.services.model_routing import SegmentModelRouter, segment_model_name
+from fastapi_ml.services.training_data import rows_to_batch
+
+
+class FakeRegistry:
+    """Answers has_model from a fixed set of registered names"""
+
+    def __init__(self, *names):
+        self.names = set(names)
+
+    def has_model(self, model_name):
+        return model_name in self.names
+
+
+class FakeModelTrainer:
+    def __init__(self, model_registry):
+        self.calls = []
+
+    async def train_price_prediction_model(self, training_data, **kwargs):
+        self.calls.append(kwargs)
+        return {'status': 'trained'}
+
+    async def train_anomaly_detection_model(self, training_data):
+        return {'status': 'trained'}
+
+    async def train_demand_forecast_model(self, training_data):
+        return {'status': 'trained'}
+
+    async def refresh_demand_forecasts(self, demand_history):
+        return {'materials': 0}
+
+
+class FakePriceExtractor:
+    """Serves a fixed set of price rows once"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def iter_batches(self, **kwargs):
+        yield rows_to_batch(self.rows)
+
+
+def _router(*names):
+    return SegmentModelRouter(FakeRegistry(*names))
+
+
+class TestSegmentModelName:
+    """Test cases for segment model naming."""
+
+    def test_names_are_slugified(self):
+        assert segment_model_name('price_predictor') == 'price_predictor'
+        assert segment_model_name('price_predictor', 'Raw Materials') == 'price_predictor__raw_materials'
+        assert segment_model_name('price_predictor', 'Electronics', 'EMEA / North') == \
+            'price_predictor__electronics__emea_north'
+
+    def test_region_without_category_is_ignored(self):
+        assert segment_model_name('price_predictor', None, 'emea') == 'price_predictor'
+        assert segment_model_name('price_predictor', np.nan, 'emea') == 'price_predictor'
+        assert segment_model_name('price_predictor', 'electronics', np.nan) == 'price_predictor__electronics'
+
+
+class TestSegmentModelRouter:
+    """Test cases for resolving and routing rows to segment models."""
+
+    def test_resolve_falls_back_from_region_to_category_to_global(self):
+        router = _router('price_predictor', 'price_predictor__electronics',
+                         'price_predictor__electronics__emea')
+
+        assert router.resolve('Electronics', 'EMEA') == 'price_predictor__electronics__emea'
+        assert router.resolve('Electronics', 'APAC') == 'price_predictor__electronics'
+        assert router.resolve('Electronics', None) == 'price_predictor__electronics'
+        assert router.resolve('Machinery', 'EMEA') == 'price_predictor'
+        assert router.resolve(None, 'EMEA') == 'price_predictor'
+        assert router.resolve(np.nan, np.nan) == 'price_predictor'
+
+    def test_resolve_without_any_model(self):
+        assert _router('price_predictor__electronics').resolve('machinery', 'emea') is None
+
+    def test_route_groups_rows_by_model(self):
+        router = _router('price_predictor', 'price_predictor__electronics',
+                         'price_predictor__electronics__emea')
+        df = pd.DataFrame({
+            'material_category': ['electronics', 'machinery', 'electronics', None, 'electronics'],
+            'supplier_region': ['emea', 'emea', 'apac', 'emea', 'emea'],
+        })
+
+        routes = router.route(df)
+
+        assert set(routes) == {'price_predictor', 'price_predictor__electronics',
+                               'price_predictor__electronics__emea'}
+        np.testing.assert_array_equal(routes['price_predictor__electronics__emea'], [0, 4])
+        np.testing.assert_array_equal(routes['price_predictor__electronics'], [2])
+        np.testing.assert_array_equal(routes['price_predictor'], [1, 3])
+
+    def test_route_without_segment_columns(self):
+        router = _router('price_predictor', 'price_predictor__electronics')
+
+        routes = router.route(pd.DataFrame({'quantity': [1, 2, 3]}))
+
+        assert list(routes) == ['price_predictor']
+        np.testing.assert_array_equal(routes['price_predictor'], [0, 1, 2])
+
+    def test_route_uses_category_column_and_missing_region(self):
+        router = _router('price_predictor', 'price_predictor__electronics')
+
+        routes = router.route(pd.DataFrame({'category': ['Electronics', 'Machinery']}))
+
+        np.testing.assert_array_equal(routes['price_predictor__electronics'], [0])
+        np.testing.assert_array_equal(routes['price_predictor'], [1])
+
+    def test_route_without_global_model(self):
+        routes = _router('price_predictor__electronics').route(
+            pd.DataFrame({'material_category': ['electronics', 'machinery']})
+        )
+
+        np.testing.assert_array_equal(routes['price_predictor__electronics'], [0])
+        np.testing.assert_array_equal(routes[None], [1])
+
+    def test_delivery_region_is_not_a_routing_key(self):
+        router = _router('price_predictor', 'price_predictor__electronics',
+                         'price_predictor__electronics__emea')
+
+        routes = router.route(pd.DataFrame({'category': ['electronics'], 'region': ['emea']}))
+
+        assert list(routes) == ['price_predictor__electronics']
+
+    def test_route_looks_up_supplier_region(self):
+        router = _router('price_predictor', 'price_predictor__electronics',
+                         'price_predictor__electronics__emea')
+        router.update_supplier_regions(pd.DataFrame({
+            'supplier_id': ['s1', 's2', 's1'],
+            'supplier_region': ['apac', 'emea', 'EMEA'],
+        }))
+
+        routes = router.route(pd.DataFrame({
+            'category': ['electronics', 'electronics', 'electronics', 'electronics'],
+            'supplier_id': ['s1', 's2', 's3', None],
+            'supplier_region': [None, None, None, 'emea'],
+        }))
+
+        assert router.supplier_regions == {'s1': 'EMEA', 's2': 'emea'}
+        np.testing.assert_array_equal(routes['price_predictor__electronics__emea'], [0, 1, 3])
+        np.testing.assert_array_equal(routes['price_predictor__electronics'], [2])
+
+    def test_price_sync_refreshes_supplier_regions(self):
+        """The service's periodic price sync keeps the router's supplier lookup current."""
+        service = MLService(Mock())
+        service.price_extractor = FakePriceExtractor([
+            (1, 'material-1', 'supplier-1', 'org-1', 12.0, 1.0, 'USD', 'quote',
+             datetime.now(timezone.utc), 'metals', 'raw_material', 'Acme', 'Europe', 4.5),
+        ])
+
+        asyncio.run(service.sync_price_observations())
+
+        assert service.model_router.supplier_regions == {'supplier-1': 'Europe'}
+
+    def test_trained_category_region_model_is_selected(self):
+        """Segments named at training time are the ones serving resolves."""
+        training_data = pd.DataFrame({
+            'material_category': ['Electronics'] * 3 + ['Machinery'] * 3,
+            'supplier_id': ['s1', 's1', 's2', 's3', 's3', 's3'],
+            'supplier_region': ['EMEA', 'EMEA', 'APAC', 'EMEA', 'EMEA', 'EMEA'],
+        })
+        segments = SegmentModelRouter.split_segments(
+            training_data, ['material_category', 'supplier_region'], min_samples=2
+        )
+        registered = [segment_model_name('price_predictor', *segment) for segment in segments]
+        router = _router('price_predictor', *registered)
+        router.update_supplier_regions(training_data)
+
+        # Serving items carry the category and the supplier, not its region
+        routes = router.route(pd.DataFrame({
+            'category': ['electronics', 'machinery', 'electronics'],
+            'supplier_id': ['s1', 's3', 's2'],
+            'region': ['apac', 'apac', 'emea'],
+        }))
+
+        assert sorted(registered) == ['price_predictor__electronics__emea', 'price_predictor__machinery__emea']
+        np.testing.assert_array_equal(routes['price_predictor__electronics__emea'], [0])
+        np.testing.assert_array_equal(routes['price_predictor__machinery__emea'], [1])
+        np.testing.assert_array_equal(routes['price_predictor'], [2])
+
+    def test_split_segments_drops_small_and_unlabelled_segments(self):
+        df = pd.DataFrame({
+            'material_category': ['a'] * 3 + ['b'] * 1 + [None] * 5,
+            'supplier_region': ['x', 'x', 'y', 'x', 'x', 'x', 'x', 'x', 'x'],
+        })
+
+        assert list(SegmentModelRouter.split_segments(df, ['material_category'], min_samples=2)) == [('a',)]
+        segments = SegmentModelRouter.split_segments(df, ['material_category', 'supplier_region'])
+        assert sorted(segments) == [('a', 'x'), ('a', 'y'), ('b', 'x')]
+        assert list(segments[('a', 'x')]) == [0, 1]
+
+
+class TestScheduledSegmentTraining:
+    """Test cases for segment training in the scheduled pipeline."""
+
+    @pytest.fixture
+    def trainer(self, monkeypatch):
+        monkeypatch.setattr(training_pipeline, 'ModelTrainer', FakeModelTrainer)
+        monkeypatch.setattr(training_pipeline, 'get_price_snapshot_store', lambda: None)
+        trainer = training_pipeline.AutoMLTrainer(FakeRegistry())
+        asyncio.run(trainer.setup_training_schedule())
+        return trainer
+
+    def _train(self, trainer):
+        data = pd.DataFrame({'material_category': ['a'], 'supplier_region': ['x'], 'price': [1.0]})
+        return asyncio.run(trainer.training_schedule['price_predictor']['train_function'](data))
+
+    def test_segments_are_opt_in(self, trainer, monkeypatch):
+        monkeypatch.setattr(settings, 'PRICE_SEGMENT_BY', [])
+
+        self._train(trainer)
+
+        assert trainer.model_trainer.calls == [{'segment_by': None}]
+
+    def test_configured_segments_are_trained(self, trainer, monkeypatch):
+        monkeypatch.setattr(settings, 'PRICE_SEGMENT_BY', ['material_category', 'supplier_region', 'missing'])
+
+        self._train(trainer)
+
+        assert trainer.model_trainer.calls == [{'segment_by': ['material_category', 'supplier_region']}]
@@ -0,0 +1,146 @@
+"""
+Monitoring history and alert index tests against an in-memory Redis.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import fakeredis
+
+from fastapi_ml.services.monitoring import ModelMonitor
+
+
+def _score(delta: timedelta) -> float:
+    """History score for a report stored ``delta`` ago"""
+    return (datetime.utcnow() - delta).timestamp()
+
+
+def _report(name: str) -> dict:
+    return {'model_name': 'price_predictor', 'overall_health': 'healthy', 'run': name}
+
+
+def _run(scenario):
+    """Run ``scenario(monitor, redis_client)`` against a fresh in-memory Redis"""
+    async def main():
+        redis_client = fakeredis.FakeAsyncRedis()
+        monitor = ModelMonitor(Mock(), redis_client, prediction_log=Mock())
+        return await scenario(monitor, redis_client)
+    return asyncio.run(main())
+
+
+class TestMonitoringHistory:
+    """Test cases for the per-model history sorted set."""
+
+    def test_results_are_stored_and_read_newest_first(self):
+        async def scenario(monitor, redis_client):
+            await redis_client.zadd('monitoring:history:price_predictor', {
+                json.dumps(_report('older')): _score(timedelta(hours=2)),
+            })
+
+            await monitor._store_monitoring_results('price_predictor', _report('latest'))
+
+            history = await monitor.get_monitoring_history('price_predictor')
+            assert [entry['run'] for entry in history] == ['latest', 'older']
+            latest = await redis_client.get('monitoring:latest:price_predictor')
+            assert json.loads(latest)['run'] == 'latest'
+            assert await redis_client.ttl('monitoring:history:price_predictor') > 0
+
+        _run(scenario)
+
+    def test_store_trims_entries_past_retention(self):
+        async def scenario(monitor, redis_client):
+            retention = timedelta(days=monitor.monitoring_config['data_retention_days'])
+            await redis_client.zadd('monitoring:history:price_predictor', {
+                json.dumps(_report('expired')): _score(retention + timedelta(hours=1)),
+                json.dumps(_report('kept')): _score(retention - timedelta(hours=1)),
+            })
+
+            await monitor._store_monitoring_results('price_predictor', _report('latest'))
+
+            history = await monitor.get_monitoring_history('price_predictor', hours_back=24 * 365)
+            assert [entry['run'] for entry in history] == ['latest', 'kept']
+
+        _run(scenario)
+
+    def test_hours_back_and_limit(self):
+        async def scenario(monitor, redis_client):
+            await redis_client.zadd('monitoring:history:price_predictor', {
+                json.dumps(_report(f'run-{hours}')): _score(timedelta(hours=hours))
+                for hours in (1, 2, 3, 10)
+            })
+
+            recent = await monitor.get_monitoring_history('price_predictor', hours_back=5)
+            limited = await monitor.get_monitoring_history('price_predictor', hours_back=5, limit=2)
+
+            assert [entry['run'] for entry in recent] == ['run-1', 'run-2', 'run-3']
+            assert [entry['run'] for entry in limited] == ['run-1', 'run-2']
+
+        _run(scenario)
+
+    def test_history_is_per_model(self):
+        async def scenario(monitor, redis_client):
+            await monitor._store_monitoring_results('price_predictor', _report('price'))
+
+            assert await monitor.get_monitoring_history('anomaly_detector') == []
+
+        _run(scenario)
+
+
+class TestAlertIndex:
+    """Test cases for listing alerts through the alerts:models index."""
+
+    def test_alerts_for_all_models(self):
+        async def scenario(monitor, redis_client):
+            await monitor.create_monitoring_alert('price_predictor', 'warning', 'drift')
+            await monitor.create_monitoring_alert('anomaly_detector', 'critical', 'down')
+
+            alerts = await monitor.get_active_alerts()
+            model_alerts = await monitor.get_active_alerts('anomaly_detector')
+
+            assert sorted(alert['model_name'] for alert in alerts) == ['anomaly_detector', 'price_predictor']
+            assert [alert['message'] for alert in model_alerts] == ['down']
+            assert await redis_client.smembers(ModelMonitor.ALERT_MODELS_KEY) == {
+                b'anomaly_detector', b'price_predictor'
+            }
+
+        _run(scenario)
+
+    def test_acknowledged_alerts_are_hidden(self):
+        async def scenario(monitor, redis_client):
+            await monitor.create_monitoring_alert('price_predictor', 'warning', 'open')
+            await redis_client.lpush('alerts:price_predictor', json.dumps({
+                'model_name': 'price_predictor', 'message': 'done', 'acknowledged': True,
+            }))
+
+            assert [alert['message'] for alert in await monitor.get_active_alerts()] == ['open']
+
+        _run(scenario)
+
+    def test_backfill_indexes_lists_written_before_the_index(self):
+        async def scenario(monitor, redis_client):
+            await redis_client.lpush('alerts:legacy_model', json.dumps({
+                'model_name': 'legacy_model', 'message': 'old', 'created_at': '2024-01-01T00:00:00',
+            }))
+            await monitor.create_monitoring_alert('price_predictor', 'warning', 'new')
+            assert [alert['message'] for alert in await monitor.get_active_alerts()] == ['new']
+
+            assert await ModelMonitor.backfill_alert_index(redis_client) == 2
+
+            alerts = await monitor.get_active_alerts()
+            assert [alert['message'] for alert in alerts] == ['new', 'old']
+            assert await redis_client.smembers(ModelMonitor.ALERT_MODELS_KEY) == {
+                b'legacy_model', b'price_predictor'
+            }
+
+        _run(scenario)
+
+    def test_backfill_runs_once(self):
+        async def scenario(monitor, redis_client):
+            assert await ModelMonitor.backfill_alert_index(redis_client) == 0
+            await redis_client.lpush('alerts:late_model', json.dumps({'message': 'late'}))
+
+            assert await ModelMonitor.backfill_alert_index(redis_client) == 0
+            assert await redis_client.smembers(ModelMonitor.ALERT_MODELS_KEY) == set()
+
+        _run(scenario)
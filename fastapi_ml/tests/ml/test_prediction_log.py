@@ -0,0 +1,138 @@
+"""
+Prediction log write/read tests.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fastapi_ml.services.drift_sketches import PREDICTION_FEATURE
+from fastapi_ml.services.prediction_log import PredictionLogReader, PredictionLogWriter, try_lock_file
+
+
+NOW = datetime(2024, 5, 1, 12, 30)
+
+
+def _log_hours(writer, hours, rows_per_hour=10):
+    for hour in range(hours):
+        features = pd.DataFrame({
+            'quantity': np.arange(rows_per_hour, dtype=float),
+            'lead_time_days': np.full(rows_per_hour, 7.0),
+        })
+        writer.log_predictions(
+            'price_predictor', '3', np.full(rows_per_hour, float(hour)), features,
+            latency_ms=5.0, timestamp=NOW - timedelta(hours=hour)
+        )
+
+
+class TestPredictionLog:
+    """Test cases for the prediction log."""
+
+    def test_count_and_window_pruning(self, tmp_path):
+        """Counts respect the time window, including partial hours."""
+        _log_hours(PredictionLogWriter(str(tmp_path)), hours=48)
+        reader = PredictionLogReader(str(tmp_path))
+
+        assert reader.count('price_predictor') == 480
+        assert reader.count('price_predictor', NOW - timedelta(hours=24), NOW + timedelta(seconds=1)) == 250
+        assert reader.count('anomaly_detector') == 0
+
+    def test_feature_projection(self, tmp_path):
+        """Only the requested feature columns are returned."""
+        _log_hours(PredictionLogWriter(str(tmp_path)), hours=3)
+        features = PredictionLogReader(str(tmp_path)).features('price_predictor', ['quantity', 'unknown'])
+
+        assert list(features.columns) == ['quantity']
+        assert len(features) == 30
+
+    def test_failures_and_volume(self, tmp_path):
+        """Failures are excluded from predictions but counted in volumes."""
+        writer = PredictionLogWriter(str(tmp_path))
+        _log_hours(writer, hours=2)
+        writer.log_failure('price_predictor', 'Prediction timeout', count=4, timestamp=NOW)
+        reader = PredictionLogReader(str(tmp_path))
+
+        assert len(reader.predictions('price_predictor')) == 20
+        volume = reader.volume('price_predictor', NOW - timedelta(hours=1), NOW + timedelta(minutes=1))
+        assert volume['prediction_count'].tolist() == [10, 10]
+        assert volume['error_count'].tolist() == [0, 4]
+
+    def test_compaction_preserves_rows(self, tmp_path):
+        """Closed hours are merged into a single segment."""
+        writer = PredictionLogWriter(str(tmp_path), retention_days=(datetime.utcnow() - NOW).days + 1)
+        _log_hours(writer, hours=1)
+        _log_hours(writer, hours=1)
+        writer._maintain((NOW + timedelta(hours=1)).strftime('%Y-%m-%dT%H'))
+
+        assert len(list(tmp_path.rglob('part-*.parquet'))) == 1
+        assert PredictionLogReader(str(tmp_path)).count('price_predictor') == 20
+
+    def test_lock_file_is_exclusive(self, tmp_path):
+        path = tmp_path / '.compact.lock'
+
+        with try_lock_file(path) as acquired:
+            assert acquired
+            with try_lock_file(path) as acquired_again:
+                assert not acquired_again
+        with try_lock_file(path) as acquired:
+            assert acquired
+
+    def test_compaction_skips_hours_locked_by_another_worker(self, tmp_path):
+        """An hour being compacted elsewhere is left alone until its lock is free."""
+        writer = PredictionLogWriter(str(tmp_path), retention_days=(datetime.utcnow() - NOW).days + 1)
+        _log_hours(writer, hours=1)
+        _log_hours(writer, hours=1)
+        hour_dir = next(tmp_path.rglob('hour=*'))
+        next_hour = (NOW + timedelta(hours=1)).strftime('%Y-%m-%dT%H')
+
+        with try_lock_file(hour_dir / '.compact.lock') as acquired:
+            assert acquired
+            writer._maintain(next_hour)
+            assert len(list(hour_dir.glob('part-*.parquet'))) == 2
+
+        writer._maintain(next_hour)
+        assert len(list(hour_dir.glob('part-*.parquet'))) == 1
+        assert not list(hour_dir.glob('*.tmp'))
+        assert PredictionLogReader(str(tmp_path)).count('price_predictor') == 20
+
+    def test_scan_retries_are_bounded(self, tmp_path):
+        """Files vanishing mid-scan trigger a fresh listing, a bounded number of times."""
+        _log_hours(PredictionLogWriter(str(tmp_path)), hours=1)
+        reader = PredictionLogReader(str(tmp_path))
+        calls = []
+
+        def vanished(*args):
+            calls.append(args)
+            raise FileNotFoundError('part-1.parquet')
+
+        reader._dataset = vanished
+        with pytest.raises(FileNotFoundError):
+            reader.count('price_predictor')
+        assert len(calls) == reader.SCAN_ATTEMPTS
+
+    def test_sketch_compaction_never_remerges_compacted_sketches(self, tmp_path):
+        """Late segments for a compacted hour get their own compacted sketch."""
+        writer = PredictionLogWriter(str(tmp_path), retention_days=(datetime.utcnow() - NOW).days + 1)
+        next_hour = (NOW + timedelta(hours=1)).strftime('%Y-%m-%dT%H')
+        for _ in range(2):
+            _log_hours(writer, hours=1)
+            _log_hours(writer, hours=1)
+            writer._maintain(next_hour)
+
+        hour_dir = next(tmp_path.rglob('hour=*'))
+        compacted = sorted(path.name for path in hour_dir.glob('sketch-*.npz'))
+        assert len(compacted) == 2 and all(name.startswith('sketch-c') for name in compacted)
+        sketch = PredictionLogReader(str(tmp_path)).sketches('price_predictor', NOW - timedelta(hours=1))
+        assert sketch.count(PREDICTION_FEATURE) == 40
+
+    def test_adjacent_sketch_windows_do_not_share_an_hour(self, tmp_path):
+        """The hour containing the end of a window belongs to the next window."""
+        _log_hours(PredictionLogWriter(str(tmp_path)), hours=3)
+        reader = PredictionLogReader(str(tmp_path))
+
+        reference = reader.sketches('price_predictor', NOW - timedelta(hours=3), NOW)
+        recent = reader.sketches('price_predictor', NOW)
+
+        assert reference.count(PREDICTION_FEATURE) == 20
+        assert recent.count(PREDICTION_FEATURE) == 10
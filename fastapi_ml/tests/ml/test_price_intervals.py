@@ -0,0 +1,111 @@
+"""
+Per-row quantile prediction interval tests.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from fastapi_ml.config import MODEL_CONFIG
+from fastapi_ml.services.ml_service import PricePredictionModel
+
+FEATURES = ['quantity', 'supplier_rating', 'volatility']
+
+
+def _synthetic_prices(n, seed):
+    """Prices whose noise grows with the volatility feature"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'quantity': rng.uniform(1, 100, n),
+        'supplier_rating': rng.uniform(1, 5, n),
+        'volatility': rng.uniform(0, 1, n),
+    })
+    y = 50 + 0.5 * X['quantity'] - 4 * X['supplier_rating'] + rng.normal(0, 1 + 15 * X['volatility'])
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def model():
+    config = MODEL_CONFIG['price_predictor']
+    price_model = PricePredictionModel({
+        **config,
+        'features': FEATURES,
+        'hyperparameters': {**config['hyperparameters'], 'objective': 'regression', 'verbose': -1},
+    })
+    X, y = _synthetic_prices(2000, seed=0)
+    X_val, y_val = _synthetic_prices(500, seed=1)
+    price_model.train(X, y, X_val, y_val)
+    return price_model
+
+
+@pytest.fixture(scope='module')
+def batch():
+    return _synthetic_prices(300, seed=2)[0]
+
+
+class TestPriceIntervals:
+    """Test cases for quantile-based prediction intervals."""
+
+    def test_quantile_models_are_trained(self, model, batch):
+        assert sorted(model.quantile_models) == [0.1, 0.9]
+
+        quantiles = model.predict_quantiles(batch)
+
+        assert sorted(quantiles) == [0.1, 0.9]
+        assert all(len(values) == len(batch) for values in quantiles.values())
+
+    def test_bounds_contain_point_prediction(self, model, batch):
+        predictions, lower, upper = model.predict_interval(batch)
+
+        np.testing.assert_array_equal(predictions, model.predict(batch))
+        assert np.all(lower <= predictions)
+        assert np.all(predictions <= upper)
+        assert np.all(lower < upper)
+
+    def test_row_interval_does_not_depend_on_batch(self, model, batch):
+        predictions, lower, upper = model.predict_interval(batch)
+        quantiles = model.predict_quantiles(batch)
+
+        for i in range(0, len(batch), 25):
+            row = batch.iloc[[i]]
+            row_prediction, row_lower, row_upper = model.predict_interval(row)
+            assert (row_prediction[0], row_lower[0], row_upper[0]) == (predictions[i], lower[i], upper[i])
+            for quantile, values in model.predict_quantiles(row).items():
+                assert values[0] == quantiles[quantile][i]
+
+        # Same rows in another order and next to other rows
+        shuffled = batch.sample(frac=1, random_state=0)
+        _, shuffled_lower, shuffled_upper = model.predict_interval(pd.concat([shuffled, batch.iloc[:10]]))
+        positions = batch.index.get_indexer(shuffled.index)
+        np.testing.assert_array_equal(shuffled_lower[:len(batch)], lower[positions])
+        np.testing.assert_array_equal(shuffled_upper[:len(batch)], upper[positions])
+
+    def test_interval_widens_with_noise(self, model):
+        calm = pd.DataFrame({'quantity': [50.0] * 3, 'supplier_rating': [3.0] * 3, 'volatility': [0.05] * 3})
+        volatile = calm.assign(volatility=0.95)
+
+        _, calm_lower, calm_upper = model.predict_interval(calm)
+        _, volatile_lower, volatile_upper = model.predict_interval(volatile)
+
+        assert np.all(volatile_upper - volatile_lower > 2 * (calm_upper - calm_lower))
+
+    def test_residual_band_without_quantile_models(self, model, batch):
+        """Models trained before quantile support fall back to a constant band."""
+        legacy = PricePredictionModel({'features': FEATURES, 'quantiles': []})
+        legacy.model = model.model
+        legacy.residual_std = model.residual_std
+        legacy.is_trained = True
+
+        predictions, lower, upper = legacy.predict_interval(batch)
+        _, row_lower, row_upper = legacy.predict_interval(batch.iloc[[7]])
+
+        assert np.all(lower <= predictions) and np.all(predictions <= upper)
+        np.testing.assert_allclose(upper - lower, 2 * PricePredictionModel.FALLBACK_INTERVAL_Z * model.residual_std)
+        assert (row_lower[0], row_upper[0]) == (lower[7], upper[7])
+
+    def test_untrained_model(self):
+        untrained = PricePredictionModel({'features': FEATURES})
+
+        with pytest.raises(ValueError):
+            untrained.predict_interval(pd.DataFrame({name: [1.0] for name in FEATURES}))
+        with pytest.raises(ValueError):
+            untrained.predict_quantiles(pd.DataFrame({name: [1.0] for name in FEATURES}))
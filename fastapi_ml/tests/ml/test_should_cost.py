@@ -0,0 +1,50 @@
+"""
+Vectorized should-cost model tests.
+"""
+import asyncio
+
+import pytest
+
+from fastapi_ml.services.ml_service import ShouldCostModel
+
+
+@pytest.fixture
+def model():
+    should_cost = ShouldCostModel()
+    asyncio.run(should_cost.initialize({
+        'materials': {'steel': 2.5, 'aluminum': 4.0, 'default': 3.0},
+        'labor': {'default': 50, 'skilled': 80},
+        'overhead': {'default': 0.25},
+    }))
+    return should_cost
+
+
+class TestShouldCostModel:
+    """Test cases for the array-based should-cost engine."""
+
+    def test_single_item_breakdown(self, model):
+        """Components, labor and overhead follow the rate tables."""
+        result = model.calculate_should_cost({
+            'frame': {'material_type': 'steel', 'weight': 10, 'complexity': 1.2},
+            'panel': {'material_type': 'unobtainium', 'weight': 2},
+            'labor_hours': 3,
+        }, quantity=4)
+
+        assert result['material_cost'] == pytest.approx(10 * 2.5 * 1.2 + 2 * 3.0)
+        assert result['labor_cost'] == pytest.approx(150)
+        assert result['total_cost'] == pytest.approx((36 + 150) * 1.25)
+        assert result['unit_cost'] == pytest.approx(result['total_cost'] / 4)
+        assert result['rate_coverage'] == pytest.approx(10 / 12)
+        assert [c['component'] for c in result['components']] == ['frame', 'panel']
+
+    def test_batch_matches_single_calls(self, model):
+        """A batch gives the same breakdowns as costing items one at a time."""
+        items = [
+            ({'body': {'material_type': 'aluminum', 'weight': i}, 'labor_hours': i % 3, 'labor_type': 'skilled'}, i + 1)
+            for i in range(50)
+        ] + [({}, 1)]
+
+        batch = model.calculate_should_cost_batch(items)
+        assert batch == [model.calculate_should_cost(specs, quantity) for specs, quantity in items]
+        assert batch[-1]['total_cost'] == 0
+        assert batch[7]['labor_cost'] == pytest.approx(80)
@@ -0,0 +1,205 @@
+"""
+Calendar-aware lag/rolling feature tests.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from fastapi_ml.services.ml_service import MLService
+from fastapi_ml.services.temporal_features import TemporalFeatureEngine
+from fastapi_ml.services.training_data import rows_to_batch
+
+
+FEATURES = [
+    'price_lag_1',
+    'price_lag_7',
+    'price_rolling_mean_7',
+    'price_rolling_mean_30',
+    'price_rolling_std_30',
+]
+
+
+@pytest.fixture
+def price_history():
+    """Irregularly spaced prices for a few material/supplier pairs."""
+    rng = np.random.default_rng(42)
+    n = 300
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'material_id': rng.integers(1, 4, n),
+        'supplier_id': rng.integers(1, 3, n),
+        'price': rng.lognormal(4, 0.3, n),
+    }, index=rng.permutation(n) + 100)
+
+
+class TestTemporalFeatureEngine:
+    """Test cases for the temporal feature engine."""
+
+    def test_lag_uses_calendar_offset(self):
+        """Lag features look back in days, not rows."""
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-10']),
+            'material_id': [1, 1, 1],
+            'supplier_id': [1, 1, 1],
+            'price': [10.0, 20.0, 30.0],
+        })
+        result = TemporalFeatureEngine(['price_lag_7']).compute_batch(df)
+
+        assert np.isnan(result['price_lag_7'].iloc[0])
+        assert np.isnan(result['price_lag_7'].iloc[1])
+        assert result['price_lag_7'].iloc[2] == 20.0
+
+    def test_rolling_window_excludes_current_row(self):
+        """Rolling windows are left-closed so the target never leaks."""
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(['2024-01-01', '2024-01-05', '2024-02-20']),
+            'material_id': [1, 1, 1],
+            'supplier_id': [1, 1, 1],
+            'price': [10.0, 20.0, 30.0],
+        })
+        result = TemporalFeatureEngine(['price_rolling_mean_30']).compute_batch(df)
+
+        assert np.isnan(result['price_rolling_mean_30'].iloc[0])
+        assert result['price_rolling_mean_30'].iloc[1] == 10.0
+        assert np.isnan(result['price_rolling_mean_30'].iloc[2])
+
+    def test_batch_preserves_index(self, price_history):
+        """Batch computation returns rows in their original order."""
+        result = TemporalFeatureEngine(FEATURES).compute_batch(price_history)
+
+        assert result.index.equals(price_history.index)
+        assert set(FEATURES).issubset(result.columns)
+
+    def test_online_state_matches_batch(self, price_history):
+        """Incremental serving features match the training computation."""
+        batch = TemporalFeatureEngine(FEATURES).compute_batch(price_history)
+
+        engine = TemporalFeatureEngine(FEATURES)
+        online = {}
+        ordered = price_history.sort_values('timestamp', kind='mergesort')
+        for timestamp, group in ordered.groupby('timestamp', sort=True):
+            records = group.to_dict('index')
+            for idx, record in records.items():
+                online[idx] = engine.lookup(record, timestamp)
+            for record in records.values():
+                engine.update(record, timestamp, record['price'])
+
+        online_df = pd.DataFrame.from_dict(online, orient='index').reindex(price_history.index)
+        for feature in FEATURES:
+            np.testing.assert_allclose(batch[feature], online_df[feature], equal_nan=True)
+
+    def test_late_arrival_rebuilds_state(self, price_history):
+        """Out-of-order updates give the same state as ordered ingestion."""
+        # Same-timestamp ties have no defined order, so keep one price per day
+        price_history = price_history.drop_duplicates(['timestamp', 'material_id', 'supplier_id'])
+        ordered = TemporalFeatureEngine(FEATURES)
+        ordered.ingest(price_history)
+
+        shuffled = TemporalFeatureEngine(FEATURES)
+        for record in price_history.sample(frac=1, random_state=7).to_dict('records'):
+            shuffled.update(record, record['timestamp'], record['price'])
+
+        entity = {'material_id': 1, 'supplier_id': 1}
+        expected = ordered.lookup(entity, '2024-04-15')
+        actual = shuffled.lookup(entity, '2024-04-15')
+        for feature in FEATURES:
+            np.testing.assert_allclose(expected[feature], actual[feature], rtol=1e-9, equal_nan=True)
+
+    def test_lookup_does_not_move_the_clock(self):
+        """Reads leave the state alone, so earlier observations are not late arrivals."""
+        engine = TemporalFeatureEngine(FEATURES)
+        entity = {'material_id': 1, 'supplier_id': 1}
+        engine.update(entity, '2024-01-01', 10.0)
+        state = engine.states[(1, 1)]
+
+        assert engine.lookup(entity, '2024-01-20')['price_lag_7'] == 10.0
+        engine.update(entity, '2024-01-10', 20.0)
+
+        assert engine.states[(1, 1)] is state
+        assert state.clock == pd.Timestamp('2024-01-10')
+        features = engine.lookup(entity, '2024-01-20')
+        assert features['price_lag_7'] == 20.0
+        assert features['price_rolling_mean_7'] != features['price_rolling_mean_7']  # nothing in the last week
+        assert features['price_rolling_mean_30'] == 15.0
+
+    def test_ingest_publishes_new_states(self):
+        """Ingest leaves the states lookups may be reading untouched and swaps in updated copies."""
+        engine = TemporalFeatureEngine(FEATURES)
+        entity = {'material_id': 1, 'supplier_id': 1}
+        engine.update(entity, '2024-01-01', 10.0)
+        state = engine.states[(1, 1)]
+
+        engine.ingest(pd.DataFrame({
+            'material_id': [1, 1], 'supplier_id': [1, 1],
+            'timestamp': ['2024-01-05', '2024-01-10'], 'price': [20.0, 30.0],
+        }))
+
+        assert engine.states[(1, 1)] is not state
+        assert state.clock == pd.Timestamp('2024-01-01')
+        assert engine.lookup(entity, '2024-01-20')['price_lag_7'] == 30.0
+
+
+class FakePriceExtractor:
+    """Serves price rows from memory with the extractor's filters."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def iter_batches(self, since=None, after_id=None, **kwargs):
+        yield rows_to_batch([
+            row for row in self.rows
+            if (since is None or row[8] >= since) and (after_id is None or row[0] > after_id)
+        ])
+
+
+def _price(price_id, price, days_ago, price_type='quote'):
+    return (
+        price_id, 'material-1', 'supplier-1', 'org-1', price, 1.0, 'USD', price_type,
+        datetime.now(timezone.utc) - timedelta(days=days_ago), 'metals', 'raw_material',
+        'Acme', 'Europe', 4.5,
+    )
+
+
+class TestOnlinePriceSync:
+    """Test cases for feeding the online feature state from the prices table."""
+
+    def test_sync_seeds_state_then_follows_new_prices(self):
+        """The first sync loads the horizon; later ones only read newer ids."""
+        service = MLService(Mock())
+        service.price_extractor = FakePriceExtractor([
+            _price(1, 10.0, days_ago=400),
+            _price(2, 12.0, days_ago=20),
+            _price(3, 99.0, days_ago=10, price_type='predicted'),
+        ])
+        entity = {'material_id': 'material-1', 'supplier_id': 'supplier-1'}
+
+        assert asyncio.run(service.sync_price_observations()) == 1
+        assert service._last_price_id == 3
+        assert service.feature_engineer.temporal_features.lookup(entity)['price_lag_7'] == 12.0
+
+        # A back-dated import is picked up by id
+        service.price_extractor.rows.append(_price(4, 14.0, days_ago=15))
+        assert asyncio.run(service.sync_price_observations()) == 1
+        assert asyncio.run(service.sync_price_observations()) == 0
+        assert service.feature_engineer.temporal_features.lookup(entity)['price_lag_7'] == 14.0
+
+    def test_close_stops_the_sync_loop(self):
+        """close() cancels the periodic sync and waits for it."""
+        async def scenario():
+            service = MLService(Mock())
+            service.price_extractor = FakePriceExtractor([_price(1, 12.0, days_ago=20)])
+            task = service._price_sync_task = asyncio.create_task(service._sync_prices_periodically())
+            while not service.feature_engineer.temporal_features.states:
+                await asyncio.sleep(0.01)
+
+            await service.close()
+
+            assert task.cancelled()
+            assert service._price_sync_task is None
+            await service.close()
+
+        asyncio.run(scenario())
@@ -0,0 +1,94 @@
+"""
+Price snapshot store tests.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi_ml.services.training_data import (
+    PRICE_SCHEMA, TRAINING_PRICE_TYPES, PriceSnapshotStore, rows_to_batch,
+)
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _row(i, price_type='quote'):
+    return (
+        i, f'material-{i % 3}', None if i % 4 == 0 else f'supplier-{i % 2}', 'org-1',
+        10.0 + i, 5.0, 'USD', price_type, START + timedelta(days=i),
+        'metals', 'raw_material', 'Acme', 'Europe', 4.5,
+    )
+
+
+class FakeExtractor:
+    """Serves rows from memory with the extractor's watermark semantics."""
+
+    def __init__(self, rows, chunk_size=3):
+        self.rows = rows
+        self.chunk_size = chunk_size
+        self.calls = []
+
+    async def iter_batches(self, after_id=None, **kwargs):
+        self.calls.append(after_id)
+        rows = [r for r in self.rows if after_id is None or r[0] > after_id]
+        for i in range(0, len(rows), self.chunk_size):
+            yield rows_to_batch(rows[i:i + self.chunk_size])
+
+
+class TestPriceSnapshotStore:
+    """Test cases for incremental Parquet price snapshots."""
+
+    def test_incremental_refresh_appends_only_new_rows(self, tmp_path):
+        """Refreshes extract from the watermark, and reads filter in the scan."""
+        extractor = FakeExtractor([_row(i) for i in range(10)] + [_row(10, 'predicted')])
+        clock = iter([START + timedelta(days=30), START + timedelta(days=31)])
+        store = PriceSnapshotStore(root=str(tmp_path), extractor=extractor, max_parts=2,
+                                   clock=lambda: next(clock))
+
+        assert asyncio.run(store.refresh())['new_rows'] == 11
+        assert extractor.calls == [None]
+        assert store.manifest()['watermark'] == 10
+        assert store.manifest()['refreshed_at'] == (START + timedelta(days=30)).isoformat()
+
+        # New prices are picked up by insertion order, including back-dated
+        # imports whose timestamp precedes everything already in the snapshot
+        extractor.rows.append(_row(11))
+        extractor.rows.append(_row(12, 'historical')[:8] + (START - timedelta(days=365),) + _row(12)[9:])
+        result = asyncio.run(store.refresh())
+        assert result == {'new_rows': 2, 'total_rows': 13, 'watermark': 12}
+        assert extractor.calls[-1] == 10
+
+        frame = store.read(price_types=('quote',))
+        assert len(frame) == 11
+        assert frame['supplier_id'].isna().sum() == 3
+        assert list(frame.columns) == PRICE_SCHEMA.names
+
+        # The since bound is inclusive, as extract_pricing_data's start_date always was
+        recent = store.read(since=START + timedelta(days=7), columns=['price_id', 'price'])
+        assert sorted(recent['price_id']) == [7, 8, 9, 10, 11]
+        assert 12 in store.read(price_types=TRAINING_PRICE_TYPES)['price_id'].tolist()
+
+    def test_compaction_and_full_refresh(self, tmp_path):
+        """Parts are compacted past max_parts, and a full refresh replaces them."""
+        extractor = FakeExtractor([])
+        store = PriceSnapshotStore(root=str(tmp_path), extractor=extractor, max_parts=2)
+        for i in range(4):
+            extractor.rows.append(_row(i))
+            asyncio.run(store.refresh())
+
+        manifest = store.manifest()
+        assert len(manifest['parts']) <= 2
+        assert manifest['rows'] == 4
+        assert sorted(store.read()['price_id']) == [0, 1, 2, 3]
+
+        asyncio.run(store.refresh(full=True))
+        assert extractor.calls[-1] is None
+        assert len(store.manifest()['parts']) == 1
+        assert len(store.read()) == 4
+        assert len(list(tmp_path.glob('prices/*.parquet'))) == 1
+
+        # Time-based watermarks of older snapshots trigger one rebuild
+        store._write_manifest({**store.manifest(), 'watermark': START.isoformat()})
+        assert asyncio.run(store.refresh())['total_rows'] == 4
+        assert extractor.calls[-1] is None
+        assert store.manifest()['watermark'] == 3
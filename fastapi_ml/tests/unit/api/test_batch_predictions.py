@@ -0,0 +1,71 @@
+"""
+Unit tests for synchronous batch price predictions.
+"""
+import asyncio
+from decimal import Decimal
+
+from fastapi_ml.api.v1.predictions import process_batch_sync
+from fastapi_ml.models.schemas import PricePredictionRequest, PredictionStatus
+
+
+class FakeMLService:
+    """Records predict_prices calls and answers with fixed prices."""
+
+    def __init__(self, prices=None, fail=False):
+        self.prices = prices
+        self.fail = fail
+        self.calls = []
+
+    async def predict_prices(self, items, include_uncertainty=True):
+        self.calls.append(items)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [
+            None if price is None else {
+                'item_id': item['item_id'],
+                'predicted_price': price,
+                'confidence_interval': {'lower': price * 0.8, 'upper': price * 1.2},
+                'model_version': 'price_predictor:3',
+            }
+            for item, price in zip(items, self.prices)
+        ]
+
+
+def _requests(*material_ids):
+    return [
+        PricePredictionRequest(material_id=material_id, quantity=Decimal('4'), unit_of_measure='kg')
+        for material_id in material_ids
+    ]
+
+
+class TestProcessBatchSync:
+    """Test cases for scoring a batch in one vectorized call."""
+
+    def test_whole_batch_is_scored_in_one_call(self):
+        ml_service = FakeMLService(prices=[100.0, 40.0, 8.0])
+
+        response = asyncio.run(process_batch_sync('batch-1', _requests('m1', 'm2', 'm3'), ml_service))
+
+        assert len(ml_service.calls) == 1
+        assert [item['material_id'] for item in ml_service.calls[0]] == ['m1', 'm2', 'm3']
+        assert response.status == PredictionStatus.COMPLETED
+        assert response.completed_predictions == 3
+        assert [result.material_id for result in response.results] == ['m1', 'm2', 'm3']
+        assert response.results[0].unit_price == Decimal('25')
+        assert response.results[0].prediction_interval == {'lower': Decimal('80'), 'upper': Decimal('120')}
+
+    def test_missing_results_are_reported_per_item(self):
+        ml_service = FakeMLService(prices=[100.0, None])
+
+        response = asyncio.run(process_batch_sync('batch-2', _requests('m1', 'm2'), ml_service))
+
+        assert response.completed_predictions == 1
+        assert response.failed_predictions == 1
+        assert response.errors[0]['material_id'] == 'm2'
+
+    def test_service_failure_fails_every_item(self):
+        response = asyncio.run(process_batch_sync('batch-3', _requests('m1', 'm2'), FakeMLService(fail=True)))
+
+        assert response.status == PredictionStatus.COMPLETED
+        assert response.failed_predictions == 2
+        assert [error['material_id'] for error in response.errors] == ['m1', 'm2']
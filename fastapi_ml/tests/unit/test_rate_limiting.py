@@ -0,0 +1,214 @@
+"""
+Unit tests for the rate limiting dependency.
+"""
+import asyncio
+import time
+
+import fakeredis
+import pytest
+from fastapi import Depends, FastAPI, status
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import dependencies
+from config import settings
+from dependencies import RateLimiter, get_current_user, load_token_bucket_script, rate_limit
+
+
+class InMemoryRateLimiter:
+    """Counts requests per key, standing in for the Redis token bucket."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.counts = {}
+
+    async def is_allowed(self, key, limit, window, burst=None):
+        if self.fail:
+            raise ConnectionError("Redis unavailable")
+        self.counts[key] = self.counts.get(key, 0) + 1
+        allowed = self.counts[key] <= limit
+        return allowed, {
+            "limit": limit,
+            "window": window,
+            "remaining": max(0, limit - self.counts[key]),
+            "retry_after": 0 if allowed else window,
+        }
+
+
+def _auth_headers(user_id):
+    token = jwt.encode(
+        {"sub": user_id, "exp": time.time() + 300},
+        settings.ML_SERVICE_JWT_SECRET,
+        algorithm="HS256",
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = InMemoryRateLimiter()
+
+    async def get_rate_limiter():
+        return limiter
+
+    monkeypatch.setattr(dependencies, "get_rate_limiter", get_rate_limiter)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(dependencies.RATE_LIMITS, "test", (2, 60))
+    return limiter
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/limited")
+    async def limited(user=Depends(get_current_user), _=Depends(rate_limit("test"))):
+        return {"user": user.id}
+
+    return TestClient(app)
+
+
+class TestRateLimitDependency:
+    """Test cases for per-user rate limit buckets."""
+
+    def test_users_behind_one_ip_get_separate_buckets(self, client, limiter):
+        """Buckets are keyed by the authenticated user, not the shared client IP."""
+        for _ in range(2):
+            assert client.get("/limited", headers=_auth_headers("user-a")).status_code == status.HTTP_200_OK
+
+        response = client.get("/limited", headers=_auth_headers("user-a"))
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+        response = client.get("/limited", headers=_auth_headers("user-b"))
+        assert response.status_code == status.HTTP_200_OK
+        assert set(limiter.counts) == {"rate_limit:bucket:test:user-a", "rate_limit:bucket:test:user-b"}
+
+    def test_redis_errors_fail_open(self, client, limiter):
+        """An unavailable Redis lets requests through instead of failing them."""
+        limiter.fail = True
+
+        for _ in range(3):
+            response = client.get("/limited", headers=_auth_headers("user-a"))
+            assert response.status_code == status.HTTP_200_OK
+
+
+def _run_limiter(scenario, **limiter_kwargs):
+    """Run ``scenario(limiter, redis_client)`` against the real script in fakeredis"""
+    async def main():
+        redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+        return await scenario(RateLimiter(redis_client, **limiter_kwargs), redis_client)
+    return asyncio.run(main())
+
+
+async def _redis_now_ms(redis_client):
+    seconds, microseconds = await redis_client.time()
+    return seconds * 1000 + microseconds // 1000
+
+
+class TestTokenBucketScript:
+    """Test cases for the Lua token bucket evaluated in Redis."""
+
+    def test_script_is_loaded_from_the_shared_file(self):
+        with open(settings.RATE_LIMIT_SCRIPT_PATH, encoding="utf-8") as script_file:
+            assert load_token_bucket_script() == script_file.read()
+        assert settings.RATE_LIMIT_SCRIPT_PATH.endswith("token_bucket.lua")
+
+    def test_requests_in_the_same_second_are_all_counted(self):
+        async def scenario(limiter, redis_client):
+            results = [(await limiter.is_allowed("bucket", 5, 3600))[0] for _ in range(8)]
+
+            assert results == [True] * 5 + [False] * 3
+            assert 7190 < await redis_client.ttl("bucket") <= 7200
+
+        _run_limiter(scenario, lease_size=1)
+
+    def test_denied_requests_report_retry_after(self):
+        async def scenario(limiter, redis_client):
+            for _ in range(3):
+                await limiter.is_allowed("bucket", 3, 3600)
+
+            allowed, metadata = await limiter.is_allowed("bucket", 3, 3600)
+
+            assert not allowed
+            assert metadata["remaining"] == 0
+            # One token refills every 1200 seconds
+            assert 1 <= metadata["retry_after"] <= 1200
+
+        _run_limiter(scenario, lease_size=1)
+
+    def test_tokens_refill_with_elapsed_time(self):
+        async def scenario(limiter, redis_client):
+            # Empty bucket last touched 30 seconds ago, refilling one token per second
+            now_ms = await _redis_now_ms(redis_client)
+            await redis_client.hset("bucket", mapping={"tokens": 0, "ts": now_ms - 30000})
+
+            allowed, metadata = await limiter.is_allowed("bucket", 60, 60)
+
+            assert allowed
+            assert metadata["remaining"] == 29
+
+        _run_limiter(scenario, lease_size=1)
+
+    def test_refill_is_capped_at_capacity(self):
+        async def scenario(limiter, redis_client):
+            now_ms = await _redis_now_ms(redis_client)
+            await redis_client.hset("bucket", mapping={"tokens": 5, "ts": now_ms - 3600 * 1000})
+
+            allowed, metadata = await limiter.is_allowed("bucket", 10, 60, burst=2)
+
+            assert allowed
+            assert metadata["remaining"] == 11
+
+        _run_limiter(scenario, lease_size=1)
+
+    def test_leased_tokens_are_served_locally(self):
+        async def scenario(limiter, redis_client):
+            allowed, metadata = await limiter.is_allowed("bucket", 100, 3600)
+            assert allowed and not metadata["leased"]
+            assert metadata["remaining"] == 99
+            assert int(float(await redis_client.hget("bucket", "tokens"))) == 90
+
+            for expected_remaining in range(8, -1, -1):
+                allowed, metadata = await limiter.is_allowed("bucket", 100, 3600)
+                assert allowed and metadata["leased"]
+                assert metadata["remaining"] == expected_remaining
+            assert int(float(await redis_client.hget("bucket", "tokens"))) == 90
+
+            # The lease is used up: the next check claims a new one
+            allowed, metadata = await limiter.is_allowed("bucket", 100, 3600)
+            assert allowed and not metadata["leased"]
+            assert int(float(await redis_client.hget("bucket", "tokens"))) == 80
+
+        _run_limiter(scenario, lease_size=10, lease_ttl=60)
+
+    def test_lease_is_capped_to_a_tenth_of_the_bucket(self):
+        async def scenario(limiter, redis_client):
+            await limiter.is_allowed("bucket", 20, 3600)
+
+            assert int(float(await redis_client.hget("bucket", "tokens"))) == 18
+
+        _run_limiter(scenario, lease_size=10, lease_ttl=60)
+
+    def test_partial_lease_when_few_tokens_are_left(self):
+        async def scenario(limiter, redis_client):
+            now_ms = await _redis_now_ms(redis_client)
+            await redis_client.hset("bucket", mapping={"tokens": 3, "ts": now_ms})
+
+            allowed, metadata = await limiter.is_allowed("bucket", 100, 3600)
+
+            assert allowed
+            assert metadata["remaining"] == 2
+            assert int(float(await redis_client.hget("bucket", "tokens"))) == 0
+
+        _run_limiter(scenario, lease_size=10, lease_ttl=60)
+
+    def test_lapsed_leases_are_discarded(self):
+        async def scenario(limiter, redis_client):
+            await limiter.is_allowed("bucket", 100, 3600)
+            allowed, metadata = await limiter.is_allowed("bucket", 100, 3600)
+
+            # Unused leased tokens are not returned to the bucket
+            assert allowed and not metadata["leased"]
+            assert int(float(await redis_client.hget("bucket", "tokens"))) == 80
+
+        _run_limiter(scenario, lease_size=10, lease_ttl=0)
@@ -0,0 +1,78 @@
+"""
+Benchmark compiled tree inference against the stock LightGBM/sklearn predictors.
+
+Run from the repository root:
+
+    python -m tests.performance.benchmark_tree_inference
+"""
+import time
+from typing import Callable, Dict, List
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from fastapi_ml.services.compiled_inference import CompiledIsolationForest, CompiledLightGBMPredictor
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+N_FEATURES = 20
+
+
+def _time_call(func: Callable[[], object], min_seconds: float = 0.2) -> float:
+    """Median seconds per call over enough repetitions to fill ``min_seconds``"""
+    func()  # warm-up
+    timings = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < min_seconds or len(timings) < 5:
+        call_started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - call_started)
+    return float(np.median(timings))
+
+
+def benchmark() -> List[Dict[str, object]]:
+    rng = np.random.default_rng(42)
+    columns = [f'feature_{i}' for i in range(N_FEATURES)]
+    X_train = pd.DataFrame(rng.normal(size=(20000, N_FEATURES)), columns=columns)
+    y_train = X_train['feature_0'] * 3 + X_train['feature_1'] ** 2 + rng.normal(size=len(X_train))
+
+    booster = lgb.train(
+        {'objective': 'regression', 'num_leaves': 31, 'verbosity': -1},
+        lgb.Dataset(X_train, label=y_train),
+        num_boost_round=200,
+    )
+    forest = IsolationForest(n_estimators=100, random_state=42).fit(X_train)
+
+    # No batch-size cutoff: measure the compiled path itself to tune the cutoffs
+    compiled_booster = CompiledLightGBMPredictor(booster, max_rows=None)
+    compiled_forest = CompiledIsolationForest(forest, max_rows=None)
+
+    results = []
+    for batch_size in BATCH_SIZES:
+        batch = pd.DataFrame(rng.normal(size=(batch_size, N_FEATURES)), columns=columns)
+
+        assert np.array_equal(booster.predict(batch), compiled_booster.predict(batch))
+        assert np.array_equal(forest.decision_function(batch), compiled_forest.decision_function(batch))
+
+        for model_name, stock, compiled in (
+            ('lightgbm', lambda: booster.predict(batch), lambda: compiled_booster.predict(batch)),
+            ('isolation_forest', lambda: forest.decision_function(batch),
+             lambda: compiled_forest.decision_function(batch)),
+        ):
+            stock_seconds = _time_call(stock)
+            compiled_seconds = _time_call(compiled)
+            results.append({
+                'model': model_name,
+                'batch_size': batch_size,
+                'stock_ms': stock_seconds * 1000,
+                'compiled_ms': compiled_seconds * 1000,
+                'speedup': stock_seconds / compiled_seconds,
+            })
+
+    return results
+
+
+if __name__ == '__main__':
+    report = pd.DataFrame(benchmark())
+    print(report.to_string(index=False, float_format=lambda value: f'{value:.3f}'))